@@ -0,0 +1,106 @@
+"""
+Benchmark analitik per user: NumPy (core.analytics) vs loop dict per baris
+
+Kedua versi menghitung deret bulanan WIB, rata-rata bergulir, rasio tabungan dan
+porsi kategori dari baris yang sama, lalu hasilnya dibandingkan.
+Jalankan: python benchmarks/bench_analytics.py [jumlah_transaksi ...] (default 10000 100000 1000000)
+"""
+
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.analytics import TransactionArrays, analyze
+
+CATEGORIES = ['makanan', 'transport', 'hiburan', 'belanja', 'tagihan', 'gaji', 'freelance']
+WINDOW = 3
+
+
+def generate_rows(count: int):
+    rng = random.Random(5)
+    base = datetime(2019, 1, 1)
+    rows = [(i + 1, "user", "User", 'income' if i % 5 == 0 else 'expense', float(rng.randint(1_000, 5_000_000)),
+             rng.choice(CATEGORIES), "", (base + timedelta(seconds=rng.randrange(5 * 365 * 86400))).strftime('%Y-%m-%d %H:%M:%S'))
+            for i in range(count)]
+    rows.sort(key=lambda row: row[7])
+    return rows
+
+
+def analyze_loop(rows, window: int = WINDOW, top: int = 3):
+    """Versi lama: akumulasi dict per baris"""
+    monthly = {}
+    local_months = []
+    for row in rows:
+        local = datetime.strptime(row[7], '%Y-%m-%d %H:%M:%S') + timedelta(hours=7)
+        month = (local.year, local.month)
+        local_months.append(month)
+        totals = monthly.setdefault(month, {'income': 0.0, 'expense': 0.0, 'count': 0})
+        totals[row[3]] += row[4]
+        totals['count'] += 1
+
+    first, last = min(monthly), max(monthly)
+    months = []
+    year, month = first
+    while (year, month) <= last:
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    income = [monthly.get(m, {}).get('income', 0.0) for m in months]
+    expense = [monthly.get(m, {}).get('expense', 0.0) for m in months]
+    window = max(1, min(window, len(months)))
+    rolling_expense = []
+    for i in range(len(months)):
+        chunk = expense[max(0, i - window + 1):i + 1]
+        rolling_expense.append(sum(chunk) / len(chunk))
+
+    recent = set(months[-window:])
+    categories = {}
+    for row, month in zip(rows, local_months):
+        if row[3] == 'expense' and month in recent:
+            categories[row[5]] = categories.get(row[5], 0.0) + row[4]
+    total = sum(categories.values())
+    shares = sorted(((name, value / total) for name, value in categories.items()), key=lambda item: -item[1])
+
+    recent_income, recent_expense = sum(income[-window:]), sum(expense[-window:])
+    return {
+        'months': [f"{y}-{m:02d}" for y, m in months],
+        'rolling_expense': rolling_expense,
+        'savings_rate': (recent_income - recent_expense) / recent_income if recent_income > 0 else None,
+        'shares': shares[:top],
+    }
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    for count in counts:
+        rows = generate_rows(count)
+
+        start = time.perf_counter()
+        expected = analyze_loop(rows)
+        loop_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        data = TransactionArrays.from_rows(rows)
+        load_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        result = analyze(data, window=WINDOW)
+        numpy_seconds = time.perf_counter() - start
+
+        assert result['months'] == expected['months']
+        assert all(math.isclose(a, b) for a, b in zip(result['rolling_expense'], expected['rolling_expense']))
+        assert math.isclose(result['savings_rate'], expected['savings_rate'])
+        assert [(s['category'], round(s['share'], 9)) for s in result['expense_shares']] == \
+               [(name, round(share, 9)) for name, share in expected['shares']]
+
+        total = load_seconds + numpy_seconds
+        print(f"{count:>9,} transaksi: loop {loop_seconds * 1000:9.1f} ms | numpy {total * 1000:8.1f} ms "
+              f"(muat {load_seconds * 1000:.1f} + hitung {numpy_seconds * 1000:.1f}) | {loop_seconds / total:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark backup online: throughput snapshot dan latensi insert selama backup berjalan
+
+Membandingkan backup bertahap (BACKUP_STEP_PAGES per langkah dengan jeda) dengan
+backup satu langkah (pages=-1), sementara satu thread terus memanggil add_transaction.
+
+Jalankan: python benchmarks/bench_backup.py [jumlah_transaksi] (default 1000000)
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.backup import BACKUP_STEP_PAGES, BACKUP_STEP_SLEEP, backup_database
+from core.database import DatabaseManager
+
+CATEGORIES = ['makanan', 'transport', 'hiburan', 'belanja', 'tagihan', 'gaji', 'freelance']
+
+
+def generate_rows(count: int):
+    rng = random.Random(5)
+    for i in range(count):
+        yield (f"user{rng.randrange(1000)}", "User", 'income' if i % 5 == 0 else 'expense',
+               rng.randint(1_000, 5_000_000), rng.choice(CATEGORIES), f"transaksi {i}",
+               f"202{rng.randrange(4)}-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d} 10:00:00")
+
+
+def percentile(latencies, fraction: float) -> float:
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def measure(db: DatabaseManager, action):
+    """Jalankan action sambil mengukur latensi add_transaction (ms) di thread lain"""
+    latencies = []
+    stop = threading.Event()
+
+    def writer():
+        while not stop.is_set():
+            start = time.perf_counter()
+            db.add_transaction("writer", "Writer", 'expense', 1000, 'makanan', 'selama backup')
+            latencies.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.002)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        result = action()
+    finally:
+        stop.set()
+        thread.join()
+    return result, latencies
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    temp_dir = tempfile.mkdtemp()
+    db = DatabaseManager(os.path.join(temp_dir, 'bench.db'), pool_size=4)
+    try:
+        db.add_transactions_bulk(generate_rows(count))
+        size = db.get_storage_stats()
+        print(f"{count:,} transaksi, {size['page_count'] * size['page_size'] / 1048576:,.0f} MB")
+
+        _, idle = measure(db, lambda: time.sleep(2))
+        print(f"  tanpa backup              : insert p50 {percentile(idle, 0.5):6.2f} ms, "
+              f"p99 {percentile(idle, 0.99):6.2f} ms")
+
+        for label, pages, step_sleep in [
+            (f"bertahap {BACKUP_STEP_PAGES} halaman", BACKUP_STEP_PAGES, BACKUP_STEP_SLEEP),
+            ("satu langkah", -1, 0.0),
+        ]:
+            target = os.path.join(temp_dir, f"snapshot{pages}.db")
+
+            def action():
+                with db.pool.connection() as conn:
+                    return backup_database(conn, target, pages=pages, step_sleep=step_sleep)
+
+            result, latencies = measure(db, action)
+            print(f"  {label:<26}: {result['seconds']:6.2f} detik, "
+                  f"{result['bytes_per_second'] / 1048576:7.1f} MB/s, diulang {result['restarts']}x, "
+                  f"insert p50 {percentile(latencies, 0.5):6.2f} ms, p99 {percentile(latencies, 0.99):6.2f} ms "
+                  f"({len(latencies)} insert)")
+    finally:
+        db.close()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
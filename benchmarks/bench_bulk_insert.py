@@ -0,0 +1,73 @@
+"""
+Benchmark insert transaksi: add_transaction per baris vs add_transactions_bulk
+
+Jalankan: python benchmarks/bench_bulk_insert.py [jumlah_baris] [batch_size]
+
+Skenario 1 user meniru import riwayat satu orang, 1000 user meniru replay log bot.
+"""
+
+import os
+import sys
+import random
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import DatabaseManager
+
+CATEGORIES = ['makanan', 'transport', 'hiburan', 'belanja', 'tagihan', 'gaji', 'freelance']
+
+
+def generate_rows(count: int, users: int = 1000):
+    """Generator baris transaksi acak (tidak disimpan di memori sekaligus)"""
+    rng = random.Random(42)
+    for i in range(count):
+        user = rng.randrange(users)
+        yield (f"user{user}", f"User{user}", 'income' if i % 5 == 0 else 'expense',
+               rng.randint(1_000, 5_000_000), rng.choice(CATEGORIES), f"transaksi {i}")
+
+
+def fresh_db():
+    temp_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+    temp_db.close()
+    return temp_db.name, DatabaseManager(temp_db.name)
+
+
+def cleanup(path: str, db: DatabaseManager):
+    db.close()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.unlink(path + suffix)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    single_count = min(count, 2000)
+
+    path, db = fresh_db()
+    try:
+        start = time.perf_counter()
+        for row in generate_rows(single_count):
+            db.add_transaction(*row)
+        elapsed = time.perf_counter() - start
+        print(f"add_transaction x {single_count:,}: {single_count / elapsed:12,.0f} baris/detik")
+    finally:
+        cleanup(path, db)
+
+    for users in (1, 1000):
+        path, db = fresh_db()
+        try:
+            start = time.perf_counter()
+            result = db.add_transactions_bulk(generate_rows(count, users), batch_size=batch_size)
+            elapsed = time.perf_counter() - start
+            print(f"add_transactions_bulk x {count:,} ({users} user, batch {batch_size}): "
+                  f"{result['inserted'] / elapsed:12,.0f} baris/detik "
+                  f"({result['inserted']:,} sukses, {result['failed']:,} gagal, {elapsed:.2f} detik)")
+        finally:
+            cleanup(path, db)
+
+
+if __name__ == "__main__":
+    main()
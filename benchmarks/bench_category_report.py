@@ -0,0 +1,69 @@
+"""
+Benchmark laporan kategori dan ringkasan bulanan untuk user dengan riwayat panjang
+
+Jalankan: python benchmarks/bench_category_report.py [jumlah_transaksi]
+"""
+
+import os
+import sys
+import random
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import DatabaseManager
+
+CATEGORIES = ['makanan', 'transport', 'hiburan', 'belanja', 'tagihan', 'gaji', 'freelance']
+REPEAT = 200
+
+
+def generate_rows(count: int):
+    """Riwayat 5 tahun untuk satu user"""
+    rng = random.Random(7)
+    for i in range(count):
+        year = 2020 + rng.randrange(5)
+        month = rng.randrange(1, 13)
+        day = rng.randrange(1, 29)
+        yield ("user0", "User0", 'income' if i % 5 == 0 else 'expense',
+               rng.randint(1_000, 5_000_000), rng.choice(CATEGORIES), f"transaksi {i}",
+               f"{year}-{month:02d}-{day:02d} 10:00:00")
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        func(*args)
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    temp_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+    temp_db.close()
+    db = DatabaseManager(temp_db.name)
+
+    try:
+        db.add_transactions_bulk(generate_rows(count))
+
+        def raw_report(user_id):
+            with db.pool.connection() as conn:
+                conn.execute('''
+                    SELECT category, transaction_type, SUM(amount) FROM transactions
+                    WHERE user_id = ? GROUP BY category, transaction_type
+                ''', (user_id,)).fetchall()
+
+        print(f"{count:,} transaksi untuk 1 user")
+        print(f"GROUP BY transaksi mentah : {timed(raw_report, 'user0'):8.3f} ms")
+        print(f"get_category_report      : {timed(db.get_category_report, 'user0'):8.3f} ms")
+        print(f"get_monthly_summary      : {timed(db.get_monthly_summary, 'user0'):8.3f} ms")
+    finally:
+        db.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(temp_db.name + suffix):
+                os.unlink(temp_db.name + suffix)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark latency per pemanggilan DatabaseManager
+Membandingkan pola lama (sqlite3.connect per pemanggilan) dengan connection pool
+
+Jalankan: python benchmarks/bench_connection_pool.py [jumlah_pemanggilan]
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+import time
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import DatabaseManager
+
+USER_ID = "bench_user"
+
+
+def legacy_get_balance(db_path: str, user_id: str):
+    """Pola sebelum pool: buka koneksi baru untuk setiap query"""
+    with sqlite3.connect(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT COALESCE(SUM(amount), 0) FROM transactions
+            WHERE user_id = ? AND transaction_type = 'income'
+        ''', (user_id,))
+        cursor.fetchone()
+        cursor.execute('''
+            SELECT COALESCE(SUM(amount), 0) FROM transactions
+            WHERE user_id = ? AND transaction_type = 'expense'
+        ''', (user_id,))
+        cursor.fetchone()
+
+
+def measure(func, calls: int):
+    """Return list latency (mikrodetik) untuk setiap pemanggilan"""
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    return samples
+
+
+def report(label: str, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{label:<28} mean {statistics.mean(samples):8.1f} us   "
+          f"p50 {statistics.median(samples):8.1f} us   p95 {p95:8.1f} us")
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    temp_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+    temp_db.close()
+    db = DatabaseManager(temp_db.name, pool_size=4)
+
+    try:
+        for i in range(200):
+            db.add_transaction(USER_ID, "Bench", 'income' if i % 2 else 'expense', 1000 + i, 'gaji')
+
+        print(f"get_user_balance x {calls}")
+        report("sebelum (connect per call)", measure(lambda: legacy_get_balance(temp_db.name, USER_ID), calls))
+        report("sesudah (pool)", measure(lambda: db.get_user_balance(USER_ID), calls))
+
+        # Beban paralel: 8 thread berbagi pool berukuran 4
+        for label, func in (
+            ("sebelum, 8 thread", lambda: legacy_get_balance(temp_db.name, USER_ID)),
+            ("sesudah, 8 thread", lambda: db.get_user_balance(USER_ID)),
+        ):
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                chunks = list(executor.map(lambda _: measure(func, calls // 8), range(8)))
+            report(label, [s for chunk in chunks for s in chunk])
+    finally:
+        db.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(temp_db.name + suffix):
+                os.unlink(temp_db.name + suffix)
+
+
+if __name__ == "__main__":
+    main()
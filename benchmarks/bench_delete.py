@@ -0,0 +1,127 @@
+"""
+Benchmark hapus transaksi: cek dulu lalu DELETE vs satu DELETE ... RETURNING
+
+Membandingkan alur bot lama (cari id di 100 transaksi terakhir, atau get_transaction,
+lalu DELETE terpisah) dengan delete_transactions(), untuk satu id acak dan rentang 11 id
+berurutan (seperti "hapus transaksi 10-20"). Rentang diukur untuk user berat (setengah
+dari semua transaksi) dan user ringan, supaya rencana query yang membaca seluruh
+riwayat user terlihat.
+
+Jalankan: python benchmarks/bench_delete.py [jumlah_transaksi] (default 1000000)
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import DatabaseManager
+
+USERS = 1000
+REPEAT = 500
+RANGE_SIZE = 11
+HEAVY_USER = "heavy_user"
+LIGHT_USER = "light_user"
+CATEGORIES = ['makanan', 'transport', 'hiburan', 'belanja', 'tagihan', 'gaji', 'freelance']
+
+
+def generate_rows(count: int):
+    """Setengah transaksi milik HEAVY_USER, sisanya tersebar di USERS user"""
+    rng = random.Random(25)
+    for i in range(count):
+        user_id = HEAVY_USER if i % 2 else f"{10**17 + rng.randrange(USERS)}"
+        yield (user_id, "User", 'income' if i % 5 == 0 else 'expense',
+               rng.randint(100_000, 50_000_000), rng.choice(CATEGORIES), f"transaksi {i}",
+               f"202{rng.randrange(4)}-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d} 10:00:00")
+
+
+def owner(db: DatabaseManager, transaction_id: int):
+    with db.pool.connection() as conn:
+        row = conn.execute("SELECT user_id FROM transactions WHERE id = ?", (transaction_id,)).fetchone()
+    return row[0] if row else None
+
+
+def scan_then_delete(db: DatabaseManager, user_id: str, transaction_id: int) -> bool:
+    """Alur lama: id dicari di 100 transaksi terakhir, yang lebih lama dianggap tidak ada"""
+    if not any(t['id'] == transaction_id for t in db.get_user_transactions(user_id, limit=100)):
+        return False
+    return db.delete_transaction(user_id, transaction_id)
+
+
+def get_then_delete(db: DatabaseManager, user_id: str, transaction_id: int) -> bool:
+    """Dua statement: get_transaction untuk detail, lalu DELETE"""
+    return db.get_transaction(user_id, transaction_id) is not None and db.delete_transaction(user_id, transaction_id)
+
+
+def timed(samples, func, *args):
+    begin = time.perf_counter()
+    result = func(*args)
+    samples.append((time.perf_counter() - begin) * 1000)
+    return result
+
+
+def report(label: str, samples, found: int):
+    samples = sorted(samples)
+    p50 = samples[len(samples) // 2]
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"  {label:<34}: p50 {p50:6.3f} ms | p99 {p99:6.3f} ms | {found} terhapus")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    temp_dir = tempfile.mkdtemp()
+    db = DatabaseManager(os.path.join(temp_dir, 'bench.db'))
+    try:
+        db.add_transactions_bulk(generate_rows(count))
+        # Transaksi terbaru berurutan untuk hapus rentang: user berat dan user ringan
+        range_rows = 2 * REPEAT * RANGE_SIZE
+        ranges = {HEAVY_USER: count + 1, LIGHT_USER: count + 1 + range_rows}
+        for user_id in ranges:
+            db.add_transactions_bulk([(user_id, "User", 'expense', 1_500_000, 'makanan', f"rentang {i}")
+                                      for i in range(range_rows)])
+        print(f"{count:,} transaksi: {HEAVY_USER} {count // 2 + range_rows:,}, sisanya {USERS} user")
+
+        # Id acak (kebanyakan di luar 100 transaksi terakhir user), tiap alur id yang berbeda
+        rng = random.Random(3)
+        targets = [(owner(db, transaction_id), transaction_id)
+                   for transaction_id in rng.sample(range(1, count + 1), 3 * REPEAT)]
+
+        print("Satu id:")
+        for index, (label, func) in enumerate([
+            ("cari di 100 terakhir + DELETE", scan_then_delete),
+            ("get_transaction + DELETE", get_then_delete),
+            ("delete_transactions (RETURNING)", lambda db, user_id, transaction_id:
+                bool(db.delete_transactions(user_id, transaction_id))),
+        ]):
+            samples, found = [], 0
+            for user_id, transaction_id in targets[index * REPEAT:(index + 1) * REPEAT]:
+                found += timed(samples, func, db, user_id, transaction_id)
+            report(label, samples, found)
+
+        for user_id, first in ranges.items():
+            print(f"Rentang {RANGE_SIZE} id berurutan, {user_id}:")
+            starts = list(range(first, first + range_rows, RANGE_SIZE))
+            samples, found = [], 0
+            for first_id in starts[:REPEAT]:
+                begin = time.perf_counter()
+                for transaction_id in range(first_id, first_id + RANGE_SIZE):
+                    found += get_then_delete(db, user_id, transaction_id)
+                samples.append((time.perf_counter() - begin) * 1000)
+            report("get_transaction + DELETE per id", samples, found)
+
+            samples, found = [], 0
+            for first_id in starts[REPEAT:]:
+                found += len(timed(samples, db.delete_transactions, user_id, first_id, first_id + RANGE_SIZE - 1))
+            report("delete_transactions (satu DELETE)", samples, found)
+        print(f"  verify_user_balances: {len(db.verify_user_balances())} user tidak cocok")
+    finally:
+        db.close()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark lag event loop: process_message (blocking) vs process_message_async
+
+Meniru on_message Discord: N user mengirim pesan bersamaan, sementara sebuah
+coroutine mengukur seberapa terlambat event loop membangunkannya.
+
+Jalankan: python benchmarks/bench_event_loop_lag.py
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.bot_core import FinancialBotCore
+
+INTERVAL = 0.005
+MESSAGES_PER_USER = 10
+
+
+async def monitor(stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(INTERVAL)
+        samples.append((time.perf_counter() - start - INTERVAL) * 1000)
+
+
+async def run(bot: FinancialBotCore, users: int, use_async: bool):
+    async def session(user_id):
+        for i in range(MESSAGES_PER_USER):
+            message = f"habis {1000 + i} untuk makanan" if i % 2 else "berapa saldo saya"
+            if use_async:
+                await bot.process_message_async(str(user_id), "Bench", message)
+            else:
+                bot.process_message(str(user_id), "Bench", message)
+                await asyncio.sleep(0)
+
+    stop = asyncio.Event()
+    samples = []
+    watcher = asyncio.create_task(monitor(stop, samples))
+    await asyncio.sleep(INTERVAL * 2)
+    await asyncio.gather(*(session(u) for u in range(users)))
+    stop.set()
+    await watcher
+
+    samples.sort()
+    p99 = samples[max(0, int(len(samples) * 0.99) - 1)]
+    return p99, samples[-1]
+
+
+async def main():
+    temp_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+    temp_db.close()
+    bot = FinancialBotCore(temp_db.name)
+    logging.getLogger('FinancialBot').setLevel(logging.WARNING)
+
+    try:
+        print(f"{'users':>6} {'mode':>6} {'lag p99 (ms)':>14} {'lag max (ms)':>14}")
+        for users in (1, 10, 50, 100):
+            for use_async in (False, True):
+                p99, worst = await run(bot, users, use_async)
+                mode = "async" if use_async else "sync"
+                print(f"{users:>6} {mode:>6} {p99:>14.1f} {worst:>14.1f}")
+    finally:
+        bot.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(temp_db.name + suffix):
+                os.unlink(temp_db.name + suffix)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
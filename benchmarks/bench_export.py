@@ -0,0 +1,50 @@
+"""
+Benchmark export streaming: kecepatan dan puncak memori terhadap ukuran riwayat
+
+Jalankan: python benchmarks/bench_export.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import DatabaseManager
+from core.export import export_transactions
+
+
+def main():
+    temp_dir = tempfile.mkdtemp()
+    db = DatabaseManager(os.path.join(temp_dir, 'bench.db'))
+    output_path = os.path.join(temp_dir, 'export.csv')
+    total = 0
+
+    try:
+        print(f"{'baris':>9} {'format':>6} {'baris/detik':>12} {'puncak memori (KiB)':>20}")
+        for size in (10_000, 100_000, 500_000):
+            rows = (("user0", "User0", 'expense', 1000 + i, 'makanan', f"transaksi {i}")
+                    for i in range(size - total))
+            db.add_transactions_bulk(rows)
+            total = size
+
+            for fmt in ('csv', 'jsonl'):
+                tracemalloc.start()
+                start = time.perf_counter()
+                with open(output_path, 'w', newline='', encoding='utf-8') as output:
+                    count = export_transactions(db, output, fmt, user_id="user0")
+                elapsed = time.perf_counter() - start
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print(f"{count:>9,} {fmt:>6} {count / elapsed:>12,.0f} {peak / 1024:>20,.0f}")
+    finally:
+        db.close()
+        for name in os.listdir(temp_dir):
+            os.unlink(os.path.join(temp_dir, name))
+        os.rmdir(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark import CSV mutasi rekening: baris/detik dan puncak memori
+
+Jalankan: python benchmarks/bench_import.py [jumlah_baris] [--memory]
+--memory mengaktifkan tracemalloc (puncak memori), tapi memperlambat baris/detik
+"""
+
+import csv
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import DatabaseManager
+from core.importer import StatementImporter
+
+DESCRIPTIONS = ['makan siang warung', 'bensin motor', 'bayar listrik', 'gaji kantor',
+                'netflix', 'beli baju', 'obat apotek', 'transfer masuk']
+
+
+def write_statement(path: str, count: int):
+    """Tulis CSV gaya mutasi bank (tanggal, keterangan, debit, kredit)"""
+    rng = random.Random(1)
+    with open(path, 'w', newline='', encoding='utf-8') as output:
+        writer = csv.writer(output)
+        writer.writerow(['Tanggal', 'Keterangan', 'Debit', 'Kredit'])
+        for i in range(count):
+            date = f"{1 + i % 28:02d}/{1 + (i // 28) % 12:02d}/2023"
+            amount = f"{rng.randint(1_000, 5_000_000):,}.00"
+            if i % 5 == 0:
+                writer.writerow([date, rng.choice(DESCRIPTIONS), '', amount])
+            else:
+                writer.writerow([date, rng.choice(DESCRIPTIONS), amount, ''])
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if arg != '--memory']
+    count = int(args[0]) if args else 1_000_000
+    trace_memory = '--memory' in sys.argv
+    temp_dir = tempfile.mkdtemp()
+    csv_path = os.path.join(temp_dir, 'mutasi.csv')
+    db = DatabaseManager(os.path.join(temp_dir, 'bench.db'))
+
+    try:
+        write_statement(csv_path, count)
+        print(f"File CSV: {count:,} baris, {os.path.getsize(csv_path) / 1024 / 1024:.1f} MiB")
+
+        if trace_memory:
+            tracemalloc.start()
+        with open(csv_path, newline='', encoding='utf-8') as source:
+            result = StatementImporter(db).import_file(
+                source, "user0", "User0",
+                progress=lambda r: print(f"  {r['inserted']:>10,} baris, {r['rows_per_second']:>8,.0f} baris/detik"))
+
+        print(f"Selesai: {result['inserted']:,} masuk, {result['failed']:,} gagal, "
+              f"{result['elapsed']:.1f} detik, {result['rows_per_second']:,.0f} baris/detik")
+        if trace_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"Puncak memori: {peak / 1024 / 1024:.1f} MiB")
+    finally:
+        db.close()
+        for name in os.listdir(temp_dir):
+            os.unlink(os.path.join(temp_dir, name))
+        os.rmdir(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
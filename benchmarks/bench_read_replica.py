@@ -0,0 +1,125 @@
+"""
+Benchmark read replica :memory: dibanding baca langsung dari file
+
+Mengukur latensi baca (tanpa dan dengan penulis lain yang aktif) serta biaya
+memori replica. Jalankan: python benchmarks/bench_read_replica.py [jumlah_transaksi ...]
+(default 100000 dan 1000000)
+"""
+
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import DatabaseManager
+
+CATEGORIES = ['makanan', 'transport', 'hiburan', 'belanja', 'tagihan', 'gaji', 'freelance']
+USERS = 1000
+REPEAT = 500
+
+
+def generate_rows(count: int):
+    rng = random.Random(3)
+    for i in range(count):
+        yield (f"user{rng.randrange(USERS)}", "User", 'income' if i % 5 == 0 else 'expense',
+               rng.randint(1_000, 5_000_000), rng.choice(CATEGORIES), f"transaksi {i}",
+               f"202{rng.randrange(4)}-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d} 10:00:00")
+
+
+def rss_bytes() -> int:
+    """Resident set size proses (Linux), 0 jika tidak tersedia"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+
+def measure(db: DatabaseManager) -> dict:
+    """Rata-rata latensi (ms) per jenis query baca untuk user acak"""
+    rng = random.Random(11)
+    queries = {
+        'get_category_report': lambda user: db.get_category_report(user),
+        # Periode tidak pas per bulan memaksa range scan transaksi
+        'get_user_balance (range)': lambda user: db.get_user_balance(user, '2021-03-10', '2022-08-20'),
+        'get_user_transactions': lambda user: db.get_user_transactions(user, limit=20),
+    }
+    results = {}
+    for name, query in queries.items():
+        start = time.perf_counter()
+        for _ in range(REPEAT):
+            query(f"user{rng.randrange(USERS)}")
+        results[name] = (time.perf_counter() - start) / REPEAT * 1000
+    return results
+
+
+def write_load(db_path: str, stop: threading.Event):
+    """Penulis lain yang terus meng-commit insert ke file yang sama"""
+    writer = DatabaseManager(db_path)
+    i = 0
+    while not stop.is_set():
+        writer.add_transaction(f"user{i % USERS}", "User", 'expense', 1000, 'makanan', 'beban tulis')
+        i += 1
+    writer.close()
+
+
+def run(count: int):
+    temp_dir = tempfile.mkdtemp()
+    db_path = os.path.join(temp_dir, 'bench.db')
+
+    seed = DatabaseManager(db_path)
+    seed.add_transactions_bulk(generate_rows(count))
+    seed.close()
+    file_size = os.path.getsize(db_path)
+
+    file_db = DatabaseManager(db_path)
+    rss_before = rss_bytes()
+    start = time.perf_counter()
+    replica_db = DatabaseManager(db_path, read_replica=True)
+    seed_seconds = time.perf_counter() - start
+    rss_after = rss_bytes()
+
+    try:
+        print(f"\n{count:,} transaksi, {USERS} user, file {file_size / 1024 / 1024:.1f} MiB")
+        print(f"Seeding replica: {seed_seconds:.2f} detik, ukuran {replica_db.replica.size_bytes() / 1024 / 1024:.1f} MiB, "
+              f"RSS +{(rss_after - rss_before) / 1024 / 1024:.1f} MiB")
+
+        for label in ('idle', 'dengan penulis aktif'):
+            stop = threading.Event()
+            loader = None
+            if label != 'idle':
+                loader = threading.Thread(target=write_load, args=(db_path, stop))
+                loader.start()
+                time.sleep(0.2)
+            try:
+                file_results = measure(file_db)
+                replica_results = measure(replica_db)
+            finally:
+                stop.set()
+                if loader:
+                    loader.join()
+
+            print(f"  [{label}]")
+            for name in file_results:
+                print(f"    {name:<26}: file {file_results[name]:8.3f} ms | replica {replica_results[name]:8.3f} ms "
+                      f"({file_results[name] / replica_results[name]:.1f}x)")
+    finally:
+        replica_db.close()
+        file_db.close()
+        for name in os.listdir(temp_dir):
+            os.unlink(os.path.join(temp_dir, name))
+        os.rmdir(temp_dir)
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    for count in counts:
+        run(count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Benchmark skema ringkas: ukuran file dan waktu query sebelum/sesudah migrasi ke ledger
+
+Database versi 6 (tabel transactions dengan user_id, username dan kategori TEXT,
+amount REAL) diisi lalu dimigrasi online dengan DatabaseManager.migrate_ledger()
+sementara satu thread terus memanggil add_transaction.
+
+Jalankan: python benchmarks/bench_schema.py [jumlah_transaksi] (default 1000000)
+"""
+
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import LEDGER_BACKFILL_PAUSE, DatabaseManager
+from core.migrations import migrate
+
+CATEGORIES = ['makanan', 'transport', 'hiburan', 'belanja', 'tagihan', 'gaji', 'freelance']
+USERS = 1000
+REPEAT = 20
+
+# User dengan riwayat panjang (10% dari semua transaksi) untuk query per user
+HEAVY_USER = "100000000000000000"
+
+
+def generate_rows(count: int):
+    rng = random.Random(11)
+    for i in range(count):
+        user = HEAVY_USER if i % 10 == 0 else str(100000000000000000 + rng.randrange(1, USERS))
+        yield (user, f"pengguna_{user[-4:]}", 'income' if i % 5 == 0 else 'expense',
+               rng.randint(1_000, 5_000_000), rng.choice(CATEGORIES), f"transaksi {i}",
+               f"202{rng.randrange(4)}-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d} 10:00:00")
+
+
+def build_legacy(path: str, count: int):
+    """Database versi 6; ringkasan dan FTS dibangun set-based oleh migrasi 3-6"""
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    migrate(conn, target=2)
+    conn.executemany('''
+        INSERT INTO transactions (user_id, username, transaction_type, amount, category, description, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', generate_rows(count))
+    conn.commit()
+    migrate(conn, target=6)
+    conn.execute("VACUUM")
+    conn.close()
+
+
+def table_sizes(db: DatabaseManager, names) -> str:
+    with db.pool.connection() as conn:
+        sizes = dict(conn.execute('SELECT name, SUM(pgsize) FROM dbstat GROUP BY name').fetchall())
+    return ", ".join(f"{name} {sizes.get(name, 0) / 1048576:,.1f} MB" for name in names)
+
+
+def timed(func, *args) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        func(*args)
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+def run_queries(db: DatabaseManager):
+    """Query per user lewat API publik DatabaseManager (ms per panggilan)"""
+    # Periode yang tidak pas per bulan: dihitung dari baris transaksi, bukan rollup
+    start, end = '2021-01-15 00:00:00', '2023-06-15 00:00:00'
+    last_id = db.get_user_transactions(HEAVY_USER, limit=1)[0]['id']
+    return {
+        'get_category_report (periode)': timed(db.get_category_report, HEAVY_USER, start, end),
+        'get_user_balance (periode)': timed(db.get_user_balance, HEAVY_USER, start, end),
+        'get_transactions_page': timed(db.get_transactions_page, HEAVY_USER, last_id, 10),
+        'get_transaction': timed(db.get_transaction, HEAVY_USER, last_id),
+        'search_transactions': timed(db.search_transactions, HEAVY_USER, "transaksi 12"),
+    }
+
+
+def percentile(latencies, fraction: float) -> float:
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    temp_dir = tempfile.mkdtemp()
+    path = os.path.join(temp_dir, 'bench.db')
+    try:
+        start = time.perf_counter()
+        build_legacy(path, count)
+        print(f"{count:,} transaksi, {USERS} user ({time.perf_counter() - start:.1f} detik untuk mengisi)")
+
+        # Thread backfill otomatis dihentikan supaya skema lama bisa diukur dulu
+        db = DatabaseManager(path, online_migration=True)
+        db._migration_stop.set()
+        db._migration_thread.join()
+        try:
+            before_size = os.path.getsize(path)
+            print(f"\nSebelum: file {before_size / 1048576:,.1f} MB "
+                  f"({table_sizes(db, ['transactions', 'idx_transactions_user_created'])})")
+            before = run_queries(db)
+
+            latencies = []
+            stop = threading.Event()
+
+            def writer():
+                while not stop.is_set():
+                    begin = time.perf_counter()
+                    db.add_transaction("writer", "Writer", 'expense', 1000, 'makanan', 'selama migrasi')
+                    latencies.append((time.perf_counter() - begin) * 1000)
+                    time.sleep(0.002)
+
+            thread = threading.Thread(target=writer)
+            thread.start()
+            start = time.perf_counter()
+            try:
+                db.migrate_ledger(pause_seconds=LEDGER_BACKFILL_PAUSE)
+            finally:
+                stop.set()
+                thread.join()
+            seconds = time.perf_counter() - start
+            print(f"\nMigrasi online: {seconds:.1f} detik ({count / seconds:,.0f} baris/detik), "
+                  f"insert selama migrasi p50 {percentile(latencies, 0.5):.2f} ms, "
+                  f"p99 {percentile(latencies, 0.99):.2f} ms, maks {max(latencies, default=0):.1f} ms "
+                  f"({len(latencies)} insert)")
+
+            db.vacuum()
+            after_size = os.path.getsize(path)
+            print(f"\nSesudah (VACUUM): file {after_size / 1048576:,.1f} MB, "
+                  f"{(1 - after_size / before_size) * 100:.0f}% lebih kecil "
+                  f"({table_sizes(db, ['ledger', 'idx_ledger_user_created', 'users'])})")
+            after = run_queries(db)
+
+            print(f"\n{'query':<32}{'sebelum':>10}{'sesudah':>10}")
+            for name, value in before.items():
+                print(f"{name:<32}{value:>8.3f}ms{after[name]:>8.3f}ms")
+        finally:
+            db.close()
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
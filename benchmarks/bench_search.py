@@ -0,0 +1,81 @@
+"""
+Benchmark pencarian transaksi (FTS5) per user
+
+Jalankan: python benchmarks/bench_search.py [jumlah_transaksi] (default 1000000)
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import DatabaseManager
+
+USERS = 1000
+REPEAT = 500
+WORDS = ['kopi', 'susu', 'nasi', 'goreng', 'ayam', 'bakso', 'bensin', 'ojek', 'grab', 'listrik',
+         'pulsa', 'netflix', 'spotify', 'baju', 'sepatu', 'buku', 'obat', 'parkir', 'tol', 'roti',
+         'teh', 'martabak', 'sate', 'gojek', 'kereta', 'indomaret', 'alfamart', 'warung', 'kantin', 'cafe']
+# Kata jarang supaya ada query dengan sedikit hasil
+RARE_WORDS = [f"toko{i}" for i in range(2000)]
+CATEGORIES = ['makanan', 'transport', 'hiburan', 'belanja', 'tagihan', 'kesehatan', 'lainnya']
+
+
+def generate_rows(count: int):
+    rng = random.Random(5)
+    for i in range(count):
+        words = rng.sample(WORDS, 2) + ([rng.choice(RARE_WORDS)] if i % 10 == 0 else [])
+        yield (f"{10**17 + rng.randrange(USERS)}", "User", 'expense', rng.randint(1_000, 500_000),
+               rng.choice(CATEGORIES), " ".join(words),
+               f"202{rng.randrange(4)}-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d} 10:00:00")
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda fraction: samples[min(len(samples) - 1, int(fraction * len(samples)))] * 1000
+    return pick(0.5), pick(0.95), pick(0.99)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    temp_dir = tempfile.mkdtemp()
+    db = DatabaseManager(os.path.join(temp_dir, 'bench.db'))
+
+    try:
+        start = time.perf_counter()
+        db.add_transactions_bulk(generate_rows(count))
+        print(f"{count:,} transaksi, {USERS} user: bulk insert (termasuk FTS) {time.perf_counter() - start:.1f} detik")
+
+        rng = random.Random(9)
+        queries = {
+            'kata umum (kopi)': lambda: 'kopi',
+            'dua kata (nasi goreng)': lambda: 'nasi goreng',
+            'prefix (mart)': lambda: 'mart',
+            'kata jarang (tokoN)': lambda: rng.choice(RARE_WORDS),
+            'tidak ada hasil': lambda: 'pesawat',
+        }
+        for name, make_query in queries.items():
+            samples = []
+            matches = 0
+            for _ in range(REPEAT):
+                user_id = f"{10**17 + rng.randrange(USERS)}"
+                query = make_query()
+                begin = time.perf_counter()
+                result = db.search_transactions(user_id, query, limit=10)
+                samples.append(time.perf_counter() - begin)
+                matches += result['count']
+            p50, p95, p99 = percentiles(samples)
+            print(f"  {name:<24}: p50 {p50:6.2f} ms | p95 {p95:6.2f} ms | p99 {p99:6.2f} ms | "
+                  f"rata-rata {matches / REPEAT:,.0f} cocok")
+    finally:
+        db.close()
+        for name in os.listdir(temp_dir):
+            os.unlink(os.path.join(temp_dir, name))
+        os.rmdir(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark yang sama untuk setiap backend Storage (sqlite dan memory)
+
+Mengukur bulk insert, insert satuan, snapshot user, pagination, pencarian dan delete.
+Jalankan: python benchmarks/bench_storage.py [jumlah_transaksi ...] (default 100000)
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import DatabaseManager
+from core.memory_store import MemoryStorage
+
+CATEGORIES = ['makanan', 'transport', 'hiburan', 'belanja', 'tagihan', 'gaji', 'freelance']
+WORDS = ['kopi', 'nasi', 'goreng', 'parkir', 'bensin', 'pulsa', 'listrik', 'bakso', 'martabak', 'teh']
+USERS = 1000
+REPEAT = 1000
+
+BACKENDS = {
+    'sqlite': lambda temp_dir: DatabaseManager(os.path.join(temp_dir, 'bench.db')),
+    'memory': lambda temp_dir: MemoryStorage(),
+}
+
+
+def generate_rows(count: int):
+    rng = random.Random(5)
+    for i in range(count):
+        yield (f"user{rng.randrange(USERS)}", "User", 'income' if i % 5 == 0 else 'expense',
+               rng.randint(1_000, 5_000_000), rng.choice(CATEGORIES), ' '.join(rng.sample(WORDS, 2)),
+               f"202{rng.randrange(4)}-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d} 10:00:00")
+
+
+def timed(label: str, func, repeat: int = REPEAT):
+    """Rata-rata latensi (ms) `func(i)` untuk i = 0..repeat-1"""
+    start = time.perf_counter()
+    for i in range(repeat):
+        func(i)
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    print(f"    {label:<28}: {elapsed:8.3f} ms")
+
+
+def run(backend: str, count: int):
+    temp_dir = tempfile.mkdtemp()
+    db = BACKENDS[backend](temp_dir)
+    rng = random.Random(9)
+    users = [f"user{rng.randrange(USERS)}" for _ in range(REPEAT)]
+    try:
+        start = time.perf_counter()
+        db.add_transactions_bulk(generate_rows(count))
+        seconds = time.perf_counter() - start
+        print(f"  [{backend}] bulk insert {count:,} baris: {seconds:.2f} detik ({count / seconds:,.0f} baris/detik)")
+
+        timed('add_transaction', lambda i: db.add_transaction(users[i], "User", 'expense', 1000, 'makanan', 'kopi'))
+        timed('get_user_snapshot', lambda i: db.get_user_snapshot(users[i]))
+        timed('get_user_snapshot (periode)', lambda i: db.get_user_snapshot(
+            users[i], start='2021-03-10 00:00:00', end='2022-08-20 00:00:00'))
+        timed('get_transactions_page', lambda i: db.get_transactions_page(users[i], page_size=20))
+        timed('search_transactions', lambda i: db.search_transactions(users[i], WORDS[i % len(WORDS)]))
+
+        recent = [db.get_user_transactions(user, limit=1) for user in users[:200]]
+        targets = [(user, page[0]['id']) for user, page in zip(users, recent) if page]
+        timed('delete_transaction', lambda i: db.delete_transaction(*targets[i]), repeat=len(targets))
+    finally:
+        db.close()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [100_000]
+    for count in counts:
+        print(f"\n{count:,} transaksi, {USERS} user")
+        for backend in BACKENDS:
+            run(backend, count)
+
+
+if __name__ == "__main__":
+    main()
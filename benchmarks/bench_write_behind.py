@@ -0,0 +1,68 @@
+"""
+Benchmark insert bersamaan: commit per transaksi vs write-behind group commit
+
+Setiap thread meniru satu handler pesan yang memanggil add_transaction.
+
+Jalankan: python benchmarks/bench_write_behind.py [insert_per_thread]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import DatabaseManager
+
+
+def worker(db: DatabaseManager, thread_id: int, count: int):
+    latencies = []
+    for i in range(count):
+        start = time.perf_counter()
+        db.add_transaction(f"user{thread_id}", "Bench", 'expense', 1000 + i, 'makanan', 'bench')
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def run(threads: int, count: int, write_behind: bool, synchronous: str):
+    temp_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+    temp_db.close()
+    db = DatabaseManager(temp_db.name, pool_size=threads, write_behind=write_behind,
+                         synchronous=synchronous)
+
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = list(executor.map(lambda t: worker(db, t, count), range(threads)))
+        elapsed = time.perf_counter() - start
+        commits = db.writer.commits if db.writer else threads * count
+    finally:
+        db.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(temp_db.name + suffix):
+                os.unlink(temp_db.name + suffix)
+
+    latencies = sorted(l for chunk in results for l in chunk)
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    return len(latencies) / elapsed, p50, p99, commits
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+
+    print(f"{'sync':>6} {'threads':>7} {'mode':>13} {'insert/detik':>13} "
+          f"{'p50 (ms)':>9} {'p99 (ms)':>9} {'commits':>8}")
+    for synchronous in ("NORMAL", "FULL"):
+        for threads in (1, 8, 32):
+            for write_behind in (False, True):
+                throughput, p50, p99, commits = run(threads, count, write_behind, synchronous)
+                mode = "write-behind" if write_behind else "langsung"
+                print(f"{synchronous:>6} {threads:>7} {mode:>13} {throughput:>13,.0f} "
+                      f"{p50:>9.2f} {p99:>9.2f} {commits:>8,}")
+
+
+if __name__ == "__main__":
+    main()
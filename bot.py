@@ -6,11 +6,17 @@ Bot untuk melacak pemasukan dan pengeluaran dengan regex dan reflection
 import os
 import asyncio
 import logging
+import tempfile
 from dotenv import load_dotenv
 import discord
 from discord.ext import commands
 
 from core.bot_core import FinancialBotCore
+from core.categories import CATEGORY_TYPES
+from core.export import EXPORT_FORMATS, export_filename
+from core.maintenance import DEFAULT_JOB_INTERVALS, SCHEDULABLE_JOBS
+from core.money import format_rupiah
+from core.tracing import QueryTracer
 
 # Load environment variables
 load_dotenv()
@@ -20,8 +26,33 @@ os.makedirs('logs', exist_ok=True)
 
 # Bot configuration
 DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')
+DATABASE_PATH = os.getenv('DATABASE_PATH', 'financial_bot.db')
+DB_BACKEND = os.getenv('DB_BACKEND', 'sqlite')
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+CORE_WORKERS = int(os.getenv('CORE_WORKERS', '4'))
+DB_WRITE_BEHIND = os.getenv('DB_WRITE_BEHIND', '0') == '1'
+DB_SHARDS = int(os.getenv('DB_SHARDS', '1'))
+DB_READ_REPLICA = os.getenv('DB_READ_REPLICA', '0') == '1'
+DB_TRACE = os.getenv('DB_TRACE', '0') == '1'
+DB_SLOW_QUERY_MS = float(os.getenv('DB_SLOW_QUERY_MS', '100'))
+DB_TRACE_DUMP = os.getenv('DB_TRACE_DUMP', 'logs/query_stats.json')
+DB_MAINTENANCE = os.getenv('DB_MAINTENANCE', '0') == '1'
+DB_BACKUP_DIR = os.getenv('DB_BACKUP_DIR', '')
+DB_BACKUP_KEEP = int(os.getenv('DB_BACKUP_KEEP', '7'))
+DB_BACKUP_INTERVAL_HOURS = float(os.getenv('DB_BACKUP_INTERVAL_HOURS', '24'))
 BOT_PREFIX = '!'
 
+# Jumlah transaksi maksimal per halaman !recent (batas field embed Discord)
+RECENT_PAGE_MAX = 25
+
+# Batas ukuran lampiran Discord (server tanpa boost)
+EXPORT_MAX_BYTES = 8 * 1024 * 1024
+
+# Job maintenance berkala; backup ikut dijadwalkan jika DB_BACKUP_DIR diisi
+MAINTENANCE_INTERVALS = dict(DEFAULT_JOB_INTERVALS)
+if DB_BACKUP_DIR:
+    MAINTENANCE_INTERVALS['backup'] = DB_BACKUP_INTERVAL_HOURS * 3600
+
 # Create bot instance dengan intents
 intents = discord.Intents.default()
 intents.message_content = True
@@ -30,7 +61,14 @@ intents.guilds = True
 bot = commands.Bot(command_prefix=BOT_PREFIX, intents=intents, help_command=None)
 
 # Initialize core bot
-financial_core = FinancialBotCore()
+financial_core = FinancialBotCore(DATABASE_PATH, max_workers=CORE_WORKERS, shard_count=DB_SHARDS,
+                                  backend=DB_BACKEND,
+                                  pool_size=DB_POOL_SIZE, write_behind=DB_WRITE_BEHIND,
+                                  read_replica=DB_READ_REPLICA, maintenance=DB_MAINTENANCE,
+                                  maintenance_intervals=MAINTENANCE_INTERVALS,
+                                  backup_dir=DB_BACKUP_DIR or None, backup_keep=DB_BACKUP_KEEP,
+                                  tracer=QueryTracer(slow_query_ms=DB_SLOW_QUERY_MS) if DB_TRACE else None,
+                                  query_stats_path=DB_TRACE_DUMP)
 
 @bot.event
 async def on_ready():
@@ -81,8 +119,8 @@ async def on_message(message):
     
     # Process pesan
     try:
-        # Process dengan financial core
-        response = financial_core.process_message(user_id, username, clean_content)
+        # Process dengan financial core (di executor, event loop tetap responsif)
+        response = await financial_core.process_message_async(user_id, username, clean_content)
         
         # Kirim response jika ada
         if response:
@@ -113,7 +151,7 @@ async def ping(ctx):
 async def stats(ctx):
     """Lihat statistik lengkap user"""
     user_id = str(ctx.author.id)
-    stats = financial_core.get_user_stats(user_id)
+    stats = await financial_core.run_blocking(financial_core.get_user_stats, user_id)
     
     embed = discord.Embed(
         title="📊 Statistik Keuangan Anda",
@@ -125,9 +163,9 @@ async def stats(ctx):
     balance_info = stats['balance']
     embed.add_field(
         name="💰 Ringkasan",
-        value=f"Pemasukan: Rp {balance_info['income']:,.0f}\n"
-              f"Pengeluaran: Rp {balance_info['expense']:,.0f}\n"
-              f"Saldo: Rp {balance_info['balance']:,.0f}",
+        value=f"Pemasukan: Rp {format_rupiah(balance_info['income'])}\n"
+              f"Pengeluaran: Rp {format_rupiah(balance_info['expense'])}\n"
+              f"Saldo: Rp {format_rupiah(balance_info['balance'])}",
         inline=False
     )
     
@@ -143,7 +181,7 @@ async def stats(ctx):
         recent_text = ""
         for trans in stats['recent_transactions'][:3]:
             emoji = "💚" if trans['type'] == 'income' else "💸"
-            recent_text += f"{emoji} Rp {trans['amount']:,.0f} - {trans['category']}\n"
+            recent_text += f"{emoji} Rp {format_rupiah(trans['amount'])} - {trans['category']}\n"
         
         embed.add_field(
             name="📋 Transaksi Terbaru",
@@ -157,6 +195,7 @@ async def stats(ctx):
 @bot.command(name='categories')
 async def categories(ctx):
     """Lihat daftar kategori yang tersedia"""
+    # Dibaca dari registry di memori, tidak perlu lewat executor
     income_categories = financial_core.db.get_available_categories('income')
     expense_categories = financial_core.db.get_available_categories('expense')
     
@@ -185,21 +224,41 @@ async def categories(ctx):
     
     await ctx.send(embed=embed)
 
+@bot.command(name='addcategory')
+@commands.is_owner()
+async def add_category(ctx, name: str, category_type: str = 'expense'):
+    """Tambah kategori baru (khusus pemilik bot): !addcategory <nama> [income|expense|both]"""
+    category_type = category_type.lower()
+    if category_type not in CATEGORY_TYPES:
+        await ctx.send(f"❌ Tipe kategori harus salah satu dari: {', '.join(CATEGORY_TYPES)}")
+        return
+    
+    added = await financial_core.run_blocking(financial_core.db.add_category, name, category_type)
+    if added:
+        await ctx.send(f"✅ Kategori **{name}** ({category_type}) ditambahkan.")
+    else:
+        await ctx.send(f"ℹ️ Kategori **{name}** sudah ada.")
+
 @bot.command(name='recent')
-async def recent_transactions(ctx, limit: int = 10):
-    """Lihat transaksi terbaru (default 10)"""
-    if limit > 50:
-        limit = 50
+async def recent_transactions(ctx, limit: int = 10, before: int = None):
+    """Lihat transaksi terbaru (default 10), halaman berikutnya lewat ID terakhir"""
+    # Embed Discord maksimal 25 field
+    limit = max(1, min(limit, RECENT_PAGE_MAX))
     
     user_id = str(ctx.author.id)
-    transactions = financial_core.db.get_user_transactions(user_id, limit)
+    transactions = await financial_core.run_blocking(
+        financial_core.db.get_transactions_page, user_id, before, limit)
     
     if not transactions:
-        await ctx.send("📭 Anda belum memiliki transaksi apapun.")
+        if before is None:
+            await ctx.send("📭 Anda belum memiliki transaksi apapun.")
+        else:
+            await ctx.send("📭 Tidak ada transaksi lain sebelum ID tersebut.")
         return
     
+    title = "Transaksi Terbaru" if before is None else f"Transaksi Sebelum ID {before}"
     embed = discord.Embed(
-        title=f"📋 {len(transactions)} Transaksi Terbaru",
+        title=f"📋 {len(transactions)} {title}",
         color=discord.Color.blue()
     )
     
@@ -207,7 +266,7 @@ async def recent_transactions(ctx, limit: int = 10):
         emoji = "💚" if trans['type'] == 'income' else "💸"
         type_text = "Pemasukan" if trans['type'] == 'income' else "Pengeluaran"
         
-        value_text = f"{type_text}: Rp {trans['amount']:,.0f}\n"
+        value_text = f"{type_text}: Rp {format_rupiah(trans['amount'])}\n"
         value_text += f"Kategori: {trans['category']}\n"
         if trans['description']:
             value_text += f"Deskripsi: {trans['description']}\n"
@@ -219,6 +278,146 @@ async def recent_transactions(ctx, limit: int = 10):
             inline=True
         )
     
+    if len(transactions) == limit:
+        embed.set_footer(text=f"Halaman berikutnya: !recent {limit} {transactions[-1]['id']}")
+    
+    await ctx.send(embed=embed)
+
+@bot.command(name='export')
+async def export_ledger(ctx, fmt: str = 'csv'):
+    """Download semua transaksi Anda sebagai file CSV atau JSONL"""
+    fmt = fmt.lower()
+    if fmt not in EXPORT_FORMATS:
+        await ctx.send(f"❌ Format tidak dikenal. Pilih: {', '.join(EXPORT_FORMATS)}")
+        return
+    
+    user_id = str(ctx.author.id)
+    # File ditulis di executor supaya event loop tidak tertahan
+    path, count = await financial_core.run_blocking(financial_core.export_user_ledger, user_id, fmt)
+    try:
+        if count == 0:
+            await ctx.send("📭 Anda belum memiliki transaksi apapun.")
+        elif os.path.getsize(path) > EXPORT_MAX_BYTES:
+            await ctx.send("❌ File export terlalu besar untuk dikirim lewat Discord. "
+                           "Minta admin menjalankan `python manage_db.py export`.")
+        else:
+            await ctx.send(f"📤 {count:,} transaksi diexport.",
+                           file=discord.File(path, filename=export_filename(user_id, fmt)))
+    finally:
+        os.unlink(path)
+
+@bot.command(name='import')
+async def import_statement(ctx):
+    """Import riwayat dari file CSV mutasi rekening (lampirkan file ke pesan)"""
+    attachments = [a for a in ctx.message.attachments if a.filename.lower().endswith('.csv')]
+    if not attachments:
+        await ctx.send("📎 Lampirkan file CSV mutasi rekening bersama perintah `!import`.")
+        return
+    
+    user_id = str(ctx.author.id)
+    username = ctx.author.display_name
+    status = await ctx.send("⏳ Mengimport transaksi...")
+    loop = asyncio.get_running_loop()
+    
+    def report_progress(result):
+        # Dipanggil dari thread executor, edit pesan dijadwalkan di event loop
+        asyncio.run_coroutine_threadsafe(
+            status.edit(content=f"⏳ {result['inserted']:,} transaksi masuk "
+                                f"({result['rows_per_second']:,.0f} baris/detik)..."), loop)
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'import.csv')
+        await attachments[0].save(path)
+        try:
+            result = await financial_core.run_blocking(
+                financial_core.import_statement, user_id, username, path, report_progress)
+        except ValueError as e:
+            await status.edit(content=f"❌ {e}")
+            return
+    
+    if 'error' in result:
+        await status.edit(content=f"❌ Import berhenti karena error database setelah "
+                                  f"{result['inserted']:,} transaksi masuk. Coba lagi nanti.")
+        return
+    
+    await status.edit(content=f"✅ Import selesai: {result['inserted']:,} transaksi masuk, "
+                              f"{result['skipped']:,} sudah ada, {result['failed']:,} baris dilewati "
+                              f"({result['rows_per_second']:,.0f} baris/detik).")
+
+@bot.command(name='dbstats')
+@commands.is_owner()
+async def dbstats(ctx, limit: int = 5):
+    """Statistik query database (khusus pemilik bot, butuh DB_TRACE=1)"""
+    stats = financial_core.get_query_stats(limit=max(1, min(limit, 15)))
+    if stats is None:
+        await ctx.send("ℹ️ Tracing query tidak aktif. Set `DB_TRACE=1` lalu restart bot.")
+        return
+    
+    embed = discord.Embed(
+        title="🩺 Statistik Query Database",
+        description=f"Ambang query lambat: {stats['slow_query_ms']:.0f} ms",
+        color=discord.Color.orange()
+    )
+    for query in stats['queries']:
+        embed.add_field(
+            name=f"{query['count']:,}x | total {query['total_ms']:,.0f} ms",
+            value=f"p50 {query['p50_ms']:.2f} / p95 {query['p95_ms']:.2f} / p99 {query['p99_ms']:.2f} ms, "
+                  f"{query['rows_per_query']} baris/query\n```sql\n{query['shape'][:300]}\n```",
+            inline=False
+        )
+    
+    if stats['slow_queries']:
+        slowest = stats['slow_queries'][0]
+        plan = "\n".join(slowest['plan']) or "-"
+        embed.add_field(
+            name=f"🐢 {len(stats['slow_queries'])} query lambat, terakhir {slowest['ms']:.0f} ms",
+            value=f"```sql\n{slowest['shape'][:400]}\n```\n```\n{plan[:400]}\n```",
+            inline=False
+        )
+    
+    path = await financial_core.run_blocking(financial_core.dump_query_stats)
+    embed.set_footer(text=f"Dump lengkap: {path}")
+    await ctx.send(embed=embed)
+
+@bot.command(name='maintenance')
+@commands.is_owner()
+async def maintenance(ctx, job: str = None):
+    """Ukuran database dan hasil maintenance terakhir; `!maintenance <job|all>` menjalankan sekarang"""
+    if financial_core.maintenance is None:
+        await ctx.send("ℹ️ Maintenance tidak aktif. Set `DB_MAINTENANCE=1` (backend sqlite) lalu restart bot.")
+        return
+    
+    if job is not None:
+        if job != 'all' and job not in SCHEDULABLE_JOBS:
+            await ctx.send(f"❌ Job tidak dikenal. Pilihan: all, {', '.join(SCHEDULABLE_JOBS)}")
+            return
+        await financial_core.run_blocking(financial_core.run_maintenance, None if job == 'all' else [job])
+    
+    stats = await financial_core.run_blocking(financial_core.get_maintenance_stats)
+    embed = discord.Embed(
+        title="🧹 Maintenance Database",
+        description=f"Ditunda karena bot sibuk: {stats['busy_skips']:,}x",
+        color=discord.Color.dark_teal()
+    )
+    for database in stats['databases']:
+        free_pct = database['freelist_count'] / database['page_count'] * 100 if database['page_count'] else 0
+        embed.add_field(
+            name=f"📦 {database['database']}",
+            value=f"File {database['size_bytes'] / 1048576:,.1f} MB, WAL {database['wal_bytes'] / 1048576:,.1f} MB\n"
+                  f"{database['page_count']:,} halaman, {database['freelist_count']:,} kosong ({free_pct:.1f}%)\n"
+                  f"Statistik ANALYZE: {'ada' if database['analyzed'] else 'belum'}",
+            inline=False
+        )
+    
+    if stats['history']:
+        lines = [f"`{run['started_at']}` {run['job']} @ {run['database']}: {run['status']}, "
+                 f"{run['duration_ms']:,.0f} ms, freelist {run['freelist_before']:,}→{run['freelist_count']:,}"
+                 + (f" ({run['detail']})" if run['detail'] else "")
+                 for run in stats['history'][:8]]
+        embed.add_field(name="🕒 Job Terakhir", value="\n".join(lines)[:1024], inline=False)
+    
+    embed.set_footer(text="Berikutnya: " + ", ".join(
+        f"{name} {seconds / 60:.0f} mnt" for name, seconds in stats['next_run_seconds'].items()))
     await ctx.send(embed=embed)
 
 @bot.event
@@ -229,6 +428,8 @@ async def on_command_error(ctx, error):
         return
     elif isinstance(error, commands.MissingRequiredArgument):
         await ctx.send("❌ Parameter yang diperlukan tidak lengkap. Ketik `!help` untuk bantuan.")
+    elif isinstance(error, commands.NotOwner):
+        await ctx.send("❌ Perintah ini khusus pemilik bot.")
     elif isinstance(error, commands.BadArgument):
         await ctx.send("❌ Parameter tidak valid. Pastikan format sudah benar.")
     else:
@@ -254,6 +455,8 @@ def main():
         print("❌ Login gagal! Periksa token Discord bot Anda.")
     except Exception as e:
         print(f"❌ Error menjalankan bot: {e}")
+    finally:
+        financial_core.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,148 @@
+"""
+Analitik keuangan per user untuk Financial Bot
+Transaksi user dimuat ke array NumPy (jumlah sen int64, waktu, tipe, kode kategori), lalu
+deret bulanan, rata-rata bergulir, porsi kategori dan rasio tabungan dihitung secara vektor.
+Total dijumlahkan sebagai int64 (tepat); hanya rata-rata dan porsi yang berupa float
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .storage import ROLLUP_TZ_OFFSET
+
+# Geser waktu UTC ke WIB sebelum dipotong per bulan (sama dengan monthly_rollups)
+WIB_OFFSET = np.timedelta64(int(ROLLUP_TZ_OFFSET.total_seconds()), 's')
+
+# Jumlah kategori pengeluaran terbesar yang dilaporkan
+TOP_CATEGORIES = 3
+
+class TransactionArrays:
+    """Kolom transaksi satu user sebagai array NumPy (satu elemen per transaksi)"""
+
+    __slots__ = ('amounts', 'timestamps', 'is_income', 'category_codes', 'categories')
+
+    def __init__(self, amounts: np.ndarray, timestamps: np.ndarray, is_income: np.ndarray,
+                 category_codes: np.ndarray, categories: List[str]):
+        self.amounts = amounts
+        self.timestamps = timestamps
+        self.is_income = is_income
+        self.category_codes = category_codes
+        # Nama kategori untuk setiap kode
+        self.categories = categories
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple]) -> 'TransactionArrays':
+        """Bangun dari baris iter_transaction_rows (kolom ARCHIVE_COLUMNS)"""
+        is_income, amounts, categories, created = [], [], [], []
+        for row in rows:
+            is_income.append(row[3] == 'income')
+            amounts.append(row[4])
+            categories.append(row[5])
+            created.append(row[7])
+
+        # Kode kategori lewat dict: jauh lebih cepat dari np.unique atas string
+        index: Dict[str, int] = {}
+        codes = np.fromiter((index.setdefault(name, len(index)) for name in categories),
+                            dtype=np.int64, count=len(categories))
+        return cls(
+            amounts=np.asarray(amounts, dtype=np.int64),
+            timestamps=np.asarray(created, dtype='datetime64[s]'),
+            is_income=np.asarray(is_income, dtype=bool),
+            category_codes=codes,
+            categories=list(index),
+        )
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Rata-rata bergulir ke belakang; elemen awal dirata-rata dari yang tersedia"""
+    window = max(1, min(window, len(values)))
+    cumsum = np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+    counts = np.minimum(np.arange(1, len(values) + 1), window)
+    starts = np.arange(1, len(values) + 1) - counts
+    return (cumsum[1:] - cumsum[starts]) / counts
+
+def savings_rates(income: np.ndarray, expense: np.ndarray) -> np.ndarray:
+    """(pemasukan - pengeluaran) / pemasukan per elemen, NaN jika tidak ada pemasukan"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(income > 0, (income - expense) / income, np.nan)
+
+def monthly_series(data: TransactionArrays) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """(bulan, pemasukan, pengeluaran, jumlah) per bulan WIB, berurutan tanpa bulan yang bolong"""
+    months = (data.timestamps + WIB_OFFSET).astype('datetime64[M]').astype(np.int64)
+    first = months.min()
+    slots = months - first
+    span = int(slots.max()) + 1
+
+    # bincount dengan weights selalu float64; np.add.at menjumlah int64 tanpa pembulatan
+    income = np.zeros(span, dtype=np.int64)
+    expense = np.zeros(span, dtype=np.int64)
+    np.add.at(income, slots[data.is_income], data.amounts[data.is_income])
+    np.add.at(expense, slots[~data.is_income], data.amounts[~data.is_income])
+    counts = np.bincount(slots, minlength=span)
+    labels = np.arange(first, first + span).astype('datetime64[M]')
+    return labels, income, expense, counts
+
+def category_shares(data: TransactionArrays, mask: Optional[np.ndarray] = None,
+                    income: bool = False) -> List[Dict[str, Any]]:
+    """Total dan porsi per kategori (pengeluaran, atau pemasukan), terbesar dulu"""
+    selected = data.is_income if income else ~data.is_income
+    if mask is not None:
+        selected = selected & mask
+    totals = np.zeros(len(data.categories), dtype=np.int64)
+    np.add.at(totals, data.category_codes[selected], data.amounts[selected])
+    grand_total = totals.sum()
+    if grand_total <= 0:
+        return []
+
+    order = np.argsort(-totals, kind='stable')
+    return [{'category': data.categories[code], 'total': int(totals[code]),
+             'share': float(totals[code] / grand_total)}
+            for code in order if totals[code] > 0]
+
+def analyze(data: TransactionArrays, window: int = 3, top: int = TOP_CATEGORIES) -> Optional[Dict[str, Any]]:
+    """Ringkasan analitik user, None jika belum ada transaksi
+
+    Rata-rata, rasio tabungan dan porsi kategori dihitung atas `window` bulan
+    kalender terakhir (bulan tanpa transaksi dihitung nol). expense_trend adalah
+    perubahan rata-rata pengeluaran dibanding `window` bulan sebelumnya.
+    """
+    if len(data) == 0:
+        return None
+
+    labels, income, expense, counts = monthly_series(data)
+    window = max(1, min(window, len(labels)))
+    rolling_income = rolling_mean(income, window)
+    rolling_expense = rolling_mean(expense, window)
+
+    recent_income = income[-window:].sum()
+    recent_expense = expense[-window:].sum()
+    savings_rate = float((recent_income - recent_expense) / recent_income) if recent_income > 0 else None
+
+    expense_trend = None
+    if len(labels) >= 2 * window and rolling_expense[-1 - window] > 0:
+        expense_trend = float(rolling_expense[-1] / rolling_expense[-1 - window] - 1)
+
+    recent_mask = (data.timestamps + WIB_OFFSET).astype('datetime64[M]') >= labels[-window]
+    return {
+        'months': [str(label) for label in labels],
+        'income': income.tolist(),
+        'expense': expense.tolist(),
+        'count': counts.tolist(),
+        'rolling_income': rolling_income.tolist(),
+        'rolling_expense': rolling_expense.tolist(),
+        'savings_rates': [None if np.isnan(rate) else float(rate) for rate in savings_rates(income, expense)],
+        'window': window,
+        'avg_income': int(round(rolling_income[-1])),
+        'avg_expense': int(round(rolling_expense[-1])),
+        'savings_rate': savings_rate,
+        'expense_trend': expense_trend,
+        'expense_shares': category_shares(data, recent_mask)[:top],
+    }
+
+def analyze_transactions(rows: Iterable[Tuple], window: int = 3,
+                         top: int = TOP_CATEGORIES) -> Optional[Dict[str, Any]]:
+    """analyze() langsung dari baris iter_transaction_rows"""
+    return analyze(TransactionArrays.from_rows(rows), window, top)
@@ -0,0 +1,95 @@
+"""
+Database arsip untuk Financial Bot
+Transaksi lama dipindah dari file utama (hot) ke file arsip (cold) yang di-ATTACH
+sebagai schema 'archive' di setiap koneksi
+"""
+
+import os
+import sqlite3
+
+# Nama schema file arsip di koneksi yang sama dengan database utama
+ARCHIVE_SCHEMA = 'archive'
+
+# Kolom transaksi yang disalin apa adanya (id dipertahankan)
+ARCHIVE_COLUMNS = 'id, user_id, username, transaction_type, amount, category, description, created_at'
+
+# PRAGMA user_version file arsip: 0 = amount rupiah REAL, 1 = sen INTEGER. Arsip
+# dikonversi bersama database utama (migrasi MINOR_UNITS_VERSION), file baru mulai dari 0
+ARCHIVE_MINOR_UNITS_VERSION = 1
+
+ARCHIVE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        username TEXT NOT NULL,
+        transaction_type TEXT NOT NULL,
+        amount {amount_type} NOT NULL,
+        category TEXT NOT NULL,
+        description TEXT,
+        created_at TIMESTAMP
+    )
+'''
+
+ARCHIVE_INDEX_SQL = 'CREATE INDEX IF NOT EXISTS idx_archive_user_created ON transactions (user_id, created_at)'
+
+ARCHIVE_SCHEMA_SQL = [
+    ARCHIVE_TABLE_SQL.format(name='transactions', amount_type='REAL'),
+    ARCHIVE_INDEX_SQL,
+    # Sama dengan transactions_fts di database utama, tapi dijaga manual (tanpa trigger)
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+        user_id, description, category,
+        content = 'transactions', content_rowid = 'id',
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    ''',
+]
+
+def archive_path_for(db_path: str) -> str:
+    """Path file arsip dari path database utama (financial_bot.db -> financial_bot.archive.db)"""
+    root, ext = os.path.splitext(db_path)
+    return f"{root}.archive{ext or '.db'}"
+
+def init_archive(archive_path: str, timeout: float = 30.0):
+    """Buat file arsip beserta skemanya jika belum ada"""
+    conn = sqlite3.connect(archive_path, timeout=timeout)
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+        has_fts = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'transactions_fts'").fetchone() is not None
+        for statement in ARCHIVE_SCHEMA_SQL:
+            conn.execute(statement)
+        if not has_fts:
+            # File arsip lama (sebelum ada FTS): index dibangun dari isi arsip
+            conn.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+        conn.commit()
+    finally:
+        conn.close()
+
+def convert_archive_amounts(archive_path: str, timeout: float = 30.0) -> bool:
+    """Bangun ulang tabel transactions arsip dengan amount dalam sen INTEGER, False jika sudah
+
+    Dipanggil setelah database utama sampai di migrasi MINOR_UNITS_VERSION. Satu
+    transaksi tulis; index FTS tidak berubah karena id dan teksnya sama.
+    """
+    conn = sqlite3.connect(archive_path, timeout=timeout, isolation_level=None)
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        if conn.execute('PRAGMA user_version').fetchone()[0] >= ARCHIVE_MINOR_UNITS_VERSION:
+            conn.rollback()
+            return False
+        conn.execute(ARCHIVE_TABLE_SQL.format(name='transactions_minor', amount_type='INTEGER'))
+        conn.execute(f'''
+            INSERT INTO transactions_minor ({ARCHIVE_COLUMNS})
+            SELECT id, user_id, username, transaction_type, CAST(ROUND(amount * 100) AS INTEGER),
+                   category, description, created_at
+            FROM transactions
+        ''')
+        conn.execute('DROP TABLE transactions')
+        conn.execute('ALTER TABLE transactions_minor RENAME TO transactions')
+        conn.execute(ARCHIVE_INDEX_SQL)
+        conn.execute(f'PRAGMA user_version = {ARCHIVE_MINOR_UNITS_VERSION}')
+        conn.commit()
+        return True
+    finally:
+        conn.close()
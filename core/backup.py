@@ -0,0 +1,135 @@
+"""
+Backup online untuk Financial Bot
+Snapshot database yang sedang dipakai lewat backup API SQLite: disalin per beberapa
+halaman dengan jeda, diverifikasi dengan integrity_check, lalu dirotasi (N terakhir)
+"""
+
+import glob
+import os
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from .maintenance import file_size
+
+# Halaman yang disalin per langkah (lock baca di sumber hanya selama satu langkah)
+BACKUP_STEP_PAGES = 256
+
+# Jeda antar langkah (detik) supaya query bot tetap kebagian I/O
+BACKUP_STEP_SLEEP = 0.005
+
+# Tulisan dari koneksi lain membuat backup API mengulang dari awal. Setelah sekian kali
+# ulang, backup diulang dalam satu langkah (di WAL penulis tetap tidak terblokir)
+BACKUP_MAX_RESTARTS = 3
+
+# Jumlah snapshot yang disimpan per file database
+DEFAULT_BACKUP_KEEP = 7
+
+# Format waktu (UTC) di nama file snapshot
+BACKUP_STAMP_FORMAT = '%Y%m%d-%H%M%S'
+
+class BackupRestarted(Exception):
+    """Sumber berubah terlalu sering selama backup bertahap"""
+
+def backup_path_for(db_path: str, backup_dir: str, stamp: str) -> str:
+    """financial_bot.db -> <backup_dir>/financial_bot.20240101-000000.db"""
+    root, ext = os.path.splitext(os.path.basename(db_path))
+    return os.path.join(backup_dir, f"{root}.{stamp}{ext or '.db'}")
+
+def list_backups(db_path: str, backup_dir: str) -> List[str]:
+    """Snapshot untuk db_path di backup_dir, terbaru dulu"""
+    root, ext = os.path.splitext(os.path.basename(db_path))
+    pattern = re.compile(rf'^{re.escape(root)}\.\d{{8}}-\d{{6}}{re.escape(ext or ".db")}$')
+    paths = [path for path in glob.glob(os.path.join(glob.escape(backup_dir), f"{root}.*"))
+             if pattern.match(os.path.basename(path))]
+    return sorted(paths, reverse=True)
+
+def rotate_backups(db_path: str, backup_dir: str, keep: int) -> List[str]:
+    """Hapus snapshot lama sehingga tersisa `keep` terbaru, return path yang dihapus"""
+    removed = list_backups(db_path, backup_dir)[max(1, keep):]
+    for path in removed:
+        os.remove(path)
+    return removed
+
+def _copy(source: sqlite3.Connection, target: sqlite3.Connection, schema: str,
+          pages: int, step_sleep: float, max_restarts: int) -> int:
+    """Backup bertahap, return jumlah pengulangan karena sumber berubah"""
+    state = {'remaining': None, 'restarts': 0}
+
+    def progress(status, remaining, total):
+        if state['remaining'] is not None and remaining > state['remaining']:
+            state['restarts'] += 1
+            if state['restarts'] > max_restarts:
+                raise BackupRestarted()
+        state['remaining'] = remaining
+        if remaining and step_sleep:
+            time.sleep(step_sleep)
+
+    try:
+        source.backup(target, pages=pages, progress=progress, name=schema)
+    except BackupRestarted:
+        # Satu langkah: snapshot konsisten dari satu transaksi baca
+        source.backup(target, pages=-1, name=schema)
+    return state['restarts']
+
+@contextmanager
+def read_snapshot(conn: sqlite3.Connection, schemas: Iterable[str] = ('main',)):
+    """Tahan satu transaksi baca di semua schema koneksi selama blok berjalan
+
+    Di WAL semua backup dari koneksi ini membaca snapshot yang sama (tulisan koneksi lain
+    tidak membuat backup mengulang), jadi file utama dan arsip yang di-ATTACH konsisten
+    satu sama lain. Transaksi baca di SQLite baru dimulai saat schema pertama kali dibaca.
+    """
+    conn.execute('BEGIN')
+    try:
+        for schema in schemas:
+            conn.execute(f"SELECT COUNT(*) FROM {schema}.sqlite_master").fetchone()
+        yield conn
+    finally:
+        conn.rollback()
+
+def backup_database(source: sqlite3.Connection, target_path: str, schema: str = 'main',
+                    pages: int = BACKUP_STEP_PAGES, step_sleep: float = BACKUP_STEP_SLEEP,
+                    max_restarts: int = BACKUP_MAX_RESTARTS) -> Dict:
+    """Salin schema dari koneksi `source` ke file target_path, lalu integrity_check
+
+    Snapshot ditulis ke file .partial dan baru di-rename setelah lolos pengecekan, jadi
+    target_path tidak pernah berisi backup setengah jadi. ValueError jika pengecekan gagal.
+    """
+    partial = target_path + '.partial'
+    if os.path.exists(partial):
+        os.remove(partial)
+
+    start = time.perf_counter()
+    target = sqlite3.connect(partial)
+    try:
+        restarts = _copy(source, target, schema, pages, step_sleep, max_restarts)
+        # Snapshot berdiri sendiri (tanpa file -wal/-shm)
+        target.execute('PRAGMA journal_mode = DELETE')
+        page_count = target.execute('PRAGMA page_count').fetchone()[0]
+        problems = [row[0] for row in target.execute('PRAGMA integrity_check')]
+    finally:
+        target.close()
+
+    if problems != ['ok']:
+        os.remove(partial)
+        raise ValueError(f"integrity_check gagal untuk {target_path}: {'; '.join(problems[:5])}")
+
+    os.replace(partial, target_path)
+    seconds = time.perf_counter() - start
+    size = file_size(target_path)
+    return {
+        'path': target_path,
+        'bytes': size,
+        'pages': page_count,
+        'restarts': restarts,
+        'seconds': seconds,
+        'bytes_per_second': size / seconds if seconds > 0 else 0.0,
+    }
+
+def backup_stamp(now: Optional[datetime] = None) -> str:
+    """Cap waktu UTC untuk nama file snapshot"""
+    return (now or datetime.now(timezone.utc)).strftime(BACKUP_STAMP_FORMAT)
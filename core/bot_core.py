@@ -3,22 +3,111 @@ Core bot logic untuk Financial Bot Discord
 Menggabungkan rules engine, database, dan Discord integration
 """
 
+import asyncio
+import functools
 import logging
-from typing import Dict, Any, Optional
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 import discord
 from discord.ext import commands
 
+from .analytics import analyze_transactions
 from .database import DatabaseManager
+from .export import export_transactions
+from .importer import StatementImporter
+from .maintenance import MaintenanceScheduler
+from .memory_store import MemoryStorage
+from .money import format_rupiah
 from .rules import FinancialRulesEngine
+from .sharding import ShardedDatabaseManager, shard_paths
+
+# Jumlah bulan kalender terakhir untuk rata-rata bulanan di saran anggaran
+MONTHLY_AVERAGE_WINDOW = 3
+
+# Implementasi Storage yang bisa dipilih lewat parameter backend
+STORAGE_BACKENDS = ('sqlite', 'memory')
+
+# Jumlah transaksi yang ditampilkan di hasil pencarian
+SEARCH_RESULT_LIMIT = 5
+
+# Bot dianggap sibuk (maintenance ditunda) sampai sekian detik setelah pesan terakhir
+MAINTENANCE_IDLE_SECONDS = 2.0
 
 class FinancialBotCore:
     """Core logic untuk Financial Bot"""
     
-    def __init__(self, db_path: str = "financial_bot.db"):
-        self.db = DatabaseManager(db_path)
+    def __init__(self, db_path: str = "financial_bot.db", max_workers: int = 4,
+                 max_pending: int = 100, shard_count: int = 1,
+                 query_stats_path: Optional[str] = None, backend: str = "sqlite",
+                 maintenance: bool = False, maintenance_intervals: Optional[Dict[str, float]] = None,
+                 **db_options):
+        # backend 'memory': semua data di memori proses (hilang saat bot berhenti).
+        # maintenance: jalankan MaintenanceScheduler di thread latar (hanya SQLite).
+        # db_options diteruskan ke DatabaseManager (mis. pool_size, tracer)
+        if backend not in STORAGE_BACKENDS:
+            raise ValueError(f"Storage backend tidak dikenal: {backend}")
+        if backend == 'memory':
+            self.db = MemoryStorage()
+        elif shard_count > 1:
+            self.db = ShardedDatabaseManager(shard_paths(db_path, shard_count), **db_options)
+        else:
+            self.db = DatabaseManager(db_path, **db_options)
         self.rules_engine = FinancialRulesEngine()
+        # File JSON tempat statistik query ditulis (hanya jika tracer aktif)
+        self.query_stats_path = query_stats_path
         self.setup_logging()
+        
+        # Executor terbatas untuk pekerjaan blocking (SQLite, file log) dari event loop
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='financial-core')
+        self.max_pending = max_pending
+        self._pending_slots = None
+        
+        # Penanda sibuk untuk maintenance: pekerjaan yang sedang berjalan dan waktu pesan terakhir
+        self._in_flight = 0
+        self._last_activity = float('-inf')
+        self.maintenance = None
+        if maintenance and backend == 'sqlite':
+            targets = self.db.shards if isinstance(self.db, ShardedDatabaseManager) else [self.db]
+            self.maintenance = MaintenanceScheduler(targets, intervals=maintenance_intervals,
+                                                    is_busy=self.is_busy)
+    
+    def is_busy(self) -> bool:
+        """True jika ada pesan yang sedang diproses atau baru saja masuk"""
+        return self._in_flight > 0 or time.monotonic() - self._last_activity < MAINTENANCE_IDLE_SECONDS
+    
+    def close_database(self):
+        """Tutup koneksi database saat bot berhenti"""
+        self.db.close()
+    
+    def close(self):
+        """Hentikan maintenance dan executor (tunggu pekerjaan yang berjalan) lalu tutup database"""
+        if self.maintenance:
+            self.maintenance.close()
+        self.executor.shutdown(wait=True)
+        self.dump_query_stats()
+        self.close_database()
+    
+    async def run_blocking(self, func: Callable, *args, **kwargs) -> Any:
+        """Jalankan fungsi blocking di executor tanpa menahan event loop"""
+        if self._pending_slots is None:
+            # Batasi antrian supaya lonjakan pesan tidak menumpuk tanpa batas
+            self._pending_slots = asyncio.Semaphore(self.max_pending)
+        
+        async with self._pending_slots:
+            loop = asyncio.get_running_loop()
+            self._in_flight += 1
+            try:
+                return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+            finally:
+                self._in_flight -= 1
+    
+    async def process_message_async(self, user_id: str, username: str, message: str) -> str:
+        """Versi async dari process_message untuk dipanggil dari event loop Discord"""
+        return await self.run_blocking(self.process_message, user_id, username, message)
     
     def setup_logging(self):
         """Setup logging configuration"""
@@ -34,6 +123,7 @@ class FinancialBotCore:
     
     def process_message(self, user_id: str, username: str, message: str) -> str:
         """Proses pesan dari user dan return response"""
+        self._last_activity = time.monotonic()
         try:
             # Log incoming message
             self.logger.info(f"Processing message from {username} ({user_id}): {message}")
@@ -67,6 +157,9 @@ class FinancialBotCore:
             elif command_type == 'stats':
                 return self._handle_stats(user_id, command_result)
             
+            elif command_type == 'search':
+                return self._handle_search(user_id, command_result)
+            
             elif command_type == 'help':
                 return self.rules_engine.generate_response(command_result)
             
@@ -88,9 +181,9 @@ class FinancialBotCore:
         response = "📊 **Statistik Keuangan Lengkap:**\n\n"
         
         # Summary
-        response += f"💰 **Total Pemasukan**: Rp {balance_info['income']:,.0f}\n"
-        response += f"💸 **Total Pengeluaran**: Rp {balance_info['expense']:,.0f}\n"
-        response += f"📈 **Saldo**: Rp {balance_info['balance']:,.0f}\n"
+        response += f"💰 **Total Pemasukan**: Rp {format_rupiah(balance_info['income'])}\n"
+        response += f"💸 **Total Pengeluaran**: Rp {format_rupiah(balance_info['expense'])}\n"
+        response += f"📈 **Saldo**: Rp {format_rupiah(balance_info['balance'])}\n"
         response += f"📊 **Total Transaksi**: {stats['transaction_count']}\n\n"
         
         # Recent transactions
@@ -98,7 +191,7 @@ class FinancialBotCore:
             response += "📋 **Transaksi Terbaru:**\n"
             for idx, trans in enumerate(stats['recent_transactions'][:5], 1):
                 emoji = "💚" if trans['type'] == 'income' else "💸"
-                response += f"{idx}. {emoji} Rp {trans['amount']:,.0f} - {trans['category']}"
+                response += f"{idx}. {emoji} Rp {format_rupiah(trans['amount'])} - {trans['category']}"
                 if trans['description']:
                     response += f" ({trans['description']})"
                 response += "\n"
@@ -125,12 +218,12 @@ class FinancialBotCore:
         )
         
         if success:
-            self.logger.info(f"Income added: {username} - Rp {amount:,.0f} - {category}")
+            self.logger.info(f"Income added: {username} - Rp {format_rupiah(amount)} - {category}")
             
             # Get updated balance untuk response
-            balance_info = self.db.get_user_balance(user_id)
+            balance_info = self.db.get_user_snapshot(user_id, recent_limit=0, months=0)['balance']
             response = self.rules_engine.generate_response(command_result)
-            response += f"\n💰 Saldo terbaru: Rp {balance_info['balance']:,.0f}"
+            response += f"\n💰 Saldo terbaru: Rp {format_rupiah(balance_info['balance'])}"
             return response
         else:
             return "❌ Gagal menyimpan transaksi. Silakan coba lagi."
@@ -155,12 +248,12 @@ class FinancialBotCore:
         )
         
         if success:
-            self.logger.info(f"Expense added: {username} - Rp {amount:,.0f} - {category}")
+            self.logger.info(f"Expense added: {username} - Rp {format_rupiah(amount)} - {category}")
             
             # Get updated balance untuk response
-            balance_info = self.db.get_user_balance(user_id)
+            balance_info = self.db.get_user_snapshot(user_id, recent_limit=0, months=0)['balance']
             response = self.rules_engine.generate_response(command_result)
-            response += f"\n💰 Saldo terbaru: Rp {balance_info['balance']:,.0f}"
+            response += f"\n💰 Saldo terbaru: Rp {format_rupiah(balance_info['balance'])}"
             
             # Warning jika saldo negatif
             if balance_info['balance'] < 0:
@@ -172,13 +265,12 @@ class FinancialBotCore:
     
     def _handle_balance(self, user_id: str, command_result: Dict[str, Any]) -> str:
         """Handle perintah saldo"""
-        balance_info = self.db.get_user_balance(user_id)
-        
-        # Get recent transactions
-        recent_transactions = self.db.get_user_transactions(user_id, limit=5)
+        start, end = self._period_bounds(command_result)
+        snapshot = self.db.get_user_snapshot(user_id, recent_limit=5, start=start, end=end, months=0)
+        recent_transactions = snapshot['recent_transactions']
         
         user_data = {
-            'balance': balance_info,
+            'balance': snapshot['balance'],
             'recent_transactions': recent_transactions
         }
         
@@ -189,7 +281,7 @@ class FinancialBotCore:
             response += "\n\n📋 **5 Transaksi Terakhir:**"
             for idx, trans in enumerate(recent_transactions, 1):
                 type_emoji = "💚" if trans['type'] == 'income' else "💸"
-                response += f"\n{idx}. {type_emoji} Rp {trans['amount']:,.0f} - {trans['category']}"
+                response += f"\n{idx}. {type_emoji} Rp {format_rupiah(trans['amount'])} - {trans['category']}"
                 if trans['description']:
                     response += f" ({trans['description']})"
         
@@ -197,27 +289,38 @@ class FinancialBotCore:
     
     def _handle_report(self, user_id: str, command_result: Dict[str, Any]) -> str:
         """Handle perintah laporan"""
-        category_report = self.db.get_category_report(user_id)
-        balance_info = self.db.get_user_balance(user_id)
+        start, end = self._period_bounds(command_result)
+        period = command_result.get('period')
+        focus = command_result.get('focus')
+        snapshot = self.db.get_user_snapshot(user_id, recent_limit=0, start=start, end=end, months=0)
+        category_report = snapshot['category_report']
+        balance_info = snapshot['balance']
         
         if not category_report:
+            if period:
+                return f"📊 Tidak ada transaksi untuk periode {period['label']}."
             return "📊 Kamu belum memiliki transaksi untuk dilaporkan."
         
-        response = "📊 **Laporan Keuangan per Kategori:**\n\n"
+        period_text = f" ({period['label'].title()})" if period else ""
+        response = f"📊 **Laporan Keuangan per Kategori{period_text}:**\n\n"
         
         # Summary
-        response += f"💰 **Total Pemasukan**: Rp {balance_info['income']:,.0f}\n"
-        response += f"💸 **Total Pengeluaran**: Rp {balance_info['expense']:,.0f}\n"
-        response += f"📈 **Saldo**: Rp {balance_info['balance']:,.0f}\n\n"
+        if focus != 'expense':
+            response += f"💰 **Total Pemasukan**: Rp {format_rupiah(balance_info['income'])}\n"
+        if focus != 'income':
+            response += f"💸 **Total Pengeluaran**: Rp {format_rupiah(balance_info['expense'])}\n"
+        if focus is None:
+            response += f"📈 **Saldo**: Rp {format_rupiah(balance_info['balance'])}\n"
+        response += "\n"
         
         # Separate income and expense categories
         income_categories = {}
         expense_categories = {}
         
         for category, amounts in category_report.items():
-            if amounts['income'] > 0:
+            if amounts['income'] > 0 and focus != 'expense':
                 income_categories[category] = amounts['income']
-            if amounts['expense'] > 0:
+            if amounts['expense'] > 0 and focus != 'income':
                 expense_categories[category] = amounts['expense']
         
         # Display Income section
@@ -226,7 +329,7 @@ class FinancialBotCore:
             # Sort by amount (highest first)
             sorted_income = sorted(income_categories.items(), key=lambda x: x[1], reverse=True)
             for category, amount in sorted_income:
-                response += f"• {category.title()}: Rp {amount:,.0f}\n"
+                response += f"• {category.title()}: Rp {format_rupiah(amount)}\n"
             response += "\n"
         
         # Display Expense section
@@ -235,34 +338,75 @@ class FinancialBotCore:
             # Sort by amount (highest first)
             sorted_expense = sorted(expense_categories.items(), key=lambda x: x[1], reverse=True)
             for category, amount in sorted_expense:
-                response += f"• {category.title()}: Rp {amount:,.0f}\n"
+                response += f"• {category.title()}: Rp {format_rupiah(amount)}\n"
         
         return response
     
-    def _handle_delete(self, user_id: str, command_result: Dict[str, Any]) -> str:
-        """Handle perintah hapus transaksi"""
-        transaction_id = command_result['transaction_id']
-        
-        # Get transaction details first untuk logging
-        transactions = self.db.get_user_transactions(user_id, limit=100)
-        target_transaction = None
-        
-        for trans in transactions:
-            if trans['id'] == transaction_id:
-                target_transaction = trans
-                break
-        
-        if not target_transaction:
-            return f"❌ Transaksi dengan ID {transaction_id} tidak ditemukan atau bukan milik Anda."
+    def _handle_search(self, user_id: str, command_result: Dict[str, Any]) -> str:
+        """Handle pencarian transaksi (cari kopi)"""
+        query = command_result['query']
+        result = self.db.search_transactions(user_id, query, limit=SEARCH_RESULT_LIMIT)
+        
+        if result['count'] == 0:
+            return f"🔎 Tidak ada transaksi yang cocok dengan '{query}'."
+        
+        response = f"🔎 **Hasil pencarian '{query}'**: {result['count']} transaksi\n"
+        if result['expense']:
+            response += f"💸 **Total Pengeluaran**: Rp {format_rupiah(result['expense'])}\n"
+        if result['income']:
+            response += f"💰 **Total Pemasukan**: Rp {format_rupiah(result['income'])}\n"
+        
+        response += "\n📋 **Transaksi Terbaru:**\n"
+        for trans in result['transactions']:
+            emoji = "💚" if trans['type'] == 'income' else "💸"
+            response += f"#{trans['id']} {emoji} Rp {format_rupiah(trans['amount'])} - {trans['category']}"
+            if trans['description']:
+                response += f" ({trans['description']})"
+            response += "\n"
         
-        # Delete transaction
-        success = self.db.delete_transaction(user_id, transaction_id)
+        if result['count'] > len(result['transactions']):
+            response += f"... dan {result['count'] - len(result['transactions'])} transaksi lainnya\n"
+        return response
+    
+    def _period_bounds(self, command_result: Dict[str, Any]) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """Rentang UTC [start, end) dari hasil parse periode, (None, None) jika tanpa periode"""
+        period = command_result.get('period')
+        if not period:
+            return None, None
+        return period['start'], period['end']
+    
+    def _handle_delete(self, user_id: str, command_result: Dict[str, Any]) -> str:
+        """Handle perintah hapus transaksi (satu id atau rentang)"""
+        first_id = command_result['transaction_id']
+        last_id = command_result.get('last_id')
+        label = f"ID {first_id}-{last_id}" if last_id is not None else f"ID {first_id}"
         
-        if success:
-            self.logger.info(f"Transaction deleted: {user_id} - ID {transaction_id}")
-            return f"✅ Transaksi ID {transaction_id} berhasil dihapus."
-        else:
-            return f"❌ Gagal menghapus transaksi ID {transaction_id}."
+        # Satu DELETE ... RETURNING: pengecekan kepemilikan dan detail transaksi sekaligus
+        try:
+            deleted = self.db.delete_transactions(user_id, first_id, last_id)
+        except Exception as e:
+            self.logger.error(f"Error deleting transactions {label}: {e}")
+            return f"❌ Gagal menghapus transaksi {label}."
+        
+        if not deleted:
+            return f"❌ Transaksi dengan {label} tidak ditemukan atau bukan milik Anda."
+        
+        self.logger.info(f"Transaction deleted: {user_id} - {', '.join(str(t['id']) for t in deleted)}")
+        if last_id is None:
+            transaction = deleted[0]
+            kind = 'pemasukan' if transaction['type'] == 'income' else 'pengeluaran'
+            return (f"✅ Transaksi ID {first_id} berhasil dihapus: {kind} "
+                    f"Rp {format_rupiah(transaction['amount'])} ({transaction['category']}).")
+        
+        totals = {'income': 0, 'expense': 0}
+        for transaction in deleted:
+            totals[transaction['type']] += transaction['amount']
+        response = f"✅ {len(deleted)} transaksi ({label}) berhasil dihapus."
+        if totals['income']:
+            response += f"\n💰 Pemasukan: Rp {format_rupiah(totals['income'])}"
+        if totals['expense']:
+            response += f"\n💸 Pengeluaran: Rp {format_rupiah(totals['expense'])}"
+        return response
     
     def _handle_budget_advice(self, user_id: str, command_result: Dict[str, Any]) -> str:
         """Handle budget advice request"""
@@ -279,15 +423,15 @@ class FinancialBotCore:
         
         item = command_result.get('item', 'item')
         price = command_result.get('price', 0)
-        self.logger.info(f"Purchase planning requested by {user_id} for {item} at Rp {price:,.0f}")
+        self.logger.info(f"Purchase planning requested by {user_id} for {item} at Rp {format_rupiah(price)}")
         
         return self.rules_engine.generate_response(command_result, user_data)
     
     def _get_comprehensive_user_data(self, user_id: str) -> Dict[str, Any]:
         """Get comprehensive user data for financial analysis"""
-        balance_info = self.db.get_user_balance(user_id)
-        recent_transactions = self.db.get_user_transactions(user_id, limit=50)
-        category_report = self.db.get_category_report(user_id)
+        snapshot = self.db.get_user_snapshot(user_id, recent_limit=50, months=MONTHLY_AVERAGE_WINDOW)
+        balance_info = snapshot['balance']
+        recent_transactions = snapshot['recent_transactions']
         
         # Calculate debt information from transactions
         debt_categories = ['tagihan', 'cicilan', 'hutang', 'debt', 'loan', 'credit']
@@ -301,22 +445,12 @@ class FinancialBotCore:
                 debt_transactions.append(trans)
                 total_debt += trans['amount']
         
-        # Estimate monthly income and expenses (using recent transaction patterns)
-        monthly_income = 0
-        monthly_expense = 0
-        
-        # Simple estimation: if we have transactions, estimate monthly based on recent data
-        if recent_transactions:
-            income_sum = sum(t['amount'] for t in recent_transactions if t['type'] == 'income')
-            expense_sum = sum(t['amount'] for t in recent_transactions if t['type'] == 'expense')
-            
-            # If we have multiple transactions, try to estimate monthly values
-            if len(recent_transactions) > 5:
-                monthly_income = income_sum / max(1, len([t for t in recent_transactions if t['type'] == 'income'])) if income_sum > 0 else 0
-                monthly_expense = expense_sum / max(1, len([t for t in recent_transactions if t['type'] == 'expense'])) if expense_sum > 0 else 0
-            else:
-                monthly_income = income_sum
-                monthly_expense = expense_sum
+        # Deret bulanan, rata-rata bergulir (3 bulan kalender terakhir), rasio tabungan
+        # dan porsi kategori dihitung vektor dari seluruh riwayat user
+        analytics = analyze_transactions(self.db.iter_transaction_rows(user_id),
+                                         window=MONTHLY_AVERAGE_WINDOW)
+        monthly_income = analytics['avg_income'] if analytics else 0
+        monthly_expense = analytics['avg_expense'] if analytics else 0
         
         return {
             'balance': {
@@ -325,23 +459,85 @@ class FinancialBotCore:
                 'balance': balance_info['balance']
             },
             'recent_transactions': recent_transactions,
-            'category_report': category_report,
+            'category_report': snapshot['category_report'],
+            'monthly_summary': snapshot['monthly_summary'],
+            'analytics': analytics,
             'debt_info': {
                 'debt_transactions': debt_transactions,
                 'total_debt': total_debt
             },
-            'transaction_count': len(recent_transactions)
+            'transaction_count': snapshot['transaction_count']
         }
     
     def get_user_stats(self, user_id: str) -> Dict[str, Any]:
-        """Get statistik lengkap user"""
-        balance_info = self.db.get_user_balance(user_id)
-        recent_transactions = self.db.get_user_transactions(user_id, limit=10)
-        category_report = self.db.get_category_report(user_id)
+        """Get statistik lengkap user (satu snapshot, konsisten walau ada tulisan bersamaan)"""
+        snapshot = self.db.get_user_snapshot(user_id, recent_limit=10, months=0)
         
         return {
-            'balance': balance_info,
-            'recent_transactions': recent_transactions,
-            'category_report': category_report,
-            'transaction_count': len(recent_transactions)
+            'balance': snapshot['balance'],
+            'recent_transactions': snapshot['recent_transactions'],
+            'category_report': snapshot['category_report'],
+            'transaction_count': snapshot['transaction_count']
         }
+    
+    def get_query_stats(self, limit: int = 10) -> Optional[Dict[str, Any]]:
+        """Bentuk query dengan total waktu terbesar dan query lambat terakhir, None jika tracing mati"""
+        tracer = self.db.tracer
+        if tracer is None:
+            return None
+        
+        return {
+            'slow_query_ms': tracer.slow_query_ms,
+            'queries': tracer.snapshot()[:limit],
+            'slow_queries': tracer.slow_queries(),
+        }
+    
+    def get_maintenance_stats(self) -> Optional[Dict[str, Any]]:
+        """Ukuran database dan hasil job maintenance terakhir, None jika maintenance mati"""
+        if self.maintenance is None:
+            return None
+        return self.maintenance.stats()
+    
+    def run_maintenance(self, jobs: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Jalankan job maintenance sekarang (dipanggil lewat run_blocking oleh admin)"""
+        if self.maintenance is None:
+            return []
+        return self.maintenance.run_now(jobs)
+    
+    def dump_query_stats(self) -> Optional[str]:
+        """Tulis statistik query ke query_stats_path, return path-nya"""
+        if self.db.tracer is None or not self.query_stats_path:
+            return None
+        
+        self.db.tracer.dump(self.query_stats_path)
+        return self.query_stats_path
+    
+    def export_user_ledger(self, user_id: str, fmt: str = 'csv') -> Tuple[str, int]:
+        """Export transaksi user ke file sementara, return (path, jumlah baris)
+        
+        Dipanggil lewat run_blocking; pemanggil wajib menghapus file setelah dikirim.
+        """
+        with tempfile.NamedTemporaryFile('w', suffix=f'.{fmt}', delete=False,
+                                         newline='', encoding='utf-8') as output:
+            try:
+                count = export_transactions(self.db, output, fmt, user_id=user_id)
+            except Exception:
+                output.close()
+                os.unlink(output.name)
+                raise
+        
+        self.logger.info(f"Export {fmt} for {user_id}: {count} transactions")
+        return output.name, count
+    
+    def import_statement(self, user_id: str, username: str, path: str,
+                         progress: Optional[Callable[[Dict[str, float]], None]] = None) -> Dict[str, float]:
+        """Import file CSV mutasi rekening untuk user (dipanggil lewat run_blocking)"""
+        importer = StatementImporter(self.db, self.rules_engine)
+        with open(path, newline='', encoding='utf-8-sig', errors='replace') as source:
+            result = importer.import_file(source, user_id, username, progress=progress)
+        
+        self.logger.info(f"Import for {user_id}: {result['inserted']} rows, {result['skipped']} existing, "
+                         f"{result['failed']} failed, {result['rows_per_second']:,.0f} rows/s")
+        if 'error' in result:
+            self.logger.error(f"Import for {user_id} stopped: {result['error']}")
+        return result
@@ -0,0 +1,57 @@
+"""
+Registry kategori di memori untuk Financial Bot
+Dimuat sekali dari tabel categories dan dimuat ulang hanya saat kategori ditambah
+"""
+
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Tipe kategori yang valid di tabel categories
+CATEGORY_TYPES = ('income', 'expense', 'both')
+
+class CategoryRegistry:
+    """Lookup nama kategori -> tipe tanpa query database
+
+    Nama dicocokkan tanpa membedakan huruf besar/kecil ('Makanan' == 'makanan').
+    Snapshot diganti utuh saat dimuat ulang, jadi pembaca tidak perlu lock.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[str, str]] = ()):
+        self._lock = threading.Lock()
+        self.replace(rows)
+
+    def replace(self, rows: Iterable[Tuple[str, str]]):
+        """Ganti seluruh isi registry dengan baris (name, type) dari tabel categories"""
+        types: Dict[str, str] = {}
+        display: Dict[str, str] = {}
+        for name, category_type in rows:
+            key = name.strip().lower()
+            types[key] = category_type
+            display[key] = name
+
+        names = tuple(sorted(display.values()))
+        by_type = {
+            transaction_type: tuple(name for name in names if types[name.strip().lower()] in (transaction_type, 'both'))
+            for transaction_type in ('income', 'expense')
+        }
+        with self._lock:
+            self._snapshot = (types, names, by_type)
+
+    def type_of(self, name: str) -> Optional[str]:
+        """Tipe kategori ('income', 'expense', 'both'), None jika tidak terdaftar"""
+        return self._snapshot[0].get(name.strip().lower())
+
+    def accepts(self, name: str, transaction_type: str) -> bool:
+        """True jika kategori terdaftar dan boleh dipakai untuk tipe transaksi ini"""
+        return self.type_of(name) in (transaction_type, 'both')
+
+    def names(self, transaction_type: str = None) -> List[str]:
+        """Nama kategori urut abjad, opsional hanya yang berlaku untuk satu tipe"""
+        _, names, by_type = self._snapshot
+        return list(by_type.get(transaction_type, ()) if transaction_type else names)
+
+    def __contains__(self, name: str) -> bool:
+        return self.type_of(name) is not None
+
+    def __len__(self) -> int:
+        return len(self._snapshot[0])
@@ -3,101 +3,929 @@ Database management untuk Financial Bot
 Menggunakan SQLite untuk menyimpan data transaksi
 """
 
+import logging
 import sqlite3
 import os
-from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+import queue
+import re
+import threading
+from time import sleep
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Iterable, Iterator, List, Dict, Optional, Tuple
 
-class DatabaseManager:
-    def __init__(self, db_path: str = "financial_bot.db"):
+from .archive import ARCHIVE_COLUMNS, ARCHIVE_SCHEMA, archive_path_for, convert_archive_amounts, init_archive
+from .backup import (DEFAULT_BACKUP_KEEP, backup_database, backup_path_for, backup_stamp, read_snapshot,
+                     rotate_backups)
+from .categories import CATEGORY_TYPES, CategoryRegistry
+from .maintenance import BACKUP_JOB, file_size, full_vacuum, run_job, storage_stats
+from .migrations import (LEDGER_BACKFILL_VERSION, MINOR_UNITS_VERSION, backfill_ledger,
+                         drop_legacy_transactions, get_schema_version, has_legacy_transactions,
+                         ledger_backfill_remaining, migrate)
+from .money import MINOR_PER_UNIT, as_minor
+from .replica import ReadReplica
+from .storage import (ROLLUP_TZ_MODIFIER, SEARCH_MAX_TERMS, Storage, format_bound, rollup_month_bounds,
+                      summarize_totals, transaction_from_row)
+from .tracing import QueryTracer
+from .writer import WriteBehindQueue
+
+logger = logging.getLogger('FinancialBot.database')
+
+# created_at opsional: NULL berarti waktu sekarang
+BULK_INSERT_SQL = '''
+    INSERT INTO transactions (user_id, username, transaction_type, amount, category, description, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+'''
+
+# Padanan BULK_INSERT_SQL setelah cutover ke ledger (id user/kategori sudah diresolve)
+LEDGER_BULK_INSERT_SQL = '''
+    INSERT INTO ledger (user_ref, transaction_type, amount_minor, category_id, description, created_at)
+    VALUES (?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+'''
+
+# Ukuran cache (KiB, negatif) untuk koneksi yang sedang bulk insert
+BULK_CACHE_SIZE = -65536
+
+# Trigger AFTER INSERT yang dilepas selama bulk insert, beserta padanan set-based
+# untuk semua baris dengan id > ? (dijalankan sekali setelah semua batch masuk)
+DEFERRED_INSERT_TRIGGERS = {
+    'trg_transactions_balance_insert': '''
+    INSERT INTO user_balances (user_id, total_income, total_expense, transaction_count)
+    SELECT user_id,
+           COALESCE(SUM(CASE WHEN transaction_type = 'income' THEN amount END), 0),
+           COALESCE(SUM(CASE WHEN transaction_type = 'expense' THEN amount END), 0),
+           COUNT(*)
+    FROM transactions
+    WHERE id > ?
+    GROUP BY user_id
+    ON CONFLICT (user_id) DO UPDATE SET
+        total_income = total_income + excluded.total_income,
+        total_expense = total_expense + excluded.total_expense,
+        transaction_count = transaction_count + excluded.transaction_count
+    ''',
+    'trg_transactions_rollup_insert': f'''
+    INSERT INTO monthly_rollups (user_id, year_month, category, transaction_type, total, count)
+    SELECT user_id, strftime('%Y-%m', created_at, '{ROLLUP_TZ_MODIFIER}'), category, transaction_type,
+           SUM(amount), COUNT(*)
+    FROM transactions
+    WHERE id > ?
+    GROUP BY 1, 2, 3, 4
+    ON CONFLICT (user_id, year_month, category, transaction_type) DO UPDATE SET
+        total = total + excluded.total,
+        count = count + excluded.count
+    ''',
+    'trg_transactions_fts_insert': '''
+    INSERT INTO transactions_fts (rowid, user_id, description, category)
+    SELECT id, user_id, description, category
+    FROM transactions
+    WHERE id > ?
+    ''',
+}
+
+# Agregasi ledger mentah per user, sumber kebenaran untuk user_balances.
+# {source} diisi tabel transaksi (plus arsip jika ada) lewat str.format
+LEDGER_TOTALS_SQL = '''
+    SELECT user_id,
+           COALESCE(SUM(CASE WHEN transaction_type = 'income' THEN amount END), 0) AS income,
+           COALESCE(SUM(CASE WHEN transaction_type = 'expense' THEN amount END), 0) AS expense,
+           COUNT(*) AS count
+    FROM {source}
+    GROUP BY user_id
+'''
+
+REBUILD_USER_BALANCES_SQL = f'''
+    INSERT INTO user_balances (user_id, total_income, total_expense, transaction_count)
+    {LEDGER_TOTALS_SQL}
+'''
+
+# Toleransi untuk data lama yang belum dikonversi ke sen (rupiah REAL); sen INTEGER selalu pas
+VERIFY_USER_BALANCES_SQL = f'''
+    WITH ledger AS ({LEDGER_TOTALS_SQL})
+    SELECT l.user_id, b.total_income, b.total_expense, b.transaction_count,
+           l.income, l.expense, l.count
+    FROM ledger l
+    LEFT JOIN user_balances b ON b.user_id = l.user_id
+    WHERE b.user_id IS NULL
+       OR ABS(b.total_income - l.income) > 0.005
+       OR ABS(b.total_expense - l.expense) > 0.005
+       OR b.transaction_count != l.count
+    UNION ALL
+    SELECT b.user_id, b.total_income, b.total_expense, b.transaction_count, 0, 0, 0
+    FROM user_balances b
+    WHERE NOT EXISTS (SELECT 1 FROM {{source}} t WHERE t.user_id = b.user_id)
+      AND (b.total_income != 0 OR b.total_expense != 0 OR b.transaction_count != 0)
+'''
+
+class ConnectionPool:
+    """Pool koneksi SQLite yang thread-aware dan dipakai ulang antar pemanggilan"""
+    
+    def __init__(self, db_path: str, size: int = 5, timeout: float = 30.0,
+                 busy_timeout_ms: int = 5000, synchronous: str = "NORMAL",
+                 attach: Optional[Dict[str, str]] = None, tracer: Optional[QueryTracer] = None):
         self.db_path = db_path
+        # Opsional: semua query di koneksi pool dicatat oleh tracer
+        self.tracer = tracer
+        # Database tambahan (nama schema -> path) yang di-ATTACH di setiap koneksi
+        self.attach = dict(attach or {})
+        # Database :memory: berbeda untuk setiap koneksi, jadi hanya boleh satu
+        self.size = 1 if db_path == ":memory:" else max(1, size)
+        self.timeout = timeout
+        self.busy_timeout_ms = busy_timeout_ms
+        self.synchronous = synchronous
+        
+        # LIFO supaya koneksi yang baru dipakai (cache masih hangat) dipakai lagi
+        self._idle = queue.LifoQueue(maxsize=self.size)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._created = 0
+        self._closed = False
+    
+    def create_connection(self) -> sqlite3.Connection:
+        """Buat koneksi baru dan setup PRAGMA sekali saja"""
+        connect = self.tracer.connect if self.tracer else sqlite3.connect
+        conn = connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        # Hanya berlaku untuk file baru (harus sebelum WAL); file lama butuh VACUUM penuh
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        if self.db_path != ":memory:":
+            conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        for schema, path in self.attach.items():
+            conn.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+        return conn
+    
+    def _acquire(self) -> sqlite3.Connection:
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection pool sudah ditutup")
+        
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self.create_connection()
+                except Exception:
+                    self._created -= 1
+                    raise
+        
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"Tidak ada koneksi database yang tersedia setelah {self.timeout} detik"
+            )
+    
+    def _release(self, conn: sqlite3.Connection):
+        # Jangan kembalikan koneksi yang masih di tengah transaksi
+        if conn.in_transaction:
+            conn.rollback()
+        
+        if self._closed:
+            conn.close()
+            with self._lock:
+                self._created -= 1
+        else:
+            self._idle.put_nowait(conn)
+    
+    @contextmanager
+    def connection(self):
+        """Pinjam koneksi dari pool (reentrant untuk thread yang sama)"""
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            # Pemanggilan bersarang di thread yang sama memakai koneksi yang sama
+            yield held
+            return
+        
+        conn = self._acquire()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._release(conn)
+    
+    def close(self):
+        """Tutup semua koneksi idle; koneksi yang sedang dipinjam ditutup saat dikembalikan"""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+# SQL tulis yang juga dipakai write-behind queue
+INSERT_TRANSACTION_SQL = '''
+    INSERT INTO transactions (user_id, username, transaction_type, amount, category, description)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+# Rentang id milik user dalam satu statement lewat primary key; ringkasan dan FTS
+# diperbarui trigger AFTER DELETE. Parameter: (first_id, last_id, user_id). Unary +
+# pada kolom user mencegah planner memilih index (user, created_at), yang membaca
+# seluruh riwayat user lalu baru menyaring id
+DELETE_TRANSACTIONS_SQL = '''
+    DELETE FROM transactions
+    WHERE id BETWEEN ? AND ? AND +user_id = ?
+'''
+
+TRANSACTION_COLUMNS = 'id, transaction_type, amount, category, description, created_at'
+
+# Setelah cutover tulisan langsung ke ledger: lewat view transactions (INSTEAD OF)
+# lastrowid dan rowcount selalu 0
+LEDGER_INSERT_SQL = '''
+    INSERT INTO ledger (user_ref, transaction_type, amount_minor, category_id, description)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+LEDGER_DELETE_SQL = '''
+    DELETE FROM ledger
+    WHERE id BETWEEN ? AND ? AND +user_ref = (SELECT id FROM users WHERE user_key = ?)
+'''
+
+# Baris yang terhapus (kolom TRANSACTION_COLUMNS) dikembalikan oleh DELETE yang sama
+LEDGER_DELETE_RETURNING = '''
+    RETURNING id, transaction_type, amount_minor,
+              (SELECT name FROM categories WHERE id = category_id), description, created_at
+'''
+
+UPSERT_USER_SQL = '''
+    INSERT INTO users (user_key, username) VALUES (?, ?)
+    ON CONFLICT (user_key) DO UPDATE SET username = excluded.username
+    RETURNING id
+'''
+
+# Nama kategori yang belum terdaftar tetap butuh id, tapi tidak masuk registry
+INSERT_CATEGORY_REF_SQL = '''
+    INSERT INTO categories (name, type, listed) VALUES (?, 'both', 0)
+    ON CONFLICT (name) DO NOTHING
+'''
+
+# Kategori yang sebelumnya hanya dipakai transaksi (listed = 0) ikut didaftarkan
+ADD_CATEGORY_SQL = '''
+    INSERT INTO categories (name, type) VALUES (?, ?)
+    ON CONFLICT (name) DO UPDATE SET type = excluded.type, listed = 1 WHERE listed = 0
+'''
+
+# Database lama dengan transaksi sebanyak ini dimigrasi ke ledger secara online
+# (backfill di thread latar), yang lebih kecil langsung saat start
+ONLINE_MIGRATION_MIN_ROWS = 50000
+
+# Baris per transaksi backfill (dan pengosongan tabel lama) serta jeda antar batch di thread latar
+LEDGER_BACKFILL_BATCH = 2000
+LEDGER_BACKFILL_PAUSE = 0.05
+
+# Trigger AFTER DELETE yang dilepas saat arsip: ringkasan tetap mencakup data arsip
+ARCHIVE_DEFERRED_TRIGGERS = ('trg_transactions_balance_delete', 'trg_transactions_rollup_delete')
+
+# Padanan trigger delete untuk transaksi yang dihapus langsung dari arsip
+ARCHIVED_DELETE_COMPENSATION_SQL = [
+    '''
+    UPDATE user_balances SET
+        total_income = total_income - CASE WHEN :transaction_type = 'income' THEN :amount ELSE 0 END,
+        total_expense = total_expense - CASE WHEN :transaction_type = 'expense' THEN :amount ELSE 0 END,
+        transaction_count = transaction_count - 1
+    WHERE user_id = :user_id
+    ''',
+    f'''
+    UPDATE monthly_rollups SET
+        total = total - :amount,
+        count = count - 1
+    WHERE user_id = :user_id
+      AND year_month = strftime('%Y-%m', :created_at, '{ROLLUP_TZ_MODIFIER}')
+      AND category = :category
+      AND transaction_type = :transaction_type
+    ''',
+    f'''
+    DELETE FROM monthly_rollups
+    WHERE user_id = :user_id
+      AND year_month = strftime('%Y-%m', :created_at, '{ROLLUP_TZ_MODIFIER}')
+      AND category = :category
+      AND transaction_type = :transaction_type
+      AND count <= 0
+    ''',
+]
+
+def _range_condition(start, end) -> Tuple[str, Dict]:
+    """Kondisi created_at dalam [start, end), masing-masing opsional"""
+    condition = ''
+    params = {}
+    if start is not None:
+        condition += ' AND created_at >= :start'
+        params['start'] = format_bound(start)
+    if end is not None:
+        condition += ' AND created_at < :end'
+        params['end'] = format_bound(end)
+    return condition, params
+
+def _rollup_month_condition(months: Tuple[Optional[str], Optional[str]]) -> Tuple[str, Dict]:
+    condition = ''
+    params = {}
+    if months[0] is not None:
+        condition += ' AND year_month >= :start_month'
+        params['start_month'] = months[0]
+    if months[1] is not None:
+        condition += ' AND year_month < :end_month'
+        params['end_month'] = months[1]
+    return condition, params
+
+# Hapus entri FTS arsip untuk baris arsip tertentu (external content: butuh nilai lama)
+ARCHIVE_FTS_DELETE_SQL = f'''
+    INSERT INTO {ARCHIVE_SCHEMA}.transactions_fts (transactions_fts, rowid, user_id, description, category)
+    SELECT 'delete', id, user_id, description, category FROM {ARCHIVE_SCHEMA}.transactions WHERE id IN ({{ids}})
+'''
+
+# Sama, dari isi baris yang sudah dihapus (hasil RETURNING)
+ARCHIVE_FTS_DELETE_ROW_SQL = f'''
+    INSERT INTO {ARCHIVE_SCHEMA}.transactions_fts (transactions_fts, rowid, user_id, description, category)
+    VALUES ('delete', ?, ?, ?, ?)
+'''
+
+# Padanan DELETE_TRANSACTIONS_SQL di arsip (index arsip juga (user_id, created_at))
+ARCHIVE_DELETE_SQL = f'''
+    DELETE FROM {ARCHIVE_SCHEMA}.transactions
+    WHERE id BETWEEN ? AND ? AND +user_id = ?
+'''
+
+def _fts_match(user_id: str, query: str) -> Optional[str]:
+    """Ekspresi FTS5 MATCH: token user_id AND setiap kata di deskripsi/kategori
+    
+    Hanya kata terakhir yang dicocokkan sebagai prefix ("kop" -> kopi); prefix
+    query menggabungkan doclist semua token berawalan sama sehingga jauh lebih mahal.
+    """
+    words = re.findall(r'\w+', query.lower())[:SEARCH_MAX_TERMS]
+    if not words:
+        return None
+    
+    # Semua nilai dikutip sebagai string FTS supaya operator dari input user tidak berlaku
+    user_phrase = '"' + user_id.replace('"', '""') + '"'
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    columns = ' AND '.join(f'{{description category}} : {term}' for term in terms)
+    return f'user_id : {user_phrase} AND {columns}'
+
+# Sebelum migrasi MINOR_UNITS_VERSION (dan di replica/arsip yang belum ikut dikonversi)
+# kolom uang masih rupiah REAL. Sen selalu INTEGER, jadi typeof() cukup untuk membedakannya
+LEGACY_AMOUNT_SQL = "CASE WHEN typeof({value}) = 'real' THEN CAST(ROUND({value} * 100) AS INTEGER) ELSE {value} END"
+
+class DatabaseManager(Storage):
+    """Storage SQLite: pool koneksi WAL, migrasi, ringkasan via trigger dan FTS5"""
+    
+    def __init__(self, db_path: str = "financial_bot.db", pool_size: int = 5,
+                 busy_timeout_ms: int = 5000, synchronous: str = "NORMAL",
+                 write_behind: bool = False, group_commit_ms: float = 0.0,
+                 group_commit_rows: int = 500, archive: Optional[bool] = None,
+                 read_replica: bool = False, tracer: Optional[QueryTracer] = None,
+                 backup_dir: Optional[str] = None, backup_keep: int = DEFAULT_BACKUP_KEEP,
+                 online_migration: Optional[bool] = None):
+        self.db_path = db_path
+        self.tracer = tracer
+        # Folder snapshot online (job maintenance 'backup'), None jika tidak diatur
+        self.backup_dir = backup_dir
+        self.backup_keep = backup_keep
+        
+        # Opsional: file arsip untuk transaksi lama, di-ATTACH sebagai schema 'archive'.
+        # archive=None berarti otomatis aktif jika file arsip sudah pernah dibuat.
+        self.archive_path = None
+        attach = {}
+        if archive is None:
+            archive = db_path != ":memory:" and os.path.exists(archive_path_for(db_path))
+        if archive and db_path != ":memory:":
+            self.archive_path = archive_path_for(db_path)
+            init_archive(self.archive_path)
+            attach[ARCHIVE_SCHEMA] = self.archive_path
+        
+        self.pool = ConnectionPool(db_path, size=pool_size, busy_timeout_ms=busy_timeout_ms,
+                                   synchronous=synchronous, attach=attach, tracer=tracer)
+        
+        # Migrasi ke ledger: None = online hanya untuk database besar, True/False = paksa
+        self.online_migration = online_migration
+        # Ditahan tulisan selama belum cutover supaya SQL yang dipilih tidak basi
+        self._schema_lock = threading.Lock()
+        self._ledger_ready = False
+        self._legacy_pending = False
+        # True selama ada data (database, replica atau arsip) yang mungkin masih rupiah REAL
+        self._legacy_amounts = True
+        # Cache id users (user_id -> (id, username)) dan categories (nama -> id)
+        self._user_refs: Dict[str, Tuple[int, str]] = {}
+        self._category_refs: Dict[str, int] = {}
         self.init_database()
+        
+        # Katalog kategori jarang berubah: dimuat sekali, dimuat ulang hanya oleh add_category
+        self.categories = CategoryRegistry(self._load_categories())
+        
+        # Opsional: salinan :memory: untuk query baca, diperbarui setelah setiap tulisan
+        self.replica = None
+        if read_replica and db_path != ":memory:":
+            self.replica = ReadReplica(attach, tracer=tracer)
+            self.refresh_replica()
+        
+        # Opsional: satu thread penulis dengan group commit untuk insert/delete
+        self.writer = None
+        if write_behind and db_path != ":memory:":
+            self.writer = WriteBehindQueue(self.pool.create_connection,
+                                           flush_interval_ms=group_commit_ms,
+                                           max_batch=group_commit_rows)
+        
+        # Backfill ledger (atau pengosongan tabel lama) yang belum selesai dilanjutkan di thread latar
+        self._migration_stop = threading.Event()
+        self._migration_thread = None
+        if self._legacy_pending:
+            self._migration_thread = threading.Thread(
+                target=self.migrate_ledger, kwargs={'pause_seconds': LEDGER_BACKFILL_PAUSE,
+                                                    'stop': self._migration_stop},
+                name='ledger-migration', daemon=True)
+            self._migration_thread.start()
+    
+    def close(self):
+        """Tutup semua koneksi database (antrian write-behind di-commit dulu)"""
+        if self._migration_thread:
+            # Progres backfill tersimpan per batch, dilanjutkan saat start berikutnya
+            self._migration_stop.set()
+            self._migration_thread.join()
+        if self.writer:
+            self.writer.close()
+        self.pool.close()
+        if self.replica:
+            self.replica.close()
     
     def init_database(self):
-        """Inisialisasi database dan tabel"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Tabel transaksi
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS transactions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id TEXT NOT NULL,
-                    username TEXT NOT NULL,
-                    transaction_type TEXT NOT NULL CHECK (transaction_type IN ('income', 'expense')),
-                    amount REAL NOT NULL,
-                    category TEXT NOT NULL,
-                    description TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Tabel kategori default
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS categories (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT UNIQUE NOT NULL,
-                    type TEXT NOT NULL CHECK (type IN ('income', 'expense', 'both'))
-                )
-            ''')
-            
-            # Insert kategori default jika belum ada
-            default_categories = [
-                ('Gaji', 'income'),
-                ('Freelance', 'income'),
-                ('Investasi', 'income'),
-                ('Hadiah', 'income'),
-                ('Makanan', 'expense'),
-                ('Transport', 'expense'),
-                ('Hiburan', 'expense'),
-                ('Belanja', 'expense'),
-                ('Tagihan', 'expense'),
-                ('Kesehatan', 'expense'),
-                ('Pendidikan', 'expense'),
-                ('Lainnya', 'both')
-            ]
-            
-            cursor.executemany('''
-                INSERT OR IGNORE INTO categories (name, type) VALUES (?, ?)
-            ''', default_categories)
+        """Inisialisasi database dan jalankan migrasi skema yang belum diterapkan
+        
+        Database lama yang besar berhenti di LEDGER_BACKFILL_VERSION; sisanya
+        diselesaikan migrate_ledger() di thread latar sementara bot tetap jalan.
+        """
+        with self.pool.connection() as conn:
+            migrate(conn, target=LEDGER_BACKFILL_VERSION)
+            remaining = ledger_backfill_remaining(conn)
+            online = self.online_migration
+            if online is None:
+                online = remaining >= ONLINE_MIGRATION_MIN_ROWS
+            if not online or remaining == 0:
+                migrate(conn)
+                if not online:
+                    conn.execute('BEGIN IMMEDIATE')
+                    drop_legacy_transactions(conn)
+                    conn.commit()
+            version = get_schema_version(conn)
+            self._ledger_ready = version > LEDGER_BACKFILL_VERSION
+            self._legacy_pending = not self._ledger_ready or has_legacy_transactions(conn)
+        # Arsip ikut dikonversi ke sen (juga jika proses sebelumnya berhenti di antaranya)
+        if version >= MINOR_UNITS_VERSION and self.archive_path:
+            convert_archive_amounts(self.archive_path)
+        self._legacy_amounts = version < MINOR_UNITS_VERSION
+    
+    def migrate_ledger(self, batch_size: int = LEDGER_BACKFILL_BATCH, pause_seconds: float = 0.0,
+                       stop: Optional[threading.Event] = None) -> int:
+        """Selesaikan migrasi online ke ledger, return jumlah id lama yang disalin
+        
+        Baris lama disalin per batch (masing-masing satu transaksi tulis pendek,
+        tulisan baru dicerminkan trigger), lalu cutover: transactions menjadi view
+        dan tabel lama dikosongkan per batch. Berhenti lebih awal jika `stop` di-set.
+        """
+        copied = 0
+        while stop is None or not stop.is_set():
+            ready = self._ledger_ready
+            with self.pool.connection() as conn:
+                conn.execute('BEGIN IMMEDIATE')
+                if ready:
+                    step = drop_legacy_transactions(conn, batch_size)
+                else:
+                    step = backfill_ledger(conn, batch_size) if ledger_backfill_remaining(conn) else 0
+                    copied += step
+                conn.commit()
             
+            if step == 0 and ready:
+                self._legacy_pending = False
+                # Seed ulang tanpa tabel lama yang masih ikut tersalin saat cutover
+                self.refresh_replica()
+                break
+            if step == 0:
+                self._cutover_ledger()
+            elif stop is not None:
+                # Jeda supaya tulisan bot kebagian lock; close() tidak menunggu jeda habis
+                stop.wait(pause_seconds)
+            elif pause_seconds:
+                sleep(pause_seconds)
+        return copied
+    
+    def _cutover_ledger(self):
+        """Jalankan migrasi sisanya saat tidak ada tulisan yang sedang memilih SQL"""
+        with self._schema_lock:
+            self.flush_writes()
+            with self.pool.connection() as conn:
+                migrate(conn)
+                version = get_schema_version(conn)
+            if version >= MINOR_UNITS_VERSION and self.archive_path:
+                convert_archive_amounts(self.archive_path)
+            self._ledger_ready = version > LEDGER_BACKFILL_VERSION
+            self.refresh_replica()
+            # Pembaca sudah tidak perlu konversi setelah replica berisi data sen
+            self._legacy_amounts = version < MINOR_UNITS_VERSION
+    
+    def _sen(self, value: str) -> str:
+        """Ekspresi SQL jumlah dalam sen, dikonversi jika datanya mungkin masih rupiah REAL"""
+        return LEGACY_AMOUNT_SQL.format(value=value) if self._legacy_amounts else value
+    
+    def _row_columns(self, columns: str) -> str:
+        """Daftar kolom transaksi (TRANSACTION_COLUMNS/ARCHIVE_COLUMNS) dengan amount dalam sen"""
+        if not self._legacy_amounts:
+            return columns
+        return columns.replace('amount', f"{self._sen('amount')} AS amount")
+    
+    @contextmanager
+    def _schema_guard(self):
+        """Yield True jika tulisan sudah ke ledger; sebelum cutover lock ditahan selama blok"""
+        if self._ledger_ready:
+            yield True
+            return
+        with self._schema_lock:
+            yield self._ledger_ready
+    
+    def _resolve_refs(self, cursor: sqlite3.Cursor, user_id: str, username: str, category: str,
+                      users: Dict[str, Tuple[int, str]], categories: Dict[str, int]) -> Tuple[int, int]:
+        """id users dan categories untuk satu baris, dibuat jika belum ada
+        
+        Id baru dicatat di `users`/`categories` dan baru boleh masuk cache
+        setelah transaksinya ter-commit.
+        """
+        user = users.get(user_id) or self._user_refs.get(user_id)
+        if user is None or user[1] != username:
+            user = (cursor.execute(UPSERT_USER_SQL, (user_id, username)).fetchall()[0][0], username)
+            users[user_id] = user
+        
+        category_id = categories.get(category) or self._category_refs.get(category)
+        if category_id is None:
+            cursor.execute(INSERT_CATEGORY_REF_SQL, (category,))
+            category_id = cursor.execute('SELECT id FROM categories WHERE name = ?', (category,)).fetchone()[0]
+            categories[category] = category_id
+        return user[0], category_id
+    
+    def _ledger_refs(self, user_id: str, username: str, category: str) -> Tuple[int, int]:
+        """(user_ref, category_id) dari cache, yang belum ada dibuat di transaksi sendiri"""
+        user = self._user_refs.get(user_id)
+        category_id = self._category_refs.get(category)
+        if user is not None and user[1] == username and category_id is not None:
+            return user[0], category_id
+        
+        users, categories = {}, {}
+        with self.pool.connection() as conn:
+            refs = self._resolve_refs(conn.cursor(), user_id, username, category, users, categories)
             conn.commit()
+        self._user_refs.update(users)
+        self._category_refs.update(categories)
+        return refs
+    
+    def get_schema_version(self) -> int:
+        """Dapatkan versi skema database saat ini"""
+        with self.pool.connection() as conn:
+            return get_schema_version(conn)
     
-    def add_transaction(self, user_id: str, username: str, transaction_type: str, 
-                       amount: float, category: str, description: str = "") -> bool:
-        """Tambah transaksi baru"""
+    def get_storage_stats(self) -> Dict[str, Any]:
+        """Ukuran file, WAL, halaman dan freelist database utama"""
+        with self.pool.connection() as conn:
+            stats = storage_stats(conn)
+            analyzed = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone()
+        stats.update({
+            'database': os.path.basename(self.db_path),
+            'size_bytes': file_size(self.db_path),
+            'wal_bytes': file_size(self.db_path + '-wal'),
+            'analyzed': analyzed is not None,
+        })
+        return stats
+    
+    def run_maintenance(self, job: str, time_budget: float = 2.0,
+                        is_busy: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+        """Jalankan satu job maintenance (lihat core.maintenance) dengan batas waktu"""
+        if job == BACKUP_JOB:
+            return self._run_backup_job()
+        with self.pool.connection() as conn:
+            result = run_job(conn, job, time_budget, is_busy)
+        result['database'] = os.path.basename(self.db_path)
+        return result
+    
+    def backup(self, backup_dir: Optional[str] = None, keep: Optional[int] = None,
+               stamp: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Snapshot online database (dan arsip jika aktif) ke backup_dir, simpan `keep` terakhir
+        
+        Kedua file disalin dari satu transaksi baca, jadi transaksi yang sedang dipindah ke
+        arsip tidak tercatat dua kali atau hilang di pasangan snapshot. Return hasil per file
+        (path, bytes, pages, restarts, seconds, bytes_per_second).
+        """
+        backup_dir = backup_dir or self.backup_dir
+        if not backup_dir or self.db_path == ":memory:":
+            raise ValueError("Backup butuh database file dan backup_dir")
+        keep = self.backup_keep if keep is None else keep
+        stamp = stamp or backup_stamp()
+        os.makedirs(backup_dir, exist_ok=True)
+        
+        sources = [('main', self.db_path)]
+        if self.archive_path:
+            sources.append((ARCHIVE_SCHEMA, self.archive_path))
+        with self.pool.connection() as conn, read_snapshot(conn, [schema for schema, _ in sources]):
+            results = [backup_database(conn, backup_path_for(path, backup_dir, stamp), schema)
+                       for schema, path in sources]
+        for _, path in sources:
+            rotate_backups(path, backup_dir, keep)
+        return results
+    
+    def _run_backup_job(self) -> Dict[str, Any]:
+        """backup() dalam format hasil job maintenance"""
+        before = self.get_storage_stats()
+        start = datetime.now(timezone.utc)
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO transactions (user_id, username, transaction_type, amount, category, description)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (user_id, username, transaction_type, amount, category, description))
+            results = self.backup()
+            status = 'ok'
+            size = sum(result['bytes'] for result in results)
+            seconds = sum(result['seconds'] for result in results)
+            restarts = sum(result['restarts'] for result in results)
+            detail = (f"{size / 1048576:,.1f} MB, {size / 1048576 / seconds if seconds else 0:,.1f} MB/s, "
+                      f"integrity ok -> {os.path.basename(results[0]['path'])}"
+                      + (f", diulang {restarts}x karena ada tulisan" if restarts else ""))
+        except (sqlite3.Error, OSError, ValueError) as e:
+            status, detail = 'error', str(e)
+        # Backup tidak mengubah file, tapi tulisan lain bisa masuk selama snapshot berjalan
+        after = self.get_storage_stats()
+        return {
+            'job': BACKUP_JOB,
+            'started_at': start.strftime('%Y-%m-%d %H:%M:%S'),
+            'duration_ms': round((datetime.now(timezone.utc) - start).total_seconds() * 1000, 3),
+            'status': status,
+            'detail': detail,
+            'page_count_before': before['page_count'],
+            'page_count': after['page_count'],
+            'freelist_before': before['freelist_count'],
+            'freelist_count': after['freelist_count'],
+            'database': after['database'],
+        }
+    
+    def vacuum(self):
+        """VACUUM penuh dan aktifkan auto_vacuum INCREMENTAL (jalankan saat bot berhenti)"""
+        with self.pool.connection() as conn:
+            full_vacuum(conn)
+        if self.replica:
+            self.refresh_replica()
+    
+    def refresh_replica(self):
+        """Seed ulang read replica dari file utama (backup API)"""
+        if self.replica:
+            with self.pool.connection() as conn:
+                self.replica.refresh(conn)
+    
+    @contextmanager
+    def _read_connection(self):
+        """Koneksi untuk query baca: replica jika aktif dan tidak basi, selain itu dari pool"""
+        if self.replica and not self.replica.stale:
+            with self.replica.connection() as conn:
+                yield conn
+        else:
+            with self.pool.connection() as conn:
+                yield conn
+    
+    def _replica_failed(self, error: Exception):
+        """Tulisan sudah ter-commit di file tapi gagal diterapkan ke replica
+        
+        Replica ditandai basi (pembaca pindah ke file) lalu di-seed ulang; jika seed
+        ulang juga gagal, replica tetap basi sampai refresh_replica() berikutnya berhasil.
+        """
+        logger.error(f"Read replica gagal diperbarui, baca dari file utama: {error}")
+        self.replica.stale = True
+        try:
+            self.refresh_replica()
+        except sqlite3.Error as e:
+            logger.error(f"Seed ulang read replica gagal: {e}")
+    
+    def _apply_to_replica(self, statements: List[Tuple[str, Any]]):
+        """Terapkan tulisan yang sudah ter-commit ke replica (jika aktif)"""
+        if not self.replica:
+            return
+        try:
+            self.replica.apply(statements)
+        except sqlite3.Error as e:
+            self._replica_failed(e)
+    
+    def _replicate_inserted(self, after_id: int, until_id: Optional[int] = None):
+        """Salin transaksi yang baru ter-commit (after_id < id <= until_id) ke replica"""
+        if not self.replica:
+            return
+        try:
+            with self.pool.connection() as conn:
+                self.replica.copy_transactions(conn, after_id, until_id)
+        except sqlite3.Error as e:
+            self._replica_failed(e)
+    
+    def _replicated_future(self, future: Future) -> Future:
+        """Future yang baru selesai setelah insert dari write-behind ikut masuk replica"""
+        replicated = Future()
+        
+        def on_done(done: Future):
+            if done.exception() is not None:
+                replicated.set_exception(done.exception())
+                return
+            transaction_id = done.result()
+            try:
+                self._replicate_inserted(transaction_id - 1, transaction_id)
+            finally:
+                replicated.set_result(transaction_id)
+        
+        future.add_done_callback(on_done)
+        return replicated
+    
+    def _transaction_schemas(self) -> List[str]:
+        """Schema yang berisi tabel transactions: main, plus archive jika aktif"""
+        return ['main', ARCHIVE_SCHEMA] if self.archive_path else ['main']
+    
+    def _ledger_source(self) -> str:
+        """Sumber baris transaksi mentah untuk query agregasi (hot + arsip)"""
+        if not self.archive_path:
+            return 'transactions'
+        return (f'(SELECT {ARCHIVE_COLUMNS} FROM main.transactions '
+                f'UNION ALL SELECT {ARCHIVE_COLUMNS} FROM {ARCHIVE_SCHEMA}.transactions)')
+    
+    def submit_transaction(self, user_id: str, username: str, transaction_type: str,
+                           amount: int, category: str, description: str = "") -> Future:
+        """Tambah transaksi (amount dalam sen), return Future berisi id yang selesai saat data sudah durable"""
+        with self._schema_guard() as ledger:
+            if self.writer:
+                sql, params = self._insert_params(ledger, user_id, username, transaction_type,
+                                                  amount, category, description)
+                future = self.writer.submit(sql, params, 'lastrowid')
+                return self._replicated_future(future) if self.replica else future
+            
+            future = Future()
+            try:
+                sql, params = self._insert_params(ledger, user_id, username, transaction_type,
+                                                  amount, category, description)
+                with self.pool.connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute(sql, params)
+                    conn.commit()
+                    transaction_id = cursor.lastrowid
+            except Exception as e:
+                future.set_exception(e)
+                return future
+        
+        self._replicate_inserted(transaction_id - 1, transaction_id)
+        future.set_result(transaction_id)
+        return future
+    
+    def _insert_params(self, ledger: bool, user_id: str, username: str, transaction_type: str,
+                       amount: int, category: str, description: str) -> Tuple[str, Tuple]:
+        """SQL dan parameter insert satu transaksi: ke ledger setelah cutover, selain itu ke tabel lama"""
+        amount = as_minor(amount)
+        if not ledger:
+            # Tabel lama masih rupiah REAL; trigger cermin membulatkannya kembali ke sen
+            return INSERT_TRANSACTION_SQL, (user_id, username, transaction_type, amount / MINOR_PER_UNIT,
+                                            category, description)
+        user_ref, category_id = self._ledger_refs(user_id, username, category)
+        return LEDGER_INSERT_SQL, (user_ref, transaction_type, amount, category_id, description)
+    
+    def flush_writes(self):
+        """Tunggu semua tulisan di antrian write-behind ter-commit"""
+        if self.writer:
+            self.writer.flush()
+    
+    def add_transactions_bulk(self, transactions: Iterable, batch_size: int = 5000) -> Dict[str, Any]:
+        """Tambah banyak transaksi dalam satu transaksi database (executemany per batch)
+        
+        Setiap item berupa dict dengan key seperti parameter add_transaction
+        (plus 'created_at' opsional) atau tuple dengan urutan yang sama. Jika database
+        error, semua batch dibatalkan dan hasilnya {'inserted': 0, 'failed': item yang
+        sudah dibaca, 'error': pesan}; item yang belum dibaca dari iterable tidak dihitung.
+        """
+        inserted = 0
+        failed = 0
+        seen = 0
+        # Id user/kategori baru di transaksi ini, masuk cache setelah commit
+        users, categories = {}, {}
+        
+        with self._schema_guard() as ledger, self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cache_size = cursor.execute('PRAGMA cache_size').fetchone()[0]
+            insert_sql = LEDGER_BULK_INSERT_SQL if ledger else BULK_INSERT_SQL
+            try:
+                # Cache lebih besar supaya update index tidak bolak-balik ke disk
+                cursor.execute(f'PRAGMA cache_size = {BULK_CACHE_SIZE}')
+                cursor.execute('BEGIN IMMEDIATE')
+                last_id = cursor.execute(
+                    f'SELECT COALESCE(MAX(id), 0) FROM {"ledger" if ledger else "transactions"}').fetchone()[0]
+                
+                # Trigger ringkasan dilepas selama transaksi ini saja (DDL ikut transaksi,
+                # koneksi lain tidak pernah melihat trigger hilang)
+                deferred_triggers = cursor.execute(f'''
+                    SELECT name, sql FROM sqlite_master
+                    WHERE type = 'trigger' AND name IN ({",".join("?" * len(DEFERRED_INSERT_TRIGGERS))})
+                ''', list(DEFERRED_INSERT_TRIGGERS)).fetchall()
+                for name, _ in deferred_triggers:
+                    cursor.execute(f'DROP TRIGGER {name}')
+                
+                batch = []
+                for item in transactions:
+                    seen += 1
+                    row = self._normalize_bulk_row(item)
+                    if row is not None and ledger:
+                        row = self._ledger_bulk_row(cursor, row, users, categories)
+                    elif row is not None:
+                        row = row[:3] + (row[3] / MINOR_PER_UNIT,) + row[4:]
+                    if row is None:
+                        failed += 1
+                        continue
+                    
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        ok, bad = self._insert_batch(cursor, insert_sql, batch)
+                        inserted += ok
+                        failed += bad
+                        batch = []
+                
+                if batch:
+                    ok, bad = self._insert_batch(cursor, insert_sql, batch)
+                    inserted += ok
+                    failed += bad
+                
+                # Ringkasan untuk semua baris baru dihitung sekali (set-based)
+                for name, trigger_sql in deferred_triggers:
+                    cursor.execute(DEFERRED_INSERT_TRIGGERS[name], (last_id,))
+                    cursor.execute(trigger_sql)
+                
                 conn.commit()
-                return True
-        except Exception as e:
-            print(f"Error adding transaction: {e}")
-            return False
+            except sqlite3.Error as e:
+                conn.rollback()
+                logger.error(f"Bulk insert dibatalkan setelah {seen} item: {e}")
+                return {'inserted': 0, 'failed': seen, 'error': str(e)}
+            finally:
+                cursor.execute(f'PRAGMA cache_size = {cache_size}')
+        
+        self._user_refs.update(users)
+        self._category_refs.update(categories)
+        self._replicate_inserted(last_id)
+        return {'inserted': inserted, 'failed': failed}
+    
+    def _ledger_bulk_row(self, cursor: sqlite3.Cursor, row: Tuple, users: Dict[str, Tuple[int, str]],
+                         categories: Dict[str, int]) -> Tuple:
+        """Baris bulk (hasil _normalize_bulk_row) -> parameter LEDGER_BULK_INSERT_SQL"""
+        user_id, username, transaction_type, amount, category, description, created_at = row
+        user_ref, category_id = self._resolve_refs(cursor, user_id, username, category, users, categories)
+        return (user_ref, transaction_type, amount, category_id, description, created_at)
+    
+    def _insert_batch(self, cursor: sqlite3.Cursor, sql: str, batch: List[Tuple]) -> Tuple[int, int]:
+        """Insert satu batch dengan executemany, fallback per baris jika ada yang gagal"""
+        cursor.execute('SAVEPOINT bulk_batch')
+        try:
+            cursor.executemany(sql, batch)
+            cursor.execute('RELEASE bulk_batch')
+            return len(batch), 0
+        except sqlite3.IntegrityError:
+            cursor.execute('ROLLBACK TO bulk_batch')
+            cursor.execute('RELEASE bulk_batch')
+        
+        inserted = 0
+        for row in batch:
+            try:
+                cursor.execute(sql, row)
+                inserted += 1
+            except sqlite3.IntegrityError:
+                pass
+        return inserted, len(batch) - inserted
     
-    def get_user_balance(self, user_id: str) -> Dict[str, float]:
-        """Dapatkan saldo user"""
-        with sqlite3.connect(self.db_path) as conn:
+    def get_user_balance(self, user_id: str, start=None, end=None) -> Dict[str, int]:
+        """Dapatkan saldo user, opsional dibatasi periode created_at [start, end)
+        
+        Tanpa periode dibaca dari user_balances. Periode yang pas per bulan (WIB)
+        dibaca dari monthly_rollups, selain itu range scan pada transaksi.
+        """
+        with self._read_connection() as conn:
             cursor = conn.cursor()
+            if start is None and end is None:
+                cursor.execute(f'''
+                    SELECT {self._sen('total_income')}, {self._sen('total_expense')} FROM user_balances
+                    WHERE user_id = ?
+                ''', (user_id,))
+            else:
+                months = rollup_month_bounds(start, end)
+                if months is not None:
+                    condition, params = _rollup_month_condition(months)
+                    source, value = 'monthly_rollups', self._sen('total')
+                else:
+                    condition, params = _range_condition(start, end)
+                    source, value = self._ledger_source(), self._sen('amount')
+                params['user_id'] = user_id
+                cursor.execute(f'''
+                    SELECT COALESCE(SUM(CASE WHEN transaction_type = 'income' THEN {value} END), 0),
+                           COALESCE(SUM(CASE WHEN transaction_type = 'expense' THEN {value} END), 0)
+                    FROM {source}
+                    WHERE user_id = :user_id{condition}
+                ''', params)
+            row = cursor.fetchone()
             
-            # Total pemasukan
-            cursor.execute('''
-                SELECT COALESCE(SUM(amount), 0) FROM transactions 
-                WHERE user_id = ? AND transaction_type = 'income'
-            ''', (user_id,))
-            total_income = cursor.fetchone()[0]
-            
-            # Total pengeluaran
-            cursor.execute('''
-                SELECT COALESCE(SUM(amount), 0) FROM transactions 
-                WHERE user_id = ? AND transaction_type = 'expense'
-            ''', (user_id,))
-            total_expense = cursor.fetchone()[0]
-            
+            total_income, total_expense = row if row else (0, 0)
             balance = total_income - total_expense
             
             return {
@@ -106,42 +934,200 @@ class DatabaseManager:
                 'balance': balance
             }
     
-    def get_user_transactions(self, user_id: str, limit: int = 10) -> List[Dict]:
-        """Dapatkan transaksi terakhir user"""
-        with sqlite3.connect(self.db_path) as conn:
+    def get_totals(self) -> Dict[str, int]:
+        """Total semua user dari user_balances (untuk statistik admin)"""
+        with self._read_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT id, transaction_type, amount, category, description, created_at
-                FROM transactions 
-                WHERE user_id = ? 
-                ORDER BY created_at DESC 
-                LIMIT ?
-            ''', (user_id, limit))
+            cursor.execute(f'''
+                SELECT COUNT(*), COALESCE(SUM({self._sen('total_income')}), 0),
+                       COALESCE(SUM({self._sen('total_expense')}), 0), COALESCE(SUM(transaction_count), 0)
+                FROM user_balances
+                WHERE transaction_count > 0
+            ''')
+            row = cursor.fetchone()
+            
+            return {
+                'users': row[0],
+                'income': row[1],
+                'expense': row[2],
+                'transactions': row[3]
+            }
+    
+    def rebuild_user_balances(self) -> int:
+        """Hitung ulang user_balances dari tabel transactions, return jumlah user"""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('DELETE FROM user_balances')
+            cursor.execute(REBUILD_USER_BALANCES_SQL.format(source=self._ledger_source()))
+            rebuilt = cursor.rowcount
+            conn.commit()
+        
+        self.refresh_replica()
+        return rebuilt
+    
+    def verify_user_balances(self) -> List[Dict]:
+        """Bandingkan user_balances dengan ledger mentah, return daftar user yang tidak cocok"""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(VERIFY_USER_BALANCES_SQL.format(source=self._ledger_source()))
             
-            transactions = []
+            mismatches = []
             for row in cursor.fetchall():
-                transactions.append({
-                    'id': row[0],
-                    'type': row[1],
-                    'amount': row[2],
-                    'category': row[3],
-                    'description': row[4],
-                    'date': row[5]
+                mismatches.append({
+                    'user_id': row[0],
+                    'stored': {'income': row[1], 'expense': row[2], 'count': row[3]},
+                    'actual': {'income': row[4], 'expense': row[5], 'count': row[6]}
                 })
             
-            return transactions
+            return mismatches
     
-    def get_category_report(self, user_id: str) -> Dict[str, Dict[str, float]]:
-        """Dapatkan laporan per kategori"""
-        with sqlite3.connect(self.db_path) as conn:
+    def get_transactions_page(self, user_id: str, before: Optional[int] = None,
+                              page_size: int = 10, start=None, end=None) -> List[Dict]:
+        """Dapatkan satu halaman transaksi (terbaru dulu) sebelum transaksi `before`
+        
+        `before` adalah id transaksi terakhir dari halaman sebelumnya. Biaya per
+        halaman konstan karena memakai seek index, bukan OFFSET. Jika `before`
+        tidak ditemukan (misalnya sudah dihapus) hasilnya kosong.
+        """
+        condition, params = _range_condition(start, end)
+        params.update({'user_id': user_id, 'limit': page_size})
+        schemas = self._transaction_schemas()
+        
+        with self._read_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT category, transaction_type, SUM(amount) as total
-                FROM transactions 
-                WHERE user_id = ? 
+            if before is not None:
+                position = self._transaction_position(cursor, user_id, before)
+                if position is None:
+                    return []
+                condition += ' AND (created_at, id) < (:before_created, :before_id)'
+                params['before_created'], params['before_id'] = position
+            
+            # Setiap schema di-seek lewat index-nya sendiri lalu digabung
+            rows = []
+            for schema in schemas:
+                cursor.execute(f'''
+                    SELECT {self._row_columns(TRANSACTION_COLUMNS)}
+                    FROM {schema}.transactions 
+                    WHERE user_id = :user_id{condition}
+                    ORDER BY created_at DESC, id DESC 
+                    LIMIT :limit
+                ''', params)
+                rows.extend(cursor.fetchall())
+        
+        if len(schemas) > 1:
+            # Buang duplikat dari batch arsip yang terputus sebelum baris hot terhapus
+            rows = list({row[0]: row for row in rows}.values())
+            rows.sort(key=lambda row: (row[5], row[0]), reverse=True)
+            rows = rows[:page_size]
+        return [transaction_from_row(row) for row in rows]
+    
+    def _transaction_position(self, cursor: sqlite3.Cursor, user_id: str,
+                              transaction_id: int) -> Optional[Tuple]:
+        """(created_at, id) transaksi milik user untuk cursor pagination"""
+        for schema in self._transaction_schemas():
+            cursor.execute(f'''
+                SELECT created_at, id FROM {schema}.transactions
+                WHERE id = ? AND user_id = ?
+            ''', (transaction_id, user_id))
+            row = cursor.fetchone()
+            if row:
+                return row
+        return None
+    
+    def get_transaction(self, user_id: str, transaction_id: int) -> Optional[Dict]:
+        """Dapatkan satu transaksi milik user (hot atau arsip), None jika tidak ada"""
+        with self._read_connection() as conn:
+            cursor = conn.cursor()
+            for schema in self._transaction_schemas():
+                cursor.execute(f'''
+                    SELECT {self._row_columns(TRANSACTION_COLUMNS)}
+                    FROM {schema}.transactions 
+                    WHERE id = ? AND user_id = ?
+                ''', (transaction_id, user_id))
+                
+                row = cursor.fetchone()
+                if row:
+                    return transaction_from_row(row)
+            return None
+    
+    def last_transaction_id(self, user_id: str) -> int:
+        """Id terbesar yang pernah dipakai (AUTOINCREMENT), dibaca dari file utama
+        
+        Arsip hanya berisi id lama dari file utama, jadi cukup sqlite_sequence main.
+        """
+        with self.pool.connection() as conn:
+            return conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM main.sqlite_sequence WHERE name IN ('transactions', 'ledger')"
+            ).fetchone()[0]
+    
+    def iter_transaction_rows(self, user_id: Optional[str] = None,
+                              chunk_size: int = 1000) -> Iterator[Tuple]:
+        """Stream baris transaksi lengkap (kolom ARCHIVE_COLUMNS) per potongan tetap
+        
+        Setiap potongan adalah query pendek dengan keyset, jadi memori konstan dan
+        tidak ada transaksi baca panjang yang menahan checkpoint WAL. Data arsip
+        (lebih lama) dikirim lebih dulu.
+        """
+        if user_id is None:
+            order, position = 'id', 'id > :last_id'
+        else:
+            # Per user: urut waktu lewat index (user_id, created_at)
+            order, position = 'created_at, id', '(created_at, id) > (:last_created, :last_id)'
+        
+        for schema in reversed(self._transaction_schemas()):
+            params = {'user_id': user_id, 'last_id': 0, 'last_created': '', 'limit': chunk_size}
+            condition = ' AND user_id = :user_id' if user_id is not None else ''
+            while True:
+                with self.pool.connection() as conn:
+                    rows = conn.execute(f'''
+                        SELECT {self._row_columns(ARCHIVE_COLUMNS)} FROM {schema}.transactions
+                        WHERE {position}{condition}
+                        ORDER BY {order}
+                        LIMIT :limit
+                    ''', params).fetchall()
+                
+                yield from rows
+                if len(rows) < chunk_size:
+                    break
+                params['last_id'], params['last_created'] = rows[-1][0], rows[-1][7]
+    
+    def get_category_report(self, user_id: str, start=None, end=None) -> Dict[str, Dict[str, int]]:
+        """Dapatkan laporan per kategori, opsional dibatasi periode [start, end)"""
+        months = rollup_month_bounds(start, end)
+        if months is not None:
+            condition, params = _rollup_month_condition(months)
+            source, value = 'monthly_rollups', self._sen('total')
+        else:
+            condition, params = _range_condition(start, end)
+            source, value = self._ledger_source(), self._sen('amount')
+        params['user_id'] = user_id
+        
+        if months is None and self._ledger_ready and not self.archive_path:
+            # Dikelompokkan per id kategori di ledger, nama di-join per grup
+            sql = f'''
+                SELECT c.name, g.transaction_type, g.total_minor AS total
+                FROM (
+                    SELECT category_id, transaction_type, SUM(amount_minor) AS total_minor
+                    FROM ledger
+                    WHERE user_ref = (SELECT id FROM users WHERE user_key = :user_id){condition}
+                    GROUP BY category_id, transaction_type
+                ) g
+                JOIN categories c ON c.id = g.category_id
+                ORDER BY total DESC
+            '''
+        else:
+            sql = f'''
+                SELECT category, transaction_type, SUM({value}) as total
+                FROM {source} 
+                WHERE user_id = :user_id{condition}
                 GROUP BY category, transaction_type
                 ORDER BY total DESC
-            ''', (user_id,))
+            '''
+        
+        with self._read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
             
             report = {}
             for row in cursor.fetchall():
@@ -156,39 +1142,286 @@ class DatabaseManager:
             
             return report
     
-    def get_available_categories(self, transaction_type: str = None) -> List[str]:
-        """Dapatkan daftar kategori yang tersedia"""
-        with sqlite3.connect(self.db_path) as conn:
+    def search_transactions(self, user_id: str, query: str, limit: int = 10) -> Dict:
+        """Cari transaksi user berdasarkan kata di deskripsi/kategori (FTS5)
+        
+        Return dict berisi transaksi yang cocok (terbaru dulu, maks `limit`) dan
+        total pemasukan/pengeluaran/jumlah dari semua transaksi yang cocok.
+        """
+        result = {'query': query, 'transactions': [], 'income': 0, 'expense': 0, 'count': 0}
+        match = _fts_match(user_id, query)
+        if match is None:
+            return result
+        
+        params = {'match': match, 'user_id': user_id, 'limit': limit}
+        amount = self._sen('t.amount')
+        rows = []
+        with self._read_connection() as conn:
+            cursor = conn.cursor()
+            for schema in self._transaction_schemas():
+                # CROSS JOIN memaksa FTS jadi loop luar; tanpa itu planner memilih index
+                # user_id dan menjalankan MATCH sekali per transaksi user.
+                # Total dihitung dengan window function supaya MATCH cukup dijalankan sekali.
+                # t.user_id dicek lagi: tokenizer bisa menyamakan id yang beda tanda baca
+                cursor.execute(f'''
+                    SELECT t.id, t.transaction_type, {amount}, t.category, t.description, t.created_at,
+                           COUNT(*) OVER (),
+                           SUM(CASE WHEN t.transaction_type = 'income' THEN {amount} ELSE 0 END) OVER (),
+                           SUM(CASE WHEN t.transaction_type = 'expense' THEN {amount} ELSE 0 END) OVER ()
+                    FROM {schema}.transactions_fts
+                    CROSS JOIN {schema}.transactions AS t ON t.id = transactions_fts.rowid
+                    WHERE transactions_fts MATCH :match AND t.user_id = :user_id
+                    ORDER BY t.created_at DESC, t.id DESC
+                    LIMIT :limit
+                ''', params)
+                schema_rows = cursor.fetchall()
+                if schema_rows:
+                    result['count'] += schema_rows[0][6]
+                    result['income'] += schema_rows[0][7]
+                    result['expense'] += schema_rows[0][8]
+                    rows.extend(row[:6] for row in schema_rows)
+        
+        rows.sort(key=lambda row: (row[5], row[0]), reverse=True)
+        result['transactions'] = [transaction_from_row(row) for row in rows[:limit]]
+        return result
+    
+    def get_monthly_summary(self, user_id: str, months: int = 12) -> List[Dict]:
+        """Dapatkan total pemasukan/pengeluaran per bulan (terbaru dulu)"""
+        with self._read_connection() as conn:
             cursor = conn.cursor()
+            total = self._sen('total')
+            cursor.execute(f'''
+                SELECT year_month,
+                       COALESCE(SUM(CASE WHEN transaction_type = 'income' THEN {total} END), 0),
+                       COALESCE(SUM(CASE WHEN transaction_type = 'expense' THEN {total} END), 0),
+                       SUM(count)
+                FROM monthly_rollups
+                WHERE user_id = ?
+                GROUP BY year_month
+                ORDER BY year_month DESC
+                LIMIT ?
+            ''', (user_id, months))
             
-            if transaction_type:
-                cursor.execute('''
-                    SELECT name FROM categories 
-                    WHERE type = ? OR type = 'both'
-                    ORDER BY name
-                ''', (transaction_type,))
+            return [
+                {'month': row[0], 'income': row[1], 'expense': row[2], 'count': row[3]}
+                for row in cursor.fetchall()
+            ]
+    
+    def get_user_snapshot(self, user_id: str, recent_limit: int = 10, start=None, end=None,
+                          months: int = 12) -> Dict[str, Any]:
+        """Ringkasan keuangan user dari satu snapshot baca
+        
+        Saldo, laporan per kategori, ringkasan bulanan (maks `months` bulan terakhir),
+        jumlah transaksi dan `recent_limit` transaksi terakhir dihitung dari dua
+        statement dalam satu transaksi baca, jadi semuanya konsisten satu sama lain
+        walaupun ada tulisan bersamaan. Periode [start, end) opsional seperti
+        get_user_balance.
+        """
+        months_bounds = rollup_month_bounds(start, end)
+        if months_bounds is not None:
+            condition, params = _rollup_month_condition(months_bounds)
+            totals_sql = f'''
+                SELECT year_month, category, transaction_type, {self._sen('total')}, count
+                FROM monthly_rollups
+                WHERE user_id = :user_id{condition}
+            '''
+        else:
+            condition, params = _range_condition(start, end)
+            totals_sql = f'''
+                SELECT strftime('%Y-%m', created_at, '{ROLLUP_TZ_MODIFIER}'), category, transaction_type,
+                       SUM({self._sen('amount')}), COUNT(*)
+                FROM {self._ledger_source()}
+                WHERE user_id = :user_id{condition}
+                GROUP BY 1, 2, 3
+            '''
+        params['user_id'] = user_id
+        
+        recent_condition, recent_params = _range_condition(start, end)
+        recent_params.update({'user_id': user_id, 'limit': recent_limit})
+        recent_sql = ' UNION ALL '.join(f'''
+            SELECT * FROM (
+                SELECT {self._row_columns(TRANSACTION_COLUMNS)} FROM {schema}.transactions
+                WHERE user_id = :user_id{recent_condition}
+                ORDER BY created_at DESC, id DESC
+                LIMIT :limit
+            )''' for schema in self._transaction_schemas()) + ' ORDER BY created_at DESC, id DESC'
+        
+        with self._read_connection() as conn:
+            cursor = conn.cursor()
+            # Kedua statement membaca snapshot WAL yang sama
+            owns_transaction = not conn.in_transaction
+            if owns_transaction:
+                cursor.execute('BEGIN')
+            try:
+                totals_rows = cursor.execute(totals_sql, params).fetchall()
+                recent_rows = cursor.execute(recent_sql, recent_params).fetchall() if recent_limit > 0 else []
+            finally:
+                if owns_transaction:
+                    conn.rollback()
+        
+        summary = summarize_totals(totals_rows, months)
+        
+        # Buang duplikat dari batch arsip yang terputus sebelum baris hot terhapus
+        recent_rows = list({row[0]: row for row in recent_rows}.values())[:recent_limit]
+        
+        summary['recent_transactions'] = [transaction_from_row(row) for row in recent_rows]
+        return summary
+    
+    def _load_categories(self) -> List[Tuple[str, str]]:
+        with self.pool.connection() as conn:
+            return conn.execute('SELECT name, type FROM categories WHERE listed = 1').fetchall()
+    
+    def add_category(self, name: str, category_type: str) -> bool:
+        """Tambah kategori baru lalu muat ulang registry, False jika sudah ada atau tidak valid"""
+        name = name.strip()
+        if not name or category_type not in CATEGORY_TYPES or name in self.categories:
+            return False
+        
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(ADD_CATEGORY_SQL, (name, category_type))
+                added = cursor.rowcount > 0
+                conn.commit()
+            
+            if added:
+                self._apply_to_replica([(ADD_CATEGORY_SQL, (name, category_type))])
+                self.categories.replace(self._load_categories())
+            return added
+        except sqlite3.Error as e:
+            print(f"Error adding category: {e}")
+            return False
+    
+    def delete_transactions(self, user_id: str, first_id: int,
+                            last_id: Optional[int] = None) -> List[Dict]:
+        """Hapus transaksi milik user dengan id dalam [first_id, last_id], return yang terhapus
+        
+        Satu DELETE ... RETURNING lewat primary key: tidak perlu membaca transaksinya
+        dulu, dan trigger AFTER DELETE memperbarui user_balances, monthly_rollups dan FTS
+        di transaksi yang sama. Sisa rentang yang tidak ada di file utama dicari di arsip.
+        """
+        last_id = first_id if last_id is None else last_id
+        params = (first_id, last_id, user_id)
+        with self._schema_guard() as ledger:
+            if ledger:
+                sql, returning = LEDGER_DELETE_SQL, LEDGER_DELETE_RETURNING
             else:
-                cursor.execute('''
-                    SELECT name FROM categories 
-                    ORDER BY name
-                ''')
+                sql = DELETE_TRANSACTIONS_SQL
+                returning = f"RETURNING {self._row_columns(TRANSACTION_COLUMNS)}"
             
-            return [row[0] for row in cursor.fetchall()]
+            if self.writer:
+                rows = self.writer.submit(sql + returning, params, result_kind='rows').result()
+            else:
+                with self.pool.connection() as conn:
+                    rows = conn.execute(sql + returning, params).fetchall()
+                    if rows:
+                        conn.commit()
+            
+            if rows:
+                # Replica cukup menjalankan DELETE yang sama tanpa RETURNING
+                self._apply_to_replica([(sql, params)])
+            # Masih di dalam guard: arsip dan ringkasan harus dalam satuan yang sama
+            if self.archive_path and len(rows) <= last_id - first_id:
+                rows += self._delete_archived_transactions(user_id, first_id, last_id)
+        return [transaction_from_row(row) for row in sorted(rows)]
     
-    def delete_transaction(self, user_id: str, transaction_id: int) -> bool:
-        """Hapus transaksi"""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
+    def _delete_archived_transactions(self, user_id: str, first_id: int, last_id: int) -> List[Tuple]:
+        """Hapus rentang id dari arsip dan kurangi ringkasan secara manual (tidak ada trigger)"""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute(ARCHIVE_DELETE_SQL + f"RETURNING {self._row_columns(TRANSACTION_COLUMNS)}, amount",
+                           (first_id, last_id, user_id))
+            rows = cursor.fetchall()
+            if not rows:
+                conn.rollback()
+                return []
+            
+            # Kompensasi memakai amount apa adanya: satuannya sama dengan ringkasan
+            params = [{'user_id': user_id, 'transaction_type': row[1], 'amount': row[6],
+                       'category': row[3], 'created_at': row[5]} for row in rows]
+            cursor.executemany(ARCHIVE_FTS_DELETE_ROW_SQL,
+                               [(row[0], user_id, row[4], row[3]) for row in rows])
+            for statement in ARCHIVED_DELETE_COMPENSATION_SQL:
+                cursor.executemany(statement, params)
+            conn.commit()
+        
+        # Arsip dibaca replica langsung dari file, cukup ringkasannya yang disesuaikan
+        if self.replica:
+            self._apply_to_replica([(statement, row_params) for row_params in params
+                                    for statement in ARCHIVED_DELETE_COMPENSATION_SQL])
+        return [row[:6] for row in rows]
+    
+    def archive_transactions(self, older_than_days: int = 365, batch_size: int = 1000,
+                             pause_seconds: float = 0.0) -> int:
+        """Pindahkan transaksi yang lebih tua dari N hari ke file arsip, return jumlah baris
+        
+        Dikerjakan per batch kecil, masing-masing satu transaksi singkat, supaya
+        penulis lain tidak lama menunggu lock. user_balances dan monthly_rollups
+        tidak berubah karena trigger delete dilepas selama batch berjalan.
+        """
+        if not self.archive_path:
+            raise ValueError("Arsip belum aktif, buat DatabaseManager dengan archive=True")
+        
+        cutoff = format_bound(datetime.now(timezone.utc) - timedelta(days=older_than_days))
+        moved = 0
+        last_id = 0
+        
+        while True:
+            # Guard: batch tidak berjalan di antara konversi sen database utama dan arsip
+            with self._schema_guard(), self.pool.connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                    DELETE FROM transactions 
-                    WHERE id = ? AND user_id = ?
-                ''', (transaction_id, user_id))
+                cursor.execute('BEGIN IMMEDIATE')
+                # Scan maju berdasarkan id supaya setiap baris hot dibaca sekali saja
+                ids = [row[0] for row in cursor.execute('''
+                    SELECT id FROM main.transactions
+                    WHERE id > ? AND created_at < ?
+                    ORDER BY id
+                    LIMIT ?
+                ''', (last_id, cutoff, batch_size))]
+                if not ids:
+                    conn.rollback()
+                    break
+                
+                deferred_triggers = cursor.execute(f'''
+                    SELECT name, sql FROM main.sqlite_master
+                    WHERE type = 'trigger' AND name IN ({",".join("?" * len(ARCHIVE_DEFERRED_TRIGGERS))})
+                ''', ARCHIVE_DEFERRED_TRIGGERS).fetchall()
+                for name, _ in deferred_triggers:
+                    cursor.execute(f'DROP TRIGGER main.{name}')
                 
-                if cursor.rowcount > 0:
+                placeholders = ",".join("?" * len(ids))
+                # OR REPLACE: batch yang sempat ter-commit di arsip tapi tidak di hot aman diulang
+                # (entri FTS lama untuk baris itu dihapus dulu supaya tidak dobel)
+                cursor.execute(ARCHIVE_FTS_DELETE_SQL.format(ids=placeholders), ids)
+                cursor.execute(f'''
+                    INSERT OR REPLACE INTO {ARCHIVE_SCHEMA}.transactions ({ARCHIVE_COLUMNS})
+                    SELECT {ARCHIVE_COLUMNS} FROM main.transactions WHERE id IN ({placeholders})
+                ''', ids)
+                cursor.execute(f'''
+                    INSERT INTO {ARCHIVE_SCHEMA}.transactions_fts (rowid, user_id, description, category)
+                    SELECT id, user_id, description, category FROM main.transactions WHERE id IN ({placeholders})
+                ''', ids)
+                cursor.execute(f'DELETE FROM main.transactions WHERE id IN ({placeholders})', ids)
+                
+                for _, trigger_sql in deferred_triggers:
+                    cursor.execute(trigger_sql)
+                
+                if self.replica:
+                    # Lock replica ditahan selama commit supaya pembaca tidak melihat
+                    # batch ini di arsip sekaligus masih di main replica
+                    with self.replica.connection():
+                        conn.commit()
+                        self._apply_to_replica(
+                            [(f'DROP TRIGGER main.{name}', ()) for name, _ in deferred_triggers] +
+                            [(f'DELETE FROM main.transactions WHERE id IN ({placeholders})', ids)] +
+                            [(trigger_sql, ()) for _, trigger_sql in deferred_triggers])
+                else:
                     conn.commit()
-                    return True
-                return False
-        except Exception as e:
-            print(f"Error deleting transaction: {e}")
-            return False
+            
+            moved += len(ids)
+            last_id = ids[-1]
+            if pause_seconds:
+                sleep(pause_seconds)
+        
+        return moved
@@ -0,0 +1,56 @@
+"""
+Export ledger transaksi ke CSV atau JSONL
+Baris di-stream langsung dari cursor database per potongan, memori tetap konstan.
+Kolom amount ditulis sebagai rupiah dengan dua desimal ('50000.00'), tepat dari sen
+"""
+
+import csv
+import json
+from typing import Optional, TextIO
+
+from .archive import ARCHIVE_COLUMNS
+from .money import to_decimal
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+# Nama kolom file export, sama dengan urutan kolom dari iter_transaction_rows
+EXPORT_HEADER = [column.strip() for column in ARCHIVE_COLUMNS.split(',')]
+AMOUNT_INDEX = EXPORT_HEADER.index('amount')
+
+def _export_row(row: tuple) -> list:
+    """Baris iter_transaction_rows dengan amount (sen) sebagai teks rupiah"""
+    values = list(row)
+    values[AMOUNT_INDEX] = str(to_decimal(values[AMOUNT_INDEX]))
+    return values
+
+def export_transactions(db, output: TextIO, fmt: str = 'csv', user_id: Optional[str] = None,
+                        chunk_size: int = 1000) -> int:
+    """Tulis transaksi satu user (atau semua user) ke output, return jumlah baris
+
+    db boleh DatabaseManager atau ShardedDatabaseManager (semua user hanya jika shard-nya
+    satu, lihat ShardedDatabaseManager.iter_transaction_rows).
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Format export tidak dikenal: {fmt} (pilih {', '.join(EXPORT_FORMATS)})")
+
+    rows = db.iter_transaction_rows(user_id, chunk_size=chunk_size)
+    count = 0
+
+    if fmt == 'csv':
+        writer = csv.writer(output)
+        writer.writerow(EXPORT_HEADER)
+        for row in rows:
+            writer.writerow(_export_row(row))
+            count += 1
+    else:
+        for row in rows:
+            output.write(json.dumps(dict(zip(EXPORT_HEADER, _export_row(row))), ensure_ascii=False))
+            output.write('\n')
+            count += 1
+
+    return count
+
+def export_filename(user_id: Optional[str], fmt: str) -> str:
+    """Nama file export yang dikirim ke user"""
+    owner = user_id if user_id is not None else 'semua'
+    return f"transaksi_{owner}.{fmt}"
@@ -0,0 +1,228 @@
+"""
+Import mutasi rekening (CSV) untuk Financial Bot
+Baris dibaca satu per satu dan ditulis per potongan lewat add_transactions_bulk,
+jadi file sebesar apapun diimport dengan memori terbatas. Baris yang sudah ada
+(waktu, tipe, jumlah dan deskripsi sama) dilewati, jadi mutasi yang sama atau
+periodenya tumpang tindih aman diimport ulang
+"""
+
+import csv
+import functools
+import itertools
+import re
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from .money import to_minor
+from .rules import FinancialRulesEngine, WIB
+
+# Nama kolom yang dikenali (huruf kecil, tanpa spasi di ujung)
+COLUMN_ALIASES = {
+    'date': ('tanggal', 'tgl', 'date', 'tanggal transaksi', 'created_at'),
+    'description': ('keterangan', 'deskripsi', 'description', 'uraian', 'catatan'),
+    'amount': ('jumlah', 'amount', 'nominal', 'mutasi'),
+    'debit': ('debit', 'debet', 'pengeluaran', 'keluar'),
+    'credit': ('kredit', 'credit', 'pemasukan', 'masuk'),
+    'type': ('tipe', 'type', 'jenis', 'db/cr', 'transaction_type'),
+    'category': ('kategori', 'category'),
+}
+
+# Nilai kolom tipe / penanda di jumlah (BCA dll: "DB" / "CR")
+TYPE_VALUES = {
+    'income': 'income', 'pemasukan': 'income', 'masuk': 'income', 'cr': 'income', 'k': 'income', 'kredit': 'income',
+    'expense': 'expense', 'pengeluaran': 'expense', 'keluar': 'expense', 'db': 'expense', 'd': 'expense', 'debit': 'expense',
+}
+
+DATE_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d', '%d/%m/%Y %H:%M', '%d/%m/%Y',
+                '%d-%m-%Y', '%d/%m/%y', '%d-%m-%y')
+
+# Baris awal yang diperiksa untuk mencari header (mutasi bank sering punya info rekening di atas)
+HEADER_SEARCH_ROWS = 20
+
+DELIMITERS = (',', ';', '\t', '|')
+
+def parse_statement_amount(text: str) -> Optional[Tuple[int, Optional[str]]]:
+    """Parse '1.250.000,00 DB', '-50,000.50', 'Rp 75.000' -> (sen positif, tipe dari tanda/penanda)"""
+    if text is None:
+        return None
+    cleaned = text.strip().lower().replace('rp', '').replace(' ', '')
+    if not cleaned:
+        return None
+
+    hinted_type = None
+    marker = re.search(r'(db|cr)$', cleaned)
+    if marker:
+        hinted_type = TYPE_VALUES[marker.group(1)]
+        cleaned = cleaned[:marker.start()]
+    if cleaned.startswith('-') or (cleaned.startswith('(') and cleaned.endswith(')')):
+        hinted_type = hinted_type or 'expense'
+    cleaned = cleaned.strip('-+()')
+
+    # Pemisah desimal adalah tanda terakhir jika diikuti tepat 1-2 digit
+    decimal = re.search(r'[.,](\d{1,2})$', cleaned)
+    if decimal:
+        whole = re.sub(r'[.,]', '', cleaned[:decimal.start()])
+        cleaned = f"{whole}.{decimal.group(1)}"
+    else:
+        cleaned = re.sub(r'[.,]', '', cleaned)
+
+    try:
+        return to_minor(cleaned), hinted_type
+    except ValueError:
+        return None
+
+@functools.lru_cache(maxsize=4096)
+def parse_statement_date(text: str) -> Optional[str]:
+    """Tanggal lokal (WIB) di mutasi -> string UTC format kolom created_at (di-cache, tanggal di mutasi berulang)"""
+    text = (text or '').strip()
+    for fmt in DATE_FORMATS:
+        try:
+            local = datetime.strptime(text, fmt).replace(tzinfo=WIB)
+        except ValueError:
+            continue
+        return local.astimezone(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    return None
+
+class StatementImporter:
+    """Import CSV mutasi rekening ke transaksi satu user"""
+
+    def __init__(self, db, rules_engine: FinancialRulesEngine = None, chunk_rows: int = 20000,
+                 skip_existing: bool = True):
+        # db boleh DatabaseManager atau ShardedDatabaseManager
+        self.db = db
+        self.rules_engine = rules_engine or FinancialRulesEngine()
+        self.chunk_rows = chunk_rows
+        self.skip_existing = skip_existing
+
+    def _map_columns(self, header: List[str]) -> Optional[Dict[str, int]]:
+        """Index kolom yang dikenali, None jika baris ini bukan header"""
+        normalized = [column.strip().lower() for column in header]
+        columns = {}
+        for field, aliases in COLUMN_ALIASES.items():
+            for index, name in enumerate(normalized):
+                if name in aliases:
+                    columns[field] = index
+                    break
+
+        has_amount = 'amount' in columns or 'debit' in columns or 'credit' in columns
+        return columns if 'date' in columns and has_amount else None
+
+    def iter_rows(self, source: TextIO, user_id: str, username: str) -> Iterator[Optional[Tuple]]:
+        """Generator baris bulk (tuple add_transactions_bulk), None untuk baris yang tidak valid"""
+        # Delimiter ditentukan dari baris yang berhasil dikenali sebagai header;
+        # Sniffer sering salah karena baris info rekening dan koma desimal
+        reader, columns = None, None
+        head = list(itertools.islice(source, HEADER_SEARCH_ROWS))
+        for index, line in enumerate(head):
+            for delimiter in DELIMITERS:
+                columns = self._map_columns(next(csv.reader([line], delimiter=delimiter), []))
+                if columns:
+                    break
+            if columns:
+                reader = csv.reader(itertools.chain(head[index + 1:], source), delimiter=delimiter)
+                break
+        if not columns:
+            raise ValueError("Header CSV tidak dikenali (butuh kolom tanggal dan jumlah/debit/kredit)")
+
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            yield self._convert_row(row, columns, user_id, username)
+
+    def _convert_row(self, row: List[str], columns: Dict[str, int],
+                     user_id: str, username: str) -> Optional[Tuple]:
+        def cell(field: str) -> str:
+            index = columns.get(field)
+            return row[index].strip() if index is not None and index < len(row) else ''
+
+        created_at = parse_statement_date(cell('date'))
+        if created_at is None:
+            return None
+
+        transaction_type = TYPE_VALUES.get(cell('type').lower())
+        parsed = None
+        if cell('amount'):
+            parsed = parse_statement_amount(cell('amount'))
+            if parsed and transaction_type is None:
+                transaction_type = parsed[1] or 'expense'
+        else:
+            # Kolom debit/kredit terpisah; kolom yang tidak dipakai biasanya kosong atau 0
+            for field, field_type in (('credit', 'income'), ('debit', 'expense')):
+                candidate = parse_statement_amount(cell(field))
+                if candidate and candidate[0] > 0:
+                    parsed, transaction_type = candidate, field_type
+                    break
+        if not parsed or parsed[0] <= 0:
+            return None
+
+        amount = parsed[0]
+        description = cell('description')
+        category = cell('category').lower() or self.rules_engine.categorize_automatically(description, amount)
+        return (user_id, username, transaction_type, amount, category, description, created_at)
+
+    def _existing_keys(self, user_id: str, first: str, last: str, last_id: int) -> Counter:
+        """Transaksi user yang sudah ada sebelum import (id <= last_id) dengan created_at dalam
+        [first, last], per kunci import (created_at, tipe, jumlah, deskripsi)"""
+        # Periode [start, end) dan created_at berpresisi detik
+        end = (datetime.strptime(last, '%Y-%m-%d %H:%M:%S') + timedelta(seconds=1)).strftime('%Y-%m-%d %H:%M:%S')
+        return Counter((t['date'], t['type'], t['amount'], t['description'] or '')
+                       for t in self.db.iter_user_transactions(user_id, page_size=1000, start=first, end=end)
+                       if t['id'] <= last_id)
+
+    def import_file(self, source: TextIO, user_id: str, username: str,
+                    progress: Callable[[Dict[str, float]], None] = None) -> Dict[str, float]:
+        """Import seluruh file per potongan, return ringkasan termasuk baris/detik
+
+        Dengan skip_existing, setiap transaksi yang sudah ada sebelum import menggugurkan satu
+        baris file dengan kunci yang sama (dihitung 'skipped'); baris kembar di file tetap masuk
+        sebanyak yang belum ada. Per potongan hanya rentang tanggalnya yang dibaca dari database,
+        jadi memori bergantung pada ukuran potongan, bukan riwayat user. Kunci yang terpakai
+        dibawa ke potongan berikutnya hanya untuk created_at terakhir (mutasi urut tanggal).
+        Jika database error, import berhenti dan ringkasan berisi 'error' (potongan yang sudah
+        masuk tetap tersimpan, baris yang belum dibaca tidak dihitung).
+        """
+        rows = self.iter_rows(source, user_id, username)
+        result = {'inserted': 0, 'skipped': 0, 'failed': 0, 'elapsed': 0.0, 'rows_per_second': 0.0}
+        # Baris yang ditulis import ini (atau bot selama import) tidak dihitung sudah ada
+        last_id = self.db.last_transaction_id(user_id) if self.skip_existing else 0
+        used = Counter()
+        start = time.perf_counter()
+
+        while True:
+            chunk = list(itertools.islice(rows, self.chunk_rows))
+            if not chunk:
+                break
+            dates = [row[6] for row in chunk if row is not None]
+            existing = Counter()
+            if last_id and dates:
+                existing = self._existing_keys(user_id, min(dates), max(dates), last_id)
+            fresh = []
+            for row in chunk:
+                key = (row[6], row[2], row[3], row[5]) if row is not None and existing else None
+                if key is not None and existing[key] > used[key]:
+                    used[key] += 1
+                    result['skipped'] += 1
+                    continue
+                fresh.append(row)
+            if used and dates:
+                # Potongan berikutnya (mutasi urut tanggal) hanya bisa bertemu created_at terakhir
+                latest = max(dates)
+                used = Counter({key: count for key, count in used.items() if key[0] >= latest})
+            counts = self.db.add_transactions_bulk(fresh)
+            result['inserted'] += counts['inserted']
+            result['failed'] += counts['failed']
+            if 'error' in counts:
+                # Error database (disk penuh, terkunci, ...) akan berulang, sisa file tidak dibaca
+                result['error'] = counts['error']
+                break
+
+            result['elapsed'] = time.perf_counter() - start
+            result['rows_per_second'] = result['inserted'] / result['elapsed'] if result['elapsed'] else 0.0
+            if progress:
+                progress(dict(result))
+
+        result['elapsed'] = time.perf_counter() - start
+        result['rows_per_second'] = result['inserted'] / result['elapsed'] if result['elapsed'] else 0.0
+        return result
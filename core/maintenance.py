@@ -0,0 +1,250 @@
+"""
+Pemeliharaan database untuk Financial Bot
+PRAGMA optimize, ANALYZE, checkpoint WAL dan incremental vacuum dijalankan berkala
+di thread latar, masing-masing dengan batas waktu dan mundur saat bot sedang sibuk
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+# Interval default tiap job (detik)
+DEFAULT_JOB_INTERVALS = {
+    'checkpoint': 300,
+    'optimize': 3600,
+    'incremental_vacuum': 3600,
+    'analyze': 24 * 3600,
+}
+
+# Batas waktu satu job di satu database (detik)
+DEFAULT_TIME_BUDGET = 2.0
+
+# Baris yang diperiksa ANALYZE per index (perkiraan, jauh lebih cepat dari full scan)
+ANALYSIS_LIMIT = 1000
+
+# Halaman kosong yang dikembalikan ke OS per langkah incremental vacuum
+VACUUM_STEP_PAGES = 256
+
+# Jumlah instruksi VM SQLite di antara pengecekan batas waktu
+PROGRESS_OPS = 1000
+
+# Jumlah hasil job terakhir yang disimpan
+HISTORY_SIZE = 50
+
+class MaintenanceInterrupted(Exception):
+    """Job dihentikan karena batas waktu habis atau bot sibuk"""
+
+def storage_stats(conn: sqlite3.Connection) -> Dict[str, int]:
+    """Ukuran halaman, jumlah halaman dan halaman kosong (freelist) schema main"""
+    return {
+        'page_size': conn.execute('PRAGMA page_size').fetchone()[0],
+        'page_count': conn.execute('PRAGMA page_count').fetchone()[0],
+        'freelist_count': conn.execute('PRAGMA freelist_count').fetchone()[0],
+        # 0 = none, 1 = full, 2 = incremental
+        'auto_vacuum': conn.execute('PRAGMA auto_vacuum').fetchone()[0],
+    }
+
+def file_size(path: str) -> int:
+    """Ukuran file dalam byte, 0 jika belum ada"""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def _optimize(conn: sqlite3.Connection, should_stop: Callable[[], bool]) -> str:
+    conn.execute(f'PRAGMA analysis_limit = {ANALYSIS_LIMIT}')
+    conn.execute('PRAGMA optimize')
+    return ''
+
+def _analyze(conn: sqlite3.Connection, should_stop: Callable[[], bool]) -> str:
+    conn.execute(f'PRAGMA analysis_limit = {ANALYSIS_LIMIT}')
+    conn.execute('ANALYZE main')
+    if conn.in_transaction:
+        conn.commit()
+    return ''
+
+def _checkpoint(conn: sqlite3.Connection, should_stop: Callable[[], bool]) -> str:
+    # PASSIVE tidak menunggu pembaca maupun penulis lain
+    busy, wal_frames, checkpointed = conn.execute('PRAGMA main.wal_checkpoint(PASSIVE)').fetchone()
+    return f"{checkpointed}/{wal_frames} frame WAL" + (" (sebagian, ada pembaca)" if busy else "")
+
+def _incremental_vacuum(conn: sqlite3.Connection, should_stop: Callable[[], bool]) -> str:
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+        return "auto_vacuum bukan INCREMENTAL, jalankan: python manage_db.py maintenance --full-vacuum"
+
+    freed = 0
+    while True:
+        free = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        if free == 0:
+            break
+        if should_stop():
+            raise MaintenanceInterrupted(f"{freed} halaman dikembalikan")
+        # Satu langkah = satu transaksi pendek; executescript menjalankan PRAGMA sampai selesai
+        conn.executescript(f'PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})')
+        freed += min(free, VACUUM_STEP_PAGES)
+    return f"{freed} halaman dikembalikan"
+
+# Nama job -> fungsi(conn, should_stop), return keterangan hasil
+MAINTENANCE_JOBS: Dict[str, Callable[[sqlite3.Connection, Callable[[], bool]], str]] = {
+    'optimize': _optimize,
+    'analyze': _analyze,
+    'incremental_vacuum': _incremental_vacuum,
+    # Terakhir: halaman yang dikembalikan vacuum baru hilang dari file setelah checkpoint
+    'checkpoint': _checkpoint,
+}
+
+# Job snapshot online (core.backup), dijadwalkan bersama job di atas jika backup_dir diatur.
+# Tidak dibatasi waktu: backup bertahap tidak menahan lock tulis
+BACKUP_JOB = 'backup'
+
+# Semua job yang bisa dijadwalkan MaintenanceScheduler
+SCHEDULABLE_JOBS = (*MAINTENANCE_JOBS, BACKUP_JOB)
+
+def run_job(conn: sqlite3.Connection, job: str, time_budget: float = DEFAULT_TIME_BUDGET,
+            is_busy: Optional[Callable[[], bool]] = None) -> Dict:
+    """Jalankan satu job di koneksi ini, return catatan hasil beserta ukuran sebelum/sesudah
+
+    status: 'ok', 'timeout' (batas waktu habis), 'busy' (dihentikan karena bot sibuk)
+    atau 'error'. Pekerjaan yang dihentikan di tengah statement di-rollback.
+    """
+    if job not in MAINTENANCE_JOBS:
+        raise ValueError(f"Job maintenance tidak dikenal: {job}")
+
+    deadline = time.monotonic() + time_budget
+    state = {'reason': None}
+
+    def should_stop() -> bool:
+        if time.monotonic() > deadline:
+            state['reason'] = 'timeout'
+        elif is_busy is not None and is_busy():
+            state['reason'] = 'busy'
+        return state['reason'] is not None
+
+    before = storage_stats(conn)
+    started_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    start = time.perf_counter()
+    # Progress handler yang return True membatalkan statement yang sedang berjalan
+    conn.set_progress_handler(should_stop, PROGRESS_OPS)
+    try:
+        detail = MAINTENANCE_JOBS[job](conn, should_stop)
+        status = 'ok'
+    except MaintenanceInterrupted as e:
+        status, detail = state['reason'], str(e)
+    except sqlite3.Error as e:
+        status = state['reason'] or 'error'
+        detail = '' if state['reason'] else str(e)
+    finally:
+        conn.set_progress_handler(None, 0)
+        if conn.in_transaction:
+            conn.rollback()
+    after = storage_stats(conn)
+
+    return {
+        'job': job,
+        'started_at': started_at,
+        'duration_ms': round((time.perf_counter() - start) * 1000, 3),
+        'status': status,
+        'detail': detail,
+        'page_count_before': before['page_count'],
+        'page_count': after['page_count'],
+        'freelist_before': before['freelist_count'],
+        'freelist_count': after['freelist_count'],
+    }
+
+def full_vacuum(conn: sqlite3.Connection):
+    """VACUUM penuh dan aktifkan auto_vacuum INCREMENTAL (offline, butuh ruang 2x ukuran file)"""
+    conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    conn.execute('VACUUM main')
+
+class MaintenanceScheduler:
+    """Thread latar yang menjalankan job maintenance sesuai interval di semua database
+
+    targets: objek dengan run_maintenance(job, time_budget, is_busy) dan
+    get_storage_stats() (DatabaseManager, satu per shard). Job yang jatuh tempo saat
+    is_busy() True ditunda dengan backoff eksponensial (backoff_seconds, 2x, ...).
+    """
+
+    def __init__(self, targets: List, intervals: Optional[Dict[str, float]] = None,
+                 time_budget: float = DEFAULT_TIME_BUDGET,
+                 is_busy: Optional[Callable[[], bool]] = None,
+                 backoff_seconds: float = 30.0, max_backoff_seconds: float = 600.0):
+        self.targets = list(targets)
+        self.intervals = dict(DEFAULT_JOB_INTERVALS if intervals is None else intervals)
+        unknown = set(self.intervals) - set(SCHEDULABLE_JOBS)
+        if unknown:
+            raise ValueError(f"Job maintenance tidak dikenal: {', '.join(sorted(unknown))}")
+        self.time_budget = time_budget
+        self.is_busy = is_busy or (lambda: False)
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+
+        # Statistik untuk perintah admin
+        self.history = deque(maxlen=HISTORY_SIZE)
+        self.busy_skips = 0
+
+        now = time.monotonic()
+        self._due = {job: now + interval for job, interval in self.intervals.items()}
+        self._attempts = {job: 0 for job in self.intervals}
+        # Satu job dalam satu waktu (thread latar vs run_now dari admin)
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='db-maintenance', daemon=True)
+        self._thread.start()
+
+    def run_now(self, jobs: Optional[List[str]] = None) -> List[Dict]:
+        """Jalankan job sekarang (default semua job terjadwal) tanpa cek sibuk"""
+        results = []
+        scheduled = [job for job in SCHEDULABLE_JOBS if job in self.intervals]
+        for job in jobs or scheduled or list(MAINTENANCE_JOBS):
+            results.extend(self._run_job(job, is_busy=None))
+        return results
+
+    def stats(self) -> Dict:
+        """Ukuran tiap database, hasil job terakhir (terbaru dulu) dan jadwal berikutnya"""
+        now = time.monotonic()
+        return {
+            'databases': [target.get_storage_stats() for target in self.targets],
+            'history': list(reversed(self.history)),
+            'next_run_seconds': {job: max(0.0, due - now) for job, due in sorted(self._due.items(), key=lambda item: item[1])},
+            'busy_skips': self.busy_skips,
+        }
+
+    def close(self, timeout: float = None):
+        """Hentikan thread latar (job yang sedang berjalan diselesaikan dulu)"""
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _run_job(self, job: str, is_busy: Optional[Callable[[], bool]]) -> List[Dict]:
+        results = []
+        with self._run_lock:
+            for target in self.targets:
+                result = target.run_maintenance(job, self.time_budget, is_busy)
+                self.history.append(result)
+                results.append(result)
+                if result['status'] == 'busy':
+                    break
+        return results
+
+    def _run(self):
+        while self._due:
+            job = min(self._due, key=self._due.get)
+            if self._stop.wait(max(0.0, self._due[job] - time.monotonic())):
+                return
+
+            busy = self.is_busy()
+            if not busy:
+                results = self._run_job(job, self.is_busy)
+                busy = any(result['status'] == 'busy' for result in results)
+
+            if busy:
+                self.busy_skips += 1
+                self._attempts[job] += 1
+                delay = min(self.backoff_seconds * 2 ** (self._attempts[job] - 1), self.max_backoff_seconds)
+            else:
+                self._attempts[job] = 0
+                delay = self.intervals[job]
+            self._due[job] = time.monotonic() + delay
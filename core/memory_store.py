@@ -0,0 +1,341 @@
+"""
+Storage in-memory untuk Financial Bot
+Implementasi Storage dengan dict dan list terurut, tanpa disk. Semantik sama dengan
+DatabaseManager (saldo, rollup bulanan WIB, pagination, pencarian) sehingga bisa
+dipakai untuk test, benchmark dan percobaan tanpa file database.
+"""
+
+import bisect
+import functools
+import re
+import threading
+import unicodedata
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+from .categories import CATEGORY_TYPES, CategoryRegistry
+from .migrations import DEFAULT_CATEGORIES, latest_version
+from .money import as_minor
+from .storage import (ROLLUP_TZ_OFFSET, SEARCH_MAX_TERMS, Storage, format_bound, rollup_month_bounds,
+                      summarize_totals, transaction_from_row)
+
+# Token seperti tokenizer FTS5 unicode61: huruf/angka saja, tanpa diakritik
+_TOKEN = re.compile(r'[^\W_]+')
+
+# Deskripsi dan tanggal banyak berulang (terutama saat bulk insert)
+@functools.lru_cache(maxsize=4096)
+def _tokens(text: Optional[str]) -> Tuple[str, ...]:
+    text = unicodedata.normalize('NFKD', (text or '').lower())
+    return tuple(_TOKEN.findall(''.join(ch for ch in text if not unicodedata.combining(ch))))
+
+@functools.lru_cache(maxsize=4096)
+def _year_month(created_at: str) -> str:
+    """Bulan WIB (YYYY-MM) dari created_at UTC, sama dengan strftime('%Y-%m', created_at, '+7 hours')"""
+    return (datetime.fromisoformat(created_at) + ROLLUP_TZ_OFFSET).strftime('%Y-%m')
+
+class _Record:
+    """Satu transaksi: baris lengkap (urutan ARCHIVE_COLUMNS) plus bulan WIB dan token pencarian"""
+
+    __slots__ = ('row', 'year_month', 'tokens')
+
+    def __init__(self, row: Tuple, year_month: str, tokens: FrozenSet[str]):
+        self.row = row
+        self.year_month = year_month
+        self.tokens = tokens
+
+class MemoryStorage(Storage):
+    """Storage di memori proses, semua operasi atomik di bawah satu lock
+
+    - transaksi: dict id -> record (urut id karena id selalu naik)
+    - index per user: list (created_at, id) terurut untuk riwayat dan periode
+    - user_balances dan monthly_rollups: dict yang diperbarui di setiap tulisan
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._records: Dict[int, _Record] = {}
+        self._by_user: Dict[str, List[Tuple[str, int]]] = {}
+        self._balances: Dict[str, List[int]] = {}
+        self._rollups: Dict[str, Dict[Tuple[str, str, str], List[int]]] = {}
+        self._next_id = 1
+        self._category_rows = list(DEFAULT_CATEGORIES)
+        self.categories = CategoryRegistry(self._category_rows)
+
+    def close(self):
+        """Tidak ada resource yang perlu dilepas"""
+
+    def get_schema_version(self) -> int:
+        """Storage in-memory selalu mengikuti skema terbaru"""
+        return latest_version()
+
+    # ---- Tulis ----
+
+    def submit_transaction(self, user_id: str, username: str, transaction_type: str,
+                           amount: int, category: str, description: str = "") -> Future:
+        """Tambah transaksi, return Future (sudah selesai) berisi id"""
+        future = Future()
+        try:
+            with self._lock:
+                future.set_result(self._insert(user_id, username, transaction_type, amount,
+                                               category, description, None))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def add_transactions_bulk(self, transactions: Iterable, batch_size: int = 5000) -> Dict[str, int]:
+        """Tambah banyak transaksi (batch_size tidak berpengaruh di memori)"""
+        inserted = 0
+        failed = 0
+        with self._lock:
+            for item in transactions:
+                row = self._normalize_bulk_row(item)
+                if row is None:
+                    failed += 1
+                    continue
+                try:
+                    self._insert(*row)
+                    inserted += 1
+                except ValueError:
+                    failed += 1
+        return {'inserted': inserted, 'failed': failed}
+
+    def _insert(self, user_id, username, transaction_type, amount, category, description, created_at) -> int:
+        # Padanan NOT NULL dan CHECK pada tabel transactions
+        if None in (user_id, username, amount, category):
+            raise ValueError("NOT NULL constraint failed: transactions")
+        if transaction_type not in ('income', 'expense'):
+            raise ValueError("CHECK constraint failed: transaction_type")
+        amount = as_minor(amount)
+        created_at = format_bound(created_at) or datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        year_month = _year_month(created_at)
+
+        transaction_id = self._next_id
+        self._next_id += 1
+        row = (transaction_id, user_id, username, transaction_type, amount, category, description, created_at)
+        self._records[transaction_id] = _Record(row, year_month,
+                                                frozenset(_tokens(description) + _tokens(category)))
+        bisect.insort(self._by_user.setdefault(user_id, []), (created_at, transaction_id))
+        self._apply_summary(row, year_month, 1)
+        return transaction_id
+
+    def _apply_summary(self, row: Tuple, year_month: str, sign: int):
+        """Padanan trigger user_balances dan monthly_rollups (sign 1 insert, -1 delete)"""
+        _, user_id, _, transaction_type, amount, category, _, _ = row
+        balance = self._balances.setdefault(user_id, [0, 0, 0])
+        balance[0 if transaction_type == 'income' else 1] += sign * amount
+        balance[2] += sign
+
+        rollups = self._rollups.setdefault(user_id, {})
+        key = (year_month, category, transaction_type)
+        rollup = rollups.setdefault(key, [0, 0])
+        rollup[0] += sign * amount
+        rollup[1] += sign
+        if rollup[1] <= 0:
+            del rollups[key]
+
+    def delete_transactions(self, user_id: str, first_id: int,
+                            last_id: Optional[int] = None) -> List[Dict]:
+        """Hapus rentang id milik user, return transaksi yang terhapus (urut id)"""
+        last_id = first_id if last_id is None else last_id
+        with self._lock:
+            keys = self._by_user.get(user_id, [])
+            # Rentang pendek dicek per id, selebihnya cukup satu kali lewat index user
+            if last_id - first_id < len(keys):
+                ids = [transaction_id for transaction_id in range(first_id, last_id + 1)
+                       if transaction_id in self._records and self._records[transaction_id].row[1] == user_id]
+            else:
+                ids = sorted(transaction_id for _, transaction_id in keys if first_id <= transaction_id <= last_id)
+
+            deleted = []
+            for transaction_id in ids:
+                deleted.append(self._transaction(transaction_id))
+                record = self._records.pop(transaction_id)
+                del keys[bisect.bisect_left(keys, (record.row[7], transaction_id))]
+                self._apply_summary(record.row, record.year_month, -1)
+            return deleted
+
+    def add_category(self, name: str, category_type: str) -> bool:
+        """Tambah kategori baru lalu muat ulang registry, False jika sudah ada atau tidak valid"""
+        name = name.strip()
+        with self._lock:
+            if not name or category_type not in CATEGORY_TYPES or name in self.categories:
+                return False
+            self._category_rows.append((name, category_type))
+            self.categories.replace(self._category_rows)
+            return True
+
+    def archive_transactions(self, older_than_days: int = 365, batch_size: int = 1000,
+                             pause_seconds: float = 0.0) -> int:
+        raise ValueError("Arsip tidak tersedia di storage in-memory")
+
+    # ---- Baca ----
+
+    def _user_range(self, user_id: str, start=None, end=None) -> List[Tuple[str, int]]:
+        """Potongan index user dengan created_at dalam [start, end), urut lama ke baru"""
+        keys = self._by_user.get(user_id, [])
+        low = bisect.bisect_left(keys, (format_bound(start),)) if start is not None else 0
+        high = bisect.bisect_left(keys, (format_bound(end),)) if end is not None else len(keys)
+        return keys[low:high]
+
+    def _totals_rows(self, user_id: str, start=None, end=None) -> List[Tuple]:
+        """Baris (year_month, category, transaction_type, total, count) seperti query agregat SQLite"""
+        months = rollup_month_bounds(start, end)
+        if months is not None:
+            start_month, end_month = months
+            return [(year_month, category, transaction_type, total, count)
+                    for (year_month, category, transaction_type), (total, count)
+                    in self._rollups.get(user_id, {}).items()
+                    if (start_month is None or year_month >= start_month)
+                    and (end_month is None or year_month < end_month)]
+
+        groups: Dict[Tuple[str, str, str], List[int]] = {}
+        for _, transaction_id in self._user_range(user_id, start, end):
+            record = self._records[transaction_id]
+            row = record.row
+            group = groups.setdefault((record.year_month, row[5], row[3]), [0, 0])
+            group[0] += row[4]
+            group[1] += 1
+        return [key + (total, count) for key, (total, count) in groups.items()]
+
+    def get_user_balance(self, user_id: str, start=None, end=None) -> Dict[str, int]:
+        """Dapatkan saldo user, opsional dibatasi periode created_at [start, end)"""
+        with self._lock:
+            if start is None and end is None:
+                total_income, total_expense, _ = self._balances.get(user_id, (0, 0, 0))
+                return {'income': total_income, 'expense': total_expense,
+                        'balance': total_income - total_expense}
+            return summarize_totals(self._totals_rows(user_id, start, end), 0)['balance']
+
+    def get_totals(self) -> Dict[str, int]:
+        """Total semua user (untuk statistik admin)"""
+        with self._lock:
+            active = [balance for balance in self._balances.values() if balance[2] > 0]
+            return {
+                'users': len(active),
+                'income': sum(balance[0] for balance in active),
+                'expense': sum(balance[1] for balance in active),
+                'transactions': sum(balance[2] for balance in active)
+            }
+
+    def get_transactions_page(self, user_id: str, before: Optional[int] = None,
+                              page_size: int = 10, start=None, end=None) -> List[Dict]:
+        """Dapatkan satu halaman transaksi (terbaru dulu) sebelum transaksi `before`"""
+        with self._lock:
+            keys = self._user_range(user_id, start, end)
+            if before is not None:
+                record = self._records.get(before)
+                if record is None or record.row[1] != user_id:
+                    return []
+                keys = keys[:bisect.bisect_left(keys, (record.row[7], before))]
+
+            page = keys[max(0, len(keys) - page_size):] if page_size > 0 else []
+            return [self._transaction(transaction_id) for _, transaction_id in reversed(page)]
+
+    def _transaction(self, transaction_id: int) -> Dict:
+        row = self._records[transaction_id].row
+        return transaction_from_row((row[0],) + row[3:])
+
+    def get_transaction(self, user_id: str, transaction_id: int) -> Optional[Dict]:
+        """Dapatkan satu transaksi milik user, None jika tidak ada"""
+        with self._lock:
+            record = self._records.get(transaction_id)
+            if record is None or record.row[1] != user_id:
+                return None
+            return self._transaction(transaction_id)
+
+    def last_transaction_id(self, user_id: str) -> int:
+        """Id terakhir yang dibagikan (id tidak pernah dipakai ulang)"""
+        with self._lock:
+            return self._next_id - 1
+
+    def iter_transaction_rows(self, user_id: Optional[str] = None,
+                              chunk_size: int = 1000) -> Iterator[Tuple]:
+        """Stream baris transaksi lengkap dari salinan daftar saat iterasi dimulai"""
+        with self._lock:
+            if user_id is None:
+                rows = [record.row for record in self._records.values()]
+            else:
+                rows = [self._records[transaction_id].row
+                        for _, transaction_id in self._by_user.get(user_id, [])]
+        yield from rows
+
+    def get_category_report(self, user_id: str, start=None, end=None) -> Dict[str, Dict[str, int]]:
+        """Dapatkan laporan per kategori, opsional dibatasi periode [start, end)"""
+        with self._lock:
+            return summarize_totals(self._totals_rows(user_id, start, end), 0)['category_report']
+
+    def search_transactions(self, user_id: str, query: str, limit: int = 10) -> Dict:
+        """Cari transaksi user berdasarkan kata di deskripsi/kategori
+
+        Semua kata harus ada sebagai token; kata terakhir cukup berupa prefix.
+        """
+        result = {'query': query, 'transactions': [], 'income': 0, 'expense': 0, 'count': 0}
+        words = [token for word in re.findall(r'\w+', query.lower())[:SEARCH_MAX_TERMS]
+                 for token in _tokens(word)]
+        if not words:
+            return result
+
+        exact, prefix = set(words[:-1]), words[-1]
+        with self._lock:
+            for _, transaction_id in reversed(self._by_user.get(user_id, [])):
+                record = self._records[transaction_id]
+                if not exact <= record.tokens or not any(token.startswith(prefix) for token in record.tokens):
+                    continue
+                result[record.row[3]] += record.row[4]
+                result['count'] += 1
+                if len(result['transactions']) < limit:
+                    result['transactions'].append(self._transaction(transaction_id))
+        return result
+
+    def get_monthly_summary(self, user_id: str, months: int = 12) -> List[Dict]:
+        """Dapatkan total pemasukan/pengeluaran per bulan (terbaru dulu)"""
+        with self._lock:
+            return summarize_totals(self._totals_rows(user_id), months)['monthly_summary']
+
+    def get_user_snapshot(self, user_id: str, recent_limit: int = 10, start=None, end=None,
+                          months: int = 12) -> Dict[str, Any]:
+        """Ringkasan keuangan user, dihitung di bawah satu lock"""
+        with self._lock:
+            summary = summarize_totals(self._totals_rows(user_id, start, end), months)
+            summary['recent_transactions'] = self.get_transactions_page(
+                user_id, page_size=recent_limit, start=start, end=end)
+            return summary
+
+    # ---- Perawatan ringkasan ----
+
+    def _ledger_totals(self) -> Dict[str, List[int]]:
+        totals: Dict[str, List[int]] = {}
+        for record in self._records.values():
+            _, user_id, _, transaction_type, amount, _, _, _ = record.row
+            total = totals.setdefault(user_id, [0, 0, 0])
+            total[0 if transaction_type == 'income' else 1] += amount
+            total[2] += 1
+        return totals
+
+    def rebuild_user_balances(self) -> int:
+        """Hitung ulang saldo dari transaksi, return jumlah user"""
+        with self._lock:
+            self._balances = self._ledger_totals()
+            return len(self._balances)
+
+    def verify_user_balances(self) -> List[Dict]:
+        """Bandingkan saldo tersimpan dengan transaksi, return daftar user yang tidak cocok"""
+        with self._lock:
+            ledger = self._ledger_totals()
+            mismatches = []
+            for user_id in list(ledger) + [user_id for user_id in self._balances if user_id not in ledger]:
+                stored = self._balances.get(user_id)
+                actual = ledger.get(user_id, [0, 0, 0])
+                if stored is None:
+                    stored_view = {'income': None, 'expense': None, 'count': None}
+                elif stored == actual:
+                    continue
+                else:
+                    stored_view = {'income': stored[0], 'expense': stored[1], 'count': stored[2]}
+                mismatches.append({
+                    'user_id': user_id,
+                    'stored': stored_view,
+                    'actual': {'income': actual[0], 'expense': actual[1], 'count': actual[2]}
+                })
+            return mismatches
@@ -0,0 +1,686 @@
+"""
+Migrasi skema database untuk Financial Bot
+Versi skema disimpan di PRAGMA user_version, setiap migrasi dijalankan sekali
+"""
+
+import sqlite3
+from typing import Callable, List, Tuple
+
+# Kategori default yang diisi oleh migrasi pertama
+DEFAULT_CATEGORIES = [
+    ('Gaji', 'income'),
+    ('Freelance', 'income'),
+    ('Investasi', 'income'),
+    ('Hadiah', 'income'),
+    ('Makanan', 'expense'),
+    ('Transport', 'expense'),
+    ('Hiburan', 'expense'),
+    ('Belanja', 'expense'),
+    ('Tagihan', 'expense'),
+    ('Kesehatan', 'expense'),
+    ('Pendidikan', 'expense'),
+    ('Lainnya', 'both')
+]
+
+# Daftar migrasi berurutan: (versi, deskripsi, fungsi)
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = []
+
+def migration(version: int, description: str):
+    """Decorator untuk mendaftarkan migrasi baru"""
+    def register(func):
+        MIGRATIONS.append((version, description, func))
+        MIGRATIONS.sort(key=lambda item: item[0])
+        return func
+    return register
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Baca versi skema dari PRAGMA user_version"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def latest_version() -> int:
+    """Versi skema terbaru yang dikenal aplikasi"""
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+def migrate(conn: sqlite3.Connection, target: int = None) -> List[int]:
+    """Jalankan semua migrasi yang belum diterapkan, return versi yang diterapkan"""
+    target = latest_version() if target is None else target
+    applied = []
+
+    for version, description, func in MIGRATIONS:
+        if version > target:
+            break
+        if version <= get_schema_version(conn):
+            continue
+
+        # Satu migrasi = satu transaksi. Versi dicek ulang setelah lock didapat
+        # supaya dua proses yang start bersamaan tidak menjalankan migrasi dua kali.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if version <= get_schema_version(conn):
+                conn.rollback()
+                continue
+            func(conn)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+
+    return applied
+
+@migration(1, "Skema awal: tabel transactions dan categories")
+def _initial_schema(conn: sqlite3.Connection):
+    # IF NOT EXISTS supaya database lama (user_version 0) tetap bisa di-upgrade
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            username TEXT NOT NULL,
+            transaction_type TEXT NOT NULL CHECK (transaction_type IN ('income', 'expense')),
+            amount REAL NOT NULL,
+            category TEXT NOT NULL,
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            type TEXT NOT NULL CHECK (type IN ('income', 'expense', 'both'))
+        )
+    ''')
+
+    # Kategori default
+    conn.executemany('''
+        INSERT OR IGNORE INTO categories (name, type) VALUES (?, ?)
+    ''', DEFAULT_CATEGORIES)
+
+@migration(2, "Index per-user untuk riwayat, saldo dan laporan kategori")
+def _per_user_indexes(conn: sqlite3.Connection):
+    # Riwayat transaksi: WHERE user_id = ? ORDER BY created_at (rowid ikut di akhir index)
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_user_created
+        ON transactions (user_id, created_at)
+    ''')
+
+    # Saldo: SUM(amount) per transaction_type, cukup dibaca dari index (covering)
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_user_type_amount
+        ON transactions (user_id, transaction_type, amount)
+    ''')
+
+    # Laporan kategori: GROUP BY category, transaction_type tanpa membaca tabel
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_user_category
+        ON transactions (user_id, category, transaction_type, amount)
+    ''')
+
+@migration(3, "Tabel ringkasan user_balances yang dijaga trigger")
+def _user_balances(conn: sqlite3.Connection):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS user_balances (
+            user_id TEXT PRIMARY KEY,
+            total_income REAL NOT NULL DEFAULT 0,
+            total_expense REAL NOT NULL DEFAULT 0,
+            transaction_count INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''')
+
+    # Trigger menjaga ringkasan di transaksi tulis yang sama dengan INSERT/DELETE
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_balance_insert
+        AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO user_balances (user_id, total_income, total_expense, transaction_count)
+            VALUES (
+                NEW.user_id,
+                CASE WHEN NEW.transaction_type = 'income' THEN NEW.amount ELSE 0 END,
+                CASE WHEN NEW.transaction_type = 'expense' THEN NEW.amount ELSE 0 END,
+                1
+            )
+            ON CONFLICT (user_id) DO UPDATE SET
+                total_income = total_income + excluded.total_income,
+                total_expense = total_expense + excluded.total_expense,
+                transaction_count = transaction_count + 1;
+        END
+    ''')
+
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_balance_delete
+        AFTER DELETE ON transactions
+        BEGIN
+            UPDATE user_balances SET
+                total_income = total_income - CASE WHEN OLD.transaction_type = 'income' THEN OLD.amount ELSE 0 END,
+                total_expense = total_expense - CASE WHEN OLD.transaction_type = 'expense' THEN OLD.amount ELSE 0 END,
+                transaction_count = transaction_count - 1
+            WHERE user_id = OLD.user_id;
+        END
+    ''')
+
+    # Isi ringkasan dari data yang sudah ada
+    conn.execute('DELETE FROM user_balances')
+    conn.execute('''
+        INSERT INTO user_balances (user_id, total_income, total_expense, transaction_count)
+        SELECT user_id,
+               COALESCE(SUM(CASE WHEN transaction_type = 'income' THEN amount END), 0),
+               COALESCE(SUM(CASE WHEN transaction_type = 'expense' THEN amount END), 0),
+               COUNT(*)
+        FROM transactions
+        GROUP BY user_id
+    ''')
+
+@migration(4, "Hapus index saldo yang sudah digantikan user_balances")
+def _drop_balance_index(conn: sqlite3.Connection):
+    # Saldo sudah dibaca dari user_balances, index ini hanya menambah biaya setiap insert
+    conn.execute('DROP INDEX IF EXISTS idx_transactions_user_type_amount')
+
+@migration(5, "Rollup bulanan per user, kategori dan tipe transaksi")
+def _monthly_rollups(conn: sqlite3.Connection):
+    # year_month dihitung dalam WIB (UTC+7) karena created_at disimpan dalam UTC
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS monthly_rollups (
+            user_id TEXT NOT NULL,
+            year_month TEXT NOT NULL,
+            category TEXT NOT NULL,
+            transaction_type TEXT NOT NULL,
+            total REAL NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, year_month, category, transaction_type)
+        ) WITHOUT ROWID
+    ''')
+
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_insert
+        AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO monthly_rollups (user_id, year_month, category, transaction_type, total, count)
+            VALUES (NEW.user_id, strftime('%Y-%m', NEW.created_at, '+7 hours'),
+                    NEW.category, NEW.transaction_type, NEW.amount, 1)
+            ON CONFLICT (user_id, year_month, category, transaction_type) DO UPDATE SET
+                total = total + excluded.total,
+                count = count + 1;
+        END
+    ''')
+
+    # Baris rollup yang sudah kosong dihapus supaya laporan tidak menampilkan kategori 0
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_delete
+        AFTER DELETE ON transactions
+        BEGIN
+            UPDATE monthly_rollups SET
+                total = total - OLD.amount,
+                count = count - 1
+            WHERE user_id = OLD.user_id
+              AND year_month = strftime('%Y-%m', OLD.created_at, '+7 hours')
+              AND category = OLD.category
+              AND transaction_type = OLD.transaction_type;
+
+            DELETE FROM monthly_rollups
+            WHERE user_id = OLD.user_id
+              AND year_month = strftime('%Y-%m', OLD.created_at, '+7 hours')
+              AND category = OLD.category
+              AND transaction_type = OLD.transaction_type
+              AND count <= 0;
+        END
+    ''')
+
+    conn.execute('DELETE FROM monthly_rollups')
+    conn.execute('''
+        INSERT INTO monthly_rollups (user_id, year_month, category, transaction_type, total, count)
+        SELECT user_id, strftime('%Y-%m', created_at, '+7 hours'), category, transaction_type,
+               SUM(amount), COUNT(*)
+        FROM transactions
+        GROUP BY 1, 2, 3, 4
+    ''')
+
+    # Laporan kategori sekarang dibaca dari rollup
+    conn.execute('DROP INDEX IF EXISTS idx_transactions_user_category')
+
+@migration(6, "Full-text search (FTS5) atas deskripsi dan kategori transaksi")
+def _transactions_fts(conn: sqlite3.Connection):
+    # External content: teks tidak disalin, FTS hanya menyimpan index-nya.
+    # user_id ikut di-index supaya pencarian per user memotong doclist, bukan
+    # mencocokkan semua user lalu difilter.
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+            user_id, description, category,
+            content = 'transactions', content_rowid = 'id',
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_insert
+        AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (rowid, user_id, description, category)
+            VALUES (NEW.id, NEW.user_id, NEW.description, NEW.category);
+        END
+    ''')
+
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_delete
+        AFTER DELETE ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (transactions_fts, rowid, user_id, description, category)
+            VALUES ('delete', OLD.id, OLD.user_id, OLD.description, OLD.category);
+        END
+    ''')
+
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_update
+        AFTER UPDATE OF user_id, description, category ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (transactions_fts, rowid, user_id, description, category)
+            VALUES ('delete', OLD.id, OLD.user_id, OLD.description, OLD.category);
+            INSERT INTO transactions_fts (rowid, user_id, description, category)
+            VALUES (NEW.id, NEW.user_id, NEW.description, NEW.category);
+        END
+    ''')
+
+    conn.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+
+# Migrasi yang menyalin data lama ke ledger sedikit demi sedikit (lihat backfill_ledger);
+# migrasi sesudahnya baru dijalankan setelah backfill selesai
+LEDGER_BACKFILL_VERSION = 7
+
+# Kolom ledger yang diisi dari satu baris transaksi lama (atau baris yang di-INSERT ke
+# view transactions). Nilai rupiah disimpan sebagai sen (INTEGER)
+LEDGER_ROW_SQL = '''
+    INSERT {verb} INTO ledger (id, user_ref, transaction_type, amount_minor, category_id, description, created_at)
+    {values}
+'''
+
+# User dan kategori (yang belum terdaftar, listed = 0) untuk baris NEW.*
+ENSURE_REFS_TRIGGER_SQL = '''
+            INSERT INTO users (user_key, username) VALUES (NEW.user_id, NEW.username)
+            ON CONFLICT (user_key) DO {username_update};
+            INSERT INTO categories (name, type, listed) VALUES (NEW.category, 'both', 0)
+            ON CONFLICT (name) DO NOTHING;
+'''
+
+# {amount}: NEW.amount (rupiah di tabel lama dan view versi 8, sen sejak versi 9) -> sen
+_LEDGER_FROM_NEW_VALUES = '''
+    VALUES (NEW.id, (SELECT id FROM users WHERE user_key = NEW.user_id), NEW.transaction_type,
+            {amount}, (SELECT id FROM categories WHERE name = NEW.category),
+            NEW.description, COALESCE(NEW.created_at, CURRENT_TIMESTAMP))
+'''
+
+LEDGER_FROM_NEW_SQL = LEDGER_ROW_SQL.format(verb='{verb}', values=_LEDGER_FROM_NEW_VALUES.format(
+    amount='CAST(ROUND(NEW.amount * 100) AS INTEGER)'))
+
+# Baris transaksi lama yang disalin per batch oleh backfill (id dipertahankan)
+BACKFILL_BATCH_SQL = LEDGER_ROW_SQL.format(verb='OR IGNORE', values='''
+    SELECT t.id, u.id, t.transaction_type, CAST(ROUND(t.amount * 100) AS INTEGER), c.id,
+           t.description, t.created_at
+    FROM transactions t
+    JOIN users u ON u.user_key = t.user_id
+    JOIN categories c ON c.name = t.category
+    WHERE t.id > ? AND t.id <= ?
+''')
+
+@migration(LEDGER_BACKFILL_VERSION, "Skema ringkas: tabel users dan ledger (sen INTEGER), disalin online dari transactions")
+def _ledger_backfill_start(conn: sqlite3.Connection):
+    # Kunci integer untuk user; username terakhir disimpan sekali per user
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            user_key TEXT UNIQUE NOT NULL,
+            username TEXT NOT NULL
+        )
+    ''')
+
+    # Nama kategori yang hanya ada di transaksi (tidak ditambahkan lewat add_category)
+    # tetap butuh id, tapi tidak ikut ditawarkan di registry kategori
+    conn.execute('ALTER TABLE categories ADD COLUMN listed INTEGER NOT NULL DEFAULT 1')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS ledger (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_ref INTEGER NOT NULL REFERENCES users (id),
+            transaction_type TEXT NOT NULL CHECK (transaction_type IN ('income', 'expense')),
+            amount_minor INTEGER NOT NULL,
+            category_id INTEGER NOT NULL REFERENCES categories (id),
+            description TEXT,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_ledger_user_created ON ledger (user_ref, created_at)')
+
+    # Selama backfill tabel transactions tetap jadi sumber kebenaran: tulisan baru
+    # dicerminkan ke ledger oleh trigger, baris lama (id <= until_id) disalin per batch
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS ledger_backfill (
+            last_id INTEGER NOT NULL,
+            until_id INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO ledger_backfill (last_id, until_id)
+        SELECT 0, COALESCE(MAX(id), 0) FROM transactions
+    ''')
+
+    # Username dari backfill diperbaiki saat cutover, jadi cukup DO NOTHING di sini
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_ledger_insert
+        AFTER INSERT ON transactions
+        BEGIN
+            {ENSURE_REFS_TRIGGER_SQL.format(username_update='NOTHING')}
+            {LEDGER_FROM_NEW_SQL.format(verb='')};
+        END
+    ''')
+
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_ledger_delete
+        AFTER DELETE ON transactions
+        BEGIN
+            DELETE FROM ledger WHERE id = OLD.id;
+        END
+    ''')
+
+def ledger_backfill_remaining(conn: sqlite3.Connection) -> int:
+    """Perkiraan jumlah baris lama yang belum disalin ke ledger, 0 jika tidak ada backfill"""
+    if get_schema_version(conn) != LEDGER_BACKFILL_VERSION:
+        return 0
+    last_id, until_id = conn.execute('SELECT last_id, until_id FROM ledger_backfill').fetchone()
+    return max(0, until_id - last_id)
+
+def backfill_ledger(conn: sqlite3.Connection, batch_size: int = None) -> int:
+    """Salin satu batch baris lama ke ledger (semua jika batch_size None), return jumlah id yang dilewati
+
+    Harus dipanggil di dalam transaksi tulis. Return 0 berarti backfill sudah selesai.
+    """
+    last_id, until_id = conn.execute('SELECT last_id, until_id FROM ledger_backfill').fetchone()
+    if last_id >= until_id:
+        return 0
+    if batch_size is not None:
+        # Batas atas batch dari id yang benar-benar ada (lewat PK, tanpa scan)
+        row = conn.execute('''
+            SELECT MAX(id) FROM (
+                SELECT id FROM transactions WHERE id > ? AND id <= ? ORDER BY id LIMIT ?
+            )
+        ''', (last_id, until_id, batch_size)).fetchone()
+        batch_end = row[0] if row[0] is not None else until_id
+    else:
+        batch_end = until_id
+
+    # Username baris terbaru di batch; yang sudah ada tidak ditimpa (diperbaiki saat cutover)
+    conn.execute('''
+        INSERT INTO users (user_key, username)
+        SELECT user_id, username FROM (
+            SELECT user_id, username, MAX(id) FROM transactions
+            WHERE id > ? AND id <= ?
+            GROUP BY user_id
+        ) WHERE true
+        ON CONFLICT (user_key) DO NOTHING
+    ''', (last_id, batch_end))
+    conn.execute('''
+        INSERT INTO categories (name, type, listed)
+        SELECT DISTINCT category, 'both', 0 FROM transactions
+        WHERE id > ? AND id <= ?
+        ON CONFLICT (name) DO NOTHING
+    ''', (last_id, batch_end))
+    conn.execute(BACKFILL_BATCH_SQL, (last_id, batch_end))
+    conn.execute('UPDATE ledger_backfill SET last_id = ?', (batch_end,))
+    return batch_end - last_id
+
+# Kolom lama yang dibentuk ulang dari ledger untuk semua pembaca (query, FTS, arsip, replica).
+# LEFT JOIN ke categories supaya query yang tidak memakai kategori melewati join-nya.
+# {amount}: rupiah (versi 8) atau sen (sejak versi 9)
+_TRANSACTIONS_VIEW_TEMPLATE = '''
+    CREATE VIEW transactions AS
+    SELECT l.id AS id, u.user_key AS user_id, u.username AS username,
+           l.transaction_type AS transaction_type, {amount} AS amount,
+           c.name AS category, l.description AS description, l.created_at AS created_at
+    FROM ledger l
+    JOIN users u ON u.id = l.user_ref
+    LEFT JOIN categories c ON c.id = l.category_id
+'''
+
+TRANSACTIONS_VIEW_SQL = _TRANSACTIONS_VIEW_TEMPLATE.format(amount='l.amount_minor / 100.0')
+
+# Nilai lama untuk trigger ledger (ringkasan dan FTS tetap memakai user_id dan nama kategori)
+_OLD_USER = '(SELECT user_key FROM users WHERE id = OLD.user_ref)'
+_OLD_CATEGORY = '(SELECT name FROM categories WHERE id = OLD.category_id)'
+
+def _view_triggers(amount: str) -> List[str]:
+    """Tulisan lewat view (replica, rebalance shard, skrip lama) diteruskan ke ledger;
+    {amount} mengubah NEW.amount menjadi sen"""
+    return [
+        f'''
+        CREATE TRIGGER trg_transactions_view_insert
+        INSTEAD OF INSERT ON transactions
+        BEGIN
+            {ENSURE_REFS_TRIGGER_SQL.format(username_update='UPDATE SET username = excluded.username')}
+            {LEDGER_ROW_SQL.format(verb='', values=_LEDGER_FROM_NEW_VALUES.format(amount=amount))};
+        END
+        ''',
+        '''
+        CREATE TRIGGER trg_transactions_view_delete
+        INSTEAD OF DELETE ON transactions
+        BEGIN
+            DELETE FROM ledger WHERE id = OLD.id;
+        END
+        ''',
+    ]
+
+def _summary_triggers(scale: str) -> List[str]:
+    """Trigger user_balances dan monthly_rollups di ledger; {scale} mengubah sen ke satuan ringkasan"""
+    return [
+        f'''
+        CREATE TRIGGER trg_transactions_balance_insert
+        AFTER INSERT ON ledger
+        BEGIN
+            INSERT INTO user_balances (user_id, total_income, total_expense, transaction_count)
+            SELECT user_key,
+                   CASE WHEN NEW.transaction_type = 'income' THEN NEW.amount_minor{scale} ELSE 0 END,
+                   CASE WHEN NEW.transaction_type = 'expense' THEN NEW.amount_minor{scale} ELSE 0 END,
+                   1
+            FROM users WHERE id = NEW.user_ref
+            ON CONFLICT (user_id) DO UPDATE SET
+                total_income = total_income + excluded.total_income,
+                total_expense = total_expense + excluded.total_expense,
+                transaction_count = transaction_count + 1;
+        END
+        ''',
+        f'''
+        CREATE TRIGGER trg_transactions_balance_delete
+        AFTER DELETE ON ledger
+        BEGIN
+            UPDATE user_balances SET
+                total_income = total_income - CASE WHEN OLD.transaction_type = 'income' THEN OLD.amount_minor{scale} ELSE 0 END,
+                total_expense = total_expense - CASE WHEN OLD.transaction_type = 'expense' THEN OLD.amount_minor{scale} ELSE 0 END,
+                transaction_count = transaction_count - 1
+            WHERE user_id = {_OLD_USER};
+        END
+        ''',
+        f'''
+        CREATE TRIGGER trg_transactions_rollup_insert
+        AFTER INSERT ON ledger
+        BEGIN
+            INSERT INTO monthly_rollups (user_id, year_month, category, transaction_type, total, count)
+            SELECT u.user_key, strftime('%Y-%m', NEW.created_at, '+7 hours'), c.name,
+                   NEW.transaction_type, NEW.amount_minor{scale}, 1
+            FROM users u, categories c
+            WHERE u.id = NEW.user_ref AND c.id = NEW.category_id
+            ON CONFLICT (user_id, year_month, category, transaction_type) DO UPDATE SET
+                total = total + excluded.total,
+                count = count + 1;
+        END
+        ''',
+        f'''
+        CREATE TRIGGER trg_transactions_rollup_delete
+        AFTER DELETE ON ledger
+        BEGIN
+            UPDATE monthly_rollups SET
+                total = total - OLD.amount_minor{scale},
+                count = count - 1
+            WHERE user_id = {_OLD_USER}
+              AND year_month = strftime('%Y-%m', OLD.created_at, '+7 hours')
+              AND category = {_OLD_CATEGORY}
+              AND transaction_type = OLD.transaction_type;
+
+            DELETE FROM monthly_rollups
+            WHERE user_id = {_OLD_USER}
+              AND year_month = strftime('%Y-%m', OLD.created_at, '+7 hours')
+              AND category = {_OLD_CATEGORY}
+              AND transaction_type = OLD.transaction_type
+              AND count <= 0;
+        END
+        ''',
+    ]
+
+LEDGER_TRIGGERS_SQL = _view_triggers('CAST(ROUND(NEW.amount * 100) AS INTEGER)') + _summary_triggers(' / 100.0') + [
+    '''
+    CREATE TRIGGER trg_transactions_fts_insert
+    AFTER INSERT ON ledger
+    BEGIN
+        INSERT INTO transactions_fts (rowid, user_id, description, category)
+        VALUES (NEW.id, (SELECT user_key FROM users WHERE id = NEW.user_ref), NEW.description,
+                (SELECT name FROM categories WHERE id = NEW.category_id));
+    END
+    ''',
+    f'''
+    CREATE TRIGGER trg_transactions_fts_delete
+    AFTER DELETE ON ledger
+    BEGIN
+        INSERT INTO transactions_fts (transactions_fts, rowid, user_id, description, category)
+        VALUES ('delete', OLD.id, {_OLD_USER}, OLD.description, {_OLD_CATEGORY});
+    END
+    ''',
+    f'''
+    CREATE TRIGGER trg_transactions_fts_update
+    AFTER UPDATE OF user_ref, description, category_id ON ledger
+    BEGIN
+        INSERT INTO transactions_fts (transactions_fts, rowid, user_id, description, category)
+        VALUES ('delete', OLD.id, {_OLD_USER}, OLD.description, {_OLD_CATEGORY});
+        INSERT INTO transactions_fts (rowid, user_id, description, category)
+        VALUES (NEW.id, (SELECT user_key FROM users WHERE id = NEW.user_ref), NEW.description,
+                (SELECT name FROM categories WHERE id = NEW.category_id));
+    END
+    ''',
+]
+
+# Nama tabel transactions lama setelah cutover sampai selesai dikosongkan
+LEGACY_TRANSACTIONS_TABLE = 'transactions_legacy'
+
+def drop_legacy_transactions(conn: sqlite3.Connection, batch_size: int = None) -> int:
+    """Hapus satu batch baris tabel lama (drop tabelnya jika kosong atau batch_size None)
+
+    Harus dipanggil di dalam transaksi tulis. Return jumlah baris yang dihapus,
+    0 berarti tabel lama sudah tidak ada.
+    """
+    if not has_legacy_transactions(conn):
+        return 0
+    if batch_size is not None:
+        deleted = conn.execute(f'''
+            DELETE FROM {LEGACY_TRANSACTIONS_TABLE}
+            WHERE id IN (SELECT id FROM {LEGACY_TRANSACTIONS_TABLE} ORDER BY id LIMIT ?)
+        ''', (batch_size,)).rowcount
+        if deleted:
+            return deleted
+    conn.execute(f'DROP TABLE {LEGACY_TRANSACTIONS_TABLE}')
+    return 0
+
+def has_legacy_transactions(conn: sqlite3.Connection) -> bool:
+    """True jika tabel transactions lama masih menunggu dikosongkan"""
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                        (LEGACY_TRANSACTIONS_TABLE,)).fetchone() is not None
+
+@migration(8, "Cutover ke ledger: transactions menjadi view, trigger ringkasan dan FTS pindah ke ledger")
+def _ledger_cutover(conn: sqlite3.Connection):
+    # Sisa backfill (semua baris jika database masih kecil dan dimigrasi saat start)
+    backfill_ledger(conn)
+
+    # Username terbaru per user dari data lama (seek index user_id, created_at)
+    conn.execute('''
+        UPDATE users SET username = COALESCE((
+            SELECT t.username FROM transactions t
+            WHERE t.user_id = users.user_key
+            ORDER BY t.created_at DESC, t.id DESC
+            LIMIT 1
+        ), username)
+    ''')
+
+    # AUTOINCREMENT: id yang pernah dipakai transactions tidak boleh dipakai ulang
+    seq = conn.execute(
+        "SELECT MAX(seq) FROM sqlite_sequence WHERE name IN ('transactions', 'ledger')").fetchone()[0]
+    if seq is not None:
+        conn.execute("DELETE FROM sqlite_sequence WHERE name = 'ledger'")
+        conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('ledger', ?)", (seq,))
+
+    # Trigger lama (ringkasan, FTS dan cermin ke ledger) dilepas. Isi user_balances,
+    # monthly_rollups dan index FTS tidak berubah: id dan nilainya sama
+    for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'transactions'").fetchall():
+        conn.execute(f'DROP TRIGGER {name}')
+    # DROP TABLE besar menahan lock tulis terlalu lama; tabel lama dikosongkan
+    # per batch setelah cutover (drop_legacy_transactions)
+    conn.execute(f'ALTER TABLE transactions RENAME TO {LEGACY_TRANSACTIONS_TABLE}')
+    conn.execute('DROP TABLE ledger_backfill')
+    conn.execute(TRANSACTIONS_VIEW_SQL)
+    for statement in LEDGER_TRIGGERS_SQL:
+        conn.execute(statement)
+
+# Ringkasan dalam sen INTEGER: SUM dan +/- di trigger selalu pas, tanpa galat REAL
+MINOR_SUMMARY_TABLES_SQL = {
+    'user_balances': '''
+        CREATE TABLE user_balances_minor (
+            user_id TEXT PRIMARY KEY,
+            total_income INTEGER NOT NULL DEFAULT 0,
+            total_expense INTEGER NOT NULL DEFAULT 0,
+            transaction_count INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''',
+    'monthly_rollups': '''
+        CREATE TABLE monthly_rollups_minor (
+            user_id TEXT NOT NULL,
+            year_month TEXT NOT NULL,
+            category TEXT NOT NULL,
+            transaction_type TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, year_month, category, transaction_type)
+        ) WITHOUT ROWID
+    ''',
+}
+
+# Trigger di ledger yang menulis tabel ringkasan (_summary_triggers)
+SUMMARY_TRIGGERS = ('trg_transactions_balance_insert', 'trg_transactions_balance_delete',
+                    'trg_transactions_rollup_insert', 'trg_transactions_rollup_delete')
+
+# Kolom uang (rupiah REAL) di setiap tabel ringkasan
+_SUMMARY_MONEY_COLUMNS = {
+    'user_balances': ('total_income', 'total_expense'),
+    'monthly_rollups': ('total',),
+}
+
+# Sejak versi ini semua jumlah uang di database dalam sen INTEGER
+MINOR_UNITS_VERSION = 9
+
+@migration(MINOR_UNITS_VERSION, "Jumlah uang dalam sen INTEGER: view transactions, user_balances dan monthly_rollups")
+def _integer_money(conn: sqlite3.Connection):
+    # Ledger sudah sen; yang masih rupiah hanya kolom amount di view dan tabel ringkasan.
+    # Trigger yang menulis ringkasan dilepas dulu supaya tabelnya bisa dibangun ulang
+    for name in SUMMARY_TRIGGERS:
+        conn.execute(f'DROP TRIGGER {name}')
+    # Trigger INSTEAD OF ikut terhapus bersama view
+    conn.execute('DROP VIEW transactions')
+
+    # Dikonversi dari nilai tersimpan (jumlah baris ringkasan, bukan transaksi), dibulatkan
+    # ke sen terdekat sehingga galat REAL yang terkumpul ikut hilang
+    for table, create_sql in MINOR_SUMMARY_TABLES_SQL.items():
+        conn.execute(create_sql)
+        columns = [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+        values = [f'CAST(ROUND({column} * 100) AS INTEGER)' if column in _SUMMARY_MONEY_COLUMNS[table]
+                  else column for column in columns]
+        conn.execute(f'INSERT INTO {table}_minor ({", ".join(columns)}) SELECT {", ".join(values)} FROM {table}')
+        conn.execute(f'DROP TABLE {table}')
+        conn.execute(f'ALTER TABLE {table}_minor RENAME TO {table}')
+
+    conn.execute(_TRANSACTIONS_VIEW_TEMPLATE.format(amount='l.amount_minor'))
+    for statement in _view_triggers('CAST(ROUND(NEW.amount) AS INTEGER)') + _summary_triggers(''):
+        conn.execute(statement)
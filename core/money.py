@@ -0,0 +1,70 @@
+"""
+Jumlah uang untuk Financial Bot
+Semua jumlah disimpan, dijumlahkan dan dikirim antar modul sebagai int sen (1/100 rupiah,
+muat di INTEGER 64-bit SQLite); teks rupiah hanya diparse/diformat di tepi (parser,
+respons, export)
+"""
+
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+# Sen per rupiah (kolom amount_minor di ledger)
+MINOR_PER_UNIT = 100
+
+# Rentang INTEGER SQLite; SUM yang melewatinya gagal ("integer overflow"), bukan membulat
+MAX_MINOR = 2 ** 63 - 1
+
+def _checked(minor: int) -> int:
+    if not -MAX_MINOR <= minor <= MAX_MINOR:
+        raise ValueError(f"Jumlah di luar rentang 64-bit: {minor}")
+    return minor
+
+def to_minor(value) -> int:
+    """Rupiah (int, Decimal, str '12500.50' atau float) -> sen, dibulatkan setengah ke atas
+
+    Float dibaca lewat repr-nya (0.1 -> 10 sen), jadi tidak ikut membawa galat biner.
+    ValueError jika bukan angka yang valid.
+    """
+    if isinstance(value, bool):
+        raise ValueError(f"Jumlah tidak valid: {value!r}")
+    if isinstance(value, int):
+        return _checked(value * MINOR_PER_UNIT)
+    try:
+        decimal = Decimal(repr(value)) if isinstance(value, float) else Decimal(value)
+    except (InvalidOperation, TypeError, ValueError):
+        raise ValueError(f"Jumlah tidak valid: {value!r}") from None
+    if not decimal.is_finite():
+        raise ValueError(f"Jumlah tidak valid: {value!r}")
+    return _checked(int((decimal * MINOR_PER_UNIT).to_integral_value(rounding=ROUND_HALF_UP)))
+
+def as_minor(value) -> int:
+    """Validasi jumlah yang sudah dalam sen: int, atau nilai bulat lain (1000.0, numpy.int64)
+
+    ValueError untuk pecahan sen, bukan angka, atau di luar rentang 64-bit.
+    """
+    if isinstance(value, bool) or isinstance(value, (str, bytes)):
+        raise ValueError(f"Jumlah sen tidak valid: {value!r}")
+    if isinstance(value, int):
+        return _checked(value)
+    try:
+        minor = int(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"Jumlah sen tidak valid: {value!r}") from None
+    if minor != value:
+        raise ValueError(f"Jumlah sen harus bulat: {value!r}")
+    return _checked(minor)
+
+def to_decimal(minor: int) -> Decimal:
+    """Sen -> Decimal rupiah dengan dua desimal (5000000 -> Decimal('50000.00'))"""
+    return Decimal(minor).scaleb(-2)
+
+def scale_minor(minor: int, numerator: int, denominator: int = 100) -> int:
+    """minor * numerator / denominator dalam sen, dibulatkan setengah menjauhi nol (tanpa float)"""
+    quotient, remainder = divmod(abs(minor) * numerator, denominator)
+    if 2 * remainder >= denominator:
+        quotient += 1
+    return quotient if minor >= 0 else -quotient
+
+def format_rupiah(minor: int) -> str:
+    """Sen -> rupiah bulat dengan pemisah ribuan ('1,250,000'), dibulatkan setengah ke atas"""
+    rupiah = scale_minor(minor, 1, MINOR_PER_UNIT)
+    return f"{rupiah:,}"
@@ -0,0 +1,115 @@
+"""
+Read replica di memori untuk Financial Bot
+Salinan :memory: dari database utama (diisi lewat backup API) untuk melayani query baca,
+diperbarui dengan menyalin baris yang sudah ter-commit di file utama
+"""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from .archive import ARCHIVE_COLUMNS
+
+# Jumlah baris per query saat menyalin hasil bulk insert ke replica
+REPLICA_COPY_CHUNK = 5000
+
+class ReadReplica:
+    """Satu koneksi :memory: yang dipakai bergantian (query di memori hanya mikrodetik)
+
+    Semua query baca ke replica berjalan satu per satu di bawah satu lock, berapa pun
+    jumlah worker executor; worker tambahan hanya membantu tulisan ke file dan
+    pekerjaan lain. Shared cache (beberapa koneksi ke satu database memori) tidak
+    dipakai: akses btree-nya tetap berurutan, dan statement baca yang belum selesai
+    mengunci tabel sehingga backup dan DDL ke replica gagal ("database table is locked").
+
+    Trigger ikut tersalin saat seeding, jadi user_balances dan monthly_rollups di
+    replica ikut diperbarui ketika baris transaksi disalin atau dihapus.
+    """
+
+    def __init__(self, attach: Dict[str, str] = None, tracer=None):
+        connect = tracer.connect if tracer else sqlite3.connect
+        self._conn = connect(':memory:', check_same_thread=False)
+        self._lock = threading.RLock()
+        # Database tambahan (arsip) tetap dibaca dari file
+        self.attach = dict(attach or {})
+        # True jika isi replica mungkin berbeda dari file utama (belum/gagal di-seed);
+        # selama itu pembaca memakai file utama
+        self.stale = True
+
+    @contextmanager
+    def connection(self):
+        """Pinjam koneksi replica (eksklusif selama blok berjalan)"""
+        with self._lock:
+            yield self._conn
+
+    def refresh(self, source: sqlite3.Connection):
+        """Salin ulang seluruh database utama dari koneksi `source` (backup API)"""
+        with self._lock:
+            self.stale = True
+            attached = {row[1] for row in self._conn.execute('PRAGMA database_list')}
+            for schema in self.attach:
+                if schema in attached:
+                    self._conn.execute(f"DETACH DATABASE {schema}")
+            source.backup(self._conn)
+            for schema, path in self.attach.items():
+                self._conn.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+            self.stale = False
+
+    def copy_transactions(self, source: sqlite3.Connection, after_id: int,
+                          until_id: Optional[int] = None) -> int:
+        """Salin baris transaksi ter-commit dengan after_id < id <= until_id dari `source`
+
+        Baca sumber dan tulis replica dilakukan di bawah lock yang sama supaya delete
+        yang ter-commit setelah baris dibaca tidak tertimpa baris lama. OR IGNORE
+        membuat baris yang sudah ada tidak dihitung dua kali oleh trigger.
+        """
+        bound = ' AND id <= :until_id' if until_id is not None else ''
+        params = {'last_id': after_id, 'until_id': until_id}
+        copied = 0
+        with self._lock:
+            try:
+                while True:
+                    rows = source.execute(f'''
+                        SELECT {ARCHIVE_COLUMNS} FROM main.transactions
+                        WHERE id > :last_id{bound}
+                        ORDER BY id
+                        LIMIT {REPLICA_COPY_CHUNK}
+                    ''', params).fetchall()
+                    if not rows:
+                        break
+                    self._conn.executemany(f'''
+                        INSERT OR IGNORE INTO main.transactions ({ARCHIVE_COLUMNS})
+                        VALUES ({",".join("?" * len(rows[0]))})
+                    ''', rows)
+                    copied += len(rows)
+                    params['last_id'] = rows[-1][0]
+                self._conn.commit()
+            except sqlite3.Error:
+                self._conn.rollback()
+                raise
+        return copied
+
+    def apply(self, statements: List[Tuple[str, Any]]):
+        """Terapkan statement tulis yang sudah ter-commit di database utama (satu transaksi)"""
+        with self._lock:
+            try:
+                # BEGIN eksplisit supaya DROP/CREATE TRIGGER ikut dalam transaksi yang sama
+                self._conn.execute('BEGIN')
+                for sql, params in statements:
+                    self._conn.execute(sql, params)
+                self._conn.commit()
+            except sqlite3.Error:
+                self._conn.rollback()
+                raise
+
+    def size_bytes(self) -> int:
+        """Ukuran database di memori (page_count * page_size)"""
+        with self._lock:
+            page_count = self._conn.execute('PRAGMA main.page_count').fetchone()[0]
+            page_size = self._conn.execute('PRAGMA main.page_size').fetchone()[0]
+            return page_count * page_size
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
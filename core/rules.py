@@ -5,7 +5,16 @@ Menangani parsing perintah dan respons yang natural dalam bahasa Indonesia
 
 import re
 from typing import Dict, List, Tuple, Optional, Any
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from .money import format_rupiah, scale_minor, to_minor
+
+# Periode dihitung dalam waktu lokal WIB lalu dikonversi ke UTC (format created_at)
+WIB = timezone(timedelta(hours=7))
+
+# Saran anggaran: peringatan jika rata-rata pengeluaran naik lebih dari 10%
+EXPENSE_TREND_ALERT = 0.10
+# ... atau satu kategori memakan lebih dari separuh pengeluaran
+DOMINANT_CATEGORY_SHARE = 0.5
 
 class ReflectionEngine:
     """Engine untuk reflection kata ganti dan transformasi kalimat"""
@@ -112,11 +121,12 @@ class FinancialRulesEngine:
             r'^(?:help|bantuan)\s+(?:dong|please|pls)$'
         ]
         
-        # Pattern untuk hapus transaksi
+        # Pattern untuk hapus transaksi: satu id atau rentang (10-20, 10 sampai 20)
+        delete_ids = r'(\d+)(?:\s*(?:-|–|s/d|sampai)\s*(\d+))?'
         self.delete_patterns = [
-            r'!delete\s+(\d+)',
-            r'(?:hapus|delete|remove)\s+(?:transaksi\s+)?(\d+)',
-            r'(?:batalkan|cancel)\s+(?:transaksi\s+)?(\d+)'
+            r'!delete\s+' + delete_ids,
+            r'(?:hapus|delete|remove)\s+(?:transaksi\s+)?' + delete_ids,
+            r'(?:batalkan|cancel)\s+(?:transaksi\s+)?' + delete_ids
         ]
         
         # Pattern untuk pertanyaan umum tentang bot
@@ -191,22 +201,37 @@ class FinancialRulesEngine:
             r'(?:can i buy)\s+(?:a\s+)?(.+?)(?:\s+(?:for|at|price)?\s*(\d+(?:,?\d+)*))?'
         ]
         
+        # Pattern untuk periode waktu, dipakai bersama laporan/saldo
+        self.period_pattern = (r'(?:\s+(?:untuk|selama|dari))?\s*\b(hari ini|kemarin|minggu ini|minggu lalu|'
+                               r'bulan ini|bulan lalu|tahun ini|tahun lalu)\b')
+        
+        # Pattern ringkasan per tipe, hanya berlaku jika ada periode (pengeluaran minggu lalu)
+        self.period_summary_patterns = [
+            r'^(?:total\s+)?(pengeluaran|pemasukan)(?:\s+(?:saya|aku))?$'
+        ]
+        
+        # Pattern pencarian transaksi: cari kopi, berapa total saya beli kopi?
+        self.search_patterns = [
+            r'^(?:!search|!cari|cari)\s+(.+?)\??$',
+            r'^berapa\s+(?:total\s+)?(?:(?:saya|aku)\s+)?(?:beli|bayar|belanja|jajan)\s+(.+?)\??$'
+        ]
+        
         self.stats_patterns = [
             r'^\s*!stats\s*$',
             r'\bstatistik\b',
             r'\bstat\b'
         ]
     
-    def parse_amount(self, amount_str: str) -> float:
-        """Parse string jumlah menjadi float"""
+    def parse_amount(self, amount_str: str) -> int:
+        """Parse string jumlah rupiah menjadi int sen ('50.000' -> 5000000), 0 jika tidak valid"""
         try:
             # Remove common separators
             cleaned = re.sub(r'[.,]', '', amount_str.replace(',', ''))
-            return float(cleaned)
+            return to_minor(int(cleaned))
         except ValueError:
-            return 0.0
+            return 0
     
-    def categorize_automatically(self, description: str, amount: float) -> str:
+    def categorize_automatically(self, description: str, amount: int) -> str:
         """Kategorisasi otomatis berdasarkan deskripsi dan jumlah"""
         description_lower = description.lower()
         
@@ -241,8 +266,8 @@ class FinancialRulesEngine:
             if any(keyword in description_lower for keyword in keywords):
                 return category
         
-        # Default based on amount
-        if amount > 1000000:  # > 1 juta, likely income
+        # Default based on amount (sen)
+        if amount > to_minor(1000000):  # > 1 juta, likely income
             return 'gaji'
         else:
             return 'lainnya'
@@ -256,6 +281,75 @@ class FinancialRulesEngine:
                 return match
         return None
     
+    def parse_period(self, text: str, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """Parse frasa periode (hari ini, bulan lalu, dll) menjadi rentang UTC [start, end)"""
+        match = re.search(self.period_pattern, text, re.IGNORECASE)
+        if not match:
+            return None
+        
+        label = match.group(1).lower()
+        now = (now or datetime.now(WIB)).astimezone(WIB)
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        
+        if label == 'hari ini':
+            start, end = today, today + timedelta(days=1)
+        elif label == 'kemarin':
+            start, end = today - timedelta(days=1), today
+        elif label.startswith('minggu'):
+            # Minggu dimulai hari Senin
+            monday = today - timedelta(days=today.weekday())
+            start, end = monday, monday + timedelta(days=7)
+            if label == 'minggu lalu':
+                start, end = monday - timedelta(days=7), monday
+        elif label.startswith('bulan'):
+            first = today.replace(day=1)
+            next_first = (first + timedelta(days=32)).replace(day=1)
+            start, end = first, next_first
+            if label == 'bulan lalu':
+                start, end = (first - timedelta(days=1)).replace(day=1), first
+        else:
+            first = today.replace(month=1, day=1)
+            start, end = first, first.replace(year=first.year + 1)
+            if label == 'tahun lalu':
+                start, end = first.replace(year=first.year - 1), first
+        
+        return {
+            'label': label,
+            'start': start.astimezone(timezone.utc).replace(tzinfo=None),
+            'end': end.astimezone(timezone.utc).replace(tzinfo=None),
+            'text': match.group(0)
+        }
+    
+    def parse_period_command(self, text: str) -> Optional[Dict[str, Any]]:
+        """Parse laporan/saldo yang dibatasi periode, misalnya 'laporan bulan ini'"""
+        period = self.parse_period(text)
+        if not period:
+            return None
+        
+        rest = re.sub(r'\s+', ' ', text.replace(period.pop('text'), ' ')).strip()
+        
+        if self.match_pattern(rest, self.report_patterns):
+            return {'type': 'report', 'period': period}
+        
+        if self.match_pattern(rest, self.balance_patterns):
+            return {'type': 'balance', 'period': period}
+        
+        match = self.match_pattern(rest, self.period_summary_patterns)
+        if match:
+            focus = 'income' if match.group(1).lower() == 'pemasukan' else 'expense'
+            return {'type': 'report', 'period': period, 'focus': focus}
+        
+        return None
+    
+    def parse_search_command(self, text: str) -> Optional[Dict[str, Any]]:
+        """Parse pencarian transaksi, misalnya 'cari kopi'"""
+        match = self.match_pattern(text, self.search_patterns)
+        if not match:
+            return None
+        
+        query = match.group(1).strip()
+        return {'type': 'search', 'query': query} if query else None
+    
     def parse_income_command(self, text: str) -> Optional[Dict[str, Any]]:
         """Parse perintah pemasukan"""
         match = self.match_pattern(text, self.income_patterns)
@@ -350,10 +444,14 @@ class FinancialRulesEngine:
         if not match:
             return None
         
-        transaction_id = int(match.group(1))
+        first_id = int(match.group(1))
+        last_id = int(match.group(2)) if match.group(2) else None
+        if last_id is not None and last_id < first_id:
+            first_id, last_id = last_id, first_id
         return {
             'type': 'delete',
-            'transaction_id': transaction_id
+            'transaction_id': first_id,
+            'last_id': last_id
         }
     
     def parse_budget_command(self, text: str) -> Optional[Dict[str, Any]]:
@@ -377,7 +475,7 @@ class FinancialRulesEngine:
         
         # Extract item name and price
         item = ""
-        price = 0.0
+        price = 0
         
         if groups[0]:
             item = groups[0].strip()
@@ -390,16 +488,16 @@ class FinancialRulesEngine:
                 # Convert all matches to numbers and pick the largest
                 numbers = []
                 for match in price_matches:
-                    numbers.append(float(match.replace(',', '')))
+                    numbers.append(to_minor(match.replace(',', '')))
                 price = max(numbers)
             except ValueError:
-                price = 0.0
+                price = 0
         
         # If groups has a second element, try to use it as price (override auto-detection)
         if len(groups) > 1 and groups[1]:
             try:
                 price_str = groups[1].replace(',', '')
-                price = float(price_str)
+                price = to_minor(price_str)
             except ValueError:
                 pass
         
@@ -461,6 +559,16 @@ class FinancialRulesEngine:
         if self.match_pattern(text, self.stats_patterns):
             return {'type': 'stats'}
         
+        # Check pencarian transaksi (cari kopi)
+        search_result = self.parse_search_command(text)
+        if search_result:
+            return search_result
+        
+        # Check laporan/saldo dengan periode (laporan bulan ini, pengeluaran minggu lalu)
+        period_result = self.parse_period_command(text)
+        if period_result:
+            return period_result
+        
         # Check report FIRST (before balance to prevent conflicts)
         if self.match_pattern(text, self.report_patterns):
             return {'type': 'report'}
@@ -557,7 +665,7 @@ class FinancialRulesEngine:
         elif command_type == 'income':
             amount = command_result['amount']
             category = command_result['category']
-            response = f"Baik! Saya telah mencatat pemasukan kamu sebesar Rp {amount:,.0f} untuk kategori '{category}'"
+            response = f"Baik! Saya telah mencatat pemasukan kamu sebesar Rp {format_rupiah(amount)} untuk kategori '{category}'"
             if command_result.get('description'):
                 response += f" dengan deskripsi '{command_result['description']}'"
             return response + "."
@@ -565,7 +673,7 @@ class FinancialRulesEngine:
         elif command_type == 'expense':
             amount = command_result['amount']
             category = command_result['category']
-            response = f"Oke! Saya sudah catat pengeluaran kamu sebesar Rp {amount:,.0f} untuk kategori '{category}'"
+            response = f"Oke! Saya sudah catat pengeluaran kamu sebesar Rp {format_rupiah(amount)} untuk kategori '{category}'"
             if command_result.get('description'):
                 response += f" dengan deskripsi '{command_result['description']}'"
             return response + "."
@@ -578,10 +686,12 @@ class FinancialRulesEngine:
                 balance = balance_info.get('balance', 0)
                 
                 status = "positif" if balance >= 0 else "negatif"
-                return (f"💰 **Ringkasan Keuangan Kamu:**\n"
-                       f"• Pemasukan: Rp {income:,.0f}\n"
-                       f"• Pengeluaran: Rp {expense:,.0f}\n"
-                       f"• Saldo: Rp {balance:,.0f} ({status})")
+                period = command_result.get('period')
+                period_text = f" ({period['label']})" if period else ""
+                return (f"💰 **Ringkasan Keuangan Kamu{period_text}:**\n"
+                       f"• Pemasukan: Rp {format_rupiah(income)}\n"
+                       f"• Pengeluaran: Rp {format_rupiah(expense)}\n"
+                       f"• Saldo: Rp {format_rupiah(balance)} ({status})")
             else:
                 return "📭 Anda belum memiliki transaksi apapun."
         
@@ -598,7 +708,9 @@ class FinancialRulesEngine:
 • `@FinancialBot !expense <jumlah> <kategori> <deskripsi>` - Catat pengeluaran  
 • `@FinancialBot !balance` - Lihat saldo
 • `@FinancialBot !report` - Laporan keuangan
-• `@FinancialBot !delete <id>` - Hapus transaksi
+• `@FinancialBot !delete <id>` - Hapus transaksi (atau rentang, mis. `hapus transaksi 10-20`)
+• `@FinancialBot laporan bulan ini` - Laporan per periode (hari ini, kemarin, minggu/bulan/tahun ini atau lalu)
+• `@FinancialBot cari <kata>` - Cari transaksi dan totalnya (mis. `cari kopi`)
 
 **Fitur Analisis Keuangan:**
 • `@FinancialBot bantuan anggaran` - Saran anggaran bulanan
@@ -664,20 +776,24 @@ Makanan, Transport, Hiburan, Belanja, Tagihan, Kesehatan, Pendidikan, Gaji, Free
         expense_percentage = (expense / income * 100) if income > 0 else 0
         available = balance
         
-        dana_darurat = income * 0.15  # 15% untuk dana darurat
-        tabungan = available * 0.30 if available > 0 else 0  # 30% dari sisa untuk tabungan
+        dana_darurat = scale_minor(income, 15)  # 15% untuk dana darurat
+        tabungan = scale_minor(available, 30) if available > 0 else 0  # 30% dari sisa untuk tabungan
         sisanya = max(0, available - dana_darurat - tabungan)
         
         # Generate simple response in Indonesian
         response = f"💰 **Ringkasan Keuangan Bulanan**:\n"
-        response += f"• **Pemasukan**: Rp {income:,.0f}\n"
-        response += f"• **Pengeluaran**: Rp {expense:,.0f}\n"
-        response += f"• **Sisa**: Rp {available:,.0f}\n\n"
+        response += f"• **Pemasukan**: Rp {format_rupiah(income)}\n"
+        response += f"• **Pengeluaran**: Rp {format_rupiah(expense)}\n"
+        response += f"• **Sisa**: Rp {format_rupiah(available)}\n\n"
+        
+        analytics = user_data.get('analytics')
+        if analytics:
+            response += self._format_analytics(analytics)
         
         response += f"📊 **Saran Penggunaan Sisa Uang**:\n"
-        response += f"• **Dana Darurat**: Rp {dana_darurat:,.0f} (15% dari gaji)\n"
-        response += f"• **Tabungan**: Rp {tabungan:,.0f} (30% dari sisa)\n"
-        response += f"• **Sisanya untuk Kamu**: Rp {sisanya:,.0f}\n\n"
+        response += f"• **Dana Darurat**: Rp {format_rupiah(dana_darurat)} (15% dari gaji)\n"
+        response += f"• **Tabungan**: Rp {format_rupiah(tabungan)} (30% dari sisa)\n"
+        response += f"• **Sisanya untuk Kamu**: Rp {format_rupiah(sisanya)}\n\n"
         
         # Simple advice based on expense ratio
         if expense_percentage > 80:
@@ -689,6 +805,10 @@ Makanan, Transport, Hiburan, Belanja, Tagihan, Kesehatan, Pendidikan, Gaji, Free
         
         # Simple actionable tips
         response += "💡 **Yang Harus Dilakukan**:\n"
+        if analytics and analytics['expense_trend'] is not None and analytics['expense_trend'] > EXPENSE_TREND_ALERT:
+            response += "• Pengeluaran lagi naik, cek lagi pengeluaran bulan ini\n"
+        if analytics and analytics['expense_shares'] and analytics['expense_shares'][0]['share'] > DOMINANT_CATEGORY_SHARE:
+            response += f"• Kategori {analytics['expense_shares'][0]['category']} makan lebih dari separuh pengeluaran, coba kurangi\n"
         if available > 0:
             response += "• Sisihkan dana darurat dulu (target 6 bulan pengeluaran)\n"
             response += "• Tabung sisanya secara rutin\n" 
@@ -700,6 +820,25 @@ Makanan, Transport, Hiburan, Belanja, Tagihan, Kesehatan, Pendidikan, Gaji, Free
         
         return response
     
+    def _format_analytics(self, analytics: Dict[str, Any]) -> str:
+        """Bagian tren bulanan, rasio tabungan dan kategori terbesar dari core.analytics"""
+        window = analytics['window']
+        response = f"📈 **Tren {window} Bulan Terakhir**:\n"
+        response += f"• **Rata-rata Pemasukan**: Rp {format_rupiah(analytics['avg_income'])} per bulan\n"
+        response += f"• **Rata-rata Pengeluaran**: Rp {format_rupiah(analytics['avg_expense'])} per bulan\n"
+        if analytics['savings_rate'] is not None:
+            response += f"• **Rasio Tabungan**: {analytics['savings_rate'] * 100:.0f}% dari pemasukan\n"
+        if analytics['expense_trend'] is not None:
+            direction = "naik" if analytics['expense_trend'] >= 0 else "turun"
+            response += (f"• Pengeluaran {direction} {abs(analytics['expense_trend']) * 100:.0f}% "
+                         f"dibanding {window} bulan sebelumnya\n")
+        
+        if analytics['expense_shares']:
+            response += "\n🏷️ **Pengeluaran Terbesar**:\n"
+            for share in analytics['expense_shares']:
+                response += f"• {share['category']}: Rp {format_rupiah(share['total'])} ({share['share'] * 100:.0f}%)\n"
+        return response + "\n"
+    
     def _generate_purchase_planning_response(self, command_result: Dict[str, Any], user_data: Dict[str, Any] = None) -> str:
         """Generate purchase planning response - Pure Indonesian & Simple"""
         item = command_result.get('item', 'barang')
@@ -707,7 +846,7 @@ Makanan, Transport, Hiburan, Belanja, Tagihan, Kesehatan, Pendidikan, Gaji, Free
         
         if not user_data or not user_data.get('balance'):
             return (f"🛍️ **Analisis Pembelian: {item.title()}**\n\n"
-                   f"**Harga**: Rp {price:,.0f}\n\n"
+                   f"**Harga**: Rp {format_rupiah(price)}\n\n"
                    "Untuk memberikan analisis yang tepat, saya perlu data keuangan kamu.\n\n"
                    "💡 **Catat dulu:**\n"
                    "• Pemasukan bulanan kamu\n"
@@ -720,9 +859,15 @@ Makanan, Transport, Hiburan, Belanja, Tagihan, Kesehatan, Pendidikan, Gaji, Free
         current_balance = balance_info.get('balance', 0)
         
         response = f"🛍️ **Analisis Beli {item.title()}**:\n\n"
-        response += f"**Harga Barang**: Rp {price:,.0f}\n"
-        response += f"**Gaji Bulanan**: Rp {income:,.0f}\n"
-        response += f"**Saldo Sekarang**: Rp {current_balance:,.0f}\n\n"
+        response += f"**Harga Barang**: Rp {format_rupiah(price)}\n"
+        response += f"**Gaji Bulanan**: Rp {format_rupiah(income)}\n"
+        response += f"**Saldo Sekarang**: Rp {format_rupiah(current_balance)}\n"
+        
+        analytics = user_data.get('analytics')
+        if analytics and analytics['savings_rate'] is not None:
+            response += (f"**Rasio Tabungan**: {analytics['savings_rate'] * 100:.0f}% "
+                         f"({analytics['window']} bulan terakhir)\n")
+        response += "\n"
         
         # Simple affordability check
         can_afford_now = current_balance >= price
@@ -733,34 +878,38 @@ Makanan, Transport, Hiburan, Belanja, Tagihan, Kesehatan, Pendidikan, Gaji, Free
             response += "✅ **Kabar Baik**: Kamu bisa beli sekarang!\n\n"
         else:
             kurang = price - current_balance
-            response += f"⚠️ **Kurang Dana**: Masih kurang Rp {kurang:,.0f}\n\n"
+            response += f"⚠️ **Kurang Dana**: Masih kurang Rp {format_rupiah(kurang)}\n\n"
         
         # Simple options
         response += "💡 **Pilihan untuk Kamu**:\n\n"
         
         if can_afford_now:
             response += "**Pilihan 1**: Beli Sekarang\n"
-            response += f"• Sisa uang setelah beli: Rp {current_balance - price:,.0f}\n"
+            response += f"• Sisa uang setelah beli: Rp {format_rupiah(current_balance - price)}\n"
             response += "• Pastikan masih ada dana darurat\n\n"
             
             if price > income:  # Expensive item
-                cheaper_option = price * 0.7
-                response += f"**Pilihan 2**: Cari yang Lebih Murah (sekitar Rp {cheaper_option:,.0f})\n"
+                cheaper_option = scale_minor(price, 70)
+                response += f"**Pilihan 2**: Cari yang Lebih Murah (sekitar Rp {format_rupiah(cheaper_option)})\n"
                 response += "• Bisa sisihkan lebih banyak untuk tabungan\n"
                 response += "• Resiko rugi lebih kecil\n\n"
         else:
             # Need to save
             kurang = price - current_balance
-            monthly_saving = max(0, income - expense)
+            # Rata-rata bergulir dari analytics, selain itu dari ringkasan saldo
+            if analytics:
+                monthly_saving = max(0, analytics['avg_income'] - analytics['avg_expense'])
+            else:
+                monthly_saving = max(0, income - expense)
             if monthly_saving > 0:
                 months_needed = kurang / monthly_saving
                 response += f"**Pilihan 1**: Nabung Dulu ({months_needed:.0f} bulan)\n"
-                response += f"• Nabung Rp {monthly_saving:,.0f} per bulan\n"
+                response += f"• Nabung Rp {format_rupiah(monthly_saving)} per bulan\n"
                 response += "• Bisa beli cash tanpa hutang\n\n"
             
             if price > income * 2:  # Very expensive
-                cheaper_option = price * 0.6
-                response += f"**Pilihan 2**: Cari Alternatif Lebih Murah (Rp {cheaper_option:,.0f})\n"
+                cheaper_option = scale_minor(price, 60)
+                response += f"**Pilihan 2**: Cari Alternatif Lebih Murah (Rp {format_rupiah(cheaper_option)})\n"
                 response += "• Lebih mudah dijangkau\n"
                 response += "• Bisa beli lebih cepat\n\n"
         
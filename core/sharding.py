@@ -0,0 +1,351 @@
+"""
+Sharding database untuk Financial Bot
+Setiap user_id diarahkan (consistent hash) ke salah satu dari N file SQLite,
+masing-masing dengan pool koneksi dan write-behind queue sendiri
+"""
+
+import bisect
+import hashlib
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .archive import archive_path_for
+from .database import DatabaseManager
+from .storage import Storage
+
+# Jumlah titik virtual per shard di ring, makin banyak makin merata
+DEFAULT_VNODES = 64
+
+# Baris bulk yang dibagi per shard sebelum dikirim (membatasi memori saat import besar)
+BULK_CHUNK_ROWS = 50000
+
+def shard_paths(db_path: str, count: int) -> List[str]:
+    """Path file shard dari path database dasar (financial_bot.db -> financial_bot.shard0.db, ...)"""
+    if count <= 1:
+        return [db_path]
+    root, ext = os.path.splitext(db_path)
+    return [f"{root}.shard{index}{ext or '.db'}" for index in range(count)]
+
+def shard_key(db_path: str) -> str:
+    """Nama shard di ring; hanya nama file supaya pindah folder tidak mengubah pemetaan"""
+    return os.path.basename(db_path)
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode('utf-8')).digest()[:8], 'big')
+
+class HashRing:
+    """Consistent hash ring: menambah/mengurangi shard hanya memindahkan sebagian kecil user"""
+
+    def __init__(self, nodes: List[str], vnodes: int = DEFAULT_VNODES):
+        if not nodes:
+            raise ValueError("HashRing membutuhkan minimal satu shard")
+
+        points = []
+        for index, node in enumerate(nodes):
+            for replica in range(vnodes):
+                points.append((_hash(f"{node}#{replica}"), index))
+        points.sort()
+
+        self.nodes = list(nodes)
+        self._hashes = [point for point, _ in points]
+        self._indexes = [index for _, index in points]
+
+    def get(self, key: str) -> int:
+        """Index shard untuk key"""
+        position = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._indexes[position]
+
+class ShardedDatabaseManager(Storage):
+    """Lapisan di depan beberapa DatabaseManager dengan API yang sama untuk query per user
+
+    Id transaksi unik per shard saja; semua operasi berbasis id selalu disertai
+    user_id sehingga diarahkan ke shard yang benar.
+    """
+
+    def __init__(self, db_paths: List[str], vnodes: int = DEFAULT_VNODES, **db_options):
+        self.db_paths = list(db_paths)
+        self.ring = HashRing([shard_key(path) for path in self.db_paths], vnodes)
+        # Tracer (jika ada) dipakai bersama semua shard
+        self.tracer = db_options.get('tracer')
+        self.shards = []
+        try:
+            for path in self.db_paths:
+                self.shards.append(DatabaseManager(path, **db_options))
+        except Exception:
+            self.close()
+            raise
+
+    def shard_for(self, user_id: str) -> DatabaseManager:
+        """DatabaseManager yang menyimpan data user ini"""
+        return self.shards[self.ring.get(user_id)]
+
+    def _map_shards(self, func: Callable[[DatabaseManager], object]) -> List:
+        """Jalankan func di semua shard secara paralel (untuk agregasi admin)"""
+        return self._run_parallel(func, self.shards)
+
+    def _run_parallel(self, func: Callable, items: List) -> List:
+        # SQLite melepas GIL selama query, jadi thread cukup untuk paralel antar file
+        if len(items) <= 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=len(items), thread_name_prefix='shard-admin') as executor:
+            return list(executor.map(func, items))
+
+    def close(self):
+        """Tutup semua shard"""
+        for shard in self.shards:
+            shard.close()
+
+    def get_schema_version(self) -> int:
+        """Versi skema terendah di antara semua shard"""
+        return min(self._map_shards(lambda shard: shard.get_schema_version()))
+
+    def add_transaction(self, user_id: str, username: str, transaction_type: str,
+                        amount: int, category: str, description: str = "") -> bool:
+        """Tambah transaksi baru"""
+        return self.shard_for(user_id).add_transaction(user_id, username, transaction_type,
+                                                       amount, category, description)
+
+    def submit_transaction(self, user_id: str, username: str, transaction_type: str,
+                           amount: int, category: str, description: str = "") -> Future:
+        """Tambah transaksi, return Future berisi id (unik di shard user tersebut)"""
+        return self.shard_for(user_id).submit_transaction(user_id, username, transaction_type,
+                                                          amount, category, description)
+
+    def flush_writes(self):
+        """Tunggu antrian write-behind semua shard ter-commit"""
+        self._map_shards(lambda shard: shard.flush_writes())
+
+    def add_transactions_bulk(self, transactions: Iterable, batch_size: int = 5000) -> Dict[str, Any]:
+        """Bulk insert yang dibagi per shard, tiap potongan di-insert paralel
+
+        Potongan shard yang error dihitung gagal (shard lain tetap masuk), error pertama
+        dilaporkan di 'error'.
+        """
+        inserted = 0
+        failed = 0
+        errors = []
+        chunk = [[] for _ in self.shards]
+        pending = 0
+
+        def flush():
+            work = [(shard, rows) for shard, rows in zip(self.shards, chunk) if rows]
+            results = self._run_parallel(
+                lambda pair: pair[0].add_transactions_bulk(pair[1], batch_size), work)
+            for rows in chunk:
+                rows.clear()
+            return results
+
+        for item in transactions:
+            shard_index = self._route_bulk_row(item)
+            if shard_index is None:
+                failed += 1
+                continue
+            chunk[shard_index].append(item)
+            pending += 1
+
+            if pending >= BULK_CHUNK_ROWS:
+                for result in flush():
+                    inserted += result['inserted']
+                    failed += result['failed']
+                    if 'error' in result:
+                        errors.append(result['error'])
+                pending = 0
+
+        if pending:
+            for result in flush():
+                inserted += result['inserted']
+                failed += result['failed']
+                if 'error' in result:
+                    errors.append(result['error'])
+
+        counts = {'inserted': inserted, 'failed': failed}
+        if errors:
+            counts['error'] = errors[0]
+        return counts
+
+    def _route_bulk_row(self, item) -> Optional[int]:
+        """Index shard untuk satu item bulk, None jika user_id tidak ada"""
+        try:
+            user_id = item['user_id'] if isinstance(item, dict) else item[0]
+        except (KeyError, IndexError, TypeError):
+            return None
+        return self.ring.get(str(user_id))
+
+    def get_user_balance(self, user_id: str, start=None, end=None) -> Dict[str, int]:
+        """Dapatkan saldo user"""
+        return self.shard_for(user_id).get_user_balance(user_id, start, end)
+
+    def get_user_transactions(self, user_id: str, limit: int = 10,
+                              start=None, end=None) -> List[Dict]:
+        """Dapatkan transaksi terakhir user"""
+        return self.shard_for(user_id).get_user_transactions(user_id, limit, start=start, end=end)
+
+    def get_transactions_page(self, user_id: str, before: Optional[int] = None,
+                              page_size: int = 10, start=None, end=None) -> List[Dict]:
+        """Dapatkan satu halaman transaksi user"""
+        return self.shard_for(user_id).get_transactions_page(user_id, before, page_size,
+                                                             start=start, end=end)
+
+    def iter_user_transactions(self, user_id: str, before: Optional[int] = None,
+                               page_size: int = 100, start=None, end=None) -> Iterator[Dict]:
+        """Iterasi seluruh riwayat transaksi user"""
+        return self.shard_for(user_id).iter_user_transactions(user_id, before, page_size,
+                                                              start=start, end=end)
+
+    def get_transaction(self, user_id: str, transaction_id: int) -> Optional[Dict]:
+        """Dapatkan satu transaksi milik user"""
+        return self.shard_for(user_id).get_transaction(user_id, transaction_id)
+
+    def last_transaction_id(self, user_id: str) -> int:
+        """Id terbesar di shard milik user"""
+        return self.shard_for(user_id).last_transaction_id(user_id)
+
+    def iter_transaction_rows(self, user_id: Optional[str] = None,
+                              chunk_size: int = 1000) -> Iterator[Tuple]:
+        """Stream transaksi satu user dari shard-nya
+
+        Semua user hanya bisa di-stream jika shard-nya satu: id transaksi unik per shard,
+        jadi gabungan beberapa shard akan berisi id yang sama dua kali (ValueError).
+        """
+        if user_id is not None:
+            return self.shard_for(user_id).iter_transaction_rows(user_id, chunk_size)
+        if len(self.shards) > 1:
+            raise ValueError("Id transaksi hanya unik per shard, stream semua user butuh user_id "
+                             f"atau satu shard (ada {len(self.shards)})")
+        return self.shards[0].iter_transaction_rows(None, chunk_size)
+
+    def get_category_report(self, user_id: str, start=None, end=None) -> Dict[str, Dict[str, int]]:
+        """Dapatkan laporan per kategori"""
+        return self.shard_for(user_id).get_category_report(user_id, start, end)
+
+    def search_transactions(self, user_id: str, query: str, limit: int = 10) -> Dict:
+        """Cari transaksi user (FTS5)"""
+        return self.shard_for(user_id).search_transactions(user_id, query, limit)
+
+    def get_monthly_summary(self, user_id: str, months: int = 12) -> List[Dict]:
+        """Dapatkan total per bulan"""
+        return self.shard_for(user_id).get_monthly_summary(user_id, months)
+
+    def get_user_snapshot(self, user_id: str, recent_limit: int = 10, start=None, end=None,
+                          months: int = 12) -> Dict[str, Any]:
+        """Ringkasan keuangan user dari satu snapshot di shard-nya"""
+        return self.shard_for(user_id).get_user_snapshot(user_id, recent_limit, start, end, months)
+
+    def get_available_categories(self, transaction_type: str = None) -> List[str]:
+        """Kategori sama di semua shard"""
+        return self.shards[0].get_available_categories(transaction_type)
+
+    @property
+    def categories(self):
+        """Registry kategori (katalog sama di semua shard)"""
+        return self.shards[0].categories
+
+    def add_category(self, name: str, category_type: str) -> bool:
+        """Tambah kategori di semua shard"""
+        return all(self._map_shards(lambda shard: shard.add_category(name, category_type)))
+
+    def delete_transactions(self, user_id: str, first_id: int,
+                            last_id: Optional[int] = None) -> List[Dict]:
+        """Hapus rentang id milik user di shard-nya"""
+        return self.shard_for(user_id).delete_transactions(user_id, first_id, last_id)
+
+    def get_totals(self) -> Dict[str, int]:
+        """Total seluruh shard (dihitung paralel)"""
+        totals = {'users': 0, 'income': 0, 'expense': 0, 'transactions': 0}
+        for shard_totals in self._map_shards(lambda shard: shard.get_totals()):
+            for key in totals:
+                totals[key] += shard_totals[key]
+        return totals
+
+    def archive_transactions(self, older_than_days: int = 365, batch_size: int = 1000,
+                             pause_seconds: float = 0.0) -> int:
+        """Arsipkan transaksi lama di semua shard (paralel, masing-masing ke arsipnya sendiri)"""
+        return sum(self._map_shards(
+            lambda shard: shard.archive_transactions(older_than_days, batch_size, pause_seconds)))
+
+    def rebuild_user_balances(self) -> int:
+        """Hitung ulang user_balances di semua shard (paralel)"""
+        return sum(self._map_shards(lambda shard: shard.rebuild_user_balances()))
+
+    def verify_user_balances(self) -> List[Dict]:
+        """Cek user_balances di semua shard (paralel)"""
+        mismatches = []
+        for shard_mismatches in self._map_shards(lambda shard: shard.verify_user_balances()):
+            mismatches.extend(shard_mismatches)
+        return mismatches
+
+def rebalance_shards(old_paths: List[str], new_paths: List[str],
+                     vnodes: int = DEFAULT_VNODES, progress: Callable[[str, str, str], None] = None) -> int:
+    """Pindahkan transaksi user yang shard-nya berubah setelah jumlah shard diganti
+
+    Jalankan saat bot berhenti. Setiap user dipindah dalam dua transaksi: salin ke
+    shard tujuan (setelah membuang salinan sisa proses sebelumnya) lalu hapus dari
+    shard asal, jadi proses yang terputus aman diulang. Id transaksi user yang
+    dipindah berubah. Shard yang punya file arsip ditolak karena transaksi arsip
+    tidak ikut dipindah. Return jumlah user yang dipindah.
+    """
+    archived = [path for path in old_paths if os.path.exists(archive_path_for(path))]
+    if archived:
+        raise ValueError("Shard dengan arsip tidak bisa di-rebalance: " + ", ".join(archived))
+
+    ring = HashRing([shard_key(path) for path in new_paths], vnodes)
+    managers = {}
+    moved = 0
+
+    def manager(path: str) -> DatabaseManager:
+        if path not in managers:
+            # Bot berhenti: migrasi diselesaikan di sini supaya semua shard dalam satuan sen
+            managers[path] = DatabaseManager(path, online_migration=False)
+        return managers[path]
+
+    try:
+        for path in new_paths:
+            manager(path)
+
+        for source_path in old_paths:
+            if not os.path.exists(source_path):
+                continue
+            source = manager(source_path)
+            with source.pool.connection() as conn:
+                users = [row[0] for row in conn.execute('SELECT DISTINCT user_id FROM transactions')]
+
+            for user_id in users:
+                target_path = new_paths[ring.get(user_id)]
+                if os.path.abspath(target_path) == os.path.abspath(source_path):
+                    continue
+                _move_user(source, manager(target_path), source_path, user_id)
+                moved += 1
+                if progress:
+                    progress(user_id, source_path, target_path)
+    finally:
+        for db in managers.values():
+            db.close()
+
+    return moved
+
+def _move_user(source: DatabaseManager, target: DatabaseManager, source_path: str, user_id: str):
+    """Salin transaksi satu user ke target lalu hapus dari source (trigger ringkasan ikut jalan)"""
+    with target.pool.connection() as conn:
+        conn.execute('ATTACH DATABASE ? AS source', (source_path,))
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM main.transactions WHERE user_id = ?', (user_id,))
+            conn.execute('''
+                INSERT INTO main.transactions
+                    (user_id, username, transaction_type, amount, category, description, created_at)
+                SELECT user_id, username, transaction_type, amount, category, description, created_at
+                FROM source.transactions
+                WHERE user_id = ?
+                ORDER BY id
+            ''', (user_id,))
+            conn.commit()
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.execute('DETACH DATABASE source')
+
+    with source.pool.connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute('DELETE FROM transactions WHERE user_id = ?', (user_id,))
+        conn.commit()
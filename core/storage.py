@@ -0,0 +1,266 @@
+"""
+Interface storage untuk Financial Bot
+Kontrak method publik yang dipakai bot, dengan implementasi SQLite (DatabaseManager)
+dan in-memory (MemoryStorage)
+"""
+
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from datetime import datetime, time, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .categories import CategoryRegistry
+from .money import as_minor
+
+# Rollup bulanan memakai WIB (UTC+7), created_at disimpan dalam UTC
+ROLLUP_TZ_MODIFIER = '+7 hours'
+ROLLUP_TZ_OFFSET = timedelta(hours=7)
+
+# Batas jumlah kata pencarian supaya ekspresi MATCH tetap kecil
+SEARCH_MAX_TERMS = 8
+
+def format_bound(value) -> Optional[str]:
+    """Batas periode (datetime UTC atau string) ke format kolom created_at"""
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return value
+
+def rollup_month_bounds(start, end) -> Optional[Tuple[Optional[str], Optional[str]]]:
+    """Bulan WIB (YYYY-MM) untuk periode yang pas di awal bulan, None jika tidak pas"""
+    months = []
+    for bound in (start, end):
+        if bound is None:
+            months.append(None)
+            continue
+        try:
+            value = bound if isinstance(bound, datetime) else datetime.strptime(bound, '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            return None
+        local = value + ROLLUP_TZ_OFFSET
+        if local.day != 1 or local.time() != time.min:
+            return None
+        months.append(local.strftime('%Y-%m'))
+    return months[0], months[1]
+
+def transaction_from_row(row: Tuple) -> Dict:
+    """Baris (kolom TRANSACTION_COLUMNS) ke dict transaksi seperti get_transaction"""
+    return {
+        'id': row[0],
+        'type': row[1],
+        'amount': row[2],
+        'category': row[3],
+        'description': row[4],
+        'date': row[5]
+    }
+
+def summarize_totals(rows: Iterable[Tuple], months: int) -> Dict[str, Any]:
+    """Ringkasan snapshot dari baris (year_month, category, transaction_type, total, count)
+
+    Return saldo, laporan kategori (urut total per kategori/tipe terbesar seperti
+    get_category_report), ringkasan `months` bulan terakhir dan jumlah transaksi.
+    """
+    balance = {'income': 0, 'expense': 0}
+    by_category = {}
+    monthly = {}
+    count = 0
+    for year_month, category, transaction_type, total, rows_in_group in rows:
+        balance[transaction_type] += total
+        key = (category, transaction_type)
+        by_category[key] = by_category.get(key, 0) + total
+        month = monthly.setdefault(year_month, {'month': year_month, 'income': 0, 'expense': 0, 'count': 0})
+        month[transaction_type] += total
+        month['count'] += rows_in_group
+        count += rows_in_group
+    balance['balance'] = balance['income'] - balance['expense']
+
+    category_report = {}
+    for (category, transaction_type), total in sorted(by_category.items(), key=lambda item: item[1], reverse=True):
+        category_report.setdefault(category, {'income': 0, 'expense': 0})[transaction_type] = total
+
+    return {
+        'balance': balance,
+        'category_report': category_report,
+        'monthly_summary': [monthly[key] for key in sorted(monthly, reverse=True)[:months]],
+        'transaction_count': count
+    }
+
+class Storage(ABC):
+    """Kontrak penyimpanan transaksi
+
+    Semua waktu (created_at, start, end) berupa string 'YYYY-MM-DD HH:MM:SS' dalam
+    UTC atau datetime UTC; periode selalu [start, end). Ringkasan bulanan memakai
+    bulan WIB (UTC+7). Semua jumlah uang (parameter maupun hasil) berupa int sen
+    (lihat core.money).
+    """
+
+    # Registry kategori, diisi oleh implementasi
+    categories: CategoryRegistry
+    # QueryTracer jika query dicatat (hanya SQLite)
+    tracer = None
+    # Path file arsip, None jika arsip tidak aktif
+    archive_path: Optional[str] = None
+
+    @abstractmethod
+    def close(self):
+        """Lepaskan semua resource; tulisan yang masih antri diselesaikan dulu"""
+
+    @abstractmethod
+    def get_schema_version(self) -> int:
+        """Versi skema data (PRAGMA user_version untuk SQLite)"""
+
+    # ---- Tulis ----
+
+    def add_transaction(self, user_id: str, username: str, transaction_type: str,
+                        amount: int, category: str, description: str = "") -> bool:
+        """Tambah transaksi baru"""
+        try:
+            self.submit_transaction(user_id, username, transaction_type,
+                                    amount, category, description).result()
+            return True
+        except Exception as e:
+            print(f"Error adding transaction: {e}")
+            return False
+
+    @abstractmethod
+    def submit_transaction(self, user_id: str, username: str, transaction_type: str,
+                           amount: int, category: str, description: str = "") -> Future:
+        """Tambah transaksi, return Future berisi id yang selesai saat data sudah durable"""
+
+    def flush_writes(self):
+        """Tunggu semua tulisan yang masih antri selesai"""
+
+    @abstractmethod
+    def add_transactions_bulk(self, transactions: Iterable, batch_size: int = 5000) -> Dict[str, Any]:
+        """Tambah banyak transaksi sekaligus, return {'inserted': n, 'failed': n}
+
+        Setiap item berupa dict dengan key seperti parameter add_transaction
+        (plus 'created_at' opsional) atau tuple dengan urutan yang sama. Jika penyimpanan
+        gagal, hasilnya berisi juga 'error' dan 'failed' hanya menghitung item yang sudah
+        dibaca dari iterable.
+        """
+
+    def delete_transaction(self, user_id: str, transaction_id: int) -> bool:
+        """Hapus transaksi milik user, False jika tidak ada"""
+        try:
+            return bool(self.delete_transactions(user_id, transaction_id))
+        except Exception as e:
+            print(f"Error deleting transaction: {e}")
+            return False
+
+    @abstractmethod
+    def delete_transactions(self, user_id: str, first_id: int,
+                            last_id: Optional[int] = None) -> List[Dict]:
+        """Hapus transaksi milik user dengan id dalam [first_id, last_id] (satu id jika
+        last_id None), return transaksi yang terhapus seperti get_transaction, urut id
+
+        Id milik user lain atau yang tidak ada dilewati. Ringkasan ikut diperbarui.
+        """
+
+    @abstractmethod
+    def add_category(self, name: str, category_type: str) -> bool:
+        """Tambah kategori baru, False jika sudah ada atau tidak valid"""
+
+    @abstractmethod
+    def archive_transactions(self, older_than_days: int = 365, batch_size: int = 1000,
+                             pause_seconds: float = 0.0) -> int:
+        """Pindahkan transaksi lama ke arsip, ValueError jika arsip tidak aktif"""
+
+    # ---- Baca ----
+
+    @abstractmethod
+    def get_user_balance(self, user_id: str, start=None, end=None) -> Dict[str, int]:
+        """Saldo user {'income', 'expense', 'balance'}, opsional dalam periode"""
+
+    @abstractmethod
+    def get_totals(self) -> Dict[str, int]:
+        """Total semua user yang punya transaksi {'users', 'income', 'expense', 'transactions'}"""
+
+    @abstractmethod
+    def get_transactions_page(self, user_id: str, before: Optional[int] = None,
+                              page_size: int = 10, start=None, end=None) -> List[Dict]:
+        """Satu halaman transaksi (terbaru dulu) sebelum transaksi `before`, [] jika `before` tidak ada"""
+
+    def get_user_transactions(self, user_id: str, limit: int = 10,
+                              start=None, end=None) -> List[Dict]:
+        """Dapatkan transaksi terakhir user, opsional dalam periode [start, end)"""
+        return self.get_transactions_page(user_id, page_size=limit, start=start, end=end)
+
+    def iter_user_transactions(self, user_id: str, before: Optional[int] = None,
+                               page_size: int = 100, start=None, end=None) -> Iterator[Dict]:
+        """Iterasi seluruh riwayat transaksi user, diambil per halaman"""
+        while True:
+            page = self.get_transactions_page(user_id, before=before, page_size=page_size,
+                                              start=start, end=end)
+            yield from page
+            if len(page) < page_size:
+                return
+            before = page[-1]['id']
+
+    @abstractmethod
+    def get_transaction(self, user_id: str, transaction_id: int) -> Optional[Dict]:
+        """Satu transaksi milik user, None jika tidak ada"""
+
+    @abstractmethod
+    def last_transaction_id(self, user_id: str) -> int:
+        """Id terbesar yang pernah dipakai di penyimpanan milik user (0 jika belum ada);
+        transaksi yang ditulis setelahnya selalu mendapat id lebih besar"""
+
+    @abstractmethod
+    def iter_transaction_rows(self, user_id: Optional[str] = None,
+                              chunk_size: int = 1000) -> Iterator[Tuple]:
+        """Stream baris lengkap (kolom ARCHIVE_COLUMNS); per user urut waktu, semua user urut id"""
+
+    @abstractmethod
+    def get_category_report(self, user_id: str, start=None, end=None) -> Dict[str, Dict[str, int]]:
+        """Total per kategori {'kategori': {'income', 'expense'}}, total terbesar dulu"""
+
+    @abstractmethod
+    def search_transactions(self, user_id: str, query: str, limit: int = 10) -> Dict:
+        """Cari berdasarkan kata di deskripsi/kategori (kata terakhir boleh prefix)"""
+
+    @abstractmethod
+    def get_monthly_summary(self, user_id: str, months: int = 12) -> List[Dict]:
+        """Total pemasukan/pengeluaran per bulan WIB (terbaru dulu)"""
+
+    @abstractmethod
+    def get_user_snapshot(self, user_id: str, recent_limit: int = 10, start=None, end=None,
+                          months: int = 12) -> Dict[str, Any]:
+        """Saldo, laporan kategori, ringkasan bulanan, jumlah dan transaksi terakhir yang konsisten"""
+
+    def get_available_categories(self, transaction_type: str = None) -> List[str]:
+        """Dapatkan daftar kategori yang tersedia (dari registry, tanpa query)"""
+        return self.categories.names(transaction_type)
+
+    # ---- Perawatan ringkasan ----
+
+    @abstractmethod
+    def rebuild_user_balances(self) -> int:
+        """Hitung ulang ringkasan saldo dari transaksi mentah, return jumlah user"""
+
+    @abstractmethod
+    def verify_user_balances(self) -> List[Dict]:
+        """Daftar user yang ringkasan saldonya tidak cocok dengan transaksi mentah"""
+
+    def _normalize_bulk_row(self, item) -> Optional[Tuple]:
+        """Ubah item bulk menjadi tuple (user_id, username, type, amount, category,
+        description, created_at), None jika tidak valid"""
+        try:
+            if isinstance(item, dict):
+                row = (item['user_id'], item['username'], item['transaction_type'],
+                       item['amount'], item['category'], item.get('description', ""),
+                       item.get('created_at'))
+            else:
+                # description dan created_at boleh tidak diisi
+                row = tuple(item)
+                if not 5 <= len(row) <= 7:
+                    return None
+                row += (None,) * (7 - len(row))
+
+            user_id, username, transaction_type, amount, category, description, created_at = row
+            if transaction_type not in ('income', 'expense') or not user_id or not username or not category:
+                return None
+
+            return (str(user_id), username, transaction_type, as_minor(amount), category,
+                    description or "", created_at)
+        except (KeyError, TypeError, ValueError):
+            return None
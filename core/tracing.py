@@ -0,0 +1,272 @@
+"""
+Tracing query SQL untuk Financial Bot
+Mencatat jumlah, total dan persentil latensi serta baris per bentuk query, dan
+menyimpan query lambat beserta EXPLAIN QUERY PLAN-nya. Yang dicatat dan di-log hanya
+bentuk query dengan placeholder, bukan nilai parameternya (user ID, nama, deskripsi)
+"""
+
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+# Jumlah latensi terakhir per bentuk query yang dipakai untuk persentil
+SAMPLE_SIZE = 1024
+
+# Jumlah query lambat terakhir yang disimpan
+SLOW_LOG_SIZE = 100
+
+# Statement yang bisa di-EXPLAIN QUERY PLAN
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'REPLACE')
+
+_WHITESPACE = re.compile(r'\s+')
+# Daftar placeholder yang panjangnya berubah-ubah (IN (?, ?, ...))
+_PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+
+def query_shape(sql: str) -> str:
+    """Bentuk query: spasi diringkas dan daftar placeholder disamakan"""
+    shape = _WHITESPACE.sub(' ', sql).strip()
+    return _PLACEHOLDER_LIST.sub('(?, ...)', shape)
+
+def _percentile(sorted_samples: List[float], fraction: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, int(round(fraction * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+class QueryStats:
+    """Statistik satu bentuk query"""
+
+    __slots__ = ('count', 'total', 'rows', 'max', 'samples')
+
+    def __init__(self, sample_size: int):
+        self.count = 0
+        self.total = 0.0
+        self.rows = 0
+        self.max = 0.0
+        self.samples = deque(maxlen=sample_size)
+
+class QueryTracer:
+    """Kumpulkan statistik query dari koneksi yang dibuat lewat `connect()`
+
+    Satu tracer boleh dipakai bersama oleh beberapa DatabaseManager (mis. semua shard).
+    """
+
+    def __init__(self, slow_query_ms: float = 100.0, sample_size: int = SAMPLE_SIZE,
+                 logger: Optional[logging.Logger] = None):
+        self.slow_query_ms = slow_query_ms
+        self.sample_size = sample_size
+        self.logger = logger or logging.getLogger('FinancialBot.sql')
+        self._stats: Dict[str, QueryStats] = {}
+        self._slow = deque(maxlen=SLOW_LOG_SIZE)
+        self._lock = threading.Lock()
+
+    def connect(self, *args, **kwargs) -> sqlite3.Connection:
+        """sqlite3.connect dengan koneksi dan cursor yang tercatat di tracer ini"""
+        conn = sqlite3.connect(*args, factory=TracedConnection, **kwargs)
+        conn.tracer = self
+        return conn
+
+    def record(self, conn: sqlite3.Connection, sql: str, params, seconds: float, rows: int,
+               explain: bool = True):
+        """Catat satu eksekusi query; query di atas ambang juga di-log, dengan EXPLAIN jika `explain`"""
+        shape = query_shape(sql)
+        with self._lock:
+            stats = self._stats.get(shape)
+            if stats is None:
+                stats = self._stats[shape] = QueryStats(self.sample_size)
+            stats.count += 1
+            stats.total += seconds
+            stats.rows += max(rows, 0)
+            stats.max = max(stats.max, seconds)
+            stats.samples.append(seconds)
+
+        elapsed_ms = seconds * 1000
+        if elapsed_ms < self.slow_query_ms:
+            return
+
+        entry = {
+            'at': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+            'ms': round(elapsed_ms, 3),
+            'rows': rows,
+            'shape': shape,
+            'plan': self._explain(conn, sql, params) if explain else [],
+        }
+        with self._lock:
+            self._slow.append(entry)
+        self.logger.warning(f"Slow query ({entry['ms']:.1f} ms, {rows} rows): {shape}\n"
+                            + "\n".join(f"    {line}" for line in entry['plan']))
+
+    def _explain(self, conn: sqlite3.Connection, sql: str, params) -> List[str]:
+        """EXPLAIN QUERY PLAN dengan cursor biasa (tidak ikut tercatat)"""
+        if not sql.lstrip().upper().startswith(EXPLAINABLE):
+            return []
+        try:
+            rows = sqlite3.Cursor(conn).execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()
+        except (sqlite3.Error, ValueError):
+            return []
+
+        # Kolom: id, parent, notused, detail; indentasi mengikuti kedalaman node
+        depth = {0: -1}
+        plan = []
+        for node_id, parent, _, detail in rows:
+            depth[node_id] = depth.get(parent, -1) + 1
+            plan.append('  ' * depth[node_id] + detail)
+        return plan
+
+    def snapshot(self) -> List[Dict]:
+        """Statistik per bentuk query, urut total waktu terbesar"""
+        with self._lock:
+            items = [(shape, stats.count, stats.total, stats.rows, stats.max, sorted(stats.samples))
+                     for shape, stats in self._stats.items()]
+
+        result = []
+        for shape, count, total, rows, longest, samples in items:
+            result.append({
+                'shape': shape,
+                'count': count,
+                'total_ms': round(total * 1000, 3),
+                'p50_ms': round(_percentile(samples, 0.50) * 1000, 3),
+                'p95_ms': round(_percentile(samples, 0.95) * 1000, 3),
+                'p99_ms': round(_percentile(samples, 0.99) * 1000, 3),
+                'max_ms': round(longest * 1000, 3),
+                'rows': rows,
+                'rows_per_query': round(rows / count, 2) if count else 0,
+            })
+        result.sort(key=lambda item: item['total_ms'], reverse=True)
+        return result
+
+    def slow_queries(self) -> List[Dict]:
+        """Query lambat terakhir (terbaru dulu)"""
+        with self._lock:
+            return list(reversed(self._slow))
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._slow.clear()
+
+    def dump(self, path: str):
+        """Tulis statistik dan query lambat ke file JSON"""
+        data = {
+            'generated_at': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+            'slow_query_ms': self.slow_query_ms,
+            'queries': self.snapshot(),
+            'slow_queries': self.slow_queries(),
+        }
+        with open(path, 'w', encoding='utf-8') as output:
+            json.dump(data, output, indent=2)
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor yang mengukur waktu execute + fetch dan menghitung baris hasil
+
+    Satu query dicatat saat hasilnya habis dibaca, saat cursor menjalankan query
+    berikutnya, ditutup, atau dibuang. Saat dibuang garbage collector (bisa di thread
+    mana saja, ketika koneksinya sudah dipakai thread lain) query tetap dihitung tapi
+    tanpa EXPLAIN.
+    """
+
+    _pending = None
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        except Exception:
+            self._pending = [sql, parameters, time.perf_counter() - start, 0]
+            self._finish()
+            raise
+        self._pending = [sql, parameters, time.perf_counter() - start, 0]
+        if self.description is None:
+            # Bukan SELECT: tidak ada baris yang dibaca, rowcount = baris yang berubah
+            self._pending[3] = self.rowcount
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        finally:
+            self._pending = [sql, (), time.perf_counter() - start, self.rowcount]
+            self._finish()
+        return self
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        if self._pending:
+            self._pending[2] += time.perf_counter() - start
+            if row is None:
+                self._finish()
+            else:
+                self._pending[3] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        start = time.perf_counter()
+        rows = super().fetchmany(size)
+        if self._pending:
+            self._pending[2] += time.perf_counter() - start
+            self._pending[3] += len(rows)
+            if len(rows) < size:
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        if self._pending:
+            self._pending[2] += time.perf_counter() - start
+            self._pending[3] += len(rows)
+            self._finish()
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            if self._pending:
+                self._pending[2] += time.perf_counter() - start
+            self._finish()
+            raise
+        if self._pending:
+            self._pending[2] += time.perf_counter() - start
+            self._pending[3] += 1
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish(explain=False)
+
+    def _finish(self, explain: bool = True):
+        pending, self._pending = self._pending, None
+        tracer = getattr(self.connection, 'tracer', None)
+        if pending and tracer:
+            tracer.record(self.connection, *pending, explain=explain)
+
+class TracedConnection(sqlite3.Connection):
+    """Koneksi yang selalu memakai TracedCursor, termasuk untuk conn.execute()"""
+
+    tracer = None
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
@@ -0,0 +1,135 @@
+"""
+Write-behind queue untuk Financial Bot
+Satu thread penulis mengambil insert/delete dari antrian dan meng-commit secara berkelompok
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple
+
+# Penanda untuk menghentikan thread penulis
+_STOP = object()
+
+class WriteOperation:
+    """Satu operasi tulis di antrian beserta Future hasilnya"""
+
+    __slots__ = ('sql', 'params', 'result_kind', 'future')
+
+    def __init__(self, sql: Optional[str], params: Tuple, result_kind: str):
+        self.sql = sql
+        self.params = params
+        # 'lastrowid', 'rowcount', 'rows' (hasil RETURNING) atau 'barrier' (tanpa SQL, untuk flush)
+        self.result_kind = result_kind
+        self.future = Future()
+
+class WriteBehindQueue:
+    """Thread penulis tunggal dengan group commit setiap N ms atau M operasi"""
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection],
+                 flush_interval_ms: float = 0.0, max_batch: int = 500):
+        # Koneksi dibuat di sini supaya error langsung terlihat oleh pemanggil
+        self._conn = connect()
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+
+        self._queue = queue.Queue()
+        self._closed = False
+        self._close_lock = threading.Lock()
+
+        # Statistik sederhana untuk benchmark dan monitoring
+        self.commits = 0
+        self.operations = 0
+
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+
+    def submit(self, sql: str, params: Tuple, result_kind: str = 'rowcount') -> Future:
+        """Masukkan operasi ke antrian, Future selesai setelah operasi ter-commit"""
+        return self._enqueue(WriteOperation(sql, params, result_kind))
+
+    def flush(self, timeout: float = None):
+        """Tunggu sampai semua operasi yang sudah masuk antrian ter-commit"""
+        self._enqueue(WriteOperation(None, (), 'barrier')).result(timeout)
+
+    def close(self, timeout: float = None):
+        """Commit sisa antrian lalu hentikan thread penulis"""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _enqueue(self, operation: WriteOperation) -> Future:
+        with self._close_lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Write-behind queue sudah ditutup")
+            self._queue.put(operation)
+        return operation.future
+
+    def _run(self):
+        conn = self._conn
+        try:
+            stopping = False
+            while not stopping:
+                first = self._queue.get()
+                if first is _STOP:
+                    break
+
+                # Kumpulkan operasi lain sampai batas waktu atau jumlah tercapai
+                batch = [first]
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        operation = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if operation is _STOP:
+                        stopping = True
+                        break
+                    batch.append(operation)
+
+                self._commit_batch(conn, batch)
+        finally:
+            conn.close()
+
+    def _commit_batch(self, conn: sqlite3.Connection, batch: List[WriteOperation]):
+        results = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for operation in batch:
+                if operation.result_kind == 'barrier':
+                    results.append((operation, None, None))
+                    continue
+                try:
+                    cursor = conn.execute(operation.sql, operation.params)
+                    if operation.result_kind == 'rows':
+                        # RETURNING baru selesai dieksekusi setelah semua barisnya diambil
+                        value = cursor.fetchall()
+                    else:
+                        value = cursor.lastrowid if operation.result_kind == 'lastrowid' else cursor.rowcount
+                    results.append((operation, value, None))
+                except sqlite3.Error as e:
+                    # Constraint error hanya membatalkan statement ini, bukan seluruh grup
+                    results.append((operation, None, e))
+            conn.commit()
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.rollback()
+            for operation in batch:
+                operation.future.set_exception(e)
+            return
+
+        self.commits += 1
+        self.operations += len(batch)
+
+        # Future baru diselesaikan setelah COMMIT, jadi datanya sudah durable
+        for operation, value, error in results:
+            if error is not None:
+                operation.future.set_exception(error)
+            else:
+                operation.future.set_result(value)
@@ -0,0 +1,283 @@
+# Financial Bot Database Tools
+# Script administrasi database (migrasi skema, dll) tanpa menjalankan bot
+
+import argparse
+import json
+import os
+import sys
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dotenv import load_dotenv
+
+from core.categories import CATEGORY_TYPES
+from core.database import DatabaseManager
+from core.export import EXPORT_FORMATS, export_transactions
+from core.importer import StatementImporter
+from core.backup import DEFAULT_BACKUP_KEEP, list_backups
+from core.maintenance import MAINTENANCE_JOBS
+from core.migrations import MIGRATIONS, latest_version
+from core.money import format_rupiah
+from core.sharding import ShardedDatabaseManager, rebalance_shards, shard_paths
+from core.tracing import QueryTracer
+
+def cmd_status(db: DatabaseManager, args) -> int:
+    """Tampilkan versi skema dan migrasi yang tersedia"""
+    current = db.get_schema_version()
+    for path in shard_paths(args.base_path, args.shards):
+        print(f"📦 Database: {path}")
+    print(f"🔢 Versi skema: {current} (terbaru: {latest_version()})")
+    for version, description, _ in MIGRATIONS:
+        mark = "✅" if version <= current else "⏳"
+        print(f"  {mark} v{version}: {description}")
+    return 0
+
+def cmd_migrate(db: DatabaseManager, args) -> int:
+    """Migrasi dijalankan otomatis saat DatabaseManager dibuat; migrasi ledger online diselesaikan di sini"""
+    for database in getattr(db, 'shards', [db]):
+        copied = database.migrate_ledger(pause_seconds=args.pause)
+        if copied:
+            print(f"🔁 {os.path.basename(database.db_path)}: {copied:,} id transaksi lama disalin ke ledger")
+    print(f"✅ Skema database sudah di versi {db.get_schema_version()}")
+    return 0
+
+def cmd_rebuild_balances(db: DatabaseManager, args) -> int:
+    """Hitung ulang tabel user_balances dari ledger transaksi"""
+    users = db.rebuild_user_balances()
+    print(f"✅ Saldo {users} user dihitung ulang dari ledger")
+    return 0
+
+def cmd_verify_balances(db: DatabaseManager, args) -> int:
+    """Cek apakah user_balances sama dengan ledger transaksi"""
+    mismatches = db.verify_user_balances()
+    if not mismatches:
+        print("✅ Semua saldo di user_balances cocok dengan ledger")
+        return 0
+
+    print(f"❌ {len(mismatches)} user tidak cocok:")
+    for item in mismatches:
+        print(f"  • {item['user_id']}: tersimpan {item['stored']} vs ledger {item['actual']}")
+    print("💡 Jalankan 'python manage_db.py rebuild-balances' untuk memperbaiki")
+    return 1
+
+def cmd_totals(db: DatabaseManager, args) -> int:
+    """Total seluruh user (semua shard dihitung paralel)"""
+    totals = db.get_totals()
+    print(f"👥 User: {totals['users']:,}")
+    print(f"📊 Transaksi: {totals['transactions']:,}")
+    print(f"💰 Pemasukan: Rp {format_rupiah(totals['income'])}")
+    print(f"💸 Pengeluaran: Rp {format_rupiah(totals['expense'])}")
+    return 0
+
+def cmd_rebalance(db: DatabaseManager, args) -> int:
+    """Pindahkan user ke shard baru setelah jumlah shard diubah (bot harus berhenti)"""
+    old_paths = shard_paths(args.base_path, args.shards)
+    new_paths = shard_paths(args.base_path, args.to)
+    # Tutup koneksi yang dibuka main() supaya shard lama bebas dipindah
+    db.close()
+
+    moved = rebalance_shards(old_paths, new_paths)
+    print(f"✅ {moved} user dipindah ke {len(new_paths)} shard")
+    obsolete = [path for path in old_paths if path not in new_paths]
+    if obsolete:
+        print("💡 Shard lama sudah kosong dan boleh dihapus: " + ", ".join(obsolete))
+    return 0
+
+def cmd_archive(db: DatabaseManager, args) -> int:
+    """Pindahkan transaksi lama ke file arsip (saldo dan laporan tidak berubah)"""
+    moved = db.archive_transactions(args.days, batch_size=args.batch_size, pause_seconds=args.pause)
+    print(f"✅ {moved:,} transaksi lebih tua dari {args.days} hari dipindah ke arsip")
+    return 0
+
+def cmd_export(db: DatabaseManager, args) -> int:
+    """Export transaksi (satu user atau semua) ke file atau stdout"""
+    if args.user is None and len(getattr(db, 'shards', [db])) > 1:
+        # Id transaksi hanya unik per shard, export semua user akan berisi id ganda
+        print("❌ Export semua user tidak didukung saat DB_SHARDS > 1, pakai --user", file=sys.stderr)
+        return 1
+    if args.output == '-':
+        count = export_transactions(db, sys.stdout, args.format, user_id=args.user)
+    else:
+        with open(args.output, 'w', newline='', encoding='utf-8') as output:
+            count = export_transactions(db, output, args.format, user_id=args.user)
+    print(f"✅ {count:,} transaksi diexport", file=sys.stderr)
+    return 0
+
+def cmd_import(db: DatabaseManager, args) -> int:
+    """Import CSV mutasi rekening untuk satu user"""
+    def report_progress(result):
+        print(f"⏳ {result['inserted']:,} baris ({result['rows_per_second']:,.0f} baris/detik)", file=sys.stderr)
+
+    importer = StatementImporter(db, skip_existing=not args.allow_duplicates)
+    with open(args.file, newline='', encoding='utf-8-sig', errors='replace') as source:
+        result = importer.import_file(source, args.user, args.username or args.user, progress=report_progress)
+    print(f"✅ {result['inserted']:,} transaksi masuk, {result['skipped']:,} sudah ada, "
+          f"{result['failed']:,} baris dilewati, "
+          f"{result['elapsed']:.1f} detik ({result['rows_per_second']:,.0f} baris/detik)")
+    if 'error' in result:
+        print(f"❌ Import berhenti karena error database: {result['error']}", file=sys.stderr)
+        return 1
+    return 0
+
+def print_query_stats(queries, slow_queries, limit: int, output=sys.stdout):
+    """Cetak statistik per bentuk query dan query lambat"""
+    print(f"{'count':>8} {'total ms':>10} {'p50':>8} {'p95':>8} {'p99':>8} {'rows/q':>8}  query", file=output)
+    for query in queries[:limit]:
+        print(f"{query['count']:>8,} {query['total_ms']:>10,.1f} {query['p50_ms']:>8.2f} {query['p95_ms']:>8.2f} "
+              f"{query['p99_ms']:>8.2f} {query['rows_per_query']:>8}  {query['shape'][:120]}", file=output)
+    for slow in slow_queries[:limit]:
+        print(f"\n🐢 {slow['at']} {slow['ms']:.1f} ms, {slow['rows']} baris: {slow['shape']}", file=output)
+        for line in slow['plan']:
+            print(f"    {line}", file=output)
+
+def cmd_query_stats(db: DatabaseManager, args) -> int:
+    """Tampilkan dump statistik query yang ditulis bot (DB_TRACE=1)"""
+    try:
+        with open(args.file, encoding='utf-8') as source:
+            data = json.load(source)
+    except FileNotFoundError:
+        print(f"❌ File {args.file} tidak ada. Jalankan bot dengan DB_TRACE=1 atau pakai !dbstats.")
+        return 1
+    print(f"Statistik query per {data['generated_at']} UTC (ambang lambat {data['slow_query_ms']} ms)")
+    print_query_stats(data['queries'], data['slow_queries'], args.limit)
+    return 0
+
+def cmd_maintenance(db: DatabaseManager, args) -> int:
+    """Jalankan job maintenance sekarang dan tampilkan ukuran database"""
+    databases = getattr(db, 'shards', [db])
+    if args.full_vacuum:
+        for database in databases:
+            database.vacuum()
+        print("✅ VACUUM penuh selesai, auto_vacuum sekarang INCREMENTAL")
+
+    for job in args.job or list(MAINTENANCE_JOBS):
+        for database in databases:
+            result = database.run_maintenance(job, args.time_budget)
+            print(f"{'✅' if result['status'] == 'ok' else '⚠️'} {job} @ {result['database']}: {result['status']}, "
+                  f"{result['duration_ms']:,.1f} ms, halaman {result['page_count_before']:,}→{result['page_count']:,}, "
+                  f"freelist {result['freelist_before']:,}→{result['freelist_count']:,}"
+                  + (f" ({result['detail']})" if result['detail'] else ""))
+
+    for database in databases:
+        stats = database.get_storage_stats()
+        print(f"📦 {stats['database']}: {stats['size_bytes']:,} byte, WAL {stats['wal_bytes']:,} byte, "
+              f"{stats['page_count']:,} halaman, {stats['freelist_count']:,} kosong, "
+              f"auto_vacuum={('NONE', 'FULL', 'INCREMENTAL')[stats['auto_vacuum']]}")
+    return 0
+
+def cmd_backup(db: DatabaseManager, args) -> int:
+    """Snapshot online (bot boleh tetap berjalan), verifikasi dan rotasi"""
+    for database in getattr(db, 'shards', [db]):
+        for result in database.backup(args.dir, keep=args.keep):
+            print(f"✅ {result['path']}: {result['bytes'] / 1048576:,.1f} MB, {result['pages']:,} halaman, "
+                  f"{result['seconds']:.2f} detik ({result['bytes_per_second'] / 1048576:,.1f} MB/s), "
+                  f"integrity ok" + (f", diulang {result['restarts']}x" if result['restarts'] else ""))
+        print(f"📦 {len(list_backups(database.db_path, args.dir))} snapshot {os.path.basename(database.db_path)} "
+              f"tersimpan di {args.dir}")
+    return 0
+
+def cmd_add_category(db: DatabaseManager, args) -> int:
+    """Tambah kategori ke tabel categories"""
+    if not db.add_category(args.name, args.type):
+        print(f"ℹ️ Kategori '{args.name}' sudah ada")
+        return 1
+    print(f"✅ Kategori '{args.name}' ({args.type}) ditambahkan")
+    # Registry kategori bot hanya dimuat ulang oleh !addcategory atau saat start
+    print("ℹ️ Bot yang sedang berjalan akan melihat kategori ini setelah restart")
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Financial Bot - administrasi database")
+    parser.add_argument('--db', default=None,
+                        help="Path database (default: DATABASE_PATH atau financial_bot.db)")
+    parser.add_argument('--shards', type=int, default=None,
+                        help="Jumlah shard saat ini (default: DB_SHARDS atau 1)")
+    parser.add_argument('--trace', action='store_true',
+                        help="Catat query perintah ini dan tampilkan statistiknya di stderr")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('status', help="Lihat versi skema dan daftar migrasi").set_defaults(func=cmd_status)
+    migrate_parser = subparsers.add_parser('migrate', help="Upgrade skema database ke versi terbaru")
+    migrate_parser.add_argument('--pause', type=float, default=0.0,
+                                help="Jeda antar batch migrasi ledger (detik) jika bot sedang berjalan")
+    migrate_parser.set_defaults(func=cmd_migrate)
+    subparsers.add_parser('rebuild-balances', help="Hitung ulang tabel user_balances").set_defaults(func=cmd_rebuild_balances)
+    subparsers.add_parser('verify-balances', help="Cek user_balances terhadap ledger").set_defaults(func=cmd_verify_balances)
+    subparsers.add_parser('totals', help="Total pemasukan/pengeluaran semua user").set_defaults(func=cmd_totals)
+
+    archive = subparsers.add_parser('archive', help="Pindahkan transaksi lama ke file arsip")
+    archive.add_argument('--days', type=int, default=365, help="Umur minimal transaksi (hari)")
+    archive.add_argument('--batch-size', type=int, default=1000, help="Baris per transaksi database")
+    archive.add_argument('--pause', type=float, default=0.0, help="Jeda antar batch (detik)")
+    archive.set_defaults(func=cmd_archive)
+
+    export = subparsers.add_parser('export', help="Export transaksi ke CSV/JSONL")
+    export.add_argument('--user', default=None, help="User ID (default: semua user)")
+    export.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+    export.add_argument('--output', default='-', help="Path file output (default: stdout)")
+    export.set_defaults(func=cmd_export)
+
+    import_parser = subparsers.add_parser('import', help="Import CSV mutasi rekening untuk satu user")
+    import_parser.add_argument('file', help="Path file CSV")
+    import_parser.add_argument('--user', required=True, help="User ID pemilik transaksi")
+    import_parser.add_argument('--username', default=None, help="Nama user (default: user ID)")
+    import_parser.add_argument('--allow-duplicates', action='store_true',
+                               help="Import juga baris yang sudah ada (default: dilewati)")
+    import_parser.set_defaults(func=cmd_import)
+
+    add_category = subparsers.add_parser('add-category', help="Tambah kategori baru")
+    add_category.add_argument('name', help="Nama kategori")
+    add_category.add_argument('--type', choices=CATEGORY_TYPES, default='expense')
+    add_category.set_defaults(func=cmd_add_category)
+
+    query_stats = subparsers.add_parser('query-stats', help="Tampilkan dump statistik query dari bot")
+    query_stats.add_argument('--file', default=os.getenv('DB_TRACE_DUMP', 'logs/query_stats.json'))
+    query_stats.add_argument('--limit', type=int, default=20, help="Jumlah bentuk query yang ditampilkan")
+    query_stats.set_defaults(func=cmd_query_stats)
+
+    maintenance = subparsers.add_parser('maintenance', help="Jalankan optimize/ANALYZE/checkpoint/incremental vacuum")
+    maintenance.add_argument('--job', action='append', choices=list(MAINTENANCE_JOBS),
+                             help="Job yang dijalankan (boleh berulang, default semua)")
+    maintenance.add_argument('--time-budget', type=float, default=30.0, help="Batas waktu per job (detik)")
+    maintenance.add_argument('--full-vacuum', action='store_true',
+                             help="VACUUM penuh dulu dan aktifkan auto_vacuum INCREMENTAL (bot harus berhenti)")
+    maintenance.set_defaults(func=cmd_maintenance)
+
+    backup = subparsers.add_parser('backup', help="Snapshot online database ke folder backup")
+    backup.add_argument('--dir', default=os.getenv('DB_BACKUP_DIR') or 'backups', help="Folder backup")
+    backup.add_argument('--keep', type=int, default=int(os.getenv('DB_BACKUP_KEEP', DEFAULT_BACKUP_KEEP)),
+                        help="Jumlah snapshot terbaru yang disimpan")
+    backup.set_defaults(func=cmd_backup)
+
+    rebalance = subparsers.add_parser('rebalance', help="Ubah jumlah shard dan pindahkan user")
+    rebalance.add_argument('--to', type=int, required=True, help="Jumlah shard baru")
+    rebalance.set_defaults(func=cmd_rebalance)
+
+    return parser
+
+def main(argv=None) -> int:
+    load_dotenv()
+    args = build_parser().parse_args(argv)
+    args.base_path = args.db or os.getenv('DATABASE_PATH', 'financial_bot.db')
+    if args.shards is None:
+        args.shards = int(os.getenv('DB_SHARDS', '1'))
+
+    # Arsip selalu di-ATTACH untuk perintah archive, selain itu otomatis jika filenya ada
+    options = {'archive': True} if args.command == 'archive' else {}
+    tracer = QueryTracer() if args.trace else None
+    if tracer:
+        options['tracer'] = tracer
+    if args.shards > 1:
+        db = ShardedDatabaseManager(shard_paths(args.base_path, args.shards), **options)
+    else:
+        db = DatabaseManager(args.base_path, **options)
+    try:
+        return args.func(db, args)
+    finally:
+        db.close()
+        if tracer:
+            print_query_stats(tracer.snapshot(), tracer.slow_queries(), 20, output=sys.stderr)
+
+if __name__ == "__main__":
+    sys.exit(main())
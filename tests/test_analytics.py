@@ -0,0 +1,101 @@
+"""
+Unit tests untuk analitik NumPy per user
+Hasil vektor dibandingkan dengan perhitungan loop biasa
+"""
+
+import os
+import random
+import sys
+import unittest
+from datetime import datetime, timedelta
+
+# Add parent directory to path untuk import
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.analytics import TransactionArrays, analyze, analyze_transactions, rolling_mean
+from core.memory_store import MemoryStorage
+from core.rules import FinancialRulesEngine
+
+def make_row(transaction_id, transaction_type, amount, category, created_at):
+    return (transaction_id, "user", "User", transaction_type, amount, category, "", created_at)
+
+class TestAnalytics(unittest.TestCase):
+    """Test deret bulanan, rata-rata bergulir, porsi kategori dan rasio tabungan"""
+
+    def test_empty(self):
+        self.assertIsNone(analyze_transactions([]))
+
+    def test_rolling_mean(self):
+        self.assertEqual(rolling_mean([3.0, 6.0, 9.0, 0.0], 3).tolist(), [3.0, 4.5, 6.0, 5.0])
+        self.assertEqual(rolling_mean([4.0], 3).tolist(), [4.0])
+
+    def test_monthly_series_uses_wib_and_fills_gaps(self):
+        result = analyze_transactions([
+            make_row(1, 'income', 1000, 'gaji', '2023-01-05 10:00:00'),
+            # 31 Januari 18:00 UTC = 1 Februari WIB
+            make_row(2, 'expense', 300, 'makanan', '2023-01-31 18:00:00'),
+            make_row(3, 'expense', 200, 'transport', '2023-04-02 10:00:00'),
+            make_row(4, 'income', 2000, 'gaji', '2023-04-10 10:00:00'),
+        ], window=2)
+        self.assertEqual(result['months'], ['2023-01', '2023-02', '2023-03', '2023-04'])
+        self.assertEqual(result['income'], [1000, 0, 0, 2000])
+        self.assertEqual(result['expense'], [0, 300, 0, 200])
+        self.assertEqual(result['count'], [1, 1, 0, 2])
+        self.assertEqual(result['savings_rates'], [1.0, None, None, 0.9])
+        self.assertEqual((result['avg_income'], result['avg_expense']), (1000, 100))
+        self.assertAlmostEqual(result['savings_rate'], 0.9)
+        self.assertAlmostEqual(result['expense_trend'], -1 / 3)
+        self.assertEqual(result['expense_shares'], [{'category': 'transport', 'total': 200, 'share': 1.0}])
+
+    def test_matches_loop_version(self):
+        """Hasil vektor sama dengan hitungan per baris pakai dict"""
+        rng = random.Random(3)
+        base = datetime(2022, 1, 1)
+        rows = [make_row(i, rng.choice(('income', 'expense')), rng.randint(1, 1000) * 100,
+                         rng.choice(('makanan', 'transport', 'gaji', 'hiburan')),
+                         (base + timedelta(minutes=rng.randrange(700 * 24 * 60))).strftime('%Y-%m-%d %H:%M:%S'))
+                for i in range(2000)]
+        result = analyze(TransactionArrays.from_rows(rows), window=3, top=10)
+
+        months = {}
+        for row in rows:
+            local = datetime.strptime(row[7], '%Y-%m-%d %H:%M:%S') + timedelta(hours=7)
+            month = months.setdefault(local.strftime('%Y-%m'), {'income': 0.0, 'expense': 0.0})
+            month[row[3]] += row[4]
+        for label, income, expense in zip(result['months'], result['income'], result['expense']):
+            self.assertAlmostEqual(income, months.get(label, {'income': 0})['income'])
+            self.assertAlmostEqual(expense, months.get(label, {'expense': 0})['expense'])
+
+        recent = set(result['months'][-3:])
+        totals = {}
+        for row in rows:
+            local = datetime.strptime(row[7], '%Y-%m-%d %H:%M:%S') + timedelta(hours=7)
+            if row[3] == 'expense' and local.strftime('%Y-%m') in recent:
+                totals[row[5]] = totals.get(row[5], 0) + row[4]
+        self.assertEqual([share['category'] for share in result['expense_shares']],
+                         sorted(totals, key=totals.get, reverse=True))
+        for share in result['expense_shares']:
+            self.assertAlmostEqual(share['share'], totals[share['category']] / sum(totals.values()))
+
+    def test_budget_advice_uses_analytics(self):
+        db = MemoryStorage()
+        db.add_transactions_bulk([
+            ("user", "User", 'income', 600000000, 'gaji', 'gaji', f"2024-{month:02d}-01 03:00:00") for month in range(1, 7)
+        ] + [
+            ("user", "User", 'expense', 100000000 * (1 if month <= 3 else 2), 'makanan', 'makan',
+             f"2024-{month:02d}-10 03:00:00") for month in range(1, 7)
+        ])
+        analytics = analyze_transactions(db.iter_transaction_rows("user"), window=3)
+        self.assertAlmostEqual(analytics['expense_trend'], 1.0)
+
+        response = FinancialRulesEngine()._generate_budget_advice_response({
+            'balance': {'income': analytics['avg_income'], 'expense': analytics['avg_expense'], 'balance': 3000000000},
+            'analytics': analytics,
+        })
+        self.assertIn("Tren 3 Bulan Terakhir", response)
+        self.assertIn("Rasio Tabungan**: 67%", response)
+        self.assertIn("naik 100%", response)
+        self.assertIn("makanan: Rp 6,000,000 (100%)", response)
+
+if __name__ == '__main__':
+    unittest.main()
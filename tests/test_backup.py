@@ -0,0 +1,151 @@
+"""
+Unit tests untuk backup online (backup API SQLite, integrity_check, rotasi)
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+# Add parent directory to path untuk import
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import database
+from core.backup import backup_database, list_backups
+from core.database import DatabaseManager
+from core.maintenance import MaintenanceScheduler
+
+class TestBackup(unittest.TestCase):
+    """Test snapshot, verifikasi dan rotasi backup"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'bot.db')
+        self.backup_dir = os.path.join(self.temp_dir, 'backups')
+        self.db = DatabaseManager(self.db_path, backup_dir=self.backup_dir, backup_keep=2)
+        self.db.add_transactions_bulk([("user", "User", 'income' if i % 3 == 0 else 'expense', 1000 + i,
+                                        'makanan', f"kopi {i}", f"2023-{1 + i % 12:02d}-01 10:00:00")
+                                       for i in range(3000)])
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_snapshot_is_standalone_copy(self):
+        result = self.db.backup(stamp='20240101-000000')[0]
+        self.assertEqual(result['path'], os.path.join(self.backup_dir, 'bot.20240101-000000.db'))
+        self.assertGreater(result['bytes_per_second'], 0)
+        self.assertEqual(os.listdir(self.backup_dir), ['bot.20240101-000000.db'])
+
+        snapshot = DatabaseManager(result['path'])
+        try:
+            self.assertEqual(snapshot.get_user_balance("user"), self.db.get_user_balance("user"))
+            self.assertEqual(snapshot.search_transactions("user", "kopi")['count'], 3000)
+        finally:
+            snapshot.close()
+
+    def test_rotation_keeps_newest(self):
+        for stamp in ('20240101-000000', '20240102-000000', '20240103-000000'):
+            self.db.backup(stamp=stamp)
+        self.assertEqual([os.path.basename(path) for path in list_backups(self.db_path, self.backup_dir)],
+                         ['bot.20240103-000000.db', 'bot.20240102-000000.db'])
+
+    def test_archive_is_backed_up(self):
+        self.db.close()
+        self.db = DatabaseManager(self.db_path, archive=True, backup_dir=self.backup_dir)
+        self.db.archive_transactions(older_than_days=30)
+        results = self.db.backup(stamp='20240101-000000')
+        self.assertEqual([os.path.basename(result['path']) for result in results],
+                         ['bot.20240101-000000.db', 'bot.archive.20240101-000000.db'])
+        with sqlite3.connect(results[1]['path']) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0], 3000)
+
+    def test_archive_snapshot_matches_main(self):
+        """Transaksi yang dipindah ke arsip di tengah backup tidak tercatat dua kali"""
+        self.db.close()
+        self.db = DatabaseManager(self.db_path, archive=True, backup_dir=self.backup_dir)
+        copied = []
+
+        def copy_then_archive(source, target_path, schema='main'):
+            result = backup_database(source, target_path, schema)
+            copied.append(schema)
+            if len(copied) == 1:
+                # Setelah file utama disalin, thread lain memindahkan semua transaksi ke arsip
+                moved = []
+                thread = threading.Thread(
+                    target=lambda: moved.append(self.db.archive_transactions(older_than_days=30)))
+                thread.start()
+                thread.join()
+                self.assertEqual(moved, [3000])
+            return result
+
+        with mock.patch.object(database, 'backup_database', side_effect=copy_then_archive):
+            main, archive = self.db.backup(stamp='20240101-000000')
+        self.assertEqual(copied, ['main', 'archive'])
+
+        with sqlite3.connect(main['path']) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0], 3000)
+        with sqlite3.connect(archive['path']) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0], 0)
+
+    def test_consistent_while_writing(self):
+        """Tulisan dari koneksi lain selama backup bertahap tidak merusak snapshot"""
+        stop = threading.Event()
+
+        def writer():
+            while not stop.is_set():
+                self.db.add_transaction("user", "User", 'expense', 10, 'makanan', 'kopi')
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            with self.db.pool.connection() as conn:
+                result = backup_database(conn, os.path.join(self.temp_dir, 'snapshot.db'), pages=8,
+                                         step_sleep=0.001, max_restarts=2)
+        finally:
+            stop.set()
+            thread.join()
+
+        self.assertGreater(result['pages'], 0)
+        snapshot = DatabaseManager(os.path.join(self.temp_dir, 'snapshot.db'))
+        try:
+            self.assertEqual(snapshot.verify_user_balances(), [])
+        finally:
+            snapshot.close()
+
+    def test_backup_job(self):
+        scheduler = MaintenanceScheduler([self.db], intervals={'backup': 3600})
+        try:
+            result = scheduler.run_now()[0]
+        finally:
+            scheduler.close()
+        self.assertEqual((result['job'], result['status'], result['database']), ('backup', 'ok', 'bot.db'))
+        self.assertIn("MB/s, integrity ok", result['detail'])
+        self.assertEqual(len(list_backups(self.db_path, self.backup_dir)), 1)
+        self.assertEqual(result['page_count'], result['page_count_before'])
+
+        # Ukuran sesudah diambil setelah backup, jadi tulisan selama snapshot ikut terhitung
+        backup = self.db.backup
+
+        def backup_with_writes(*args, **kwargs):
+            self.db.add_transactions_bulk([("user9", "User9", 'expense', 1000, 'makanan', 'x' * 200,
+                                            '2024-03-01 10:00:00')] * 500)
+            return backup(*args, **kwargs)
+
+        with mock.patch.object(self.db, 'backup', side_effect=backup_with_writes):
+            result = self.db.run_maintenance('backup')
+        self.assertEqual(result['status'], 'ok')
+        self.assertGreater(result['page_count'], result['page_count_before'])
+
+        no_dir = DatabaseManager(os.path.join(self.temp_dir, 'other.db'))
+        try:
+            self.assertEqual(no_dir.run_maintenance('backup')['status'], 'error')
+        finally:
+            no_dir.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+Unit tests untuk registry kategori
+"""
+
+import unittest
+import os
+import tempfile
+import shutil
+import sys
+
+# Add parent directory to path untuk import
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.categories import CategoryRegistry
+from core.database import DatabaseManager
+from core.sharding import ShardedDatabaseManager, shard_paths
+from core.tracing import QueryTracer
+
+class TestCategoryRegistry(unittest.TestCase):
+    """Test lookup kategori di memori"""
+
+    def test_lookup_is_case_insensitive(self):
+        """Nama dicocokkan tanpa membedakan huruf besar/kecil"""
+        registry = CategoryRegistry([('Makanan', 'expense'), ('Gaji', 'income'), ('Lainnya', 'both')])
+
+        self.assertEqual(registry.type_of('makanan'), 'expense')
+        self.assertEqual(registry.type_of(' GAJI '), 'income')
+        self.assertIsNone(registry.type_of('ortu'))
+        self.assertIn('lainnya', registry)
+        self.assertEqual(len(registry), 3)
+
+    def test_accepts_and_names_per_type(self):
+        """Kategori 'both' berlaku untuk kedua tipe"""
+        registry = CategoryRegistry([('Makanan', 'expense'), ('Gaji', 'income'), ('Lainnya', 'both')])
+
+        self.assertTrue(registry.accepts('gaji', 'income'))
+        self.assertFalse(registry.accepts('gaji', 'expense'))
+        self.assertTrue(registry.accepts('lainnya', 'expense'))
+        self.assertEqual(registry.names('income'), ['Gaji', 'Lainnya'])
+        self.assertEqual(registry.names(), ['Gaji', 'Lainnya', 'Makanan'])
+
+class TestCategoryCatalogue(unittest.TestCase):
+    """Test registry kategori di DatabaseManager"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'bot.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _category_queries(self, tracer):
+        return sum(query['count'] for query in tracer.snapshot() if 'FROM categories' in query['shape'])
+
+    def test_categories_served_without_queries(self):
+        """Daftar kategori dibaca dari registry setelah dimuat sekali saat start"""
+        tracer = QueryTracer()
+        db = DatabaseManager(self.db_path, tracer=tracer)
+        try:
+            loaded = self._category_queries(tracer)
+            for _ in range(10):
+                self.assertIn('Makanan', db.get_available_categories('expense'))
+                self.assertNotIn('Gaji', db.get_available_categories('expense'))
+            self.assertEqual(len(db.get_available_categories()), 12)
+            self.assertEqual(self._category_queries(tracer), loaded)
+        finally:
+            db.close()
+
+    def test_add_category_refreshes_registry(self):
+        """Kategori baru langsung terlihat, duplikat (beda huruf) ditolak"""
+        db = DatabaseManager(self.db_path, read_replica=True)
+        try:
+            self.assertTrue(db.add_category('Peliharaan', 'expense'))
+            self.assertFalse(db.add_category('peliharaan', 'expense'))
+            self.assertFalse(db.add_category('Sedekah', 'hibah'))
+            self.assertEqual(db.categories.type_of('peliharaan'), 'expense')
+            self.assertIn('Peliharaan', db.get_available_categories('expense'))
+        finally:
+            db.close()
+
+        # Tersimpan di database, terlihat saat dibuka ulang
+        db = DatabaseManager(self.db_path)
+        try:
+            self.assertIn('Peliharaan', db.get_available_categories('expense'))
+        finally:
+            db.close()
+
+    def test_add_category_on_all_shards(self):
+        """Kategori baru ditulis ke semua shard"""
+        db = ShardedDatabaseManager(shard_paths(self.db_path, 3))
+        try:
+            self.assertTrue(db.add_category('Donasi', 'expense'))
+            for shard in db.shards:
+                self.assertEqual(shard.categories.type_of('donasi'), 'expense')
+            self.assertIn('Donasi', db.get_available_categories('expense'))
+        finally:
+            db.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,11 +8,16 @@ import os
 import tempfile
 import sys
 import gc
+import sqlite3
+import threading
+import shutil
+from datetime import datetime
+from unittest import mock
 
 # Add parent directory to path untuk import
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from core.database import DatabaseManager
+from core.database import ARCHIVE_DELETE_SQL, LEDGER_DELETE_SQL, DatabaseManager, ConnectionPool
 
 class TestDatabaseManager(unittest.TestCase):
     """Test Database Manager functionality"""
@@ -231,6 +236,692 @@ class TestDatabaseManager(unittest.TestCase):
         
         self.assertEqual(balance2['income'], 0)
         self.assertEqual(balance2['expense'], 50000)
+    
+    def test_balance_summary_follows_insert_and_delete(self):
+        """Tabel user_balances ikut berubah saat insert dan delete"""
+        self.db.add_transaction(self.test_user_id, self.test_username, 'income', 1000000, 'gaji', 'salary')
+        self.db.add_transaction(self.test_user_id, self.test_username, 'expense', 250000, 'makanan', 'food')
+        
+        expense = [t for t in self.db.get_user_transactions(self.test_user_id) if t['type'] == 'expense'][0]
+        self.db.delete_transaction(self.test_user_id, expense['id'])
+        
+        self.assertEqual(self.db.verify_user_balances(), [])
+        balance = self.db.get_user_balance(self.test_user_id)
+        self.assertEqual(balance['income'], 1000000)
+        self.assertEqual(balance['expense'], 0)
+    
+    def test_rebuild_and_verify_user_balances(self):
+        """Verify mendeteksi ringkasan yang rusak dan rebuild memperbaikinya"""
+        self.db.add_transaction(self.test_user_id, self.test_username, 'income', 1000000, 'gaji', 'salary')
+        self.db.add_transaction("user2", "User2", 'expense', 50000, 'makanan', 'food')
+        
+        with self.db.pool.connection() as conn:
+            conn.execute("UPDATE user_balances SET total_income = 1 WHERE user_id = ?", (self.test_user_id,))
+            conn.execute("INSERT INTO user_balances VALUES ('ghost', 10, 0, 1)")
+            conn.commit()
+        
+        mismatches = {item['user_id'] for item in self.db.verify_user_balances()}
+        self.assertEqual(mismatches, {self.test_user_id, 'ghost'})
+        
+        self.assertEqual(self.db.rebuild_user_balances(), 2)
+        self.assertEqual(self.db.verify_user_balances(), [])
+        self.assertEqual(self.db.get_user_balance(self.test_user_id)['income'], 1000000)
+    
+    def test_bulk_insert(self):
+        """Test bulk insert dari generator dengan batch kecil"""
+        rows = (
+            (self.test_user_id, self.test_username, 'income' if i % 2 == 0 else 'expense', 1000, 'gaji', f"row {i}")
+            for i in range(25)
+        )
+        result = self.db.add_transactions_bulk(rows, batch_size=10)
+        
+        self.assertEqual(result, {'inserted': 25, 'failed': 0})
+        balance = self.db.get_user_balance(self.test_user_id)
+        self.assertEqual(balance['income'], 13000)
+        self.assertEqual(balance['expense'], 12000)
+        self.assertEqual(self.db.verify_user_balances(), [])
+    
+    def test_bulk_insert_counts_failed_rows(self):
+        """Baris tidak valid dihitung gagal tanpa membatalkan baris lain"""
+        rows = [
+            {'user_id': self.test_user_id, 'username': self.test_username, 'transaction_type': 'income',
+             'amount': 500000, 'category': 'gaji', 'created_at': '2024-01-15 08:00:00'},
+            (self.test_user_id, self.test_username, 'invalid_type', 1000, 'gaji'),
+            (self.test_user_id, self.test_username, 'expense', 'bukan angka', 'makanan'),
+            (self.test_user_id, self.test_username, 'expense'),
+            (self.test_user_id, self.test_username, 'expense', 20000, 'makanan'),
+        ]
+        result = self.db.add_transactions_bulk(rows)
+        
+        self.assertEqual(result, {'inserted': 2, 'failed': 3})
+        self.assertEqual(self.db.get_user_balance(self.test_user_id)['balance'], 480000)
+        
+        dates = [t['date'] for t in self.db.get_user_transactions(self.test_user_id)]
+        self.assertIn('2024-01-15 08:00:00', dates)
+    
+    def test_bulk_insert_database_error(self):
+        """Error database membatalkan semua batch dan melaporkan item yang sudah dibaca"""
+        rows = ((self.test_user_id, self.test_username, 'expense', 1000 + i, 'makanan') for i in range(25))
+        original = self.db._insert_batch
+        calls = []
+        
+        def failing_batch(cursor, sql, batch):
+            calls.append(len(batch))
+            if len(calls) == 2:
+                raise sqlite3.OperationalError("disk I/O error")
+            return original(cursor, sql, batch)
+        
+        with mock.patch.object(self.db, '_insert_batch', side_effect=failing_batch), \
+                self.assertLogs('FinancialBot.database', 'ERROR'):
+            result = self.db.add_transactions_bulk(rows, batch_size=10)
+        
+        # 20 item terbaca, 5 sisanya belum dibaca dari generator
+        self.assertEqual(result, {'inserted': 0, 'failed': 20, 'error': 'disk I/O error'})
+        self.assertEqual(self.db.get_user_transactions(self.test_user_id), [])
+        self.assertEqual(self.db.verify_user_balances(), [])
+    
+    def test_bulk_insert_keeps_balance_trigger(self):
+        """Trigger saldo aktif lagi setelah bulk insert selesai"""
+        self.db.add_transactions_bulk([(self.test_user_id, self.test_username, 'income', 1000, 'gaji')])
+        self.db.add_transaction(self.test_user_id, self.test_username, 'income', 2000, 'gaji')
+        
+        self.assertEqual(self.db.get_user_balance(self.test_user_id)['income'], 3000)
+        self.assertEqual(self.db.verify_user_balances(), [])
+
+    def test_monthly_summary_from_rollups(self):
+        """Rollup bulanan memakai bulan WIB dan ikut bulk insert"""
+        rows = [
+            (self.test_user_id, self.test_username, 'income', 5000000, 'gaji', 'jan', '2024-01-05 02:00:00'),
+            (self.test_user_id, self.test_username, 'expense', 100000, 'makanan', 'jan', '2024-01-20 12:00:00'),
+            # 31 Jan 20:00 UTC sudah 1 Feb di WIB
+            (self.test_user_id, self.test_username, 'expense', 40000, 'makanan', 'feb', '2024-01-31 20:00:00'),
+        ]
+        self.db.add_transactions_bulk(rows)
+        self.db.add_transaction(self.test_user_id, self.test_username, 'expense', 10000, 'makanan', 'lagi')
+        
+        summary = self.db.get_monthly_summary(self.test_user_id)
+        months = [m['month'] for m in summary]
+        self.assertEqual(months[-2:], ['2024-02', '2024-01'])
+        self.assertEqual(summary[-1], {'month': '2024-01', 'income': 5000000, 'expense': 100000, 'count': 2})
+        self.assertEqual(summary[-2]['expense'], 40000)
+        self.assertEqual(summary[0]['expense'], 10000)
+        self.assertEqual(self.db.get_category_report(self.test_user_id)['makanan']['expense'], 150000)
+    
+    def test_rollup_row_removed_when_empty(self):
+        """Delete transaksi terakhir di satu kategori menghapus baris rollup"""
+        self.db.add_transaction(self.test_user_id, self.test_username, 'income', 1000000, 'gaji', 'salary')
+        self.db.add_transaction(self.test_user_id, self.test_username, 'expense', 250000, 'makanan', 'food')
+        
+        expense = [t for t in self.db.get_user_transactions(self.test_user_id) if t['type'] == 'expense'][0]
+        self.db.delete_transaction(self.test_user_id, expense['id'])
+        
+        report = self.db.get_category_report(self.test_user_id)
+        self.assertNotIn('makanan', report)
+        self.assertEqual(report['gaji']['income'], 1000000)
+
+    def test_keyset_pagination(self):
+        """Halaman transaksi berurutan tanpa duplikat, termasuk created_at yang sama"""
+        rows = [(self.test_user_id, self.test_username, 'expense', 1000 + i, 'makanan', f"row {i}",
+                 '2024-01-01 10:00:00' if i < 10 else f'2024-01-{i:02d} 10:00:00')
+                for i in range(25)]
+        self.db.add_transactions_bulk(rows)
+        self.db.add_transaction("user2", "User2", 'expense', 5000, 'makanan', 'lain')
+        
+        first = self.db.get_transactions_page(self.test_user_id, page_size=10)
+        second = self.db.get_transactions_page(self.test_user_id, before=first[-1]['id'], page_size=10)
+        self.assertEqual(len(first), 10)
+        self.assertEqual(first[0]['description'], 'row 24')
+        self.assertEqual(second[0]['description'], 'row 14')
+        
+        walked = list(self.db.iter_user_transactions(self.test_user_id, page_size=7))
+        self.assertEqual(len(walked), 25)
+        self.assertEqual(len({t['id'] for t in walked}), 25)
+        self.assertEqual([t['id'] for t in walked[:20]], [t['id'] for t in first + second])
+        
+        # Cursor milik user lain tidak membocorkan data
+        other = self.db.get_user_transactions("user2")[0]['id']
+        self.assertEqual(self.db.get_transactions_page(self.test_user_id, before=other), [])
+    
+    def test_get_transaction(self):
+        """Ambil satu transaksi berdasarkan id dan pemilik"""
+        self.db.add_transaction(self.test_user_id, self.test_username, 'income', 1000000, 'gaji', 'salary')
+        trans_id = self.db.get_user_transactions(self.test_user_id)[0]['id']
+        
+        self.assertEqual(self.db.get_transaction(self.test_user_id, trans_id)['amount'], 1000000)
+        self.assertIsNone(self.db.get_transaction("user2", trans_id))
+
+    def test_date_range_queries(self):
+        """Saldo, daftar transaksi dan laporan dibatasi periode created_at"""
+        rows = [
+            (self.test_user_id, self.test_username, 'income', 5000000, 'gaji', 'jan', '2024-01-05 02:00:00'),
+            (self.test_user_id, self.test_username, 'expense', 100000, 'makanan', 'jan', '2024-01-20 12:00:00'),
+            (self.test_user_id, self.test_username, 'expense', 40000, 'transport', 'feb', '2024-02-03 08:00:00'),
+            (self.test_user_id, self.test_username, 'expense', 60000, 'makanan', 'feb', '2024-02-10 08:00:00'),
+        ]
+        self.db.add_transactions_bulk(rows)
+        
+        # Bulan Februari WIB (pas per bulan, dibaca dari rollup)
+        feb = (datetime(2024, 1, 31, 17), datetime(2024, 2, 29, 17))
+        self.assertEqual(self.db.get_user_balance(self.test_user_id, *feb),
+                         {'income': 0, 'expense': 100000, 'balance': -100000})
+        self.assertEqual(self.db.get_category_report(self.test_user_id, *feb),
+                         {'makanan': {'income': 0, 'expense': 60000}, 'transport': {'income': 0, 'expense': 40000}})
+        
+        # Rentang bebas (range scan pada transactions)
+        week = ('2024-02-01 00:00:00', '2024-02-08 00:00:00')
+        self.assertEqual(self.db.get_user_balance(self.test_user_id, *week)['expense'], 40000)
+        self.assertEqual(list(self.db.get_category_report(self.test_user_id, *week)), ['transport'])
+        
+        descriptions = [t['description'] for t in self.db.get_user_transactions(self.test_user_id, start=feb[0])]
+        self.assertEqual(descriptions, ['feb', 'feb'])
+        self.assertEqual(len(self.db.get_user_transactions(self.test_user_id, end=feb[0])), 2)
+
+class TestConnectionPool(unittest.TestCase):
+    """Test connection pool yang dipakai DatabaseManager"""
+    
+    def setUp(self):
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+        self.temp_db.close()
+        self.db = DatabaseManager(self.temp_db.name, pool_size=2)
+    
+    def tearDown(self):
+        self.db.close()
+        gc.collect()
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                if os.path.exists(self.temp_db.name + suffix):
+                    os.unlink(self.temp_db.name + suffix)
+            except PermissionError:
+                pass
+    
+    def test_connection_reused_across_calls(self):
+        """Koneksi yang sama dipakai ulang, bukan dibuat per pemanggilan"""
+        with self.db.pool.connection() as first:
+            pass
+        self.db.get_user_balance("user")
+        with self.db.pool.connection() as second:
+            pass
+        self.assertIs(first, second)
+    
+    def test_connection_pragmas(self):
+        """Setiap koneksi diset WAL, busy_timeout dan synchronous"""
+        with self.db.pool.connection() as conn:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+            self.assertEqual(conn.execute("PRAGMA busy_timeout").fetchone()[0], 5000)
+            self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)  # NORMAL
+    
+    def test_nested_use_in_same_thread(self):
+        """Pemanggilan bersarang tidak menghabiskan pool"""
+        pool = ConnectionPool(self.temp_db.name, size=1, timeout=0.5)
+        with pool.connection() as outer:
+            with pool.connection() as inner:
+                self.assertIs(outer, inner)
+        pool.close()
+    
+    def test_concurrent_threads(self):
+        """Banyak thread berbagi pool kecil tanpa error"""
+        errors = []
+        
+        def worker(n):
+            try:
+                for i in range(20):
+                    self.db.add_transaction(f"user{n}", f"User{n}", 'income', 1000, 'gaji', str(i))
+                    self.db.get_user_balance(f"user{n}")
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        self.assertEqual(errors, [])
+        for n in range(6):
+            self.assertEqual(self.db.get_user_balance(f"user{n}")['income'], 20000)
+        self.assertLessEqual(self.db.pool._created, 2)
+    
+    def test_failed_write_rolls_back(self):
+        """Koneksi dikembalikan ke pool tanpa transaksi yang menggantung"""
+        self.assertFalse(self.db.add_transaction("user", "User", 'invalid', 1000, 'gaji'))
+        with self.db.pool.connection() as conn:
+            self.assertFalse(conn.in_transaction)
+    
+    def test_close(self):
+        """Setelah close, pool menolak peminjaman baru"""
+        self.db.close()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            self.db.get_user_balance("user")
+
+class TestWriteBehindQueue(unittest.TestCase):
+    """Test mode write-behind dengan group commit"""
+    
+    def setUp(self):
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+        self.temp_db.close()
+        self.db = DatabaseManager(self.temp_db.name, write_behind=True, group_commit_ms=5)
+    
+    def tearDown(self):
+        self.db.close()
+        gc.collect()
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                if os.path.exists(self.temp_db.name + suffix):
+                    os.unlink(self.temp_db.name + suffix)
+            except PermissionError:
+                pass
+    
+    def test_future_resolves_after_commit(self):
+        """Future berisi id transaksi yang sudah bisa dibaca koneksi lain"""
+        transaction_id = self.db.submit_transaction("user", "User", 'income', 1000, 'gaji').result(timeout=5)
+        
+        conn = sqlite3.connect(self.temp_db.name)
+        row = conn.execute("SELECT amount FROM transactions WHERE id = ?", (transaction_id,)).fetchone()
+        conn.close()
+        self.assertEqual(row[0], 1000)
+    
+    def test_invalid_row_does_not_fail_group(self):
+        """Baris tidak valid gagal sendiri, baris lain di grup tetap tersimpan"""
+        good = self.db.submit_transaction("user", "User", 'income', 1000, 'gaji')
+        bad = self.db.submit_transaction("user", "User", 'invalid', 1000, 'gaji')
+        
+        self.assertIsInstance(good.result(timeout=5), int)
+        with self.assertRaises(sqlite3.IntegrityError):
+            bad.result(timeout=5)
+        self.assertFalse(self.db.add_transaction("user", "User", 'invalid', 1000, 'gaji'))
+        self.assertEqual(self.db.get_user_balance("user")['income'], 1000)
+    
+    def test_delete_through_writer(self):
+        """Delete juga lewat antrian dan mengembalikan status"""
+        transaction_id = self.db.submit_transaction("user", "User", 'expense', 500, 'makanan').result(timeout=5)
+        self.assertFalse(self.db.delete_transaction("other_user", transaction_id))
+        self.assertTrue(self.db.delete_transaction("user", transaction_id))
+        self.assertEqual(self.db.get_user_balance("user")['expense'], 0)
+    
+    def test_concurrent_writers_grouped(self):
+        """Banyak thread menulis bersamaan dan di-commit dalam grup"""
+        def worker(n):
+            for i in range(25):
+                self.assertTrue(self.db.add_transaction(f"user{n}", f"User{n}", 'income', 100, 'gaji', str(i)))
+        
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        for n in range(8):
+            self.assertEqual(self.db.get_user_balance(f"user{n}")['income'], 2500)
+        self.assertEqual(self.db.writer.operations, 200)
+        self.assertLess(self.db.writer.commits, 200)
+    
+    def test_close_flushes_queue(self):
+        """Shutdown meng-commit semua operasi yang masih di antrian"""
+        futures = [self.db.submit_transaction("user", "User", 'income', 10, 'gaji') for _ in range(50)]
+        self.db.close()
+        
+        self.assertTrue(all(f.done() and not f.exception() for f in futures))
+        reopened = DatabaseManager(self.temp_db.name)
+        self.assertEqual(reopened.get_user_balance("user")['income'], 500)
+        reopened.close()
+        
+        with self.assertRaises(sqlite3.ProgrammingError):
+            self.db.submit_transaction("user", "User", 'income', 10, 'gaji')
+
+class TestArchive(unittest.TestCase):
+    """Test arsip transaksi lama ke file terpisah"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'bot.db')
+        self.db = DatabaseManager(self.db_path, archive=True)
+        rows = [("user", "User", 'income' if i % 2 else 'expense', 1000 + i, 'makanan', f"lama {i}",
+                 f"2020-{1 + i % 12:02d}-15 10:00:00") for i in range(40)]
+        self.db.add_transactions_bulk(rows)
+        self.db.add_transaction("user", "User", 'income', 500000, 'gaji', 'baru')
+    
+    def tearDown(self):
+        self.db.close()
+        gc.collect()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _hot_count(self):
+        with self.db.pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM main.transactions").fetchone()[0]
+    
+    def test_archive_keeps_balance_and_reports(self):
+        """Saldo, laporan dan riwayat tetap lengkap setelah transaksi lama diarsipkan"""
+        balance = self.db.get_user_balance("user")
+        report = self.db.get_category_report("user")
+        history = [t['id'] for t in self.db.iter_user_transactions("user", page_size=100)]
+        
+        self.assertEqual(self.db.archive_transactions(older_than_days=30, batch_size=7), 40)
+        self.assertEqual(self._hot_count(), 1)
+        
+        self.assertEqual(self.db.get_user_balance("user"), balance)
+        self.assertEqual(self.db.get_category_report("user"), report)
+        self.assertEqual([t['id'] for t in self.db.iter_user_transactions("user", page_size=6)], history)
+        self.assertEqual(self.db.get_user_balance("user", '2020-03-01 00:00:00', '2020-03-31 00:00:00'),
+                         {'income': 0, 'expense': 4080, 'balance': -4080})
+        self.assertEqual(self.db.verify_user_balances(), [])
+        
+        # Menjalankan ulang tidak memindahkan apa-apa
+        self.assertEqual(self.db.archive_transactions(older_than_days=30), 0)
+    
+    def test_delete_archived_transaction(self):
+        """Hapus transaksi di arsip ikut mengurangi ringkasan"""
+        self.db.archive_transactions(older_than_days=30)
+        oldest = self.db.get_user_transactions("user", limit=100)[-1]
+        before = self.db.get_user_balance("user")
+        
+        self.assertEqual(self.db.get_transaction("user", oldest['id'])['description'], oldest['description'])
+        self.assertTrue(self.db.delete_transaction("user", oldest['id']))
+        self.assertFalse(self.db.delete_transaction("user", oldest['id']))
+        
+        self.assertEqual(self.db.get_user_balance("user")['expense'], before['expense'] - oldest['amount'])
+        self.assertEqual(self.db.verify_user_balances(), [])
+    
+    def test_delete_range_spans_archive(self):
+        """Satu rentang id bisa mencakup transaksi di arsip dan di file utama"""
+        self.assertEqual(self.db.archive_transactions(older_than_days=30), 40)
+        newest = self.db.get_user_transactions("user", limit=1)[0]
+        
+        deleted = self.db.delete_transactions("user", 35, newest['id'])
+        self.assertEqual([t['id'] for t in deleted], list(range(35, 41)) + [newest['id']])
+        self.assertEqual(deleted[-1], newest)
+        self.assertEqual(deleted[0], {'id': 35, 'type': 'expense', 'amount': 1034, 'category': 'makanan',
+                                      'description': 'lama 34', 'date': '2020-11-15 10:00:00'})
+        
+        self.assertEqual(self.db.get_user_balance("user")['income'], sum(1000 + i for i in range(1, 34, 2)))
+        self.assertEqual(self.db.search_transactions("user", "lama")['count'], 34)
+        self.assertEqual(self.db.verify_user_balances(), [])
+    
+    def test_delete_range_uses_primary_key(self):
+        """Hapus rentang mencari lewat primary key, bukan index (user, created_at)"""
+        self.db.archive_transactions(older_than_days=30)
+        with self.db.pool.connection() as conn:
+            for query in (LEDGER_DELETE_SQL, ARCHIVE_DELETE_SQL):
+                plan = " ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, (1, 2, 'user')))
+                self.assertIn("INTEGER PRIMARY KEY", plan, query)
+                self.assertNotIn("_user_created", plan, query)
+    
+    def test_search_includes_archive(self):
+        """Transaksi di arsip tetap bisa dicari dan dihapus dari index saat dihapus"""
+        self.db.archive_transactions(older_than_days=30)
+        self.assertEqual(self.db.search_transactions("user", "lama")['count'], 40)
+        
+        archived = self.db.search_transactions("user", "lama", limit=1)['transactions'][0]
+        self.assertTrue(self.db.delete_transaction("user", archived['id']))
+        self.assertEqual(self.db.search_transactions("user", "lama")['count'], 39)
+        self.assertEqual(self.db.search_transactions("user", "baru")['income'], 500000)
+    
+    def test_archive_attached_automatically(self):
+        """File arsip yang sudah ada otomatis di-ATTACH saat database dibuka lagi"""
+        self.db.archive_transactions(older_than_days=30)
+        self.db.close()
+        
+        self.db = DatabaseManager(self.db_path)
+        self.assertIsNotNone(self.db.archive_path)
+        self.assertEqual(len(self.db.get_user_transactions("user", limit=100)), 41)
+
+class TestSearch(unittest.TestCase):
+    """Test pencarian FTS5 atas deskripsi dan kategori"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db = DatabaseManager(os.path.join(self.temp_dir, 'bot.db'))
+        self.db.add_transaction("user", "User", 'expense', 25000, 'makanan', 'Kopi susu gula aren')
+        self.db.add_transaction("user", "User", 'expense', 18000, 'makanan', 'kopi hitam')
+        self.db.add_transaction("user", "User", 'expense', 30000, 'makanan', 'nasi goreng')
+        self.db.add_transaction("user", "User", 'income', 50000, 'freelance', 'jual biji kopi')
+        self.db.add_transaction("other", "Other", 'expense', 99000, 'makanan', 'kopi')
+    
+    def tearDown(self):
+        self.db.close()
+        gc.collect()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_search_totals_and_order(self):
+        """Total dihitung dari semua hasil, daftar terbaru dulu dan dibatasi limit"""
+        result = self.db.search_transactions("user", "kopi", limit=2)
+        self.assertEqual(result['count'], 3)
+        self.assertEqual(result['expense'], 43000)
+        self.assertEqual(result['income'], 50000)
+        self.assertEqual([t['description'] for t in result['transactions']], ['jual biji kopi', 'kopi hitam'])
+    
+    def test_search_is_per_user(self):
+        """Transaksi user lain tidak ikut"""
+        self.assertEqual(self.db.search_transactions("other", "kopi")['count'], 1)
+        self.assertEqual(self.db.search_transactions("nobody", "kopi")['count'], 0)
+    
+    def test_search_words_prefix_and_category(self):
+        """Semua kata harus cocok, kata terakhir boleh prefix, kategori ikut dicari"""
+        self.assertEqual(self.db.search_transactions("user", "nasi gor")['count'], 1)
+        self.assertEqual(self.db.search_transactions("user", "kopi nasi")['count'], 0)
+        self.assertEqual(self.db.search_transactions("user", "KOPI Susu")['count'], 1)
+        self.assertEqual(self.db.search_transactions("user", "freelance")['income'], 50000)
+    
+    def test_search_query_is_not_fts_syntax(self):
+        """Operator FTS dari input user tidak dieksekusi"""
+        for query in ('kopi OR nasi', '"kopi', 'user_id : other', 'NEAR(kopi', '*', ''):
+            result = self.db.search_transactions("user", query)
+            self.assertIsInstance(result['count'], int)
+        self.assertEqual(self.db.search_transactions("user", 'kopi OR nasi')['count'], 0)
+        self.assertEqual(self.db.search_transactions("user", '')['transactions'], [])
+    
+    def test_search_follows_delete_and_bulk_insert(self):
+        """Index FTS ikut berubah saat transaksi dihapus atau di-bulk insert"""
+        first = self.db.search_transactions("user", "hitam")['transactions'][0]
+        self.assertTrue(self.db.delete_transaction("user", first['id']))
+        self.assertEqual(self.db.search_transactions("user", "hitam")['count'], 0)
+        
+        self.db.add_transactions_bulk([("user", "User", 'expense', 5000, 'transport', f"parkir mall {i}",
+                                        "2024-01-01 10:00:00") for i in range(20)])
+        self.assertEqual(self.db.search_transactions("user", "parkir")['count'], 20)
+        self.assertEqual(self.db.search_transactions("user", "transport")['expense'], 100000)
+
+class TestUserSnapshot(unittest.TestCase):
+    """Test ringkasan user dari satu snapshot baca"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'bot.db')
+        self.db = DatabaseManager(self.db_path, archive=True)
+        rows = [("user", "User", 'income' if i % 3 == 0 else 'expense', 1000 * (i + 1),
+                 ('gaji', 'makanan', 'transport')[i % 3], f"transaksi {i}",
+                 f"2023-{1 + i % 12:02d}-{1 + i % 27:02d} 10:00:00") for i in range(60)]
+        self.db.add_transactions_bulk(rows)
+        self.db.add_transaction("other", "Other", 'expense', 70000, 'hiburan', 'bioskop')
+    
+    def tearDown(self):
+        self.db.close()
+        gc.collect()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _assert_matches_individual_queries(self, db, start=None, end=None):
+        snapshot = db.get_user_snapshot("user", recent_limit=7, start=start, end=end)
+        self.assertEqual(snapshot['balance'], db.get_user_balance("user", start, end))
+        self.assertEqual(snapshot['category_report'], db.get_category_report("user", start, end))
+        self.assertEqual(snapshot['recent_transactions'],
+                         db.get_user_transactions("user", limit=7, start=start, end=end))
+        return snapshot
+    
+    def test_snapshot_matches_individual_queries(self):
+        """Hasil sama dengan get_user_balance/get_category_report/get_user_transactions"""
+        snapshot = self._assert_matches_individual_queries(self.db)
+        self.assertEqual(snapshot['transaction_count'], 60)
+        self.assertEqual(snapshot['monthly_summary'], self.db.get_monthly_summary("user"))
+        
+        # Periode pas per bulan (rollup) dan periode sembarang (range scan)
+        self._assert_matches_individual_queries(self.db, '2023-02-28 17:00:00', '2023-05-31 17:00:00')
+        snapshot = self._assert_matches_individual_queries(self.db, '2023-03-10 00:00:00', '2023-06-20 00:00:00')
+        self.assertEqual(snapshot['transaction_count'],
+                         len(self.db.get_user_transactions("user", limit=100, start='2023-03-10 00:00:00',
+                                                           end='2023-06-20 00:00:00')))
+    
+    def test_snapshot_with_archive_and_replica(self):
+        """Transaksi arsip ikut dihitung, juga saat dibaca dari replica"""
+        self.db.archive_transactions(older_than_days=30)
+        self.db.add_transaction("user", "User", 'income', 500000, 'gaji', 'baru')
+        snapshot = self._assert_matches_individual_queries(self.db)
+        self.assertEqual(snapshot['transaction_count'], 61)
+        self.assertEqual(snapshot['recent_transactions'][0]['description'], 'baru')
+        self._assert_matches_individual_queries(self.db, '2023-03-10 00:00:00', '2023-06-20 00:00:00')
+        
+        replica_db = DatabaseManager(self.db_path, read_replica=True)
+        try:
+            self.assertEqual(replica_db.get_user_snapshot("user", recent_limit=7),
+                             self.db.get_user_snapshot("user", recent_limit=7))
+        finally:
+            replica_db.close()
+    
+    def test_snapshot_empty_user(self):
+        snapshot = self.db.get_user_snapshot("nobody")
+        self.assertEqual(snapshot['balance'], {'income': 0, 'expense': 0, 'balance': 0})
+        self.assertEqual(snapshot['recent_transactions'], [])
+        self.assertEqual(snapshot['category_report'], {})
+        self.assertEqual(snapshot['transaction_count'], 0)
+    
+    def test_snapshot_consistent_under_concurrent_writes(self):
+        """Agregat dan daftar transaksi berasal dari snapshot yang sama"""
+        stop = threading.Event()
+        
+        def writer():
+            i = 0
+            while not stop.is_set():
+                self.db.add_transaction("user", "User", 'expense', 100 + i, 'makanan', 'tulis')
+                i += 1
+        
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            for _ in range(50):
+                # Jumlah dari statement agregat harus cocok dengan daftar dari statement kedua
+                snapshot = self.db.get_user_snapshot("user", recent_limit=100000)
+                recent = snapshot['recent_transactions']
+                self.assertEqual(snapshot['transaction_count'], len(recent))
+                self.assertEqual(snapshot['balance']['expense'],
+                                 sum(t['amount'] for t in recent if t['type'] == 'expense'))
+        finally:
+            stop.set()
+            thread.join()
+
+class TestReadReplica(unittest.TestCase):
+    """Test read replica :memory: yang mengikuti tulisan di file utama"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'bot.db')
+        # Data awal ditulis tanpa replica supaya seeding lewat backup API teruji
+        seed = DatabaseManager(self.db_path)
+        seed.add_transactions_bulk([("user", "User", 'expense', 1000 + i, 'makanan', f"awal {i}",
+                                     f"2024-01-{1 + i:02d} 10:00:00") for i in range(10)])
+        seed.close()
+        self.db = DatabaseManager(self.db_path, read_replica=True)
+    
+    def tearDown(self):
+        self.db.close()
+        gc.collect()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _file_state(self, user_id):
+        """Saldo dan laporan yang dihitung langsung dari file utama"""
+        file_db = DatabaseManager(self.db_path)
+        try:
+            return (file_db.get_user_balance(user_id), file_db.get_category_report(user_id),
+                    file_db.get_user_transactions(user_id, limit=100))
+        finally:
+            file_db.close()
+    
+    def _replica_state(self, user_id):
+        return (self.db.get_user_balance(user_id), self.db.get_category_report(user_id),
+                self.db.get_user_transactions(user_id, limit=100))
+    
+    def test_reads_served_from_replica(self):
+        """Data hasil seeding terbaca dari replica, bukan dari file"""
+        self.assertIsNotNone(self.db.replica)
+        self.assertEqual(self.db.get_user_balance("user")['expense'], sum(1000 + i for i in range(10)))
+        
+        # Tulisan langsung ke file (di luar DatabaseManager) tidak terlihat sampai refresh
+        with self.db.pool.connection() as conn:
+            conn.execute("DELETE FROM transactions")
+            conn.commit()
+        self.assertEqual(len(self.db.get_user_transactions("user", limit=100)), 10)
+        self.db.refresh_replica()
+        self.assertEqual(self.db.get_user_transactions("user", limit=100), [])
+    
+    def test_writes_applied_to_replica(self):
+        """Insert, bulk insert dan delete langsung terlihat di replica dan cocok dengan file"""
+        self.assertTrue(self.db.add_transaction("user", "User", 'income', 500000, 'gaji', 'gaji'))
+        self.db.add_transactions_bulk([("user", "User", 'expense', 25000, 'transport', 'ojek',
+                                        '2024-02-03 08:00:00')] * 3)
+        first = self.db.get_user_transactions("user", limit=100)[-1]
+        self.assertTrue(self.db.delete_transaction("user", first['id']))
+        
+        self.assertEqual(self._replica_state("user"), self._file_state("user"))
+        self.assertEqual(self.db.get_category_report("user")['transport']['expense'], 75000)
+        self.assertIsNone(self.db.get_transaction("user", first['id']))
+    
+    def test_replica_failure_falls_back_to_file(self):
+        """Gagal memperbarui replica dicatat ke log, dan selama basi pembaca memakai file"""
+        with mock.patch.object(self.db.replica, 'copy_transactions',
+                               side_effect=sqlite3.OperationalError("disk I/O error")), \
+                mock.patch.object(self.db.replica, 'refresh',
+                                  side_effect=sqlite3.OperationalError("out of memory")), \
+                self.assertLogs('FinancialBot.database', 'ERROR') as logs:
+            self.assertTrue(self.db.add_transaction("user", "User", 'income', 500000, 'gaji', 'gaji'))
+        
+        self.assertIn("disk I/O error", logs.output[0])
+        self.assertIn("out of memory", logs.output[1])
+        self.assertTrue(self.db.replica.stale)
+        self.assertEqual(self.db.get_user_balance("user")['income'], 500000)
+        self.assertEqual(self._replica_state("user"), self._file_state("user"))
+        
+        # Seed ulang yang berhasil mengaktifkan replica lagi
+        self.db.refresh_replica()
+        self.assertFalse(self.db.replica.stale)
+        self.assertEqual(self._replica_state("user"), self._file_state("user"))
+    
+    def test_write_behind_insert_visible_after_future(self):
+        """Future write-behind selesai setelah baris juga masuk replica"""
+        self.db.close()
+        self.db = DatabaseManager(self.db_path, read_replica=True, write_behind=True)
+        
+        futures = [self.db.submit_transaction("user2", "User2", 'income', 1000, 'gaji') for _ in range(20)]
+        ids = [future.result() for future in futures]
+        
+        self.assertEqual(self.db.get_user_balance("user2")['income'], 20000)
+        self.assertEqual(self.db.get_transaction("user2", ids[-1])['amount'], 1000)
+    
+    def test_archive_with_replica(self):
+        """Arsip dan delete dari arsip tetap konsisten antara replica dan file"""
+        self.db.close()
+        self.db = DatabaseManager(self.db_path, read_replica=True, archive=True)
+        balance = self.db.get_user_balance("user")
+        
+        self.assertEqual(self.db.archive_transactions(older_than_days=30, batch_size=3), 10)
+        self.assertEqual(self.db.get_user_balance("user"), balance)
+        self.assertEqual(len(self.db.get_user_transactions("user", limit=100)), 10)
+        
+        oldest = self.db.get_user_transactions("user", limit=100)[-1]
+        self.assertTrue(self.db.delete_transaction("user", oldest['id']))
+        self.assertEqual(self._replica_state("user"), self._file_state("user"))
+        
+        # Rentang yang mencakup arsip dan file utama
+        self.assertTrue(self.db.add_transaction("user", "User", 'income', 5000, 'gaji', 'baru'))
+        self.assertEqual(len(self.db.delete_transactions("user", 1, 15)), 10)
+        self.assertEqual(self._replica_state("user"), self._file_state("user"))
+    
+    def test_range_delete_with_write_behind(self):
+        """DELETE ... RETURNING lewat antrian write-behind, replica ikut terhapus"""
+        self.db.close()
+        self.db = DatabaseManager(self.db_path, read_replica=True, write_behind=True)
+        
+        deleted = self.db.delete_transactions("user", 3, 6)
+        self.assertEqual([(t['id'], t['amount']) for t in deleted], [(3, 1002), (4, 1003), (5, 1004), (6, 1005)])
+        self.assertEqual(self.db.delete_transactions("user", 3, 6), [])
+        self.assertEqual(self.db.get_user_balance("user")['expense'], sum(1000 + i for i in range(10)) - 4014)
+        self.assertEqual(self._replica_state("user"), self._file_state("user"))
 
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Unit tests untuk export transaksi
+"""
+
+import unittest
+import os
+import io
+import csv
+import json
+import tempfile
+import shutil
+import sys
+
+# Add parent directory to path untuk import
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.bot_core import FinancialBotCore
+from core.database import DatabaseManager
+from core.export import EXPORT_HEADER, export_transactions
+
+class TestExport(unittest.TestCase):
+    """Test export CSV/JSONL yang di-stream per potongan"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db = DatabaseManager(os.path.join(self.temp_dir, 'bot.db'))
+        # created_at sama supaya batas potongan diuji dengan tie-breaker id
+        rows = [("user1" if i % 3 else "user2", "User", 'expense', 1000 + i, 'makanan', f"baris {i}",
+                 '2024-01-01 10:00:00' if i < 6 else f'2024-01-{i:02d} 10:00:00') for i in range(20)]
+        self.db.add_transactions_bulk(rows)
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_csv_export_single_user(self):
+        """CSV satu user lengkap, urut waktu, walau potongan kecil"""
+        output = io.StringIO()
+        count = export_transactions(self.db, output, 'csv', user_id="user1", chunk_size=4)
+
+        rows = list(csv.reader(io.StringIO(output.getvalue())))
+        self.assertEqual(rows[0], EXPORT_HEADER)
+        self.assertEqual(count, 13)
+        self.assertEqual(len(rows), 14)
+        self.assertTrue(all(row[1] == "user1" for row in rows[1:]))
+        self.assertEqual(len({row[0] for row in rows[1:]}), 13)
+        self.assertEqual([row[7] for row in rows[1:]], sorted(row[7] for row in rows[1:]))
+
+    def test_jsonl_export_all_users(self):
+        """JSONL semua user, satu objek per baris"""
+        output = io.StringIO()
+        count = export_transactions(self.db, output, 'jsonl', chunk_size=7)
+
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(count, 20)
+        self.assertEqual([record['id'] for record in records], list(range(1, 21)))
+        self.assertEqual(records[0]['description'], 'baris 0')
+
+    def test_unknown_format(self):
+        """Format selain csv/jsonl ditolak"""
+        with self.assertRaises(ValueError):
+            export_transactions(self.db, io.StringIO(), 'xml')
+
+    def test_bot_export_to_file(self):
+        """FinancialBotCore menulis export ke file sementara"""
+        bot = FinancialBotCore(os.path.join(self.temp_dir, 'bot2.db'))
+        try:
+            bot.process_message("user", "User", "habis 50000 makan siang")
+            path, count = bot.export_user_ledger("user", 'csv')
+            try:
+                with open(path, newline='', encoding='utf-8') as exported:
+                    rows = list(csv.reader(exported))
+            finally:
+                os.unlink(path)
+        finally:
+            bot.close()
+
+        self.assertEqual(count, 1)
+        # Jumlah ditulis dalam rupiah dengan dua desimal (disimpan sebagai sen)
+        self.assertEqual(rows[1][4], '50000.00')
+
+if __name__ == '__main__':
+    unittest.main()
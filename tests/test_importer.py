@@ -0,0 +1,185 @@
+"""
+Unit tests untuk import CSV mutasi rekening
+"""
+
+import unittest
+from unittest import mock
+import os
+import io
+import tempfile
+import shutil
+import sys
+
+# Add parent directory to path untuk import
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.bot_core import FinancialBotCore
+from core.database import DatabaseManager
+from core.importer import StatementImporter, parse_statement_amount, parse_statement_date
+
+class TestStatementParsing(unittest.TestCase):
+    """Test parser jumlah dan tanggal mutasi"""
+
+    def test_amount_formats(self):
+        """Pemisah ribuan Indonesia/US, penanda DB/CR, tanda minus dan kurung"""
+        self.assertEqual(parse_statement_amount('1.250.000,00 DB'), (125000000, 'expense'))
+        self.assertEqual(parse_statement_amount('50,000.50 CR'), (5000050, 'income'))
+        self.assertEqual(parse_statement_amount('Rp 75.000'), (7500000, None))
+        self.assertEqual(parse_statement_amount('-25000'), (2500000, 'expense'))
+        self.assertEqual(parse_statement_amount('(1.500)'), (150000, 'expense'))
+        # Sen dari mutasi tidak dibulatkan
+        self.assertEqual(parse_statement_amount('12.345,67'), (1234567, None))
+        self.assertIsNone(parse_statement_amount('abc'))
+        self.assertIsNone(parse_statement_amount(''))
+
+    def test_date_is_wib_converted_to_utc(self):
+        """Tanggal lokal WIB disimpan sebagai UTC"""
+        self.assertEqual(parse_statement_date('01/02/2024'), '2024-01-31 17:00:00')
+        self.assertEqual(parse_statement_date('2024-02-01 10:00'), '2024-02-01 03:00:00')
+        self.assertIsNone(parse_statement_date('kemarin'))
+
+class TestStatementImporter(unittest.TestCase):
+    """Test import file CSV per potongan"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db = DatabaseManager(os.path.join(self.temp_dir, 'bot.db'))
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_debit_credit_columns_with_preamble(self):
+        """Header dicari setelah info rekening, kolom debit/kredit menentukan tipe"""
+        source = io.StringIO(
+            "No. Rekening;1234567890\n"
+            "Periode;Januari 2024\n"
+            "\n"
+            "Tanggal;Keterangan;Debit;Kredit\n"
+            "02/01/2024;GAJI KANTOR;0;5.000.000,00\n"
+            "03/01/2024;makan siang warung;45.000,00;0\n"
+            "04/01/2024;bensin motor;30.000,00;\n"
+        )
+        result = StatementImporter(self.db).import_file(source, "user1", "User1")
+
+        self.assertEqual(result['inserted'], 3)
+        self.assertEqual(result['failed'], 0)
+        balance = self.db.get_user_balance("user1")
+        self.assertEqual(balance['income'], 500000000)
+        self.assertEqual(balance['expense'], 7500000)
+        categories = {t['description']: t['category'] for t in self.db.get_user_transactions("user1")}
+        self.assertEqual(categories['makan siang warung'], 'makanan')
+
+    def test_invalid_rows_counted_as_failed(self):
+        """Baris dengan tanggal/jumlah rusak dilewati tanpa membatalkan import"""
+        source = io.StringIO(
+            "date,description,amount,type\n"
+            "2024-01-05,netflix,54000,expense\n"
+            "bukan tanggal,rusak,1000,expense\n"
+            "2024-01-06,tanpa jumlah,,expense\n"
+            "2024-01-07,transfer masuk,200000,income\n"
+        )
+        result = StatementImporter(self.db).import_file(source, "user1", "User1")
+
+        self.assertEqual(result['inserted'], 2)
+        self.assertEqual(result['failed'], 2)
+        self.assertEqual(self.db.get_user_balance("user1")['balance'], 14600000)
+
+    def test_progress_reported_per_chunk(self):
+        """Progress dipanggil setiap potongan dengan jumlah kumulatif"""
+        lines = ["Tanggal,Keterangan,Jumlah"] + [f"0{1 + i % 9}/03/2024,belanja {i},{1000 + i}" for i in range(25)]
+        reports = []
+        result = StatementImporter(self.db, chunk_rows=10).import_file(
+            io.StringIO("\n".join(lines)), "user1", "User1", progress=reports.append)
+
+        self.assertEqual([r['inserted'] for r in reports], [10, 20, 25])
+        self.assertEqual(result['inserted'], 25)
+        self.assertGreaterEqual(result['rows_per_second'], 0)
+        self.assertEqual(len(list(self.db.iter_user_transactions("user1"))), 25)
+
+    def test_reimport_skips_existing_rows(self):
+        """Import ulang file yang sama (atau periode yang tumpang tindih) tidak menggandakan transaksi"""
+        statement = ("Tanggal,Keterangan,Jumlah\n"
+                     "05/02/2024,kopi,25.000 DB\n"
+                     "05/02/2024,kopi,25.000 DB\n"
+                     "06/02/2024,gaji,5.000.000 CR\n")
+        first = StatementImporter(self.db).import_file(io.StringIO(statement), "user1", "User1")
+        self.assertEqual((first['inserted'], first['skipped']), (3, 0))
+
+        second = StatementImporter(self.db).import_file(io.StringIO(statement), "user1", "User1")
+        self.assertEqual((second['inserted'], second['skipped'], second['failed']), (0, 3, 0))
+        self.assertEqual(self.db.get_user_balance("user1"),
+                         {'income': 500000000, 'expense': 5000000, 'balance': 495000000})
+
+        # Periode berikutnya berisi sebagian baris lama plus satu kopi lagi
+        overlap = statement + "05/02/2024,kopi,25.000 DB\n07/02/2024,bensin,30.000 DB\n"
+        third = StatementImporter(self.db, chunk_rows=2).import_file(io.StringIO(overlap), "user1", "User1")
+        self.assertEqual((third['inserted'], third['skipped']), (2, 3))
+        self.assertEqual(self.db.get_user_balance("user1")['expense'], 10500000)
+
+        # Baris milik user lain tidak dianggap sudah ada
+        other = StatementImporter(self.db).import_file(io.StringIO(statement), "user2", "User2")
+        self.assertEqual(other['inserted'], 3)
+        forced = StatementImporter(self.db, skip_existing=False).import_file(
+            io.StringIO(statement), "user1", "User1")
+        self.assertEqual((forced['inserted'], forced['skipped']), (3, 0))
+
+    def test_reimport_reads_only_chunk_range(self):
+        """Pengecekan baris lama per potongan: hanya rentang tanggal potongan yang dibaca"""
+        self.db.add_transactions_bulk([("user1", "User1", 'expense', 100, 'makanan', f"lama {i}",
+                                        f"2020-01-{1 + i % 28:02d} 10:00:00") for i in range(500)])
+        statement = ("Tanggal,Keterangan,Jumlah\n"
+                     "05/02/2024,kopi,25.000 DB\n"
+                     "05/02/2024,kopi,25.000 DB\n"
+                     "06/02/2024,gaji,5.000.000 CR\n")
+        # Baris kembar terpisah ke dua potongan tetap masuk dua-duanya
+        first = StatementImporter(self.db, chunk_rows=1).import_file(io.StringIO(statement), "user1", "User1")
+        self.assertEqual((first['inserted'], first['skipped']), (3, 0))
+
+        reads = []
+        original = self.db.iter_user_transactions
+
+        def traced(user_id, **kwargs):
+            rows = list(original(user_id, **kwargs))
+            reads.append((kwargs['start'], kwargs['end'], len(rows)))
+            return iter(rows)
+
+        with mock.patch.object(self.db, 'iter_user_transactions', side_effect=traced):
+            second = StatementImporter(self.db, chunk_rows=1).import_file(io.StringIO(statement), "user1", "User1")
+        self.assertEqual((second['inserted'], second['skipped']), (0, 3))
+        self.assertEqual(reads, [('2024-02-04 17:00:00', '2024-02-04 17:00:01', 2)] * 2
+                         + [('2024-02-05 17:00:00', '2024-02-05 17:00:01', 1)])
+        self.assertEqual(self.db.get_user_balance("user1")['expense'], 5000000 + 50000)
+
+    def test_database_error_stops_import(self):
+        """Error database menghentikan import dan dilaporkan di ringkasan"""
+        lines = ["Tanggal,Keterangan,Jumlah"] + [f"0{1 + i % 9}/03/2024,belanja {i},{1000 + i}" for i in range(25)]
+        results = [{'inserted': 10, 'failed': 0}, {'inserted': 0, 'failed': 10, 'error': 'database is locked'}]
+        with mock.patch.object(self.db, 'add_transactions_bulk', side_effect=results) as bulk:
+            result = StatementImporter(self.db, chunk_rows=10, skip_existing=False).import_file(
+                io.StringIO("\n".join(lines)), "user1", "User1")
+
+        self.assertEqual(bulk.call_count, 2)
+        self.assertEqual((result['inserted'], result['failed'], result['error']), (10, 10, 'database is locked'))
+
+    def test_unknown_header_raises(self):
+        """File tanpa kolom tanggal/jumlah ditolak"""
+        with self.assertRaises(ValueError):
+            StatementImporter(self.db).import_file(io.StringIO("a,b\n1,2\n"), "user1", "User1")
+
+    def test_core_import_statement_from_file(self):
+        """FinancialBotCore.import_statement membaca file (dengan BOM)"""
+        path = os.path.join(self.temp_dir, 'mutasi.csv')
+        with open(path, 'w', encoding='utf-8-sig', newline='') as output:
+            output.write("Tanggal,Keterangan,Jumlah\n10/01/2024,bayar listrik,350.000 DB\n")
+
+        core = FinancialBotCore(os.path.join(self.temp_dir, 'core.db'))
+        try:
+            result = core.import_statement("user1", "User1", path)
+            self.assertEqual(result['inserted'], 1)
+            self.assertEqual(core.db.get_user_balance("user1")['expense'], 35000000)
+        finally:
+            core.close()
+
+if __name__ == '__main__':
+    unittest.main()
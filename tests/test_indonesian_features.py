@@ -31,11 +31,11 @@ class TestIndonesianFeatures(unittest.TestCase):
     def test_indonesian_purchase_patterns(self):
         """Test Indonesian purchase planning patterns"""
         test_cases = [
-            ("saya mau beli mobil 50000000", "mobil", 50000000.0),
-            ("mau beli laptop 15000000", "laptop", 15000000.0),
-            ("rencana beli motor 25000000", "motor", 25000000.0),
-            ("analisis beli rumah 500000000", "rumah", 500000000.0),
-            ("konsultasi beli handphone 10000000", "handphone", 10000000.0)
+            ("saya mau beli mobil 50000000", "mobil", 5000000000),
+            ("mau beli laptop 15000000", "laptop", 1500000000),
+            ("rencana beli motor 25000000", "motor", 2500000000),
+            ("analisis beli rumah 500000000", "rumah", 50000000000),
+            ("konsultasi beli handphone 10000000", "handphone", 1000000000)
         ]
         
         for command, expected_item, expected_price in test_cases:
@@ -56,9 +56,9 @@ class TestIndonesianFeatures(unittest.TestCase):
         """Test budget response with financial data"""
         user_data = {
             'balance': {
-                'income': 6250000,
-                'expense': 4500000,
-                'balance': 1750000
+                'income': 625000000,
+                'expense': 450000000,
+                'balance': 175000000
             }
         }
         
@@ -73,7 +73,7 @@ class TestIndonesianFeatures(unittest.TestCase):
     
     def test_purchase_response_without_data(self):
         """Test purchase response when no data is available"""
-        command_result = {'item': 'mobil', 'price': 30000000}
+        command_result = {'item': 'mobil', 'price': 3000000000}
         result = self.rules._generate_purchase_planning_response(command_result, None)
         self.assertIn("Analisis Pembelian", result)
         self.assertIn("30,000,000", result)
@@ -81,12 +81,12 @@ class TestIndonesianFeatures(unittest.TestCase):
     
     def test_purchase_response_with_data(self):
         """Test purchase response with financial data"""
-        command_result = {'item': 'mobil', 'price': 30000000}
+        command_result = {'item': 'mobil', 'price': 3000000000}
         user_data = {
             'balance': {
-                'income': 6250000,
-                'expense': 4500000,
-                'balance': 1750000
+                'income': 625000000,
+                'expense': 450000000,
+                'balance': 175000000
             }
         }
         
@@ -104,15 +104,15 @@ class TestIndonesianFeatures(unittest.TestCase):
         # Test budget response
         user_data = {
             'balance': {
-                'income': 5000000,
-                'expense': 3000000,
-                'balance': 2000000
+                'income': 500000000,
+                'expense': 300000000,
+                'balance': 200000000
             }
         }
         budget_response = self.rules._generate_budget_advice_response(user_data)
         
         # Test purchase response
-        command_result = {'item': 'laptop', 'price': 15000000}
+        command_result = {'item': 'laptop', 'price': 1500000000}
         purchase_response = self.rules._generate_purchase_planning_response(command_result, user_data)
         
         # Check for common English words that should not appear
@@ -14,6 +14,7 @@ import sqlite3
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from core.bot_core import FinancialBotCore
+from core.money import to_minor
 
 class TestBotCoreIntegration(unittest.TestCase):
     """Test integrasi bot core dengan semua komponen"""
@@ -64,7 +65,7 @@ class TestBotCoreIntegration(unittest.TestCase):
         
         # Check final balance
         stats = self.bot.get_user_stats(self.test_user_id)
-        expected_total = 5000000 + 1000000 + 500000 + 250000
+        expected_total = to_minor(5000000 + 1000000 + 500000 + 250000)
         self.assertEqual(stats['balance']['income'], expected_total)
         self.assertEqual(stats['balance']['balance'], expected_total)
     
@@ -89,9 +90,9 @@ class TestBotCoreIntegration(unittest.TestCase):
         
         # Check balance
         stats = self.bot.get_user_stats(self.test_user_id)
-        expected_expense = 200000 + 50000 + 100000 + 150000
+        expected_expense = to_minor(200000 + 50000 + 100000 + 150000)
         self.assertEqual(stats['balance']['expense'], expected_expense)
-        self.assertEqual(stats['balance']['balance'], 1000000 - expected_expense)
+        self.assertEqual(stats['balance']['balance'], to_minor(1000000) - expected_expense)
     
     def test_balance_query_variations(self):
         """Test berbagai variasi query balance"""
@@ -140,6 +141,18 @@ class TestBotCoreIntegration(unittest.TestCase):
         self.assertIn("Makanan", response)    # Category
         self.assertIn("350,000", response)    # Makanan total expense
     
+    def test_search_flow(self):
+        """Test cari transaksi lewat pesan"""
+        self.bot.process_message(self.test_user_id, self.test_username, "!expense 25000 makanan kopi susu")
+        self.bot.process_message(self.test_user_id, self.test_username, "!expense 18000 makanan kopi hitam")
+        
+        response = self.bot.process_message(self.test_user_id, self.test_username, "berapa total saya beli kopi?")
+        self.assertIn("2 transaksi", response)
+        self.assertIn("43,000", response)
+        
+        response = self.bot.process_message(self.test_user_id, self.test_username, "cari teh")
+        self.assertIn("Tidak ada transaksi", response)
+    
     def test_help_command(self):
         """Test help command"""
         help_queries = [
@@ -221,6 +234,28 @@ class TestBotCoreIntegration(unittest.TestCase):
             self.assertIn("tidak mengerti", response)
             self.assertIn("!help", response)
     
+    def test_delete_flow(self):
+        """Hapus satu transaksi dan rentang transaksi lewat pesan"""
+        for amount in (10000, 20000, 30000, 40000):
+            self.bot.process_message(self.test_user_id, self.test_username, f"!expense {amount} makanan")
+        self.bot.process_message("other_user", "Other", "!expense 99000 makanan")
+        ids = sorted(t['id'] for t in self.bot.db.get_user_transactions(self.test_user_id))
+        
+        response = self.bot.process_message(self.test_user_id, self.test_username, f"hapus transaksi {ids[0]}")
+        self.assertIn(f"Transaksi ID {ids[0]} berhasil dihapus", response)
+        self.assertIn("Rp 10,000 (makanan)", response)
+        
+        # Rentang mencakup id milik user lain, yang tidak ikut terhapus
+        response = self.bot.process_message(self.test_user_id, self.test_username,
+                                            f"hapus transaksi {ids[1]}-{ids[3] + 1}")
+        self.assertIn("3 transaksi", response)
+        self.assertIn("Rp 90,000", response)
+        self.assertEqual(self.bot.get_user_stats(self.test_user_id)['balance']['expense'], 0)
+        self.assertEqual(self.bot.get_user_stats("other_user")['balance']['expense'], to_minor(99000))
+        
+        response = self.bot.process_message(self.test_user_id, self.test_username, f"hapus transaksi {ids[0]}")
+        self.assertIn("tidak ditemukan", response)
+    
     def test_user_isolation(self):
         """Test bahwa data antar user terpisah"""
         user1_id = "user1_123"
@@ -234,11 +269,11 @@ class TestBotCoreIntegration(unittest.TestCase):
         stats1 = self.bot.get_user_stats(user1_id)
         stats2 = self.bot.get_user_stats(user2_id)
         
-        self.assertEqual(stats1['balance']['income'], 1000000)
+        self.assertEqual(stats1['balance']['income'], to_minor(1000000))
         self.assertEqual(stats1['balance']['expense'], 0)
         
         self.assertEqual(stats2['balance']['income'], 0)
-        self.assertEqual(stats2['balance']['expense'], 50000)
+        self.assertEqual(stats2['balance']['expense'], to_minor(50000))
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,162 @@
+"""
+Unit tests untuk maintenance database (optimize, ANALYZE, checkpoint, incremental vacuum)
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+# Add parent directory to path untuk import
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.bot_core import FinancialBotCore
+from core.database import DatabaseManager
+from core.maintenance import MAINTENANCE_JOBS, MaintenanceScheduler
+
+class TestMaintenanceJobs(unittest.TestCase):
+    """Test job maintenance di satu DatabaseManager"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db = DatabaseManager(os.path.join(self.temp_dir, 'bot.db'))
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _fragment(self):
+        """Isi lalu hapus sebagian besar transaksi supaya freelist terisi"""
+        self.db.add_transactions_bulk([("user", "User", 'expense', 1000, 'makanan', 'kopi ' * 40,
+                                        '2024-01-01 10:00:00')] * 5000)
+        with self.db.pool.connection() as conn:
+            conn.execute("DELETE FROM transactions WHERE id % 5 != 0")
+            conn.commit()
+        return self.db.get_storage_stats()
+
+    def test_new_database_uses_incremental_auto_vacuum(self):
+        stats = self.db.get_storage_stats()
+        self.assertEqual(stats['auto_vacuum'], 2)
+        self.assertEqual(stats['database'], 'bot.db')
+        self.assertGreater(stats['size_bytes'], 0)
+        self.assertFalse(stats['analyzed'])
+
+    def test_all_jobs(self):
+        before = self._fragment()
+        self.assertGreater(before['freelist_count'], 0)
+
+        results = {job: self.db.run_maintenance(job) for job in MAINTENANCE_JOBS}
+        self.assertEqual({job: result['status'] for job, result in results.items()},
+                         {job: 'ok' for job in MAINTENANCE_JOBS})
+
+        vacuum = results['incremental_vacuum']
+        # ANALYZE memakai halaman kosong untuk sqlite_stat1
+        self.assertGreater(vacuum['freelist_before'], 0)
+        self.assertEqual(vacuum['freelist_count'], 0)
+        self.assertLess(vacuum['page_count'], vacuum['page_count_before'])
+
+        after = self.db.get_storage_stats()
+        self.assertTrue(after['analyzed'])
+        self.assertLess(after['page_count'], before['page_count'])
+        self.assertIn("frame WAL", results['checkpoint']['detail'])
+        # Data yang tersisa tidak berubah
+        self.assertEqual(self.db.get_user_balance("user")['expense'], 1000 * 1000)
+        self.assertEqual(self.db.verify_user_balances(), [])
+
+    def test_time_budget_and_busy_stop_job(self):
+        before = self._fragment()
+        timeout = self.db.run_maintenance('incremental_vacuum', time_budget=0)
+        self.assertEqual(timeout['status'], 'timeout')
+        self.assertEqual(timeout['freelist_count'], before['freelist_count'])
+
+        busy = self.db.run_maintenance('incremental_vacuum', is_busy=lambda: True)
+        self.assertEqual(busy['status'], 'busy')
+
+        # Statement yang sedang berjalan dibatalkan lewat progress handler dan di-rollback
+        analyze = self.db.run_maintenance('analyze', time_budget=0)
+        self.assertEqual(analyze['status'], 'timeout')
+        self.assertFalse(self.db.get_storage_stats()['analyzed'])
+        self.assertEqual(self.db.get_transaction("user", 5)['amount'], 1000)
+
+    def test_unknown_job(self):
+        with self.assertRaises(ValueError):
+            self.db.run_maintenance('reindex')
+
+    def test_legacy_database_needs_full_vacuum(self):
+        with self.db.pool.connection() as conn:
+            conn.execute("PRAGMA auto_vacuum = NONE")
+            conn.execute("VACUUM")
+        self.assertEqual(self.db.get_storage_stats()['auto_vacuum'], 0)
+        self.assertIn("--full-vacuum", self.db.run_maintenance('incremental_vacuum')['detail'])
+
+        self.db.vacuum()
+        self.assertEqual(self.db.get_storage_stats()['auto_vacuum'], 2)
+
+class TestMaintenanceScheduler(unittest.TestCase):
+    """Test penjadwalan, backoff saat sibuk dan integrasi dengan FinancialBotCore"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'bot.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _wait_for(self, condition, timeout: float = 5.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail("kondisi tidak tercapai")
+            time.sleep(0.01)
+
+    def test_busy_backoff_then_run(self):
+        db = DatabaseManager(self.db_path)
+        busy = [True]
+        scheduler = MaintenanceScheduler([db], intervals={'checkpoint': 0.01}, is_busy=lambda: busy[0],
+                                         backoff_seconds=0.01, max_backoff_seconds=0.05)
+        try:
+            self._wait_for(lambda: scheduler.busy_skips >= 3)
+            self.assertEqual(list(scheduler.history), [])
+
+            busy[0] = False
+            self._wait_for(lambda: len(scheduler.history) >= 2)
+            stats = scheduler.stats()
+            self.assertEqual(stats['history'][0]['job'], 'checkpoint')
+            self.assertEqual(stats['history'][0]['status'], 'ok')
+            self.assertEqual(stats['databases'][0]['database'], 'bot.db')
+            self.assertEqual(list(stats['next_run_seconds']), ['checkpoint'])
+        finally:
+            scheduler.close()
+            db.close()
+
+    def test_unknown_job_interval(self):
+        with self.assertRaises(ValueError):
+            MaintenanceScheduler([], intervals={'reindex': 60})
+
+    def test_bot_core_maintenance(self):
+        bot = FinancialBotCore(self.db_path, shard_count=2, maintenance=True)
+        try:
+            self.assertFalse(bot.is_busy())
+            bot.process_message("user", "User", "!income 100000 gaji")
+            self.assertTrue(bot.is_busy())
+
+            results = bot.run_maintenance()
+            self.assertEqual([result['job'] for result in results[::2]], list(MAINTENANCE_JOBS))
+            self.assertEqual(len(results), 2 * len(MAINTENANCE_JOBS))
+            stats = bot.get_maintenance_stats()
+            self.assertEqual(len(stats['databases']), 2)
+            self.assertEqual(len(stats['history']), len(results))
+        finally:
+            bot.close()
+
+        memory_bot = FinancialBotCore(backend='memory', maintenance=True)
+        try:
+            self.assertIsNone(memory_bot.get_maintenance_stats())
+            self.assertEqual(memory_bot.run_maintenance(), [])
+        finally:
+            memory_bot.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,323 @@
+"""
+Unit tests untuk migrasi skema database
+Testing PRAGMA user_version dan upgrade database lama
+"""
+
+import unittest
+import os
+import tempfile
+import sys
+import gc
+import shutil
+import sqlite3
+import threading
+
+# Add parent directory to path untuk import
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.archive import ARCHIVE_COLUMNS, archive_path_for, init_archive
+from core.database import DELETE_TRANSACTIONS_SQL, DatabaseManager
+from core.migrations import (LEDGER_BACKFILL_VERSION, MINOR_UNITS_VERSION, backfill_ledger,
+                             has_legacy_transactions, latest_version, migrate)
+
+# Skema sebelum ada sistem migrasi (user_version = 0)
+LEGACY_SCHEMA = '''
+    CREATE TABLE transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        username TEXT NOT NULL,
+        transaction_type TEXT NOT NULL CHECK (transaction_type IN ('income', 'expense')),
+        amount REAL NOT NULL,
+        category TEXT NOT NULL,
+        description TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE categories (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE NOT NULL,
+        type TEXT NOT NULL CHECK (type IN ('income', 'expense', 'both'))
+    );
+    INSERT INTO categories (name, type) VALUES ('Gaji', 'income'), ('Makanan', 'expense');
+'''
+
+class TestMigrations(unittest.TestCase):
+    """Test migrasi skema"""
+
+    def setUp(self):
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+        self.temp_db.close()
+        self.db = None
+
+    def tearDown(self):
+        if self.db:
+            self.db.close()
+        gc.collect()
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                if os.path.exists(self.temp_db.name + suffix):
+                    os.unlink(self.temp_db.name + suffix)
+            except PermissionError:
+                pass
+
+    def _indexes(self):
+        with self.db.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'ledger'"
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def test_fresh_database_at_latest_version(self):
+        """Database baru langsung berada di versi terbaru"""
+        self.db = DatabaseManager(self.temp_db.name)
+        self.assertEqual(self.db.get_schema_version(), latest_version())
+        self.assertIn('idx_ledger_user_created', self._indexes())
+
+    def test_upgrade_legacy_database_in_place(self):
+        """Database lama tanpa user_version di-upgrade tanpa kehilangan data"""
+        conn = sqlite3.connect(self.temp_db.name)
+        conn.executescript(LEGACY_SCHEMA)
+        conn.execute('''
+            INSERT INTO transactions (user_id, username, transaction_type, amount, category, description)
+            VALUES ('old_user', 'Old', 'income', 750000, 'gaji', 'data lama')
+        ''')
+        conn.commit()
+        conn.close()
+
+        self.db = DatabaseManager(self.temp_db.name)
+
+        self.assertEqual(self.db.get_schema_version(), latest_version())
+        self.assertEqual(self.db.get_user_balance('old_user')['income'], 75000000)
+        self.assertIn('idx_ledger_user_created', self._indexes())
+        self.assertEqual(self.db.verify_user_balances(), [])
+        self.assertEqual(self.db.get_category_report('old_user'), {'gaji': {'income': 75000000, 'expense': 0}})
+
+    def test_migrate_is_idempotent(self):
+        """Menjalankan migrasi ulang tidak menerapkan apapun"""
+        self.db = DatabaseManager(self.temp_db.name)
+        with self.db.pool.connection() as conn:
+            self.assertEqual(migrate(conn), [])
+
+    def test_per_user_queries_use_index(self):
+        """Query per-user tidak lagi full table scan"""
+        self.db = DatabaseManager(self.temp_db.name)
+        queries = [
+            "SELECT COALESCE(SUM(amount), 0) FROM transactions WHERE user_id = ? AND transaction_type = 'income'",
+            "SELECT id FROM transactions WHERE user_id = ? ORDER BY created_at DESC LIMIT 10",
+            "SELECT id FROM transactions WHERE user_id = ? AND (created_at, id) < ('2024-01-01', 5) ORDER BY created_at DESC, id DESC LIMIT 10",
+            "SELECT category, transaction_type, SUM(total) FROM monthly_rollups WHERE user_id = ? GROUP BY category, transaction_type",
+        ]
+        with self.db.pool.connection() as conn:
+            for query in queries:
+                plan = " ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, ('user',)))
+                self.assertIn("USING", plan, query)
+                self.assertNotIn("SCAN transactions", plan, query)
+
+class TestLedgerMigration(unittest.TestCase):
+    """Test migrasi online dari tabel transactions lama ke ledger ringkas"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'bot.db')
+        self.db = None
+
+        # Database versi 6 (sebelum ledger) dengan nama kategori yang tidak terdaftar
+        conn = sqlite3.connect(self.db_path)
+        migrate(conn, target=6)
+        conn.executemany('''
+            INSERT INTO transactions (user_id, username, transaction_type, amount, category, description, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [(f"user{i % 7}", f"Nama{i % 7}-{i // 1000}", 'income' if i % 4 == 0 else 'expense',
+               1000 + i * 0.5, ('makanan', 'Gaji', 'kopi susu')[i % 3], f"transaksi {i}",
+               f"2023-{1 + i % 12:02d}-{1 + i % 28:02d} 10:00:00") for i in range(3000)])
+        conn.execute("DELETE FROM transactions WHERE id = 3000")
+        conn.commit()
+        conn.execute("VACUUM")
+        self.legacy_pages = conn.execute("PRAGMA page_count").fetchone()[0]
+        conn.close()
+
+    def tearDown(self):
+        if self.db:
+            self.db.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _dump(self, conn):
+        return [conn.execute(query).fetchall() for query in (
+            "SELECT * FROM transactions ORDER BY id",
+            "SELECT * FROM user_balances ORDER BY user_id",
+            "SELECT * FROM monthly_rollups ORDER BY 1, 2, 3, 4",
+            "SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH 'kopi' ORDER BY rowid",
+            "SELECT name, type FROM categories WHERE listed = 1 ORDER BY name",
+        )]
+
+    def test_legacy_delete_range_uses_primary_key(self):
+        """Hapus rentang di tabel lama (sebelum ledger) lewat primary key, bukan index per user"""
+        conn = sqlite3.connect(self.db_path)
+        plan = " ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + DELETE_TRANSACTIONS_SQL,
+                                                       (1, 2, 'user1')))
+        conn.close()
+        self.assertIn("INTEGER PRIMARY KEY", plan)
+        self.assertNotIn("idx_", plan)
+
+    def test_backfill_in_batches_matches_inline(self):
+        """Backfill per batch dengan tulisan di tengahnya sama hasilnya dengan migrasi sekaligus"""
+        inline_path = os.path.join(self.temp_dir, 'inline.db')
+        shutil.copy(self.db_path, inline_path)
+        writes = [
+            ("INSERT INTO transactions (user_id, username, transaction_type, amount, category, description) "
+             "VALUES ('user1', 'Baru', 'expense', 12345.67, 'kopi tubruk', 'kopi')"),
+            "DELETE FROM transactions WHERE id = 2",
+        ]
+
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        migrate(conn, target=LEDGER_BACKFILL_VERSION)
+        for statement in writes:
+            conn.execute(statement)
+        steps = 0
+        while True:
+            conn.execute('BEGIN IMMEDIATE')
+            copied = backfill_ledger(conn, 700)
+            conn.execute('COMMIT')
+            if not copied:
+                break
+            steps += 1
+        self.assertEqual(steps, 5)
+        migrate(conn)
+        self.assertTrue(has_legacy_transactions(conn))
+
+        inline = sqlite3.connect(inline_path, isolation_level=None)
+        for statement in writes:
+            inline.execute(statement)
+        migrate(inline)
+        try:
+            self.assertEqual(self._dump(conn), self._dump(inline))
+            self.assertEqual(conn.execute("SELECT username FROM users WHERE user_key = 'user1'").fetchone()[0], 'Baru')
+            self.assertEqual(conn.execute("SELECT username FROM users WHERE user_key = 'user6'").fetchone()[0], 'Nama6-2')
+            self.assertEqual(conn.execute("SELECT amount FROM transactions WHERE id = 3001").fetchone()[0], 1234567)
+        finally:
+            conn.close()
+            inline.close()
+
+    def test_online_migration_while_writing(self):
+        """Tulisan (termasuk write-behind yang antri saat cutover) tetap benar selama migrasi"""
+        self.db = DatabaseManager(self.db_path, online_migration=True, write_behind=True, read_replica=True)
+        ids = []
+        deleted = []
+
+        def writer():
+            # Sebelum cutover: DELETE ... RETURNING di tabel lama, amount REAL dikembalikan dalam sen
+            deleted.extend(self.db.delete_transactions("user3", 100, 130))
+            for i in range(200):
+                ids.append(self.db.submit_transaction("user9", "Sembilan", 'expense', 100, 'makanan', f"w{i}").result())
+            self.db.add_transactions_bulk([("user8", "Delapan", 'income', 5000, 'Gaji', 'bonus')] * 3)
+            self.db.delete_transaction("user1", 2)
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        self.db.migrate_ledger(batch_size=300)
+        thread.join()
+        self.db.flush_writes()
+
+        self.assertEqual(self.db.get_schema_version(), latest_version())
+        with self.db.pool.connection() as conn:
+            self.assertFalse(has_legacy_transactions(conn))
+        self.assertEqual(len(set(ids)), 200)
+        self.assertTrue(all(self.db.get_transaction("user9", transaction_id) for transaction_id in ids))
+        self.assertEqual(self.db.get_user_balance("user9")['expense'], 20000)
+        self.assertEqual(self.db.get_category_report("user8"), {'Gaji': {'income': 15000, 'expense': 0}})
+        self.assertIsNone(self.db.get_transaction("user1", 2))
+        self.assertEqual([(t['id'], t['amount']) for t in deleted],
+                         [(i + 1, 100000 + 50 * i) for i in range(99, 130) if i % 7 == 3])
+        self.assertEqual(self.db.delete_transactions("user3", 100, 130), [])
+        self.assertEqual(self.db.verify_user_balances(), [])
+
+        # Id AUTOINCREMENT tabel lama (termasuk yang sudah dihapus) tidak dipakai ulang
+        self.assertGreater(min(ids), 3000)
+        self.assertGreater(self.db.submit_transaction("user9", "Sembilan", 'expense', 1, 'makanan').result(), 3203)
+
+    def test_small_database_migrates_at_start_and_shrinks(self):
+        """Database kecil langsung dimigrasi, file lebih kecil setelah VACUUM"""
+        self.db = DatabaseManager(self.db_path)
+        self.assertIsNone(self.db._migration_thread)
+        self.assertEqual(self.db.get_schema_version(), latest_version())
+        with self.db.pool.connection() as conn:
+            self.assertFalse(has_legacy_transactions(conn))
+        self.db.vacuum()
+        self.assertLess(self.db.get_storage_stats()['page_count'], self.legacy_pages)
+
+        # Nama kategori dari transaksi lama tidak ikut ditawarkan sampai ditambahkan
+        self.assertNotIn('kopi susu', self.db.categories)
+        self.assertTrue(self.db.add_category('kopi susu', 'expense'))
+        self.assertEqual(self.db.categories.type_of('kopi susu'), 'expense')
+        self.assertFalse(self.db.add_category('Kopi Susu', 'expense'))
+
+class TestMinorUnitsMigration(unittest.TestCase):
+    """Test konversi amount rupiah REAL ke sen INTEGER (database utama dan arsip)"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'bot.db')
+        self.db = None
+
+        # Versi sebelum sen: 0.1 dijumlah sepuluh kali sebagai float tidak tepat 1.0
+        conn = sqlite3.connect(self.db_path)
+        migrate(conn, target=MINOR_UNITS_VERSION - 1)
+        conn.executemany('''
+            INSERT INTO transactions (user_id, username, transaction_type, amount, category, description, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [("user1", "User1", 'expense', 0.1, 'makanan', 'permen', '2024-01-10 10:00:00')] * 10 + [
+            ("user1", "User1", 'income', 12345.67, 'gaji', 'gaji', '2024-01-01 10:00:00'),
+            ("user2", "User2", 'income', 5000000, 'gaji', 'gaji', '2024-02-01 10:00:00'),
+        ])
+        # Transaksi yang sudah diarsip tetap dihitung di user_balances
+        conn.execute("UPDATE user_balances SET total_expense = total_expense + 2500.5, "
+                     "transaction_count = transaction_count + 1 WHERE user_id = 'user1'")
+        conn.commit()
+        conn.close()
+
+        init_archive(archive_path_for(self.db_path))
+        archive = sqlite3.connect(archive_path_for(self.db_path))
+        archive.execute(f"INSERT INTO transactions ({ARCHIVE_COLUMNS}) VALUES "
+                        "(100, 'user1', 'User1', 'expense', 2500.5, 'transport', 'ojek', '2020-01-01 10:00:00')")
+        archive.commit()
+        archive.close()
+
+    def tearDown(self):
+        if self.db:
+            self.db.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_amounts_converted_in_place(self):
+        """Jumlah lama jadi sen tepat, termasuk ringkasan, rollup dan arsip"""
+        self.db = DatabaseManager(self.db_path)
+        self.assertEqual(self.db.get_schema_version(), latest_version())
+
+        with self.db.pool.connection() as conn:
+            for query in ("SELECT DISTINCT typeof(amount_minor) FROM ledger",
+                          "SELECT DISTINCT typeof(total_income) FROM user_balances",
+                          "SELECT DISTINCT typeof(total_expense) FROM user_balances",
+                          "SELECT DISTINCT typeof(total) FROM monthly_rollups",
+                          "SELECT DISTINCT typeof(amount) FROM archive.transactions"):
+                self.assertEqual(conn.execute(query).fetchall(), [('integer',)], query)
+            self.assertEqual(conn.execute("PRAGMA archive.user_version").fetchone()[0], 1)
+
+        self.assertEqual(self.db.get_user_balance("user1"),
+                         {'income': 1234567, 'expense': 250150, 'balance': 984417})
+        self.assertEqual(self.db.get_transaction("user1", 100)['amount'], 250050)
+        self.assertEqual(self.db.get_category_report("user2"), {'gaji': {'income': 500000000, 'expense': 0}})
+        self.assertEqual(self.db.verify_user_balances(), [])
+
+        # Transaksi baru langsung dalam sen; membuka ulang tidak mengonversi dua kali
+        self.db.add_transaction("user1", "User1", 'expense', 1, 'makanan', 'sen')
+        self.db.close()
+        self.db = DatabaseManager(self.db_path)
+        self.assertEqual(self.db.get_user_balance("user1")['expense'], 250151)
+        self.assertEqual(self.db.get_transaction("user1", 100)['amount'], 250050)
+
+    def test_fractional_sen_rejected(self):
+        """Jumlah yang bukan sen bulat ditolak, bukan dibulatkan diam-diam"""
+        self.db = DatabaseManager(self.db_path)
+        self.assertFalse(self.db.add_transaction("user1", "User1", 'expense', 10.5, 'makanan'))
+        self.assertEqual(self.db.get_user_balance("user1")['expense'], 250150)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Unit tests untuk jumlah uang dalam sen
+Konversi rupiah <-> sen dan total yang tepat setelah jutaan transaksi acak
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+from collections import defaultdict
+from decimal import Decimal
+
+# Add parent directory to path untuk import
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.analytics import analyze_transactions
+from core.database import DatabaseManager
+from core.money import MAX_MINOR, as_minor, format_rupiah, scale_minor, to_decimal, to_minor
+
+class TestMoney(unittest.TestCase):
+    """Test konversi dan format jumlah"""
+
+    def test_to_minor(self):
+        self.assertEqual(to_minor(50000), 5000000)
+        self.assertEqual(to_minor('12345.67'), 1234567)
+        self.assertEqual(to_minor(Decimal('0.005')), 1)
+        # Float dibaca lewat repr, bukan nilai binernya (0.1 + 0.2 = 0.30000000000000004)
+        self.assertEqual(to_minor(0.1), 10)
+        self.assertEqual(to_minor(1.005), 101)
+        for invalid in ('abc', '', None, float('nan'), float('inf'), True, 10 ** 20):
+            with self.subTest(value=invalid):
+                with self.assertRaises(ValueError):
+                    to_minor(invalid)
+
+    def test_as_minor(self):
+        self.assertEqual(as_minor(150), 150)
+        self.assertEqual(as_minor(150.0), 150)
+        self.assertEqual(as_minor(-MAX_MINOR), -MAX_MINOR)
+        for invalid in (10.5, '150', True, None, MAX_MINOR + 1):
+            with self.subTest(value=invalid):
+                with self.assertRaises(ValueError):
+                    as_minor(invalid)
+
+    def test_format_and_scale(self):
+        self.assertEqual(format_rupiah(125000000), '1,250,000')
+        self.assertEqual(format_rupiah(1234550), '12,346')
+        self.assertEqual(format_rupiah(-1234550), '-12,346')
+        self.assertEqual(format_rupiah(0), '0')
+        self.assertEqual(to_decimal(5000000), Decimal('50000.00'))
+        self.assertEqual(str(to_decimal(-5)), '-0.05')
+        self.assertEqual(scale_minor(1000, 15), 150)
+        self.assertEqual(scale_minor(5, 30), 2)
+        self.assertEqual(scale_minor(-5, 50), -3)
+
+class TestExactTotals(unittest.TestCase):
+    """Property test: total dari database sama persis dengan jumlah int di Python"""
+
+    TRANSACTIONS = 1_000_000
+    USERS = 40
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db = DatabaseManager(os.path.join(self.temp_dir, 'bot.db'))
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_totals_match_after_million_random_transactions(self):
+        rng = random.Random(24)
+        categories = ['makanan', 'transport', 'gaji', 'hiburan']
+        expected = defaultdict(lambda: {'income': 0, 'expense': 0})
+        by_category = defaultdict(lambda: defaultdict(lambda: {'income': 0, 'expense': 0}))
+        float_totals = defaultdict(float)
+
+        def rows():
+            for _ in range(self.TRANSACTIONS):
+                user = f"user{rng.randrange(self.USERS)}"
+                transaction_type = 'income' if rng.random() < 0.5 else 'expense'
+                # Sampai 100 miliar rupiah per transaksi, dengan sen acak
+                amount = rng.randrange(1, 10 ** 13)
+                category = rng.choice(categories)
+                expected[user][transaction_type] += amount
+                by_category[user][category][transaction_type] += amount
+                float_totals[user, transaction_type] += amount / 100
+                yield (user, "User", transaction_type, amount, category, '',
+                       f"2024-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d} 10:00:00")
+
+        self.assertEqual(self.db.add_transactions_bulk(rows())['inserted'], self.TRANSACTIONS)
+
+        for user, totals in expected.items():
+            balance = self.db.get_user_balance(user)
+            self.assertEqual((balance['income'], balance['expense']), (totals['income'], totals['expense']))
+            self.assertEqual(balance['balance'], totals['income'] - totals['expense'])
+            self.assertEqual(self.db.get_category_report(user), {
+                category: dict(amounts) for category, amounts in by_category[user].items()})
+
+        totals = self.db.get_totals()
+        self.assertEqual(totals['income'], sum(t['income'] for t in expected.values()))
+        self.assertEqual(totals['expense'], sum(t['expense'] for t in expected.values()))
+        self.assertEqual(self.db.verify_user_balances(), [])
+
+        # Analitik NumPy menjumlah int64 dengan hasil yang sama
+        analytics = analyze_transactions(self.db.iter_transaction_rows("user0"), window=12)
+        self.assertEqual(sum(analytics['income']), expected['user0']['income'])
+        self.assertEqual(sum(analytics['expense']), expected['user0']['expense'])
+
+        # Penjumlahan float rupiah untuk data yang sama sudah meleset
+        self.assertTrue(any(to_minor(float_totals[user, 'income']) != totals['income']
+                            for user, totals in expected.items()))
+
+if __name__ == '__main__':
+    unittest.main()
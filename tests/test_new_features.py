@@ -52,10 +52,10 @@ class TestNewFeatures(unittest.TestCase):
     def test_purchase_planning_parsing(self):
         """Test purchase planning command parsing"""
         test_cases = [
-            ("I want to buy a car 30000000", "car", 30000000.0),
-            ("saya mau beli laptop 15000000", "laptop", 15000000.0),
-            ("I want to buy a house 500000000", "house", 500000000.0),
-            ("saya ingin beli motor 25000000", "motor", 25000000.0)
+            ("I want to buy a car 30000000", "car", 3000000000),
+            ("saya mau beli laptop 15000000", "laptop", 1500000000),
+            ("I want to buy a house 500000000", "house", 50000000000),
+            ("saya ingin beli motor 25000000", "motor", 2500000000)
         ]
         
         for command, expected_item, expected_price in test_cases:
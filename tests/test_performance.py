@@ -3,6 +3,7 @@ Performance tests for Financial Bot
 Tests response times, memory usage, and scalability
 """
 import unittest
+import asyncio
 import tempfile
 import os
 import time
@@ -252,5 +253,67 @@ class TestPerformance(unittest.TestCase):
                           f"Regex processing took {processing_time:.3f}s for message length {len(message)}")
 
 
+
+class TestAsyncPerformance(unittest.IsolatedAsyncioTestCase):
+    
+    async def asyncSetUp(self):
+        """Setup test environment"""
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+        self.temp_db.close()
+        self.bot = FinancialBotCore(db_path=self.temp_db.name)
+    
+    async def asyncTearDown(self):
+        """Clean up"""
+        self.bot.close()
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                if os.path.exists(self.temp_db.name + suffix):
+                    os.unlink(self.temp_db.name + suffix)
+            except (PermissionError, FileNotFoundError):
+                pass
+    
+    async def _measure_loop_lag(self, stop: asyncio.Event, interval: float = 0.005):
+        """Ukur keterlambatan event loop selama beban berjalan"""
+        worst = 0.0
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            worst = max(worst, time.perf_counter() - start - interval)
+        return worst
+    
+    async def test_event_loop_lag_under_concurrent_users(self):
+        """Event loop tetap responsif saat banyak user mengirim pesan bersamaan"""
+        async def user_session(user_id):
+            for i in range(5):
+                await self.bot.process_message_async(
+                    str(user_id), f"User{user_id}", f"habis {50000 + i} untuk makanan")
+            return await self.bot.process_message_async(str(user_id), f"User{user_id}", "berapa saldo saya")
+        
+        stop = asyncio.Event()
+        monitor = asyncio.create_task(self._measure_loop_lag(stop))
+        responses = await asyncio.gather(*(user_session(i) for i in range(30)))
+        stop.set()
+        worst_lag = await monitor
+        
+        self.assertEqual(len(responses), 30)
+        for response in responses:
+            self.assertIn("Ringkasan Keuangan", response)
+        
+        # Pekerjaan blocking ada di executor, jadi loop tidak tertahan lama
+        self.assertLess(worst_lag, 0.1, f"Event loop lag {worst_lag * 1000:.1f}ms")
+    
+    async def test_run_blocking_commands(self):
+        """Query untuk command !stats, !recent, !categories lewat executor"""
+        await self.bot.process_message_async("user", "User", "saya dapat gaji 5000000 dari kantor")
+        
+        stats = await self.bot.run_blocking(self.bot.get_user_stats, "user")
+        recent = await self.bot.run_blocking(self.bot.db.get_user_transactions, "user", 10)
+        categories = await self.bot.run_blocking(self.bot.db.get_available_categories, 'income')
+        
+        self.assertEqual(stats['balance']['income'], 500000000)
+        self.assertEqual(len(recent), 1)
+        self.assertIn('Gaji', categories)
+
+
 if __name__ == '__main__':
     unittest.main()
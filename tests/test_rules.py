@@ -10,7 +10,9 @@ import os
 # Add parent directory to path untuk import
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from core.rules import FinancialRulesEngine, ReflectionEngine
+from datetime import datetime
+
+from core.rules import FinancialRulesEngine, ReflectionEngine, WIB
 
 class TestReflectionEngine(unittest.TestCase):
     """Test reflection kata ganti"""
@@ -32,59 +34,65 @@ class TestFinancialRulesEngine(unittest.TestCase):
     def setUp(self):
         self.rules_engine = FinancialRulesEngine()
     
+    def test_explicit_category_recategorized_by_keywords(self):
+        """Kategori yang disebut user tetap dipetakan ulang jika deskripsi cocok keyword"""
+        self.assertEqual(self.rules_engine.parse_command("dapat 500000 hadiah bonus kantor")['category'], 'gaji')
+        self.assertEqual(self.rules_engine.parse_command("!expense 25000 transport makan siang")['category'], 'makanan')
+        self.assertEqual(self.rules_engine.parse_command("!expense 25000 lainnya bensin motor")['category'], 'transport')
+    
     def test_income_command_parsing(self):
         """Test parsing perintah pemasukan"""
         # Test command format
         result = self.rules_engine.parse_command("!income 5000000 gaji bonus akhir tahun")
         self.assertEqual(result['type'], 'income')
-        self.assertEqual(result['amount'], 5000000.0)
+        self.assertEqual(result['amount'], 500000000)
         self.assertEqual(result['category'], 'gaji')
         self.assertEqual(result['description'], 'bonus akhir tahun')
         
         # Test natural language - Fixed pattern
         result = self.rules_engine.parse_command("saya dapat freelance 1000000 dari projek website")
         self.assertEqual(result['type'], 'income')
-        self.assertEqual(result['amount'], 1000000.0)
+        self.assertEqual(result['amount'], 100000000)
         self.assertEqual(result['category'], 'freelance')
         
         # Test simple format
         result = self.rules_engine.parse_command("dapat 1000000 freelance")
         self.assertEqual(result['type'], 'income')
-        self.assertEqual(result['amount'], 1000000.0)
+        self.assertEqual(result['amount'], 100000000)
         
         # Test with synonyms
         result = self.rules_engine.parse_command("saya meraih gaji 2000000")
         self.assertEqual(result['type'], 'income')
-        self.assertEqual(result['amount'], 2000000.0)
+        self.assertEqual(result['amount'], 200000000)
     
     def test_expense_command_parsing(self):
         """Test parsing perintah pengeluaran"""
         # Test command format
         result = self.rules_engine.parse_command("!expense 50000 makanan lunch dengan teman")
         self.assertEqual(result['type'], 'expense')
-        self.assertEqual(result['amount'], 50000.0)
+        self.assertEqual(result['amount'], 5000000)
         self.assertEqual(result['category'], 'makanan')
         self.assertEqual(result['description'], 'lunch dengan teman')
         
         # Test natural language
         result = self.rules_engine.parse_command("saya habis 75000 untuk transport")
         self.assertEqual(result['type'], 'expense')
-        self.assertEqual(result['amount'], 75000.0)
+        self.assertEqual(result['amount'], 7500000)
         
         # Test alternative format: beli makanan 25000
         result = self.rules_engine.parse_command("beli makanan 25000")
         self.assertEqual(result['type'], 'expense')
         self.assertEqual(result['category'], 'makanan')
-        self.assertEqual(result['amount'], 25000.0)
+        self.assertEqual(result['amount'], 2500000)
         
         # Test with synonyms
         result = self.rules_engine.parse_command("saya menghabiskan 100000 untuk hiburan")
         self.assertEqual(result['type'], 'expense')
-        self.assertEqual(result['amount'], 100000.0)
+        self.assertEqual(result['amount'], 10000000)
         
         result = self.rules_engine.parse_command("saya belanja 200000 baju")
         self.assertEqual(result['type'], 'expense')
-        self.assertEqual(result['amount'], 200000.0)
+        self.assertEqual(result['amount'], 20000000)
     
     def test_balance_command_parsing(self):
         """Test parsing perintah saldo"""
@@ -114,6 +122,44 @@ class TestFinancialRulesEngine(unittest.TestCase):
             result = self.rules_engine.parse_command(test_case)
             self.assertEqual(result['type'], 'report', f"Failed for: {test_case}")
     
+    def test_period_parsing(self):
+        """Test parsing frasa periode ke rentang UTC"""
+        # Rabu 14 Feb 2024 pukul 03:00 WIB
+        now = datetime(2024, 2, 14, 3, 0, tzinfo=WIB)
+        cases = {
+            "laporan hari ini": (datetime(2024, 2, 13, 17), datetime(2024, 2, 14, 17)),
+            "saldo kemarin": (datetime(2024, 2, 12, 17), datetime(2024, 2, 13, 17)),
+            "laporan minggu ini": (datetime(2024, 2, 11, 17), datetime(2024, 2, 18, 17)),
+            "pengeluaran minggu lalu": (datetime(2024, 2, 4, 17), datetime(2024, 2, 11, 17)),
+            "laporan bulan ini": (datetime(2024, 1, 31, 17), datetime(2024, 2, 29, 17)),
+            "laporan bulan lalu": (datetime(2023, 12, 31, 17), datetime(2024, 1, 31, 17)),
+            "laporan tahun ini": (datetime(2023, 12, 31, 17), datetime(2024, 12, 31, 17)),
+            "laporan tahun lalu": (datetime(2022, 12, 31, 17), datetime(2023, 12, 31, 17)),
+        }
+        
+        for text, (start, end) in cases.items():
+            period = self.rules_engine.parse_period(text, now=now)
+            self.assertEqual((period['start'], period['end']), (start, end), f"Failed for: {text}")
+    
+    def test_period_command_parsing(self):
+        """Test laporan dan saldo dengan periode"""
+        result = self.rules_engine.parse_command("laporan bulan ini")
+        self.assertEqual(result['type'], 'report')
+        self.assertEqual(result['period']['label'], 'bulan ini')
+        
+        result = self.rules_engine.parse_command("berapa saldo saya minggu ini")
+        self.assertEqual(result['type'], 'balance')
+        self.assertEqual(result['period']['label'], 'minggu ini')
+        
+        result = self.rules_engine.parse_command("pengeluaran minggu lalu")
+        self.assertEqual(result['type'], 'report')
+        self.assertEqual(result['focus'], 'expense')
+        
+        # Deskripsi transaksi yang menyebut periode tetap dicatat sebagai transaksi
+        result = self.rules_engine.parse_command("!income 5000000 gaji bulan ini")
+        self.assertEqual(result['type'], 'income')
+        self.assertNotIn('period', self.rules_engine.parse_command("laporan"))
+    
     def test_help_command_parsing(self):
         """Test parsing perintah bantuan"""
         test_cases = [
@@ -192,40 +238,54 @@ class TestFinancialRulesEngine(unittest.TestCase):
         result = self.rules_engine.parse_command("hapus transaksi 456")
         self.assertEqual(result['type'], 'delete')
         self.assertEqual(result['transaction_id'], 456)
+        self.assertIsNone(result['last_id'])
+        
+        # Rentang id, urutan terbalik dinormalkan
+        for text in ("hapus transaksi 10-20", "!delete 10 - 20", "hapus 20-10", "batalkan transaksi 10 sampai 20"):
+            result = self.rules_engine.parse_command(text)
+            self.assertEqual((result['type'], result['transaction_id'], result['last_id']), ('delete', 10, 20), text)
+    
+    def test_search_command_parsing(self):
+        """Test parsing perintah cari"""
+        for text, query in [("cari kopi", "kopi"), ("!cari nasi goreng", "nasi goreng"),
+                            ("berapa total saya beli kopi?", "kopi"), ("berapa bayar parkir", "parkir")]:
+            result = self.rules_engine.parse_command(text)
+            self.assertEqual(result['type'], 'search')
+            self.assertEqual(result['query'], query)
     
     def test_automatic_categorization(self):
         """Test kategorisasi otomatis"""
         # Test income categorization
-        category = self.rules_engine.categorize_automatically("gaji bulan ini", 5000000)
+        category = self.rules_engine.categorize_automatically("gaji bulan ini", 500000000)
         self.assertEqual(category, 'gaji')
         
-        category = self.rules_engine.categorize_automatically("projek freelance", 1000000)
+        category = self.rules_engine.categorize_automatically("projek freelance", 100000000)
         self.assertEqual(category, 'freelance')
         
         # Test expense categorization
-        category = self.rules_engine.categorize_automatically("makan siang", 50000)
+        category = self.rules_engine.categorize_automatically("makan siang", 5000000)
         self.assertEqual(category, 'makanan')
         
-        category = self.rules_engine.categorize_automatically("bensin motor", 30000)
+        category = self.rules_engine.categorize_automatically("bensin motor", 3000000)
         self.assertEqual(category, 'transport')
         
-        category = self.rules_engine.categorize_automatically("bayar listrik", 200000)
+        category = self.rules_engine.categorize_automatically("bayar listrik", 20000000)
         self.assertEqual(category, 'tagihan')
         
         # Test with new synonyms
-        category = self.rules_engine.categorize_automatically("lapar banget", 25000)
+        category = self.rules_engine.categorize_automatically("lapar banget", 2500000)
         self.assertEqual(category, 'makanan')
         
-        category = self.rules_engine.categorize_automatically("pekerjaan kantor", 3000000)
+        category = self.rules_engine.categorize_automatically("pekerjaan kantor", 300000000)
         self.assertEqual(category, 'gaji')
     
     def test_amount_parsing(self):
         """Test parsing jumlah uang"""
         # Test various amount formats
-        self.assertEqual(self.rules_engine.parse_amount("1000000"), 1000000.0)
-        self.assertEqual(self.rules_engine.parse_amount("1,000,000"), 1000000.0)
-        self.assertEqual(self.rules_engine.parse_amount("50000"), 50000.0)
-        self.assertEqual(self.rules_engine.parse_amount("invalid"), 0.0)
+        self.assertEqual(self.rules_engine.parse_amount("1000000"), 100000000)
+        self.assertEqual(self.rules_engine.parse_amount("1,000,000"), 100000000)
+        self.assertEqual(self.rules_engine.parse_amount("50000"), 5000000)
+        self.assertEqual(self.rules_engine.parse_amount("invalid"), 0)
     
     def test_unknown_command(self):
         """Test handling perintah tidak dikenal"""
@@ -238,7 +298,7 @@ class TestFinancialRulesEngine(unittest.TestCase):
         # Test income response
         command_result = {
             'type': 'income',
-            'amount': 1000000,
+            'amount': 100000000,
             'category': 'gaji',
             'description': 'gaji bulan ini'
         }
@@ -250,7 +310,7 @@ class TestFinancialRulesEngine(unittest.TestCase):
         # Test expense response
         command_result = {
             'type': 'expense',
-            'amount': 50000,
+            'amount': 5000000,
             'category': 'makanan',
             'description': 'lunch'
         }
@@ -0,0 +1,120 @@
+"""
+Unit tests untuk sharding database
+"""
+
+import unittest
+import os
+import tempfile
+import shutil
+import sys
+
+# Add parent directory to path untuk import
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.sharding import HashRing, ShardedDatabaseManager, rebalance_shards, shard_paths
+
+class TestHashRing(unittest.TestCase):
+    """Test consistent hash ring"""
+
+    def test_distribution_and_stability(self):
+        """User tersebar merata dan menambah shard hanya memindahkan sebagian kecil"""
+        users = [f"user{i}" for i in range(3000)]
+        ring3 = HashRing(['a.db', 'b.db', 'c.db'])
+        ring4 = HashRing(['a.db', 'b.db', 'c.db', 'd.db'])
+
+        counts = [0, 0, 0]
+        for user in users:
+            counts[ring3.get(user)] += 1
+        for count in counts:
+            self.assertGreater(count, 600)
+
+        moved = sum(1 for user in users if ring3.get(user) != ring4.get(user))
+        # Idealnya 1/4 user pindah, modulo biasa memindahkan sekitar 3/4
+        self.assertLess(moved, len(users) * 0.4)
+
+    def test_shard_paths(self):
+        """Nama file shard diturunkan dari path dasar"""
+        self.assertEqual(shard_paths('data/bot.db', 1), ['data/bot.db'])
+        self.assertEqual(shard_paths('data/bot.db', 2), ['data/bot.shard0.db', 'data/bot.shard1.db'])
+
+class TestShardedDatabaseManager(unittest.TestCase):
+    """Test routing query ke shard"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.base_path = os.path.join(self.temp_dir, 'bot.db')
+        self.db = ShardedDatabaseManager(shard_paths(self.base_path, 3))
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_user_queries_routed_to_one_shard(self):
+        """Semua data user ada di satu shard dan query membaca shard itu"""
+        for i in range(30):
+            self.assertTrue(self.db.add_transaction(f"user{i}", "User", 'income', 1000 * (i + 1), 'gaji', 'salary'))
+
+        for i in range(30):
+            user_id = f"user{i}"
+            self.assertEqual(self.db.get_user_balance(user_id)['income'], 1000 * (i + 1))
+            self.assertEqual(self.db.get_user_snapshot(user_id)['transaction_count'], 1)
+            holders = [shard for shard in self.db.shards if shard.get_user_transactions(user_id)]
+            self.assertEqual(holders, [self.db.shard_for(user_id)])
+
+        trans = self.db.get_user_transactions("user5")[0]
+        self.assertEqual(self.db.get_transaction("user5", trans['id'])['amount'], 6000)
+        self.assertTrue(self.db.delete_transaction("user5", trans['id']))
+        self.assertEqual(self.db.get_user_balance("user5")['income'], 0)
+
+    def test_iter_all_rows_rejected_across_shards(self):
+        """Stream semua user ditolak karena id transaksi berulang antar shard"""
+        for i in range(30):
+            self.db.add_transaction(f"user{i}", "User", 'expense', 100, 'makanan')
+        ids = [row[0] for shard in self.db.shards for row in shard.iter_transaction_rows()]
+        self.assertLess(len(set(ids)), len(ids))
+
+        with self.assertRaises(ValueError):
+            self.db.iter_transaction_rows()
+        self.assertEqual(len(list(self.db.iter_transaction_rows("user3"))), 1)
+
+        single = ShardedDatabaseManager(shard_paths(os.path.join(self.temp_dir, 'single.db'), 1))
+        try:
+            single.add_transaction("user", "User", 'expense', 100, 'makanan')
+            self.assertEqual(len(list(single.iter_transaction_rows())), 1)
+        finally:
+            single.close()
+
+    def test_bulk_insert_and_parallel_totals(self):
+        """Bulk insert dibagi per shard dan total admin menjumlah semua shard"""
+        rows = [(f"user{i % 50}", "User", 'expense', 100, 'makanan') for i in range(500)]
+        rows.append(("user1", "User", 'invalid_type', 100, 'makanan'))
+
+        self.assertEqual(self.db.add_transactions_bulk(rows), {'inserted': 500, 'failed': 1})
+        self.assertEqual(self.db.get_totals(),
+                         {'users': 50, 'income': 0, 'expense': 50000, 'transactions': 500})
+        self.assertEqual(self.db.verify_user_balances(), [])
+        self.assertEqual(self.db.get_user_balance("user7")['expense'], 1000)
+
+    def test_rebalance_moves_users(self):
+        """Rebalance ke jumlah shard baru tanpa kehilangan data"""
+        rows = [(f"user{i % 40}", "User", 'income' if i % 2 else 'expense', 100 + i, 'gaji', 'x',
+                 '2024-01-15 10:00:00') for i in range(400)]
+        self.db.add_transactions_bulk(rows)
+        before = {f"user{i}": self.db.get_user_balance(f"user{i}") for i in range(40)}
+        self.db.close()
+
+        moved = rebalance_shards(shard_paths(self.base_path, 3), shard_paths(self.base_path, 5))
+        self.assertGreater(moved, 0)
+        # Rebalance kedua tidak memindahkan apa-apa lagi
+        self.assertEqual(rebalance_shards(shard_paths(self.base_path, 3), shard_paths(self.base_path, 5)), 0)
+
+        self.db = ShardedDatabaseManager(shard_paths(self.base_path, 5))
+        for user_id, balance in before.items():
+            self.assertEqual(self.db.get_user_balance(user_id), balance)
+            self.assertEqual(len(self.db.get_user_transactions(user_id, limit=100)), 10)
+        self.assertEqual(self.db.get_totals()['transactions'], 400)
+        self.assertEqual(self.db.verify_user_balances(), [])
+        self.assertEqual(self.db.get_monthly_summary("user3")[0]['month'], '2024-01')
+
+if __name__ == '__main__':
+    unittest.main()
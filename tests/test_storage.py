@@ -0,0 +1,271 @@
+"""
+Conformance test untuk implementasi Storage
+Test yang sama dijalankan untuk SQLite (DatabaseManager) dan in-memory (MemoryStorage)
+"""
+
+import gc
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+# Add parent directory to path untuk import
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.bot_core import FinancialBotCore
+from core.database import DatabaseManager
+from core.memory_store import MemoryStorage
+from core.storage import Storage
+
+class StorageConformance:
+    """Perilaku yang wajib sama di semua backend (dicampur ke TestCase per backend)"""
+
+    def make_storage(self) -> Storage:
+        raise NotImplementedError
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db = self.make_storage()
+
+    def tearDown(self):
+        self.db.close()
+        gc.collect()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _seed(self):
+        rows = [("user", "User", 'income' if i % 4 == 0 else 'expense', 1000 * (i + 1),
+                 ('gaji', 'makanan', 'transport', 'hiburan')[i % 4], f"transaksi ke {i}",
+                 f"2023-{1 + i % 12:02d}-{1 + i % 28:02d} {i % 24:02d}:00:00") for i in range(48)]
+        return self.db.add_transactions_bulk(rows)
+
+    def test_add_and_balance(self):
+        self.assertTrue(self.db.add_transaction("user", "User", 'income', 500000, 'gaji', 'bulanan'))
+        self.assertTrue(self.db.add_transaction("user", "User", 'expense', 20000, 'makanan', 'siang'))
+        self.assertFalse(self.db.add_transaction("user", "User", 'transfer', 1, 'lainnya'))
+
+        self.assertEqual(self.db.get_user_balance("user"), {'income': 500000, 'expense': 20000, 'balance': 480000})
+        self.assertEqual(self.db.get_user_balance("nobody"), {'income': 0, 'expense': 0, 'balance': 0})
+        self.assertEqual(self.db.get_totals(), {'users': 1, 'income': 500000, 'expense': 20000, 'transactions': 2})
+
+        transaction_id = self.db.submit_transaction("user", "User", 'expense', 5000, 'transport').result()
+        self.assertEqual(self.db.get_transaction("user", transaction_id)['amount'], 5000)
+        self.assertIsNone(self.db.get_transaction("other", transaction_id))
+
+    def test_bulk_insert_counts_invalid_rows(self):
+        result = self.db.add_transactions_bulk([
+            ("user", "User", 'income', 1000, 'gaji'),
+            {'user_id': "user", 'username': "User", 'transaction_type': 'expense', 'amount': 250,
+             'category': 'makanan', 'created_at': '2024-02-01 10:00:00'},
+            ("user", "User", 'bonus', 1000, 'gaji'),
+            ("user", "User", 'income', 'abc', 'gaji'),
+            ("user",),
+        ])
+        self.assertEqual(result, {'inserted': 2, 'failed': 3})
+        self.assertEqual(self.db.get_user_balance("user")['balance'], 750)
+
+    def test_pagination_and_periods(self):
+        self._seed()
+        history = list(self.db.iter_user_transactions("user", page_size=5))
+        self.assertEqual(len(history), 48)
+        keys = [(t['date'], t['id']) for t in history]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+
+        page = self.db.get_transactions_page("user", before=history[9]['id'], page_size=3)
+        self.assertEqual([t['id'] for t in page], [t['id'] for t in history[10:13]])
+        self.assertEqual(self.db.get_transactions_page("user", before=10**9), [])
+
+        start, end = '2023-03-01 00:00:00', '2023-06-15 00:00:00'
+        in_period = [t for t in history if start <= t['date'] < end]
+        self.assertEqual(self.db.get_user_transactions("user", limit=100, start=start, end=end), in_period)
+        self.assertEqual(self.db.get_user_balance("user", start, end)['expense'],
+                         sum(t['amount'] for t in in_period if t['type'] == 'expense'))
+
+    def test_reports_follow_wib_months(self):
+        # 2023-01-31 20:00 UTC = 1 Februari WIB
+        self.db.add_transactions_bulk([
+            ("user", "User", 'expense', 100, 'makanan', 'a', '2023-01-31 16:59:59'),
+            ("user", "User", 'expense', 200, 'makanan', 'b', '2023-01-31 20:00:00'),
+            ("user", "User", 'income', 1000, 'gaji', 'c', '2023-02-10 10:00:00'),
+        ])
+        self.assertEqual(self.db.get_monthly_summary("user"), [
+            {'month': '2023-02', 'income': 1000, 'expense': 200, 'count': 2},
+            {'month': '2023-01', 'income': 0, 'expense': 100, 'count': 1},
+        ])
+        # Periode pas satu bulan WIB (Februari)
+        february = ('2023-01-31 17:00:00', '2023-02-28 17:00:00')
+        self.assertEqual(self.db.get_user_balance("user", *february), {'income': 1000, 'expense': 200, 'balance': 800})
+        self.assertEqual(list(self.db.get_category_report("user", *february)), ['gaji', 'makanan'])
+
+    def test_delete_updates_summaries(self):
+        self._seed()
+        before = self.db.get_user_snapshot("user")
+        victim = self.db.get_user_transactions("user", limit=1)[0]
+
+        self.assertFalse(self.db.delete_transaction("other", victim['id']))
+        self.assertTrue(self.db.delete_transaction("user", victim['id']))
+        self.assertFalse(self.db.delete_transaction("user", victim['id']))
+
+        after = self.db.get_user_snapshot("user")
+        self.assertEqual(after['transaction_count'], before['transaction_count'] - 1)
+        self.assertEqual(after['balance'][victim['type']], before['balance'][victim['type']] - victim['amount'])
+        self.assertEqual(self.db.verify_user_balances(), [])
+        self.assertEqual(self.db.rebuild_user_balances(), 1)
+
+    def test_delete_range_returns_rows(self):
+        self._seed()
+        other_id = self.db.submit_transaction("other", "Other", 'expense', 700, 'makanan', 'kopi transaksi').result()
+        ids = sorted(t['id'] for t in self.db.iter_user_transactions("user"))
+        expected = [self.db.get_transaction("user", transaction_id) for transaction_id in ids[10:21]]
+        before = self.db.get_user_balance("user")
+
+        # Rentang yang mencakup id user lain: hanya milik user yang terhapus
+        deleted = self.db.delete_transactions("user", ids[10], other_id)
+        self.assertEqual(deleted[:11], expected)
+        self.assertEqual(len(deleted), len(ids) - 10)
+        self.assertEqual(self.db.get_transaction("other", other_id)['amount'], 700)
+        self.assertEqual(self.db.delete_transactions("user", ids[10], ids[20]), [])
+
+        after = self.db.get_user_balance("user")
+        for kind in ('income', 'expense'):
+            self.assertEqual(after[kind], before[kind] - sum(t['amount'] for t in deleted if t['type'] == kind))
+        self.assertEqual(self.db.search_transactions("user", "transaksi")['count'], 10)
+        self.assertEqual(self.db.get_user_snapshot("user")['transaction_count'], 10)
+        self.assertEqual(self.db.delete_transactions("user", ids[0])[0]['id'], ids[0])
+        self.assertEqual(self.db.verify_user_balances(), [])
+
+    def test_search(self):
+        self.db.add_transaction("user", "User", 'expense', 25000, 'makanan', 'Kopi susu')
+        self.db.add_transaction("user", "User", 'expense', 30000, 'makanan', 'nasi goreng')
+        self.db.add_transaction("other", "Other", 'expense', 9000, 'makanan', 'kopi')
+
+        result = self.db.search_transactions("user", "kop")
+        self.assertEqual((result['count'], result['expense']), (1, 25000))
+        self.assertEqual(self.db.search_transactions("user", "nasi gor")['count'], 1)
+        self.assertEqual(self.db.search_transactions("user", "makanan")['count'], 2)
+        self.assertEqual(self.db.search_transactions("user", "kopi OR nasi")['count'], 0)
+        self.assertEqual(self.db.search_transactions("user", "")['count'], 0)
+
+    def test_categories(self):
+        self.assertIn('Makanan', self.db.get_available_categories('expense'))
+        self.assertTrue(self.db.add_category('Donasi', 'expense'))
+        self.assertFalse(self.db.add_category('donasi', 'expense'))
+        self.assertFalse(self.db.add_category('Aneh', 'transfer'))
+        self.assertEqual(self.db.categories.type_of('DONASI'), 'expense')
+
+    def test_last_transaction_id(self):
+        self.assertEqual(self.db.last_transaction_id("user"), 0)
+        self.db.add_transaction("user", "User", 'expense', 1000, 'makanan')
+        newest = self.db.submit_transaction("other", "Other", 'income', 1, 'gaji').result()
+        self.assertEqual(self.db.last_transaction_id("user"), newest)
+        # Id yang sudah dihapus tidak dipakai ulang
+        self.db.delete_transaction("other", newest)
+        self.assertEqual(self.db.last_transaction_id("user"), newest)
+        self.assertGreater(self.db.submit_transaction("user", "User", 'income', 1, 'gaji').result(), newest)
+
+    def test_iter_transaction_rows(self):
+        self._seed()
+        self.db.add_transaction("other", "Other", 'income', 1, 'gaji')
+        rows = list(self.db.iter_transaction_rows(chunk_size=7))
+        self.assertEqual([row[0] for row in rows], sorted(row[0] for row in rows))
+        self.assertEqual(len(rows), 49)
+
+        user_rows = list(self.db.iter_transaction_rows("user", chunk_size=7))
+        self.assertEqual(len(user_rows), 48)
+        self.assertEqual([(row[7], row[0]) for row in user_rows], sorted((row[7], row[0]) for row in user_rows))
+
+class TestSQLiteStorage(StorageConformance, unittest.TestCase):
+    def make_storage(self) -> Storage:
+        return DatabaseManager(os.path.join(self.temp_dir, 'bot.db'))
+
+    def test_archive_requires_archive_file(self):
+        with self.assertRaises(ValueError):
+            self.db.archive_transactions()
+
+class TestMemoryStorage(StorageConformance, unittest.TestCase):
+    def make_storage(self) -> Storage:
+        return MemoryStorage()
+
+    def test_archive_requires_archive_file(self):
+        with self.assertRaises(ValueError):
+            self.db.archive_transactions()
+
+class TestStorageEquivalence(unittest.TestCase):
+    """Operasi acak yang sama di kedua backend harus memberi hasil yang sama"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.sqlite = DatabaseManager(os.path.join(self.temp_dir, 'bot.db'))
+        self.memory = MemoryStorage()
+
+    def tearDown(self):
+        self.sqlite.close()
+        gc.collect()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_random_operations(self):
+        rng = random.Random(7)
+        users = [f"user{i}" for i in range(5)]
+        words = ['kopi', 'nasi', 'goreng', 'parkir', 'bensin', 'gaji', 'bonus']
+        rows = [(rng.choice(users), "User", rng.choice(('income', 'expense')), rng.randint(1, 500) * 100,
+                 rng.choice(('makanan', 'transport', 'gaji', 'hiburan')), ' '.join(rng.sample(words, 2)),
+                 f"2023-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00")
+                for _ in range(300)]
+        for db in (self.sqlite, self.memory):
+            db.add_transactions_bulk(rows)
+
+        for step in range(200):
+            user = rng.choice(users)
+            action = rng.random()
+            if action < 0.1:
+                transaction_id = rng.randint(1, 320)
+                self.assertEqual(self.sqlite.delete_transaction(user, transaction_id),
+                                 self.memory.delete_transaction(user, transaction_id))
+                continue
+            if action < 0.2:
+                first_id = rng.randint(1, 320)
+                last_id = first_id + rng.randint(0, 15)
+                self.assertEqual(self.sqlite.delete_transactions(user, first_id, last_id),
+                                 self.memory.delete_transactions(user, first_id, last_id))
+                continue
+
+            start = f"2023-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 00:00:00"
+            end = f"2023-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 00:00:00"
+            for method, args in [
+                ('get_user_balance', (user,)),
+                ('get_user_balance', (user, start, end)),
+                ('get_user_balance', (user, '2023-02-28 17:00:00', '2023-07-31 17:00:00')),
+                ('get_user_transactions', (user, 8, start, end)),
+                ('get_transactions_page', (user, rng.randint(1, 300), 5)),
+                ('get_monthly_summary', (user, 4)),
+                ('get_user_snapshot', (user, 5, start, end, 3)),
+                ('search_transactions', (user, rng.choice(words)[:rng.randint(2, 6)], 4)),
+                ('get_totals', ()),
+            ]:
+                with self.subTest(step=step, method=method, args=args):
+                    self.assertEqual(getattr(self.sqlite, method)(*args), getattr(self.memory, method)(*args))
+
+            # Urutan kategori dengan total sama tidak ditentukan, bandingkan isinya saja
+            self.assertEqual(self.sqlite.get_category_report(user, start, end),
+                             self.memory.get_category_report(user, start, end))
+
+        self.assertEqual(self.sqlite.verify_user_balances(), self.memory.verify_user_balances())
+
+class TestBackendSelection(unittest.TestCase):
+    def test_memory_backend(self):
+        bot = FinancialBotCore(backend='memory')
+        try:
+            self.assertIsInstance(bot.db, MemoryStorage)
+            response = bot.process_message("user", "User", "!income 100000 gaji")
+            self.assertIn("Saldo terbaru", response)
+            self.assertEqual(bot.get_user_stats("user")['balance']['income'], 10000000)
+        finally:
+            bot.close()
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            FinancialBotCore(backend='postgres')
+
+if __name__ == '__main__':
+    unittest.main()
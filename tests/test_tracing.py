@@ -0,0 +1,149 @@
+"""
+Unit tests untuk tracing query SQL
+"""
+
+import unittest
+import gc
+import os
+import json
+import tempfile
+import shutil
+import sys
+from unittest import mock
+
+# Add parent directory to path untuk import
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.bot_core import FinancialBotCore
+from core.database import DatabaseManager
+from core.sharding import ShardedDatabaseManager, shard_paths
+from core.tracing import QueryTracer, query_shape
+
+class TestQueryTracer(unittest.TestCase):
+    """Test statistik per bentuk query dan log query lambat"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'bot.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _stats_for(self, tracer, fragment):
+        matches = [query for query in tracer.snapshot() if fragment in query['shape']]
+        self.assertEqual(len(matches), 1, f"bentuk query '{fragment}' harus tepat satu")
+        return matches[0]
+
+    def test_query_shape(self):
+        """Spasi diringkas dan daftar placeholder IN disamakan"""
+        self.assertEqual(query_shape("SELECT *\n   FROM t  WHERE id IN (?, ?,?)"),
+                         "SELECT * FROM t WHERE id IN (?, ...)")
+        self.assertEqual(query_shape("DELETE FROM t WHERE id IN (?,?)"), query_shape("DELETE FROM t WHERE id IN (?, ?, ?, ?)"))
+
+    def test_counts_latency_and_rows(self):
+        """Jumlah eksekusi, baris hasil dan persentil tercatat per bentuk query"""
+        tracer = QueryTracer(slow_query_ms=10_000)
+        db = DatabaseManager(self.db_path, tracer=tracer)
+        try:
+            for i in range(5):
+                db.add_transaction("user1", "User1", 'expense', 1000 + i, 'makanan', f"makan {i}")
+            for _ in range(3):
+                self.assertEqual(len(db.get_user_transactions("user1", limit=4)), 4)
+            db.get_user_balance("user1")
+        finally:
+            db.close()
+
+        insert = self._stats_for(tracer, 'INSERT INTO ledger (user_ref, transaction_type, amount_minor, category_id, description) VALUES')
+        self.assertEqual(insert['count'], 5)
+        self.assertEqual(insert['rows'], 5)
+
+        page = self._stats_for(tracer, 'ORDER BY created_at DESC, id DESC')
+        self.assertEqual(page['count'], 3)
+        self.assertEqual(page['rows'], 12)
+        self.assertEqual(page['rows_per_query'], 4)
+        self.assertLessEqual(page['p50_ms'], page['p95_ms'])
+        self.assertLessEqual(page['p95_ms'], page['p99_ms'])
+        self.assertLessEqual(page['p99_ms'], page['max_ms'])
+
+        # fetchone tanpa membaca sampai habis tetap tercatat
+        self.assertEqual(self._stats_for(tracer, 'FROM user_balances WHERE user_id')['count'], 1)
+        self.assertEqual(tracer.slow_queries(), [])
+
+    def test_slow_query_logged_with_plan(self):
+        """Query di atas ambang disimpan sebagai bentuk query (tanpa nilai parameter) dan EXPLAIN QUERY PLAN"""
+        tracer = QueryTracer(slow_query_ms=0)
+        db = DatabaseManager(self.db_path, tracer=tracer)
+        try:
+            db.add_transaction("user1", "User1", 'expense', 1000, 'makanan', 'makan rahasia')
+            with self.assertLogs('FinancialBot.sql', level='WARNING') as logs:
+                db.get_user_transactions("user1", limit=5)
+        finally:
+            db.close()
+
+        slow = [entry for entry in tracer.slow_queries() if 'ORDER BY created_at DESC' in entry['shape']]
+        self.assertEqual(len(slow), 1)
+        self.assertTrue(any('idx_ledger_user_created' in line for line in slow[0]['plan']))
+        # User ID, nama dan deskripsi tidak pernah masuk log maupun dump
+        recorded = json.dumps(tracer.slow_queries()) + "\n".join(logs.output)
+        for value in ("user1", "User1", "rahasia"):
+            self.assertNotIn(value, recorded)
+
+    def test_cursor_collected_without_explain(self):
+        """Cursor yang dibuang garbage collector tetap dihitung, tanpa EXPLAIN di koneksinya"""
+        tracer = QueryTracer(slow_query_ms=0)
+        db = DatabaseManager(self.db_path, tracer=tracer)
+        try:
+            db.add_transaction("user1", "User1", 'expense', 1000, 'makanan', 'makan')
+            tracer.reset()
+            with mock.patch.object(tracer, '_explain', return_value=['plan']) as explain, \
+                    self.assertLogs('FinancialBot.sql', level='WARNING'):
+                with db.pool.connection() as conn:
+                    cursor = conn.execute("SELECT id FROM transactions WHERE user_id = ?", ("user1",))
+                    cursor.fetchone()
+                    del cursor
+                    gc.collect()
+        finally:
+            db.close()
+
+        explain.assert_not_called()
+        self.assertEqual(self._stats_for(tracer, 'FROM transactions WHERE user_id')['count'], 1)
+        self.assertEqual(tracer.slow_queries()[0]['plan'], [])
+
+    def test_dump_and_core_stats(self):
+        """Statistik tersedia lewat FinancialBotCore dan di-dump ke JSON saat close"""
+        dump_path = os.path.join(self.temp_dir, 'query_stats.json')
+        core = FinancialBotCore(self.db_path, tracer=QueryTracer(), query_stats_path=dump_path)
+        try:
+            core.process_message("user1", "User1", "keluar 25000 untuk makan siang")
+            stats = core.get_query_stats(limit=3)
+            self.assertEqual(len(stats['queries']), 3)
+        finally:
+            core.close()
+
+        with open(dump_path, encoding='utf-8') as source:
+            data = json.load(source)
+        self.assertTrue(data['queries'])
+        self.assertIn('slow_queries', data)
+
+        plain = FinancialBotCore(os.path.join(self.temp_dir, 'plain.db'))
+        try:
+            self.assertIsNone(plain.get_query_stats())
+            self.assertIsNone(plain.dump_query_stats())
+        finally:
+            plain.close()
+
+    def test_tracer_shared_by_shards(self):
+        """Satu tracer mengumpulkan query dari semua shard"""
+        tracer = QueryTracer(slow_query_ms=10_000)
+        db = ShardedDatabaseManager(shard_paths(self.db_path, 3), tracer=tracer)
+        try:
+            for i in range(30):
+                db.get_user_balance(f"user{i}")
+        finally:
+            db.close()
+
+        self.assertIs(db.tracer, tracer)
+        self.assertEqual(self._stats_for(tracer, 'FROM user_balances WHERE user_id')['count'], 30)
+
+if __name__ == '__main__':
+    unittest.main()